@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from logging.config import dictConfig
 
@@ -41,7 +42,16 @@ from papermerge.core.routers.version import (
     router as version_router,
 )
 from papermerge.core.version import __version__
-from papermerge.core.config import get_settings
+from papermerge.core.config import FileServer, get_settings
+from papermerge.core import executor
+from papermerge.core.features.document import manifests, previews
+from papermerge.core.features.useractivity import rollup as stats_rollup
+from papermerge.core.features.useractivity import writer as activity_writer
+from papermerge.core.features.tasks import outbox
+from papermerge.core.db.engine import engine, read_engine
+from papermerge.core.storage import get_storage_instance
+from papermerge.search import sync as search_sync
+from papermerge.search.db import triggers as search_triggers
 
 # customs
 # from papermerge.core.features.useractivity.storage import router as storage_router
@@ -51,7 +61,46 @@ from papermerge.core.features.document.router_document_stats import router as do
 
 config = get_settings()
 prefix = config.papermerge__main__api_prefix
-app = FastAPI(title="Papermerge DMS REST API", version=__version__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.papermerge__main__file_server == FileServer.S3:
+        # fails right away, not on first page operation, if misconfigured
+        get_storage_instance()
+    activity_writer.writer.start()
+    relay_tasks = (
+        config.papermerge__outbox__relay_in_app
+        and config.papermerge__redis__url is not None
+    )
+    if relay_tasks:
+        outbox.relay_worker.start()
+    sync_search = (
+        config.papermerge__search__sync_in_app and search_triggers.is_enabled()
+    )
+    if sync_search:
+        search_sync.sync_worker.start()
+    if config.papermerge__stats__rollup_in_app:
+        stats_rollup.rollup_worker.start()
+    yield
+    await previews.shutdown()
+    await manifests.shutdown()
+    await activity_writer.writer.shutdown()
+    if relay_tasks:
+        await outbox.relay_worker.shutdown()
+    if sync_search:
+        await search_sync.sync_worker.shutdown()
+    if config.papermerge__stats__rollup_in_app:
+        await stats_rollup.rollup_worker.shutdown()
+    executor.shutdown_pool()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+app = FastAPI(
+    title="Papermerge DMS REST API", version=__version__, lifespan=lifespan
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -2,6 +2,10 @@ import typer
 
 from papermerge.core.cli import perms as perms_cli
 from papermerge.core.cli import scopes as scopes_cli
+from papermerge.core.cli import nodes as nodes_cli
+from papermerge.core.cli import stats as stats_cli
+from papermerge.core.cli import tasks as tasks_cli
+from papermerge.core.cli import blobs as blobs_cli
 from papermerge.core.features.users.cli import cli as usr_cli
 from papermerge.core.features.groups.cli import cli as groups_cli
 from papermerge.core.cli import token as token_cli
@@ -15,6 +19,10 @@ app.add_typer(groups_cli.app, name="groups")
 app.add_typer(perms_cli.app, name="perms")
 app.add_typer(scopes_cli.app, name="scopes")
 app.add_typer(token_cli.app, name="tokens")
+app.add_typer(nodes_cli.app, name="nodes")
+app.add_typer(stats_cli.app, name="stats")
+app.add_typer(tasks_cli.app, name="tasks")
+app.add_typer(blobs_cli.app, name="blobs")
 app.add_typer(search.app, name="search")
 app.add_typer(index.app, name="index")
 app.add_typer(index_schema.app, name="index-schema")
@@ -0,0 +1,81 @@
+"""content addressed document version files
+
+Revision ID: a3c6e9f1b2d5
+Revises: f2b8d4e6a1c7
+Create Date: 2026-10-18 10:14:37.205318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c6e9f1b2d5'
+down_revision: Union[str, None] = 'f2b8d4e6a1c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column(
+            'last_used_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint('sha256'),
+    )
+    # existing versions keep NULL i.e. their per version file, until
+    # `paper-cli blobs dedup` moves them to the blob store
+    op.add_column(
+        'document_versions',
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+    )
+    op.create_foreign_key(
+        'document_versions_sha256_fkey',
+        'document_versions',
+        'blobs',
+        ['sha256'],
+        ['sha256'],
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'document_versions_sha256_idx',
+            'document_versions',
+            ['sha256'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Files already moved to the blob store are not moved back.
+    """
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'document_versions_sha256_idx',
+            table_name='document_versions',
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint(
+        'document_versions_sha256_fkey', 'document_versions', type_='foreignkey'
+    )
+    op.drop_column('document_versions', 'sha256')
+    op.drop_table('blobs')
@@ -0,0 +1,71 @@
+"""search index table
+
+Revision ID: a3f9c2d81b6e
+Revises: e4b1c7a9d2f3
+Create Date: 2026-10-17 14:02:19.530117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9c2d81b6e'
+down_revision: Union[str, None] = 'e4b1c7a9d2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Table is populated by `paper-cli index`
+    op.create_table(
+        'search_index',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('node_id', sa.Uuid(), nullable=False),
+        sa.Column('document_version_id', sa.Uuid(), nullable=True),
+        sa.Column('entity_type', sa.String(length=8), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=True),
+        sa.Column('lang', sa.String(length=8), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('page_number', sa.Integer(), nullable=True),
+        sa.Column('tags', sa.JSON(), nullable=False),
+        sa.Column(
+            'tsv',
+            postgresql.TSVECTOR().with_variant(sa.Text(), 'sqlite'),
+            nullable=True,
+        ),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['node_id'], ['nodes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'search_index_node_id_idx', 'search_index', ['node_id'], unique=False
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index(
+            'search_index_tsv_idx',
+            'search_index',
+            ['tsv'],
+            unique=False,
+            postgresql_using='gin',
+        )
+    elif op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index_fts USING fts5("
+            "id UNINDEXED, title, text, tags, "
+            "tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('search_index_tsv_idx', table_name='search_index')
+    elif op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_index_fts")
+    op.drop_index('search_index_node_id_idx', table_name='search_index')
+    op.drop_table('search_index')
@@ -0,0 +1,54 @@
+"""search changes table and triggers
+
+Revision ID: b7d2e4f19a0c
+Revises: a3f9c2d81b6e
+Create Date: 2026-10-17 16:41:52.207311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from papermerge.search.db import triggers
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f19a0c'
+down_revision: Union[str, None] = 'a3f9c2d81b6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'search_changes',
+        sa.Column(
+            'id',
+            sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+            nullable=False,
+        ),
+        sa.Column('node_id', sa.Uuid(), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(),
+            server_default=sa.text('(CURRENT_TIMESTAMP)'),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    # only with the database search backend; installed later, if needed,
+    # with `paper-cli index triggers`
+    if triggers.is_enabled():
+        for statement in triggers.create_statements(op.get_bind().dialect.name):
+            op.execute(statement)
+    # Index already built (`paper-cli index`) is brought up to date with
+    # `paper-cli index sync --reconcile`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in triggers.drop_statements(op.get_bind().dialect.name):
+        op.execute(statement)
+    op.drop_table('search_changes')
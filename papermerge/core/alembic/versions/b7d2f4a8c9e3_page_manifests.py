@@ -0,0 +1,35 @@
+"""page manifests of document versions
+
+Revision ID: b7d2f4a8c9e3
+Revises: a3c6e9f1b2d5
+Create Date: 2026-10-18 14:02:51.630417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f4a8c9e3'
+down_revision: Union[str, None] = 'a3c6e9f1b2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'document_versions',
+        sa.Column('manifest', sa.JSON(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Materialize pending manifests first (e.g. by downloading the
+    versions), otherwise those versions are left without file.
+    """
+    op.drop_column('document_versions', 'manifest')
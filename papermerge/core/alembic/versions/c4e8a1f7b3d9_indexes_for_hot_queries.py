@@ -0,0 +1,84 @@
+"""indexes for hot queries
+
+Revision ID: c4e8a1f7b3d9
+Revises: b7d2e4f19a0c
+Create Date: 2026-10-17 19:02:37.514120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f7b3d9'
+down_revision: Union[str, None] = 'b7d2e4f19a0c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# name -> (table, columns, partial index condition)
+INDEXES = {
+    'nodes_parent_id_ctype_title_idx': (
+        'nodes', ['parent_id', 'ctype', 'title'], None
+    ),
+    'documents_document_type_id_idx': (
+        'documents', ['document_type_id'], 'document_type_id IS NOT NULL'
+    ),
+    'document_versions_document_id_number_idx': (
+        'document_versions', ['document_id', 'number'], None
+    ),
+    'pages_document_version_id_number_idx': (
+        'pages', ['document_version_id', 'number'], None
+    ),
+    'custom_field_values_document_id_field_id_idx': (
+        'custom_field_values', ['document_id', 'field_id'], None
+    ),
+    'shared_nodes_user_id_node_id_idx': (
+        'shared_nodes', ['user_id', 'node_id'], 'user_id IS NOT NULL'
+    ),
+    'shared_nodes_group_id_node_id_idx': (
+        'shared_nodes', ['group_id', 'node_id'], 'group_id IS NOT NULL'
+    ),
+    'shared_nodes_node_id_idx': ('shared_nodes', ['node_id'], None),
+    'nodes_tags_node_id_idx': ('nodes_tags', ['node_id'], None),
+    'nodes_tags_tag_id_idx': ('nodes_tags', ['tag_id'], None),
+    'users_groups_user_id_idx': ('users_groups', ['user_id'], None),
+    'activities_user_id_created_at_idx': (
+        'activities', ['user_id', 'created_at'], None
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY does not block writes to (large) tables while index is
+    # built, but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, (table, columns, where) in INDEXES.items():
+            kwargs = {}
+            if where is not None:
+                kwargs['postgresql_where'] = sa.text(where)
+                kwargs['sqlite_where'] = sa.text(where)
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                **kwargs,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, (table, _, _) in INDEXES.items():
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,32 @@
+"""search changes triggers only with database search backend
+
+Revision ID: c4e8a2f6b1d9
+Revises: b7d2f4a8c9e3
+Create Date: 2026-10-19 09:41:12.207835
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from papermerge.search.db import triggers
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f6b1d9'
+down_revision: Union[str, None] = 'b7d2f4a8c9e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # triggers created regardless of search backend by b7d2e4f19a0c; with
+    # an external search engine nothing replays (nor empties) the log
+    if not triggers.is_enabled():
+        triggers.uninstall(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
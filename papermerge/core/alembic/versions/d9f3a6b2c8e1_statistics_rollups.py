@@ -0,0 +1,132 @@
+"""statistics rollups
+
+Revision ID: d9f3a6b2c8e1
+Revises: c4e8a1f7b3d9
+Create Date: 2026-10-17 21:14:08.302514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f3a6b2c8e1'
+down_revision: Union[str, None] = 'c4e8a1f7b3d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# rows of the recent time window are read by `paper-cli stats rollup`
+INDEXES = {
+    'user_activity_stats_timestamp_idx': ('user_activity_stats', ['timestamp']),
+    'nodes_created_at_idx': ('nodes', ['created_at']),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stats_activity_hourly',
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.Column('without_node', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'user_id', 'action'),
+    )
+    op.create_table(
+        'stats_documents_daily',
+        sa.Column(
+            'id',
+            sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+            nullable=False,
+        ),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=True),
+        sa.Column('group_id', sa.Uuid(), nullable=True),
+        sa.Column('document_type_id', sa.Uuid(), nullable=True),
+        sa.Column('documents', sa.BigInteger(), nullable=False),
+        sa.Column('versions', sa.BigInteger(), nullable=False),
+        sa.Column('bytes', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'stats_documents_daily_day_idx', 'stats_documents_daily', ['day']
+    )
+    op.create_table(
+        'stats_file_sizes_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('size_category', sa.String(length=32), nullable=False),
+        sa.Column('files', sa.BigInteger(), nullable=False),
+        sa.Column('bytes', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'size_category'),
+    )
+    op.create_table(
+        'stats_tags',
+        sa.Column('tag_id', sa.Uuid(), nullable=False),
+        sa.Column('documents', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('tag_id'),
+    )
+    op.create_table(
+        'stats_roles',
+        sa.Column('role_id', sa.Uuid(), nullable=False),
+        sa.Column('users', sa.BigInteger(), nullable=False),
+        sa.Column('nodes', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('role_id'),
+    )
+    op.create_table(
+        'stats_shared_nodes',
+        sa.Column('node_id', sa.Uuid(), nullable=False),
+        sa.Column('shares', sa.BigInteger(), nullable=False),
+        sa.Column('user_shares', sa.BigInteger(), nullable=False),
+        sa.Column('group_shares', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('node_id'),
+    )
+    op.create_table(
+        'stats_largest_documents',
+        sa.Column('node_id', sa.Uuid(), nullable=False),
+        sa.Column('bytes', sa.BigInteger(), nullable=False),
+        sa.Column('versions', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('node_id'),
+    )
+    op.create_table(
+        'stats_rollup_state',
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('rolled_up_until', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+    with op.get_context().autocommit_block():
+        for name, (table, columns) in INDEXES.items():
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+    # rollups are computed by the first run of `paper-cli stats rollup`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, (table, _) in INDEXES.items():
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
+    op.drop_table('stats_rollup_state')
+    op.drop_table('stats_largest_documents')
+    op.drop_table('stats_shared_nodes')
+    op.drop_table('stats_roles')
+    op.drop_table('stats_tags')
+    op.drop_table('stats_file_sizes_daily')
+    op.drop_index('stats_documents_daily_day_idx', table_name='stats_documents_daily')
+    op.drop_table('stats_documents_daily')
+    op.drop_table('stats_activity_hourly')
@@ -0,0 +1,44 @@
+"""nodes closure table
+
+Revision ID: e4b1c7a9d2f3
+Revises: 7d457cc1b01d
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b1c7a9d2f3'
+down_revision: Union[str, None] = '7d457cc1b01d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Table is populated by `paper-cli nodes closure-rebuild`
+    op.create_table(
+        'nodes_closure',
+        sa.Column('ancestor_id', sa.Uuid(), nullable=False),
+        sa.Column('descendant_id', sa.Uuid(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['nodes.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['nodes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+    )
+    op.create_index(
+        'nodes_closure_descendant_id_depth_idx',
+        'nodes_closure',
+        ['descendant_id', 'depth'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('nodes_closure_descendant_id_depth_idx', table_name='nodes_closure')
+    op.drop_table('nodes_closure')
@@ -0,0 +1,42 @@
+"""activities created_at index
+
+Revision ID: e5a7c3d1f9b4
+Revises: d9f3a6b2c8e1
+Create Date: 2026-10-17 22:41:37.118260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c3d1f9b4'
+down_revision: Union[str, None] = 'd9f3a6b2c8e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keyset pagination and export of all activities
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'activities_created_at_id_idx',
+            'activities',
+            ['created_at', 'id'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'activities_created_at_id_idx',
+            table_name='activities',
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,58 @@
+"""task outbox
+
+Revision ID: f2b8d4e6a1c7
+Revises: e5a7c3d1f9b4
+Create Date: 2026-10-17 23:52:10.447813
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4e6a1c7'
+down_revision: Union[str, None] = 'e5a7c3d1f9b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_outbox',
+        sa.Column(
+            'id',
+            sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+            nullable=False,
+        ),
+        sa.Column('task_name', sa.String(), nullable=False),
+        sa.Column('kwargs', sa.JSON(), nullable=False),
+        sa.Column('route_name', sa.String(), nullable=True),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column(
+            'available_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'task_outbox_available_at_idx', 'task_outbox', ['available_at']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('task_outbox_available_at_idx', table_name='task_outbox')
+    op.drop_table('task_outbox')
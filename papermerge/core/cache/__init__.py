@@ -8,6 +8,10 @@ redis_url = settings.papermerge__redis__url
 cache_enabled = settings.papermerge__main__cache_enabled
 
 if redis_url and cache_enabled:
-    client = RedisClient(redis_url)
+    client = RedisClient(
+        redis_url,
+        prefix=settings.papermerge__main__prefix,
+        ttl_jitter=settings.papermerge__redis__ttl_jitter,
+    )
 else:
     client = EmptyClient()
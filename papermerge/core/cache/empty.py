@@ -1,9 +1,67 @@
+from typing import Awaitable, Callable, Iterable, Mapping
+
+from .redis_client import Value, _to_bytes
+
+
+class Pipeline:
+    def __init__(self):
+        self._count = 0
+
+    def get(self, key: str) -> "Pipeline":
+        self._count += 1
+        return self
+
+    def set(self, key: str, value: Value, ex: int = 60) -> "Pipeline":
+        self._count += 1
+        return self
+
+    def delete(self, *keys: str) -> "Pipeline":
+        self._count += 1
+        return self
+
+    async def execute(self) -> list:
+        result = [None] * self._count
+        self._count = 0
+        return result
+
+    async def __aenter__(self) -> "Pipeline":
+        return self
+
+    async def __aexit__(self, *args):
+        self._count = 0
+
+
 class Client:
+    """Cache which never caches anything
+
+    Used when cache is disabled.
+    """
 
-    def get(self, key):
+    async def get(self, key: str) -> bytes | None:
         return None
 
-    def set(self, key, value, ex: int = 60): ...
+    async def set(self, key: str, value: Value, ex: int = 60): ...
+
+    async def mget(self, keys: Iterable[str]) -> list[bytes | None]:
+        return [None for _ in keys]
+
+    async def mset(self, mapping: Mapping[str, Value], ex: int = 60): ...
+
+    async def delete(self, *keys: str): ...
+
+    def pipeline(self) -> Pipeline:
+        return Pipeline()
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Value]],
+        ex: int = 60,
+        lock_timeout: float = 10,
+    ) -> bytes:
+        return _to_bytes(await compute())
+
+    async def close(self): ...
 
 
 def get_client():
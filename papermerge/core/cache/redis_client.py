@@ -1,21 +1,209 @@
-import redis
+"""
+Asyncio Redis cache client
+
+All keys are namespaced with `prefix` (i.e. `PAPERMERGE__MAIN__PREFIX`), so
+that several Papermerge instances can share one Redis database. Values are
+stored as bytes; `str` values are stored UTF-8 encoded and are returned
+as bytes, decoding them is up to the caller.
+
+Expiration time of each key is randomly extended by up to `ttl_jitter`
+(fraction of the TTL), so that keys cached at the same moment do not all
+expire at the same moment.
+"""
+import asyncio
+import logging
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, Iterable, Mapping
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+Value = bytes | str
+
+# deletes lock KEYS[1] only if it is still held with token ARGV[1] i.e. lock
+# which expired meanwhile and was taken by someone else is left alone
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _to_bytes(value: Value) -> bytes:
+    if isinstance(value, str):
+        return value.encode("utf-8")
+
+    return value
+
+
+class Pipeline:
+    """Queues cache commands and sends them in a single round trip
+
+        async with cache.pipeline() as pipe:
+            pipe.set("a", b"1", ex=60)
+            pipe.get("b")
+            a_set, b = await pipe.execute()
+    """
+
+    def __init__(self, client: "Client"):
+        self._client = client
+        self._pipe = client.connection.pipeline(transaction=False)
+
+    def get(self, key: str) -> "Pipeline":
+        self._pipe.get(self._client.key(key))
+        return self
+
+    def set(self, key: str, value: Value, ex: int = 60) -> "Pipeline":
+        self._pipe.set(self._client.key(key), value, ex=self._client.ttl(ex))
+        return self
+
+    def delete(self, *keys: str) -> "Pipeline":
+        self._pipe.delete(*[self._client.key(key) for key in keys])
+        return self
+
+    async def execute(self) -> list:
+        return await self._pipe.execute()
+
+    async def __aenter__(self) -> "Pipeline":
+        return self
+
+    async def __aexit__(self, *args):
+        await self._pipe.reset()
 
 
 class Client:
-    def __init__(self, url):
+    def __init__(
+        self,
+        url: str | None = None,
+        prefix: str = "",
+        ttl_jitter: float = 0.1,
+        connection: redis.Redis | None = None,
+    ):
         self.url = url
-        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self.ttl_jitter = ttl_jitter
+        self.connection = connection or redis.from_url(url)
+        # computations in progress (in this process), see `get_or_compute`
+        self._computing: dict[str, asyncio.Future] = {}
 
-    def get(self, key):
-        if self.client.exists(key):
-            return self.client.get(key).decode("utf-8")
+    def key(self, key: str) -> str:
+        if self.prefix:
+            return f"{self.prefix}:{key}"
 
-        return None
+        return key
 
-    def set(self, key, value, ex: int = 60):
+    def ttl(self, ex: int) -> int:
+        """Returns `ex` extended by random jitter"""
+        return ex + int(ex * random.uniform(0, self.ttl_jitter))
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.connection.get(self.key(key))
+
+    async def set(self, key: str, value: Value, ex: int = 60):
         """ex is number of SECONDS until key expires"""
-        self.client.set(key, value, ex)
+        await self.connection.set(self.key(key), value, ex=self.ttl(ex))
+
+    async def mget(self, keys: Iterable[str]) -> list[bytes | None]:
+        keys = [self.key(key) for key in keys]
+        if len(keys) == 0:
+            return []
+
+        return await self.connection.mget(keys)
+
+    async def mset(self, mapping: Mapping[str, Value], ex: int = 60):
+        """Sets all keys (each with its own expiration jitter) in one round trip"""
+        if len(mapping) == 0:
+            return
+
+        async with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ex)
+            await pipe.execute()
+
+    async def delete(self, *keys: str):
+        if len(keys) == 0:
+            return
+
+        await self.connection.delete(*[self.key(key) for key in keys])
+
+    def pipeline(self) -> Pipeline:
+        return Pipeline(self)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Value]],
+        ex: int = 60,
+        lock_timeout: float = 10,
+    ) -> bytes:
+        """Returns cached value of `key`; on cache miss computes and caches it
+
+        Protects against cache stampede: concurrent callers within the same
+        process share one computation, and across processes only the holder
+        of the (short lived) `lock:<key>` computes the value while others
+        wait for it to appear in cache. If the value does not appear within
+        `lock_timeout` seconds, waiting caller computes the value itself.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        if key in self._computing:
+            return await asyncio.shield(self._computing[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._computing[key] = future
+        try:
+            value = await self._compute_once(key, compute, ex, lock_timeout)
+            future.set_result(value)
+        except Exception as e:
+            future.set_exception(e)
+            # mark exception as retrieved: it is re-raised right here,
+            # while waiters (if any) get it from the future
+            future.exception()
+            raise
+        finally:
+            del self._computing[key]
+
+        return value
+
+    async def _compute_once(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Value]],
+        ex: int,
+        lock_timeout: float,
+    ) -> bytes:
+        lock_key = self.key(f"lock:{key}")
+        token = uuid.uuid4().hex
+        acquired = await self.connection.set(
+            lock_key, token, nx=True, px=int(lock_timeout * 1000)
+        )
+        if not acquired:
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                value = await self.get(key)
+                if value is not None:
+                    return value
+            logger.warning(f"Timeout waiting for {key} to be computed")
+
+        try:
+            value = _to_bytes(await compute())
+            await self.set(key, value, ex=ex)
+        finally:
+            if acquired:
+                await self.connection.eval(RELEASE_LOCK, 1, lock_key, token)
+
+        return value
+
+    async def close(self):
+        await self.connection.aclose()
 
 
-def get_client(url):
-    return Client(url)
+def get_client(url, prefix: str = "", ttl_jitter: float = 0.1):
+    return Client(url, prefix=prefix, ttl_jitter=ttl_jitter)
@@ -0,0 +1,77 @@
+"""
+Benchmark of per request authentication overhead
+
+Resolves current user (as `get_current_user` dependency does for every
+request) `requests` times, with and without principal cache:
+
+    $ python -m papermerge.core.cli.auth_bench admin --groups staff
+"""
+import statistics
+import time
+
+import typer
+from fastapi.security import SecurityScopes
+from rich.console import Console
+from rich.table import Table
+
+from papermerge.core import utils
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features import auth
+from papermerge.core.features.auth import principal_cache
+from papermerge.core.features.users.db import api as usr_dbapi
+from papermerge.core.utils.cli import async_command
+
+app = typer.Typer(help="Authentication overhead benchmark")
+
+
+def make_token(user_id: str, username: str, email: str, groups: list[str]) -> str:
+    payload = utils.base64.encode(
+        {
+            "sub": user_id,
+            "preferred_username": username,
+            "email": email,
+            "groups": groups,
+            "scopes": [],
+        }
+    )
+    return f"header.{payload}.signature"
+
+
+@app.command()
+@async_command
+async def bench(username: str, requests: int = 1000, groups: list[str] = []):
+    """Measures `get_current_user` latency with and without principal cache"""
+    async with AsyncSessionLocal() as db_session:
+        user = await usr_dbapi.get_user(db_session, username)
+
+    token = make_token(str(user.id), username, user.email, groups)
+    ttl = principal_cache.config.papermerge__main__principal_cache_ttl
+
+    table = Table(title=f"get_current_user x {requests}")
+    table.add_column("principal cache", style="cyan")
+    table.add_column("mean ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+
+    for name, cache_ttl in (("off", 0), (f"ttl={ttl or 60}s", ttl or 60)):
+        principal_cache.config.papermerge__main__principal_cache_ttl = cache_ttl
+        await principal_cache.invalidate()
+        latencies = []
+        for _ in range(requests):
+            start = time.monotonic()
+            async with AsyncSessionLocal() as db_session:
+                await auth.get_current_user(
+                    SecurityScopes(), remote_user=None, token=token, db_session=db_session
+                )
+            latencies.append(time.monotonic() - start)
+
+        table.add_row(
+            name,
+            f"{statistics.mean(latencies) * 1000:.3f}",
+            f"{statistics.quantiles(latencies, n=100)[94] * 1000:.3f}",
+        )
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+import typer
+from rich.console import Console
+from sqlalchemy import func, select
+
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.document import blobs
+from papermerge.core.features.document.db.orm import Blob, DocumentVersion
+from papermerge.core.utils.cli import async_command
+
+app = typer.Typer(help="Content addressed storage of document version files")
+console = Console()
+
+
+def check_enabled():
+    if not blobs.is_enabled():
+        console.print(
+            "[red]Blob store is disabled"
+            " (see papermerge__main__blob_store, papermerge__main__file_server)"
+            "[/red]"
+        )
+        raise typer.Exit(1)
+
+
+@app.command("dedup")
+@async_command
+async def dedup_cmd(batch_size: int = 100, min_age: int = 60):
+    """Moves files of existing document versions to the blob store
+
+    Files with the same content are stored once. Files modified within
+    `min_age` seconds are skipped. Safe to run on a live installation and
+    to interrupt: completed batches are committed.
+    """
+    check_enabled()
+    async with AsyncSessionLocal() as db_session:
+        result = await blobs.dedup(
+            db_session, batch_size=batch_size, min_age=timedelta(seconds=min_age)
+        )
+
+    console.print(
+        f"Moved {result.versions} files ({result.duplicates} duplicates,"
+        f" {result.saved_bytes} bytes saved), {result.missing} files missing"
+    )
+
+
+@app.command("gc")
+@async_command
+async def gc_cmd(grace: int = 3600, orphans: bool = False):
+    """Removes blobs not referenced by any document version
+
+    Only blobs not (re)used within last `grace` seconds are removed. With
+    --orphans, also files without blob row are removed (scans the whole
+    blob store).
+    """
+    check_enabled()
+    async with AsyncSessionLocal() as db_session:
+        result = await blobs.gc(
+            db_session, grace=timedelta(seconds=grace), orphans=orphans
+        )
+
+    console.print(
+        f"Removed {result.blobs} blobs ({result.bytes} bytes),"
+        f" {result.orphans} orphan files"
+    )
+
+
+@app.command("stats")
+@async_command
+async def stats_cmd():
+    """Stored vs referenced size of document version files"""
+    refs = (
+        select(DocumentVersion.sha256, func.count().label("count"))
+        .where(DocumentVersion.sha256.is_not(None))
+        .group_by(DocumentVersion.sha256)
+        .subquery()
+    )
+    stmt = select(
+        func.count(Blob.sha256),
+        func.coalesce(func.sum(Blob.size), 0),
+        func.coalesce(func.sum(Blob.size * refs.c.count), 0),
+        func.count(Blob.sha256).filter(refs.c.count.is_(None)),
+    ).outerjoin(refs, refs.c.sha256 == Blob.sha256)
+    legacy = select(func.count()).where(DocumentVersion.sha256.is_(None))
+
+    async with AsyncSessionLocal() as db_session:
+        count, stored, referenced, unreferenced = (
+            await db_session.execute(stmt)
+        ).one()
+        legacy_count = await db_session.scalar(legacy)
+
+    console.print(f"Blobs: {count} ({unreferenced} unreferenced)")
+    console.print(f"Stored: {stored} bytes, referenced: {referenced} bytes")
+    console.print(f"Versions not in blob store: {legacy_count}")
@@ -0,0 +1,50 @@
+"""
+Benchmark of CloudFront URL signing
+
+Signs `count` distinct URLs (first time - each URL is actually signed,
+second time - memoized URLs are returned), and reports time per 1,000 URLs:
+
+    $ python -m papermerge.core.cli.cf_sign_url_bench --count 1000
+
+Uses configured CF_SIGN_URL_PRIVATE_KEY and CF_SIGN_URL_KEY_ID.
+"""
+import time
+import uuid
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from papermerge.core import cloudfront
+
+app = typer.Typer(help="CloudFront URL signing benchmark")
+
+
+@app.command()
+def bench(count: int = 1000, valid_for: int = 600):
+    """Measures signing throughput per 1,000 URLs"""
+    urls = [f"https://cdn.example.com/thumbnails/{uuid.uuid4()}.jpg" for _ in range(count)]
+
+    table = Table(title=f"Signing {count} URLs")
+    table.add_column("run", style="cyan")
+    table.add_column("ms per 1,000 URLs", justify="right")
+    table.add_column("URLs/s", justify="right")
+
+    for name, sign in (
+        ("one by one (not memoized)", lambda: [cloudfront.sign_url(url, valid_for) for url in urls]),
+        ("bulk (memoized)", lambda: cloudfront.sign_urls(urls, valid_for)),
+    ):
+        start = time.monotonic()
+        sign()
+        elapsed = time.monotonic() - start
+        table.add_row(
+            name,
+            f"{elapsed * 1000 * 1000 / count:.1f}",
+            f"{count / elapsed:.0f}",
+        )
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,167 @@
+"""
+Benchmark of nodes tree lookups: recursive CTEs vs closure table
+
+Creates a synthetic tree in user's home folder: `--fanout` folders per
+folder, `--depth` levels deep, with `--docs` documents in each folder of
+the last level, (re)builds `nodes_closure` and measures latency of
+ancestors, descendants and subtree size (`count_descendants`) lookups with
+`papermerge__main__nodes_closure_table` disabled (recursive CTEs) and
+enabled (closure table):
+
+    $ python -m papermerge.core.cli.closure_bench <user-id> --fanout 10 --depth 3
+
+Everything is done in one transaction, which is rolled back at the end,
+thus no data (nor rebuilt closure table) is left behind.
+"""
+import statistics
+import time
+import uuid
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import text
+
+from papermerge.core import orm
+from papermerge.core.db import closure
+from papermerge.core.db.common import (
+    count_descendants,
+    get_ancestors,
+    get_descendants,
+)
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.utils.cli import async_command
+
+app = typer.Typer(help="Nodes closure table benchmark")
+console = Console()
+
+# `fanout` (or `docs`) children of each of `parent_ids`
+INSERT_CHILDREN = """
+    WITH new_nodes AS (
+        INSERT INTO nodes (id, title, ctype, lang, user_id, parent_id, created_at, updated_at)
+        SELECT gen_random_uuid(), :prefix || i, '{ctype}', 'deu',
+               :user_id, parent_id, now(), now()
+        FROM unnest(CAST(:parent_ids AS uuid[])) AS parent_id
+        CROSS JOIN generate_series(1, :count) AS i
+        RETURNING id
+    )
+    INSERT INTO {table} SELECT id{values} FROM new_nodes RETURNING node_id
+"""
+INSERT_FOLDERS = text(
+    INSERT_CHILDREN.format(ctype="folder", table="folders (node_id)", values="")
+)
+INSERT_DOCUMENTS = text(
+    INSERT_CHILDREN.format(
+        ctype="document",
+        table="documents (node_id, ocr, ocr_status)",
+        values=", false, 'UNKNOWN'",
+    )
+)
+
+
+def _percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+async def _measure(lookup, repeat: int) -> str:
+    latencies = []
+    for _ in range(repeat):
+        start = time.monotonic()
+        await lookup()
+        latencies.append((time.monotonic() - start) * 1000)
+
+    return f"{_percentile(latencies, 50):.1f} / {_percentile(latencies, 95):.1f}"
+
+
+@app.command()
+@async_command
+async def bench(
+    user_id: uuid.UUID,
+    fanout: int = 10,
+    depth: int = 3,
+    docs: int = 20,
+    repeat: int = 20,
+):
+    """Compares tree lookups with recursive CTEs and with closure table"""
+    prefix = f"bench-{uuid.uuid4().hex[:8]}-"
+    enabled = closure.config.papermerge__main__nodes_closure_table
+
+    async with AsyncSessionLocal() as db_session:
+        user = await db_session.get(orm.User, user_id)
+        params = {"user_id": user_id}
+
+        start = time.monotonic()
+        levels = [[user.home_folder_id]]
+        for level in range(1, depth + 1):
+            result = await db_session.scalars(
+                INSERT_FOLDERS,
+                {
+                    **params,
+                    "prefix": f"{prefix}{level}-",
+                    "parent_ids": levels[-1],
+                    "count": fanout,
+                },
+            )
+            levels.append(result.all())
+        await db_session.execute(
+            INSERT_DOCUMENTS,
+            {**params, "prefix": "bench-", "parent_ids": levels[-1], "count": docs},
+        )
+        rows = await closure.rebuild(db_session, commit=False)
+        await db_session.execute(text("ANALYZE nodes, nodes_closure"))
+        console.print(
+            f"Created tree and {rows} closure rows in {time.monotonic() - start:.1f}s"
+        )
+
+        top_ids, leaf_id = levels[1], levels[-1][0]
+        subtree = await count_descendants(db_session, [user.home_folder_id])
+        lookups = [
+            (
+                "ancestors of a leaf folder",
+                lambda: get_ancestors(db_session, node_id=leaf_id),
+            ),
+            (
+                "descendants of a top folder",
+                lambda: get_descendants(db_session, node_ids=[top_ids[0]]),
+            ),
+            (
+                "subtree size of a top folder",
+                lambda: count_descendants(db_session, [top_ids[0]]),
+            ),
+            (
+                f"subtree sizes of {len(top_ids)} top folders",
+                lambda: count_descendants(db_session, top_ids),
+            ),
+            (
+                "subtree size of home folder",
+                lambda: count_descendants(db_session, [user.home_folder_id]),
+            ),
+        ]
+
+        table = Table(
+            title=f"Tree of {subtree[user.home_folder_id]} nodes in home folder"
+            f" (fanout {fanout}, depth {depth}, {docs} documents per leaf folder);"
+            f" p50 / p95 ms over {repeat} runs"
+        )
+        table.add_column("lookup", style="cyan")
+        table.add_column("recursive CTE", justify="right")
+        table.add_column("closure table", justify="right")
+
+        try:
+            for label, lookup in lookups:
+                row = [label]
+                for closure_enabled in (False, True):
+                    closure.config.papermerge__main__nodes_closure_table = (
+                        closure_enabled
+                    )
+                    row.append(await _measure(lookup, repeat))
+                table.add_row(*row)
+        finally:
+            closure.config.papermerge__main__nodes_closure_table = enabled
+            await db_session.rollback()
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,134 @@
+"""
+Benchmark of `utils.misc.copy_file`
+
+Copies a file of `--size-mb` megabytes (from a path and from an in memory
+`io.BytesIO`) with the previous implementation of `copy_file`, which read
+the whole source into memory, and with the current one, and reports
+throughput and peak memory:
+
+    $ python -m papermerge.core.cli.copy_bench --size-mb 1024
+
+Each copy runs in a fresh process; "peak RSS" is the growth of its peak
+resident set size during the copy, i.e. memory needed by the copy itself
+(for `bytesio` the source buffer, written chunk by chunk like a spooled
+upload, is allocated before the measurement). Peak RSS is reset via
+`/proc/self/clear_refs`, i.e. numbers are precise on Linux only.
+Page cache is not dropped between runs: numbers of the path copies are
+those of a hot cache.
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import aiofiles
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from papermerge.core.utils import misc
+
+app = typer.Typer(help="File copy benchmark")
+
+MB = 1024 * 1024
+
+
+async def previous_copy_file(src: Path | io.BytesIO, dst: Path):
+    """`copy_file` as it was: whole content is read into memory"""
+    if isinstance(src, Path):
+        async with aiofiles.open(src, "rb") as src_file:
+            async with aiofiles.open(dst, "wb") as dst_file:
+                content = await src_file.read()
+                await dst_file.write(content)
+    else:
+        async with aiofiles.open(dst, "wb") as f:
+            await f.write(src.getvalue())
+
+
+def reset_peak_rss():
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def rss(field: str) -> int:
+    """`VmRSS` (current) or `VmHWM` (peak) resident set size in bytes"""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(implementation: str, source: str, src: Path, dst: Path, fsync: bool):
+    """Runs in a fresh process; returns (seconds, peak RSS growth in bytes)"""
+    if source == "bytesio":
+        buffer = io.BytesIO()
+        with open(src, "rb") as f:
+            while chunk := f.read(MB):
+                buffer.write(chunk)
+        src = buffer
+
+    copy = misc.copy_file if implementation == "current" else previous_copy_file
+    kwargs = {"fsync": fsync} if implementation == "current" else {}
+
+    reset_peak_rss()
+    rss_before = rss("VmRSS")
+    start = time.monotonic()
+    asyncio.run(copy(src, dst, **kwargs))
+    elapsed = time.monotonic() - start
+
+    return elapsed, max(rss("VmHWM") - rss_before, 0)
+
+
+def run_isolated(*args):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure, *args).result()
+
+
+@app.command()
+def bench(size_mb: int = 1024, fsync: bool = False, dir: Path | None = None):
+    """Compares previous and current `copy_file`"""
+    table = Table(title=f"Copying {size_mb} MB file")
+    table.add_column("source", style="cyan")
+    table.add_column("copy_file", style="cyan")
+    table.add_column("seconds", justify="right")
+    table.add_column("MB/s", justify="right")
+    table.add_column("peak RSS MB", justify="right")
+
+    with tempfile.TemporaryDirectory(dir=dir) as tmpdir:
+        src = Path(tmpdir) / "src.bin"
+        with open(src, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(MB))
+
+        for source in ("path", "bytesio"):
+            for implementation in ("previous", "current"):
+                dst = Path(tmpdir) / f"{source}-{implementation}.bin"
+                elapsed, growth = run_isolated(
+                    implementation, source, src, dst, fsync
+                )
+                table.add_row(
+                    source,
+                    implementation,
+                    f"{elapsed:.2f}",
+                    f"{size_mb / elapsed:.0f}",
+                    f"{growth / MB:.1f}",
+                )
+                dst.unlink()
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
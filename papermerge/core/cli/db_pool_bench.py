@@ -0,0 +1,81 @@
+"""
+Load test of database connection pooling
+
+Simulates `concurrency` clients, each opening `requests` short sessions
+(like `get_db` does per HTTP request), and compares latency of unpooled
+connections (NullPool) vs pooled ones (current pool settings):
+
+    $ python -m papermerge.core.cli.db_pool_bench --concurrency 20 --requests 50
+"""
+import asyncio
+import statistics
+import time
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from papermerge.core.db import engine as db_engine
+from papermerge.core.utils.cli import async_command
+
+app = typer.Typer(help="Database connection pool load test")
+
+
+async def _client(sessionmaker, requests: int, latencies: list[float]):
+    for _ in range(requests):
+        start = time.monotonic()
+        async with sessionmaker() as db_session:
+            await db_session.execute(text("SELECT 1"))
+        latencies.append(time.monotonic() - start)
+
+
+async def _run(engine: AsyncEngine, concurrency: int, requests: int) -> list[float]:
+    latencies = []
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        await asyncio.gather(
+            *[_client(sessionmaker, requests, latencies) for _ in range(concurrency)]
+        )
+    finally:
+        await engine.dispose()
+
+    return latencies
+
+
+def _percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+@app.command()
+@async_command
+async def bench(concurrency: int = 10, requests: int = 100):
+    """Compares session latency with and without connection pool"""
+    table = Table(title=f"{concurrency} clients x {requests} requests")
+    table.add_column("pool", style="cyan")
+    table.add_column("mean ms", justify="right")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("req/s", justify="right")
+
+    pool_size = db_engine.config.papermerge__database__pool_size
+    for name, size in (("none", 0), (f"size={pool_size}", pool_size)):
+        db_engine.config.papermerge__database__pool_size = size
+        engine = db_engine.create_engine(db_engine.SQLALCHEMY_DATABASE_URL)
+        start = time.monotonic()
+        latencies = await _run(engine, concurrency, requests)
+        elapsed = time.monotonic() - start
+        table.add_row(
+            name,
+            f"{statistics.mean(latencies) * 1000:.2f}",
+            f"{_percentile(latencies, 50) * 1000:.2f}",
+            f"{_percentile(latencies, 95) * 1000:.2f}",
+            f"{len(latencies) / elapsed:.0f}",
+        )
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,204 @@
+"""
+Benchmark of documents by type table view
+
+Creates a document type with custom fields of several types and `docs`
+documents of that type (with custom field values) in user's home folder and
+measures latency of `get_docs_by_type` - unordered, ordered by each custom
+field, on deep pages and with filters:
+
+    $ python -m papermerge.core.cli.docs_by_type_bench <user-id> --docs 100000
+
+Everything is done in one transaction, which is rolled back at the end,
+thus no data is left behind.
+"""
+import statistics
+import time
+import uuid
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import text
+
+from papermerge.core import orm, schema
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.document.db import api as doc_dbapi
+from papermerge.core.types import CFFilterOp, OrderEnum
+from papermerge.core.utils.cli import async_command
+
+app = typer.Typer(help="Documents by type benchmark")
+console = Console()
+
+SEED = [
+    """
+    INSERT INTO document_types (id, name, user_id, created_at)
+    VALUES (:type_id, 'bench-' || :tag, :user_id, now())
+    """,
+    """
+    INSERT INTO custom_fields (id, name, type, user_id, created_at)
+    VALUES
+        (gen_random_uuid(), 'bench-shop-' || :tag, 'text', :user_id, now()),
+        (gen_random_uuid(), 'bench-total-' || :tag, 'monetary', :user_id, now()),
+        (gen_random_uuid(), 'bench-date-' || :tag, 'date', :user_id, now()),
+        (gen_random_uuid(), 'bench-year-' || :tag, 'int', :user_id, now())
+    """,
+    """
+    INSERT INTO document_types_custom_fields (document_type_id, custom_field_id)
+    SELECT :type_id, id FROM custom_fields WHERE name LIKE 'bench-%-' || :tag
+    """,
+    """
+    INSERT INTO nodes (id, title, ctype, lang, user_id, parent_id, created_at, updated_at)
+    SELECT gen_random_uuid(), 'bench-' || i || '.pdf', 'document', 'deu',
+           :user_id, :parent_id, now(), now()
+    FROM generate_series(1, :docs) AS i
+    """,
+    """
+    INSERT INTO documents (node_id, ocr, ocr_status, document_type_id)
+    SELECT id, false, 'UNKNOWN', :type_id FROM nodes
+    WHERE parent_id = :parent_id AND title LIKE 'bench-%.pdf'
+    """,
+    # every document has all but (every tenth) one value
+    """
+    INSERT INTO custom_field_values (
+        id, document_id, field_id, value_text, value_monetary, value_date,
+        value_int, created_at
+    )
+    SELECT
+        gen_random_uuid(), documents.node_id, cf.id,
+        CASE WHEN cf.type = 'text' THEN 'shop ' || (h % 50) END,
+        CASE WHEN cf.type = 'monetary' THEN (h % 100000) / 100.0 END,
+        CASE WHEN cf.type = 'date' THEN now() - (h % 3650) * interval '1 day' END,
+        CASE WHEN cf.type = 'int' THEN 2000 + h % 25 END,
+        now()
+    FROM documents
+    CROSS JOIN custom_fields cf
+    CROSS JOIN LATERAL (
+        SELECT abs(hashtext(documents.node_id::text || cf.id::text)) AS h
+    ) AS hashed
+    WHERE documents.document_type_id = :type_id
+    AND cf.name LIKE 'bench-%-' || :tag
+    AND h % 10 <> 0
+    """,
+    "ANALYZE nodes, documents, custom_field_values",
+]
+
+
+def _percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+@app.command()
+@async_command
+async def bench(
+    user_id: uuid.UUID,
+    docs: int = 100_000,
+    page_size: int = 20,
+    repeat: int = 10,
+):
+    """Measures latency of documents by type table view"""
+    type_id = uuid.uuid4()
+
+    async with AsyncSessionLocal() as db_session:
+        user = await db_session.get(orm.User, user_id)
+        params = {
+            "user_id": user_id,
+            "parent_id": user.home_folder_id,
+            "type_id": type_id,
+            "tag": type_id.hex[:8],
+            "docs": docs,
+        }
+
+        start = time.monotonic()
+        for statement in SEED:
+            await db_session.execute(text(statement), params)
+        console.print(
+            f"Created {docs} documents with custom fields"
+            f" in {time.monotonic() - start:.1f}s"
+        )
+
+        cfs = {
+            cf.type: cf.name
+            for cf in await doc_dbapi.get_document_type_cfs(db_session, type_id)
+        }
+        last_page = max(docs // page_size, 1)
+        variants = [
+            ("unordered", {}),
+            ("unordered, last page", dict(page_number=last_page)),
+            *[
+                (f"ordered by {cf_type} {order.value}", dict(order_by=name, order=order))
+                for cf_type, name in cfs.items()
+                for order in OrderEnum
+            ],
+            (
+                "ordered by monetary, page 1000",
+                dict(order_by=cfs["monetary"], page_number=min(1000, last_page)),
+            ),
+            (
+                "filtered by text contains, ordered by date",
+                dict(
+                    order_by=cfs["date"],
+                    filters=[
+                        schema.DocumentCFVFilter(
+                            name=cfs["text"], op=CFFilterOp.contains, value="shop 1"
+                        )
+                    ],
+                ),
+            ),
+            (
+                "filtered by int and monetary",
+                dict(
+                    filters=[
+                        schema.DocumentCFVFilter(
+                            name=cfs["int"], op=CFFilterOp.eq, value="2010"
+                        ),
+                        schema.DocumentCFVFilter(
+                            name=cfs["monetary"], op=CFFilterOp.gt, value="500"
+                        ),
+                    ],
+                ),
+            ),
+        ]
+
+        table = Table(
+            title=f"Documents by type: {docs} documents, {len(cfs)} custom fields,"
+            f" {page_size} per page; p50 / p95 ms over {repeat} runs"
+        )
+        table.add_column("query", style="cyan")
+        table.add_column("page", justify="right")
+        table.add_column("count", justify="right")
+
+        for label, kwargs in variants:
+            page_latencies = []
+            count_latencies = []
+            for _ in range(repeat):
+                start = time.monotonic()
+                await doc_dbapi.get_docs_by_type(
+                    db_session,
+                    type_id=type_id,
+                    user_id=user_id,
+                    page_size=page_size,
+                    **kwargs,
+                )
+                page_latencies.append((time.monotonic() - start) * 1000)
+
+                start = time.monotonic()
+                await doc_dbapi.get_docs_count_by_type(
+                    db_session, type_id=type_id, filters=kwargs.get("filters", ())
+                )
+                count_latencies.append((time.monotonic() - start) * 1000)
+
+            table.add_row(
+                label,
+                *[
+                    f"{_percentile(values, 50):.1f} / {_percentile(values, 95):.1f}"
+                    for values in (page_latencies, count_latencies)
+                ],
+            )
+
+        await db_session.rollback()
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
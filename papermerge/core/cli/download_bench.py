@@ -0,0 +1,118 @@
+"""
+Benchmark of document version downloads
+
+Serves a file of `--size-mb` megabytes with plain `FileResponse` (how
+downloads used to be served) and with `document_file_response`, and reports
+wall time, CPU time and throughput of typical viewer requests:
+
+    $ python -m papermerge.core.cli.download_bench --size-mb 200
+
+* full - whole file is downloaded
+* reopen - client opens the file again (it has it cached already)
+* seek - client needs 1 MB from the middle of the file
+
+Requests go through in-process ASGI transport i.e. numbers do not include
+network, but do include all work done by the application.
+"""
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+import typer
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from rich.console import Console
+from rich.table import Table
+
+from papermerge.core.features.document.response import (
+    doc_ver_etag,
+    document_file_response,
+)
+
+app = typer.Typer(help="Document version download benchmark")
+
+MB = 1024 * 1024
+
+
+def make_app(path: Path, etag: str) -> FastAPI:
+    web_app = FastAPI()
+
+    @web_app.get("/before")
+    async def before():
+        return FileResponse(path)
+
+    @web_app.get("/after")
+    async def after(request: Request):
+        return document_file_response(request, path, etag=etag)
+
+    return web_app
+
+
+async def measure(client: httpx.AsyncClient, url: str, headers: dict, repeat: int):
+    wall_start, cpu_start = time.monotonic(), time.process_time()
+    received = 0
+    for _ in range(repeat):
+        response = await client.get(url, headers=headers)
+        received += len(response.content)
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return wall / repeat, cpu / repeat, received / repeat, response.status_code
+
+
+async def run(size_mb: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "doc.pdf"
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(MB))
+
+        etag = doc_ver_etag(uuid.uuid4(), size_mb * MB)
+        transport = httpx.ASGITransport(app=make_app(path, etag))
+        middle = size_mb * MB // 2
+        scenarios = (
+            ("full", {}),
+            ("reopen", {"If-None-Match": etag}),
+            ("seek", {"Range": f"bytes={middle}-{middle + MB - 1}"}),
+        )
+
+        table = Table(title=f"Downloading {size_mb} MB file")
+        table.add_column("scenario", style="cyan")
+        table.add_column("serving", style="cyan")
+        table.add_column("status", justify="right")
+        table.add_column("received MB", justify="right")
+        table.add_column("wall ms", justify="right")
+        table.add_column("CPU ms", justify="right")
+        table.add_column("MB/s", justify="right")
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for scenario, headers in scenarios:
+                for url in ("/before", "/after"):
+                    wall, cpu, received, status = await measure(
+                        client, url, headers, repeat
+                    )
+                    table.add_row(
+                        scenario,
+                        url.strip("/"),
+                        str(status),
+                        f"{received / MB:.1f}",
+                        f"{wall * 1000:.1f}",
+                        f"{cpu * 1000:.1f}",
+                        f"{received / MB / wall:.0f}",
+                    )
+
+    Console().print(table)
+
+
+@app.command()
+def bench(size_mb: int = 200, repeat: int = 3):
+    """Compares plain and range/conditional aware downloads"""
+    asyncio.run(run(size_mb, repeat))
+
+
+if __name__ == "__main__":
+    app()
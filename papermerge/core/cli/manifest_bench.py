@@ -0,0 +1,154 @@
+"""
+Benchmark of page operations: PDF rewrite vs page manifest
+
+Applies `--ops` consecutive page operations (rotation of one page) on a
+PDF of `--pages` pages of `--page-kb` kilobytes each (i.e. like a
+scanned document) in both ways `page_mngm.apply_pages_op` can:
+
+    * rewrite: each operation writes (and hashes, see `blobs.ingest`) a
+      new PDF with all the pages
+    * manifest: each operation composes a manifest of the new version
+      (see `manifests.compose`); PDF is written once, by materialization
+      of the last version (on download, or in background)
+
+    $ python -m papermerge.core.cli.manifest_bench --pages 200 --ops 5
+
+Database round trips, which are the same for both, are not included.
+Page cache is not dropped: PDF reads are those of a hot cache.
+"""
+import json
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import pikepdf
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from papermerge.core import schema
+from papermerge.core.features.document import blobs, manifests
+from papermerge.core.features.page_mngm.db.api import copy_pdf_pages
+
+app = typer.Typer(help="Page manifests benchmark")
+
+MB = 1024 * 1024
+
+
+@dataclass
+class Version:
+    """Stand in for `orm.DocumentVersion` (what `compose` needs of it)"""
+
+    id: uuid.UUID
+    file_path: Path
+    manifest: list | None = None
+
+
+def make_pdf(path: Path, pages: int, page_kb: int):
+    pdf = pikepdf.Pdf.new()
+    for number in range(pages):
+        pdf.add_blank_page(page_size=(595, 842))
+        # incompressible, already encoded data, like the JPEG of a scan
+        image = pdf.make_stream(os.urandom(page_kb * 1024))
+        image.Filter = pikepdf.Name.DCTDecode
+        pdf.pages[number].Resources = pikepdf.Dictionary(
+            XObject=pikepdf.Dictionary(Im0=image)
+        )
+    pdf.save(path)
+
+
+def rotate_ops(pages: int) -> list[tuple[int, int]]:
+    """Rotation of the first page, other pages as they are"""
+    return [(number, 90 if number == 1 else 0) for number in range(1, pages + 1)]
+
+
+def rewrite(src: Version, pages: int, ops: int, tmpdir: Path) -> tuple[float, int]:
+    written = 0
+    start = time.monotonic()
+    for op in range(ops):
+        dst = tmpdir / f"rewrite-{op}.pdf"
+        items = [
+            schema.PageAndRotOp(
+                page=schema.MovePage(id=uuid.uuid4(), number=number), angle=angle
+            )
+            for number, angle in rotate_ops(pages)
+        ]
+        copy_pdf_pages(src.file_path, dst, items)
+        blobs.file_sha256(dst)
+        written += dst.stat().st_size
+        src = Version(id=uuid.uuid4(), file_path=dst)
+
+    return time.monotonic() - start, written
+
+
+def compose(src: Version, pages: int, ops: int) -> tuple[float, Version]:
+    start = time.monotonic()
+    version = src
+    for _ in range(ops):
+        version = Version(
+            id=uuid.uuid4(),
+            file_path=src.file_path,
+            manifest=manifests.compose(version, rotate_ops(pages)),
+        )
+        # stored as JSON in `document_versions.manifest`
+        json.dumps(version.manifest)
+
+    return time.monotonic() - start, version
+
+
+def materialize(src: Version, version: Version, tmpdir: Path) -> tuple[float, int]:
+    dst = tmpdir / "materialized.pdf"
+    paths = {str(src.id): src.file_path}
+    start = time.monotonic()
+    manifests.build_pdf(
+        [(paths[v], number, rotation) for v, number, rotation in version.manifest],
+        dst,
+    )
+    blobs.file_sha256(dst)
+
+    return time.monotonic() - start, dst.stat().st_size
+
+
+@app.command()
+def bench(pages: int = 200, page_kb: int = 256, ops: int = 5, dir: Path | None = None):
+    """Compares PDF rewrites and page manifests"""
+    table = Table(title=f"{ops} page operations on {pages} pages PDF")
+    table.add_column("path", style="cyan")
+    table.add_column("ms per op", justify="right")
+    table.add_column("MB written per op", justify="right")
+    table.add_column("materialization ms", justify="right")
+    table.add_column("total ms", justify="right")
+
+    with tempfile.TemporaryDirectory(dir=dir) as tmpdirname:
+        tmpdir = Path(tmpdirname)
+        src = Version(id=uuid.uuid4(), file_path=tmpdir / "src.pdf")
+        make_pdf(src.file_path, pages, page_kb)
+
+        elapsed, written = rewrite(src, pages, ops, tmpdir)
+        table.add_row(
+            "rewrite",
+            f"{elapsed / ops * 1000:.1f}",
+            f"{written / ops / MB:.1f}",
+            "-",
+            f"{elapsed * 1000:.0f}",
+        )
+
+        elapsed, version = compose(src, pages, ops)
+        manifest_size = len(json.dumps(version.manifest))
+        materialization, _ = materialize(src, version, tmpdir)
+        table.add_row(
+            "manifest",
+            f"{elapsed / ops * 1000:.1f}",
+            f"{manifest_size / MB:.3f}",
+            f"{materialization * 1000:.0f}",
+            f"{(elapsed + materialization) * 1000:.0f}",
+        )
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
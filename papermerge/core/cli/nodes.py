@@ -0,0 +1,30 @@
+import time
+
+import typer
+from rich.console import Console
+
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.db import closure
+from papermerge.core.utils.cli import async_command
+
+
+app = typer.Typer(help="Nodes management")
+console = Console()
+
+
+@app.command("closure-rebuild")
+@async_command
+async def closure_rebuild():
+    """(Re)builds nodes closure table from nodes' parent/child relations
+
+    Run it once after enabling PAPERMERGE__MAIN__NODES_CLOSURE_TABLE
+    on an existing installation.
+    """
+    start = time.monotonic()
+    async with AsyncSessionLocal() as db_session:
+        count = await closure.rebuild(db_session)
+
+    console.print(
+        f"Nodes closure table rebuilt: {count} rows "
+        f"in {time.monotonic() - start:.2f}s"
+    )
@@ -0,0 +1,139 @@
+"""
+Benchmark of folder listing: page number (OFFSET) vs cursor (keyset)
+pagination
+
+Creates `nodes` synthetic folders in user's home folder and measures
+latency of `get_paginated_nodes` at increasing page depth, with page number
+and exact count (as before), with cursor and estimated count, and with
+cursor only:
+
+    $ python -m papermerge.core.cli.pagination_bench <user-id> --nodes 200000
+
+Everything is done in one transaction, which is rolled back at the end,
+thus no data is left behind.
+"""
+import statistics
+import time
+import uuid
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import select, text
+
+from papermerge.core import orm
+from papermerge.core.db import pagination
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.nodes.db import api as nodes_dbapi
+from papermerge.core.types import TotalMode
+from papermerge.core.utils.cli import async_command
+
+app = typer.Typer(help="Folder listing pagination benchmark")
+console = Console()
+
+INSERT_FOLDERS = text(
+    """
+    WITH new_nodes AS (
+        INSERT INTO nodes (id, title, ctype, lang, user_id, parent_id, created_at, updated_at)
+        SELECT gen_random_uuid(), 'bench-' || md5(i::text), 'folder', 'deu',
+               :user_id, :parent_id, now() - i * interval '1 second', now()
+        FROM generate_series(1, :count) AS i
+        RETURNING id
+    )
+    INSERT INTO folders (node_id) SELECT id FROM new_nodes
+    """
+)
+
+
+def _percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+async def _cursor_at(db_session, parent_id, order_by: list[str], offset: int):
+    """Cursor client would have after walking `offset` rows"""
+    if offset == 0:
+        return None
+    keys = pagination.sort_keys(nodes_dbapi.str2colexpr(order_by), orm.Node.id)
+    stmt = (
+        select(*[key.expr for key in keys])
+        .where(orm.Node.parent_id == parent_id)
+        .order_by(*[key.clause() for key in keys])
+        .offset(offset - 1)
+        .limit(1)
+    )
+    row = (await db_session.execute(stmt)).one()
+
+    return pagination.encode_cursor(keys, list(row))
+
+
+@app.command()
+@async_command
+async def bench(
+    user_id: uuid.UUID,
+    nodes: int = 200_000,
+    page_size: int = 50,
+    order_by: str = "title",
+    repeat: int = 10,
+):
+    """Measures latency of folder listing at increasing page depth"""
+    order = [item.strip() for item in order_by.split(",")]
+
+    async with AsyncSessionLocal() as db_session:
+        user = await db_session.get(orm.User, user_id)
+        parent_id = user.home_folder_id
+
+        start = time.monotonic()
+        await db_session.execute(
+            INSERT_FOLDERS,
+            {"user_id": user_id, "parent_id": parent_id, "count": nodes},
+        )
+        await db_session.execute(text("ANALYZE nodes, folders"))
+        console.print(f"Created {nodes} folders in {time.monotonic() - start:.1f}s")
+
+        table = Table(
+            title=f"Listing of {nodes} nodes, {page_size} per page, "
+            f"ordered by {order_by}; p50 / p95 ms over {repeat} runs"
+        )
+        table.add_column("page", justify="right", style="cyan")
+        table.add_column("page number + count", justify="right")
+        table.add_column("cursor + estimate", justify="right")
+        table.add_column("cursor", justify="right")
+
+        last_page = max(nodes // page_size, 1)
+        depths = sorted({1, 10, 100, 1000, last_page // 2, last_page})
+        for page_number in [p for p in depths if p <= last_page]:
+            cursor = await _cursor_at(
+                db_session, parent_id, order, (page_number - 1) * page_size
+            )
+            variants = [
+                dict(page_number=page_number, total=TotalMode.exact),
+                dict(cursor=cursor, total=TotalMode.estimate),
+                dict(cursor=cursor, total=TotalMode.none),
+            ]
+            cells = []
+            for kwargs in variants:
+                latencies = []
+                for _ in range(repeat):
+                    start = time.monotonic()
+                    await nodes_dbapi.get_paginated_nodes(
+                        db_session,
+                        parent_id=parent_id,
+                        user_id=user_id,
+                        page_size=page_size,
+                        order_by=order,
+                        **{"page_number": 1, **kwargs},
+                    )
+                    latencies.append((time.monotonic() - start) * 1000)
+                cells.append(
+                    f"{_percentile(latencies, 50):.1f} / "
+                    f"{_percentile(latencies, 95):.1f}"
+                )
+            table.add_row(str(page_number), *cells)
+
+        await db_session.rollback()
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
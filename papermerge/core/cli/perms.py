@@ -5,6 +5,7 @@ from rich.table import Table
 from papermerge.core.db.engine import AsyncSessionLocal
 from papermerge.core import dbapi
 from papermerge.core import schema
+from papermerge.core.features.auth import principal_cache
 from papermerge.core.utils.cli import async_command
 
 
@@ -27,6 +28,8 @@ async def perms_sync():
     async with AsyncSessionLocal() as db_session:
         await dbapi.sync_perms(db_session)
 
+    await principal_cache.invalidate()
+
 
 def print_perms(perms: list[schema.Permission]):
     table = Table(title="Permissions")
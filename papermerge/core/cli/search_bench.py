@@ -0,0 +1,132 @@
+"""
+Benchmark of database (PostgreSQL) full text search
+
+Fills `search_index` with `pages` synthetic pages (`pages_per_doc` pages per
+document, ~60 words of text each, word frequencies are skewed i.e. some
+words are very common, most are rare) owned by given user, and measures
+latency of `PGBackend.search` (ranking, grouping by document and
+permission filtering included):
+
+    $ python -m papermerge.core.cli.search_bench <user-id> --pages 10000000
+
+Everything is done in one transaction, which is rolled back at the end,
+thus no data is left behind. Loading 10M pages takes a while (and disk
+space for WAL) - start with the default 100K.
+"""
+import statistics
+import time
+import uuid
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import text
+
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.utils.cli import async_command
+from papermerge.search.backends.postgres import PGBackend
+
+app = typer.Typer(help="Database full text search benchmark")
+console = Console()
+
+VOCABULARY_SIZE = 50_000
+WORDS_PER_PAGE = 60
+
+INSERT_DOCUMENTS = text(
+    """
+    INSERT INTO nodes (id, title, ctype, lang, user_id, parent_id, created_at, updated_at)
+    SELECT gen_random_uuid(), 'bench-' || i || '.pdf', 'document', 'deu',
+           :user_id, NULL, now(), now()
+    FROM generate_series(1, :count) AS i
+    RETURNING id
+    """
+)
+INSERT_PAGES = text(
+    f"""
+    INSERT INTO search_index (
+        id, node_id, entity_type, user_id, lang, title, page_number, tags, tsv,
+        updated_at
+    )
+    SELECT gen_random_uuid(), n.id, 'page', :user_id, 'deu', n.title, p, '[]',
+           setweight(to_tsvector('german', replace(n.title, '.', ' ')), 'A') ||
+           setweight(to_tsvector('german', words.text), 'B'),
+           now()
+    FROM nodes n
+    CROSS JOIN generate_series(1, :pages_per_doc) AS p
+    CROSS JOIN LATERAL (
+        SELECT string_agg(
+            'wort' || floor(power(random(), 3) * {VOCABULARY_SIZE})::int, ' '
+        ) AS text
+        -- reference to outer row makes subquery evaluated per page
+        FROM generate_series(1, {WORDS_PER_PAGE} + (p * 0))
+    ) AS words
+    WHERE n.title LIKE 'bench-%' AND n.user_id = :user_id
+    """
+)
+
+QUERIES = {
+    "common word": "wort1",
+    "rare word": f"wort{VOCABULARY_SIZE - 1}",
+    "two words": "wort10 wort500",
+    "phrase": '"wort1 wort2"',
+    "no match": "nichtvorhanden",
+}
+
+
+def _percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+@app.command()
+@async_command
+async def bench(
+    user_id: uuid.UUID,
+    pages: int = 100_000,
+    pages_per_doc: int = 10,
+    repeat: int = 20,
+):
+    """Measures search latency over synthetic search index"""
+    backend = PGBackend()
+
+    async with AsyncSessionLocal() as db_session:
+        start = time.monotonic()
+        await db_session.execute(
+            INSERT_DOCUMENTS,
+            {"user_id": user_id, "count": max(pages // pages_per_doc, 1)},
+        )
+        await db_session.execute(
+            INSERT_PAGES, {"user_id": user_id, "pages_per_doc": pages_per_doc}
+        )
+        # planner would otherwise assume (from stale statistics) both
+        # tables are almost empty
+        await db_session.execute(text("ANALYZE nodes, search_index"))
+        console.print(f"Loaded {pages} pages in {time.monotonic() - start:.1f}s")
+
+        table = Table(title=f"Search over {pages} pages, {repeat} runs per query")
+        table.add_column("query", style="cyan")
+        table.add_column("documents (~)", justify="right")
+        table.add_column("p50 ms", justify="right")
+        table.add_column("p95 ms", justify="right")
+        table.add_column("max ms", justify="right")
+
+        for name, query in QUERIES.items():
+            latencies = []
+            for _ in range(repeat):
+                start = time.monotonic()
+                result = await backend.search(db_session, query, user_id=user_id)
+                latencies.append((time.monotonic() - start) * 1000)
+            table.add_row(
+                f"{name} ({query})",
+                str(result.num_pages * result.page_size),
+                f"{_percentile(latencies, 50):.1f}",
+                f"{_percentile(latencies, 95):.1f}",
+                f"{max(latencies):.1f}",
+            )
+
+        await db_session.rollback()
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
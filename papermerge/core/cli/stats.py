@@ -0,0 +1,59 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import typer
+from rich.console import Console
+
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.useractivity import rollup as stats_rollup
+from papermerge.core.utils.cli import async_command
+
+app = typer.Typer(help="Statistics")
+console = Console()
+
+
+@app.command("rollup")
+@async_command
+async def rollup_cmd(
+    follow: bool = False,
+    interval: float = 60,
+    snapshot_interval: float = 3600,
+    lookback: int = 60,
+    full: bool = False,
+):
+    """Brings statistics rollups up to date
+
+    Recomputes rollups of activity and documents since `lookback` minutes
+    before the previous run (everything with --full) and refreshes snapshots
+    of tags, roles, shares and largest documents. With --follow keeps
+    running: rollups are recomputed every `interval` seconds, snapshots
+    every `snapshot_interval` seconds.
+    """
+    last_snapshot = None
+
+    async with AsyncSessionLocal() as db_session:
+        while True:
+            start = time.monotonic()
+            snapshots = (
+                last_snapshot is None or start - last_snapshot >= snapshot_interval
+            )
+            result = await stats_rollup.rollup(
+                db_session,
+                lookback=timedelta(minutes=lookback),
+                full=full,
+                snapshots=snapshots,
+            )
+            if result.snapshots:
+                last_snapshot = start
+            since = "beginning" if result.since is None else f"{result.since:%c}"
+            console.print(
+                f"Rolled up since {since}: {result.activity_rows} activity rows, "
+                f"{result.document_rows} document rows"
+                f"{', snapshots' if result.snapshots else ''} "
+                f"in {time.monotonic() - start:.2f}s"
+            )
+            if not follow:
+                break
+            full = False
+            await asyncio.sleep(interval)
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import typer
+from rich.console import Console
+from sqlalchemy import delete, func, select
+
+from papermerge.core.config import get_settings
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.tasks import outbox
+from papermerge.core.features.tasks.db.orm import OutboxMessage
+from papermerge.core.utils.cli import async_command
+
+app = typer.Typer(help="Celery tasks outbox")
+console = Console()
+config = get_settings()
+
+
+@app.command("relay")
+@async_command
+async def relay_cmd(follow: bool = False):
+    """Publishes queued tasks to the broker
+
+    With --follow keeps running, see `papermerge__outbox__*` settings.
+    """
+    if config.papermerge__redis__url is None:
+        console.print("[red]papermerge__redis__url is not set[/red]")
+        raise typer.Exit(1)
+
+    while True:
+        result = await outbox.relay_worker.relay()
+        if result.published or result.failed:
+            console.print(
+                f"Published {result.published} tasks"
+                f" ({result.coalesced} duplicates coalesced),"
+                f" {result.failed} failed"
+            )
+        if not follow:
+            break
+        await asyncio.sleep(outbox.relay_worker.poll_interval)
+
+
+@app.command("status")
+@async_command
+async def status_cmd():
+    """Number of queued tasks, per task name"""
+    stmt = (
+        select(
+            OutboxMessage.task_name,
+            func.count(),
+            func.min(OutboxMessage.created_at),
+            func.max(OutboxMessage.attempts),
+        )
+        .group_by(OutboxMessage.task_name)
+        .order_by(OutboxMessage.task_name)
+    )
+    async with AsyncSessionLocal() as db_session:
+        rows = (await db_session.execute(stmt)).all()
+
+    for name, count, oldest, attempts in rows:
+        console.print(
+            f"{name}: {count} queued, oldest {oldest:%c}, max attempts {attempts}"
+        )
+
+
+@app.command("purge")
+@async_command
+async def purge_cmd(older_than: int = 24):
+    """Deletes tasks queued more than `older_than` hours ago
+
+    E.g. on installations without Redis, where queued tasks are never
+    published.
+    """
+    before = datetime.now(timezone.utc) - timedelta(hours=older_than)
+    async with AsyncSessionLocal() as db_session:
+        result = await db_session.execute(
+            delete(OutboxMessage).where(OutboxMessage.created_at < before)
+        )
+        await db_session.commit()
+
+    console.print(f"Deleted {result.rowcount} tasks")
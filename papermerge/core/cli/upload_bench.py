@@ -0,0 +1,119 @@
+"""
+Benchmark of memory use of PDF uploads
+
+Handles an uploaded PDF of `--size-mb` megabytes the way `upload_file`
+and `dbapi.upload` did before streaming (whole multipart body read into
+memory, written with the previous `copy_file`, page count from memory)
+and the way they do now (`utils.misc.stream_file` from the spooled
+temporary file, page count from the stored file), and reports time and
+peak memory:
+
+    $ python -m papermerge.core.cli.upload_bench --size-mb 256
+
+Each upload runs in a fresh process; the multipart body is a spooled
+temporary file, as created by Starlette, filled before the measurement.
+"Peak RSS" is the growth of peak resident set size (see `copy_bench`)
+i.e. memory needed to handle the upload. Database work, the same in both
+cases, is not included.
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pikepdf
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from papermerge.core.cli.copy_bench import previous_copy_file, reset_peak_rss, rss
+from papermerge.core.utils import misc
+
+app = typer.Typer(help="Upload memory benchmark")
+
+MB = 1024 * 1024
+# starlette.datastructures.UploadFile spools bodies above 1 MB to disk
+SPOOL_MAX_SIZE = MB
+
+
+def make_pdf(path: Path, size_mb: int):
+    """PDF of one page per megabyte (incompressible, like scans)"""
+    pdf = pikepdf.Pdf.new()
+    for number in range(size_mb):
+        pdf.add_blank_page(page_size=(595, 842))
+        image = pdf.make_stream(os.urandom(MB))
+        image.Filter = pikepdf.Name.DCTDecode
+        pdf.pages[number].Resources = pikepdf.Dictionary(
+            XObject=pikepdf.Dictionary(Im0=image)
+        )
+    pdf.save(path)
+
+
+def page_count(content: io.BytesIO | Path) -> int:
+    with pikepdf.open(content) as pdf:
+        return len(pdf.pages)
+
+
+async def previous_upload(file, dst: Path) -> int:
+    content = io.BytesIO(file.read())
+    await previous_copy_file(content, dst)
+    return page_count(content)
+
+
+async def current_upload(file, dst: Path) -> int:
+    await misc.stream_file(src=file, dst=dst)
+    return page_count(dst)
+
+
+def measure(implementation: str, src: Path, dst: Path):
+    """Runs in a fresh process; returns (seconds, peak RSS growth in bytes)"""
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, dir=dst.parent)
+    with open(src, "rb") as f:
+        while chunk := f.read(MB):
+            file.write(chunk)
+    file.seek(0)
+
+    upload = current_upload if implementation == "current" else previous_upload
+
+    reset_peak_rss()
+    rss_before = rss("VmRSS")
+    start = time.monotonic()
+    asyncio.run(upload(file, dst))
+    elapsed = time.monotonic() - start
+
+    return elapsed, max(rss("VmHWM") - rss_before, 0)
+
+
+def run_isolated(*args):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure, *args).result()
+
+
+@app.command()
+def bench(size_mb: int = 256, dir: Path | None = None):
+    """Compares previous and current handling of uploaded PDFs"""
+    table = Table(title=f"Uploading {size_mb} MB PDF")
+    table.add_column("upload", style="cyan")
+    table.add_column("seconds", justify="right")
+    table.add_column("peak RSS MB", justify="right")
+
+    with tempfile.TemporaryDirectory(dir=dir) as tmpdir:
+        src = Path(tmpdir) / "src.pdf"
+        make_pdf(src, size_mb)
+
+        for implementation in ("previous", "current"):
+            dst = Path(tmpdir) / f"{implementation}.pdf"
+            elapsed, growth = run_isolated(implementation, src, dst)
+            table.add_row(implementation, f"{elapsed:.2f}", f"{growth / MB:.1f}")
+            dst.unlink()
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,58 +1,84 @@
-from datetime import datetime, timedelta
+"""
+Signing of CloudFront URLs
+
+Parsed private key and the signer are loaded once per process. Signed
+URLs are memoized: expiration time of a URL is aligned to time buckets
+(of `SIGNED_URL_REUSE_FRACTION` of the validity period), thus within one
+bucket the same resource always gets exactly the same signed URL - it is
+signed only once, and browsers and CDN can cache the resource by its URL.
+Every returned URL is still valid for at least
+`(1 - SIGNED_URL_REUSE_FRACTION) * valid_for` seconds.
+"""
+import functools
+import time
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterable
 
-import pytz
 from botocore.signers import CloudFrontSigner
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
 from papermerge.core.config import settings
-from papermerge.core.cache import client as cache
 
 
-PEM_PRIVATE_KEY_STRING = "pem-private-key-string"
-PEM_PRIVATE_KEY_TTL = 600
+# fraction of URL's validity period during which the same signed URL
+# is handed out
+SIGNED_URL_REUSE_FRACTION = 0.75
+SIGNED_URLS_CACHE_SIZE = 16 * 1024
 
 
-def rsa_signer(message):
-    private_key_string = cache.get(PEM_PRIVATE_KEY_STRING)
+@functools.lru_cache(maxsize=1)
+def load_private_key(key_path: str):
+    path = Path(key_path)
+    if not path.exists():
+        raise ValueError(
+            f"{path} does not exist"
+        )
 
-    if private_key_string is not None:
-        private_key = serialization.load_pem_private_key(
-            private_key_string,
+    with open(path, 'rb') as key_file:
+        return serialization.load_pem_private_key(
+            key_file.read(),
             password=None,
             backend=default_backend()
         )
-        return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
 
+
+def rsa_signer(message):
     _kpath = settings.papermerge__main__cf_sign_url_private_key
     if _kpath is None:
         raise ValueError(
             "Missing CF_SIGN_URL_PRIVATE_KEY setting"
         )
 
-    key_path = Path(_kpath)
-    if not key_path.exists():
-        raise ValueError(
-            f"{key_path} does not exist"
-        )
-
-    with open(key_path, 'rb') as key_file:
-        private_key_string = key_file.read()
-        private_key = serialization.load_pem_private_key(
-            private_key_string,
-            password=None,
-            backend=default_backend()
-        )
-        cache.set(
-            PEM_PRIVATE_KEY_STRING,
-            private_key_string,
-            ex=PEM_PRIVATE_KEY_TTL
-        )
+    private_key = load_private_key(_kpath)
 
     return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
 
 
+@functools.lru_cache(maxsize=1)
+def get_signer(key_id: str) -> CloudFrontSigner:
+    return CloudFrontSigner(key_id, rsa_signer)
+
+
+def expires_at(valid_for: int, now: float | None = None) -> int:
+    """Returns (bucket aligned) expiration timestamp of URL signed `now`"""
+    if now is None:
+        now = time.time()
+    bucket = max(int(valid_for * SIGNED_URL_REUSE_FRACTION), 1)
+    bucket_start = int(now) // bucket * bucket
+
+    return bucket_start + valid_for
+
+
+@functools.lru_cache(maxsize=SIGNED_URLS_CACHE_SIZE)
+def _sign_url(url: str, key_id: str, expires: int) -> str:
+    return get_signer(key_id).generate_presigned_url(
+        url,
+        date_less_than=datetime.fromtimestamp(expires, tz=timezone.utc)
+    )
+
+
 def sign_url(url: str, valid_for: int = 600):
     """
     :type url: str
@@ -62,18 +88,20 @@ def sign_url(url: str, valid_for: int = 600):
     :param valid_for: number of seconds the url will be valid for, defaults
         to 600 (i.e. 10 minutes)
     """
+    return sign_urls([url], valid_for=valid_for)[0]
+
+
+def sign_urls(urls: Iterable[str], valid_for: int = 600) -> list[str]:
+    """Signs all `urls` with the same expiration time
+
+    Meant for list responses: settings are read and expiration time
+    computed only once for all URLs.
+    """
     key_id = settings.papermerge__main__cf_sign_url_key_id
-    tz = pytz.timezone(
-        settings.papermerge__main__timezone
-    )
     if key_id is None:
         raise ValueError(
             "CF_SIGN_URL_KEY_ID is empty"
         )
-    cf_signer = CloudFrontSigner(key_id, rsa_signer)
-    date_less_than = datetime.now(tz) + timedelta(seconds=valid_for)
-    signed_url = cf_signer.generate_presigned_url(
-        url,
-        date_less_than=date_less_than
-    )
-    return signed_url
+    expires = expires_at(valid_for)
+
+    return [_sign_url(url, key_id, expires) for url in urls]
@@ -8,6 +8,13 @@ class FileServer(str, Enum):
     LOCAL = 'local'
     S3 = 's3'
 
+
+class ActivityOverflow(str, Enum):
+    DROP_NEWEST = 'drop_newest'
+    DROP_OLDEST = 'drop_oldest'
+    BLOCK = 'block'
+
+
 class Settings(BaseSettings):
     papermerge__main__logging_cfg: Path | None = Path("/etc/papermerge/logging.yaml")
     papermerge__main__media_root: Path = Path("media")
@@ -19,10 +26,110 @@ class Settings(BaseSettings):
     papermerge__main__cf_domain: str | None = None
     papermerge__main__timezone: str = 'Europe/Berlin'
     papermerge__main__cache_enabled: bool = False
+    # Number of processes used for CPU bound PDF transformations
+    # (pikepdf/img2pdf). `None` = number of CPUs; 0 = no process pool, jobs
+    # run in a thread of the current process
+    papermerge__main__pdf_workers: int | None = None
+    papermerge__main__pdf_job_timeout: int | None = 300  # seconds
+    papermerge__main__pdf_job_memory_limit: int | None = None  # MB
+    # Maintain `nodes_closure` table and use it (instead of recursive CTEs)
+    # for ancestors/descendants lookups. After enabling it on existing
+    # installation, run `paper-cli nodes closure-rebuild` once
+    papermerge__main__nodes_closure_table: bool = False
+    # Cache of authenticated principals (user + scopes), see
+    # `papermerge.core.features.auth.principal_cache`. TTL = 0 disables it
+    papermerge__main__principal_cache_ttl: int = 60  # seconds
+    papermerge__main__principal_cache_size: int = 1024  # entries per process
+    # How often each process re-reads cache generation (i.e. how long other
+    # processes may keep using principals after an invalidation)
+    papermerge__main__principal_generation_ttl: float = 1.0  # seconds
+    # When set (e.g. "/protected-media"), document version downloads are
+    # delegated to the reverse proxy via `X-Accel-Redirect: <prefix>/<path
+    # relative to media root>` i.e. the file is sent by nginx with sendfile
+    papermerge__main__download_accel_redirect: str | None = None
+    # Store document version files once per content (local file server
+    # only), see `papermerge.core.features.document.blobs`. Files of
+    # existing versions are moved there by `paper-cli blobs dedup`. Opt-in:
+    # workers sharing the media volume (OCR, S3) look files up by their
+    # per-version path. Space of deleted files is reclaimed only by
+    # `paper-cli blobs gc`, which has to be scheduled (e.g. daily cron)
+    papermerge__main__blob_store: bool = False
+    # Flush files written by `utils.misc.copy_file` (and their rename) to
+    # disk before returning i.e. they survive a power loss (slower)
+    papermerge__main__fsync: bool = False
+    # Page operations within a document (reorder, rotate, delete pages)
+    # store a manifest of source pages instead of rewriting the PDF, see
+    # `papermerge.core.features.document.manifests`. PDF is written on first
+    # use of the file and, with `eager`, in background right away. Used only
+    # with `file_server` local
+    papermerge__main__page_manifests: bool = False
+    papermerge__main__page_manifests_eager: bool = True
+    # Storage of page data, see `papermerge.core.storage`. With `hardlink`,
+    # local copies are hard links (instead of reflinks/copies) i.e. page
+    # data files must never be modified in place
+    papermerge__storage__hardlink: bool = False
+    # S3 file server: bucket shared with the s3 worker; endpoint URL of S3
+    # compatible storage (e.g. MinIO) is read, as by the s3 worker, from
+    # AWS_S3_ENDPOINT_URL
+    papermerge__s3__bucket_name: str | None = None
+    papermerge__storage__s3_max_workers: int = 16  # parallel requests
     papermerge__database__url: str = "sqlite:////db/db.sqlite3"
+    # Optional read replica; if set, read only endpoints use it
+    papermerge__database__read_url: str | None = None
+    # Connection pool (PostgreSQL only). `pool_size` = 0 disables pooling
+    # i.e. each session opens (and closes) its own connection
+    papermerge__database__pool_size: int = 5
+    papermerge__database__max_overflow: int = 10
+    papermerge__database__pool_timeout: int = 30  # seconds
+    papermerge__database__pool_recycle: int = 1800  # seconds
+    papermerge__database__pool_pre_ping: bool = True
+    # Size of asyncpg prepared statements cache (per connection). Set it
+    # to 0 when connecting via PgBouncer in transaction pooling mode
+    papermerge__database__statement_cache_size: int = 100
+    # User activity (audit) events are buffered in process and written in
+    # bulk, see `papermerge.core.features.useractivity.writer`. Buffer is
+    # flushed when it holds `batch_size` events or every `flush_interval`
+    # seconds; when it holds `queue_size` events, new events are handled
+    # according to `overflow` policy (`block` waits up to `block_timeout`
+    # seconds for free space, then drops the event)
+    papermerge__activity__batch_size: int = 500
+    papermerge__activity__flush_interval: float = 1.0  # seconds
+    papermerge__activity__queue_size: int = 10_000
+    papermerge__activity__overflow: ActivityOverflow = ActivityOverflow.DROP_OLDEST
+    papermerge__activity__block_timeout: float = 1.0  # seconds
+    # Statistics are read from rollups, see
+    # `papermerge.core.features.useractivity.rollup`, recomputed (since
+    # `rollup_lookback` minutes before the previous run) every
+    # `rollup_interval` seconds, snapshots every `snapshot_interval`
+    # seconds. With `rollup_in_app` this runs in each REST API process;
+    # otherwise run `paper-cli stats rollup --follow`
+    papermerge__stats__rollup_in_app: bool = True
+    papermerge__stats__rollup_interval: float = 60.0  # seconds
+    papermerge__stats__snapshot_interval: float = 3600.0  # seconds
+    papermerge__stats__rollup_lookback: int = 60  # minutes
+    # Celery tasks are queued in `task_outbox` table (in the transaction of
+    # the change which triggers them) and published by the relay, see
+    # `papermerge.core.features.tasks.outbox`. Messages are held back for
+    # `coalesce_window` seconds, identical ones are published once; failed
+    # ones are retried after `retry_backoff` seconds, doubled on each
+    # failure up to `retry_backoff_max`. With `relay_in_app` the relay runs
+    # in each REST API process; otherwise run `paper-cli tasks relay
+    # --follow`. Without `papermerge__redis__url` no task is queued
+    papermerge__outbox__batch_size: int = 100
+    papermerge__outbox__poll_interval: float = 0.5  # seconds
+    papermerge__outbox__coalesce_window: float = 1.0  # seconds
+    papermerge__outbox__retry_backoff: float = 1.0  # seconds
+    papermerge__outbox__retry_backoff_max: float = 300.0  # seconds
+    papermerge__outbox__relay_in_app: bool = True
     papermerge__redis__url: str | None = None
+    # Expiration time of cached keys is randomly extended by up to this
+    # fraction of their TTL, so that keys cached together do not expire together
+    papermerge__redis__ttl_jitter: float = 0.1
     papermerge__ocr__default_lang_code: str = 'deu'
     papermerge__preview__page_size_sm: int = 200  # pixels
+    papermerge__preview__page_size_md: int = 600  # pixels
+    papermerge__preview__page_size_lg: int = 900  # pixels
+    papermerge__preview__page_size_xl: int = 1600  # pixels
     # When is OCR triggered ?
     # `ocr__automatic` = True means that OCR will be performed without
     #   end user intervention i.e. via background scheduler like celery scheduler
@@ -32,6 +139,13 @@ class Settings(BaseSettings):
     #   scheduler OCR later on any document.
     papermerge__ocr__automatic: bool = False
     papermerge__search__url: str | None = None
+    # With the database search backend, changes are logged by triggers and
+    # replayed into the index every `sync_interval` seconds, see
+    # `papermerge.search.sync`. With `sync_in_app` the replay runs in each
+    # REST API process; otherwise run `paper-cli index sync --follow`
+    papermerge__search__sync_in_app: bool = True
+    papermerge__search__sync_interval: float = 2.0  # seconds
+    papermerge__search__sync_batch_size: int = 500
 
 settings = Settings()
 
@@ -10,6 +10,7 @@ JPG = "jpg"
 PAGES = "pages"
 THUMBNAILS = "thumbnails"
 DOCVERS = "docvers"
+BLOBS = "blobs"
 OCR = "ocr"
 PREVIEWS = "previews"
 DEFAULT_TAG_BG_COLOR = "#c41fff"
@@ -39,6 +40,8 @@ PATH_TMPL_MOVE_DOCUMENTS = "path_tmpl_move_documents"
 INCOMING_DATE_FORMAT = "%Y-%m-%d"
 # incoming (from user) year month format
 INCOMING_YEARMONTH_FORMAT = "%Y-%m"
+# size of the buffer used when streaming uploaded files to the media root
+COPY_CHUNK_SIZE = 1024 * 1024  # 1 MiB
 
 class ContentType:
     APPLICATION_PDF = "application/pdf"
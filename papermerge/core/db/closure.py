@@ -0,0 +1,186 @@
+"""
+Maintenance of `nodes_closure` table
+
+`nodes_closure` holds one row (ancestor_id, descendant_id, depth) for
+every pair of nodes where one is ancestor of the other (each node is its own
+ancestor with depth = 0). With it, ancestors, descendants and subtree size
+of a node are single indexed queries instead of recursive CTEs walking
+`nodes.parent_id`.
+
+The table is maintained only if `papermerge__main__nodes_closure_table`
+setting is enabled:
+
+    * new nodes and ORM level parent changes - in session's `after_flush`
+    * bulk moves - by explicitly calling `move_nodes`
+    * deleted nodes - by `ON DELETE CASCADE` foreign keys
+"""
+import logging
+from uuid import UUID
+
+from sqlalchemy import (
+    Connection,
+    Uuid,
+    delete,
+    event,
+    insert,
+    literal,
+    select,
+    true,
+)
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from papermerge.core.config import get_settings
+from papermerge.core.features.nodes.db.orm import Node, NodeClosure
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+
+def is_enabled() -> bool:
+    return config.papermerge__main__nodes_closure_table
+
+
+def _insert_node(conn: Connection, node_id: UUID, parent_id: UUID | None):
+    conn.execute(
+        insert(NodeClosure).values(ancestor_id=node_id, descendant_id=node_id, depth=0)
+    )
+    if parent_id is None:
+        return
+
+    conn.execute(
+        insert(NodeClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                NodeClosure.ancestor_id,
+                literal(node_id, Uuid),
+                NodeClosure.depth + 1,
+            ).where(NodeClosure.descendant_id == parent_id),
+        )
+    )
+
+
+def _move_node(conn: Connection, node_id: UUID, new_parent_id: UUID | None):
+    """Re-attaches subtree of `node_id` under `new_parent_id`"""
+    subtree_ids = select(NodeClosure.descendant_id).where(
+        NodeClosure.ancestor_id == node_id
+    )
+    old_ancestor_ids = select(NodeClosure.ancestor_id).where(
+        NodeClosure.descendant_id == node_id,
+        NodeClosure.ancestor_id != node_id,
+    )
+    conn.execute(
+        delete(NodeClosure).where(
+            NodeClosure.descendant_id.in_(subtree_ids),
+            NodeClosure.ancestor_id.in_(old_ancestor_ids),
+        )
+    )
+    if new_parent_id is None:
+        return
+
+    sup = NodeClosure.__table__.alias("sup")
+    sub = NodeClosure.__table__.alias("sub")
+    conn.execute(
+        insert(NodeClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                sup.c.ancestor_id,
+                sub.c.descendant_id,
+                sup.c.depth + sub.c.depth + 1,
+            )
+            # every ancestor of the new parent with every node of the subtree
+            .select_from(sup.join(sub, true()))
+            .where(
+                sup.c.descendant_id == new_parent_id,
+                sub.c.ancestor_id == node_id,
+            ),
+        )
+    )
+
+
+def _parents_first(nodes: list[Node]) -> list[Node]:
+    """Sorts nodes so that parent comes before any of its children"""
+    by_id = {node.id: node for node in nodes}
+
+    def level(node: Node) -> int:
+        result = 0
+        while node.parent_id in by_id:
+            node = by_id[node.parent_id]
+            result += 1
+        return result
+
+    return sorted(nodes, key=level)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_closure(session: Session, flush_context):
+    if not is_enabled():
+        return
+
+    new_nodes = [obj for obj in session.new if isinstance(obj, Node)]
+    moved_nodes = [
+        obj
+        for obj in session.dirty
+        if isinstance(obj, Node)
+        and sa_inspect(obj).attrs.parent_id.history.has_changes()
+    ]
+    if not new_nodes and not moved_nodes:
+        return
+
+    conn = session.connection()
+    for node in _parents_first(new_nodes):
+        _insert_node(conn, node_id=node.id, parent_id=node.parent_id)
+
+    for node in moved_nodes:
+        _move_node(conn, node_id=node.id, new_parent_id=node.parent_id)
+
+
+async def move_nodes(
+    db_session: AsyncSession, node_ids: list[UUID], target_id: UUID
+) -> None:
+    """Updates closure table after bulk (i.e. non ORM) parent change"""
+    if not is_enabled():
+        return
+
+    def _move(session: Session):
+        conn = session.connection()
+        for node_id in node_ids:
+            _move_node(conn, node_id=node_id, new_parent_id=target_id)
+
+    await db_session.run_sync(_move)
+
+
+async def rebuild(db_session: AsyncSession, commit: bool = True) -> int:
+    """(Re)builds whole closure table from `nodes.parent_id`
+
+    Returns number of rows in rebuilt table. With `commit` = False the
+    rebuild is left in session's transaction (e.g. for benchmarks).
+    """
+    tree = (
+        select(
+            Node.id.label("ancestor_id"),
+            Node.id.label("descendant_id"),
+            literal(0).label("depth"),
+        )
+        .cte(recursive=True, name="tree")
+    )
+    tree = tree.union_all(
+        select(
+            tree.c.ancestor_id,
+            Node.id,
+            tree.c.depth + 1,
+        ).where(Node.parent_id == tree.c.descendant_id)
+    )
+
+    await db_session.execute(delete(NodeClosure))
+    result = await db_session.execute(
+        insert(NodeClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(tree.c.ancestor_id, tree.c.descendant_id, tree.c.depth),
+        )
+    )
+    if commit:
+        await db_session.commit()
+
+    return result.rowcount
@@ -1,10 +1,11 @@
-from typing import List, Tuple
+from typing import Iterable, List, Tuple
 from uuid import UUID
 
-from sqlalchemy import select, exists, literal
-from sqlalchemy.orm import aliased
+from sqlalchemy import ColumnElement, event, func, or_, select, literal
+from sqlalchemy.orm import aliased, Session
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from papermerge.core.db import closure
 from papermerge.core.features.nodes.db import orm
 from papermerge.core.features.shared_nodes.db import orm as sn_orm
 from papermerge.core.features.groups.db import orm as groups_orm
@@ -21,32 +22,69 @@ async def get_ancestors(
     The most recent ancestor will be the last element in returned list.
     In other words, "home" or "inbox" folders will be first in returned list
     """
-    nodes_anchor = (
-        select(
-            orm.Node.id, orm.Node.title, orm.Node.parent_id, literal(0).label("level")
-        )
-        .where(orm.Node.id == node_id)
-        .cte(recursive=True, name="tree")
-    )
-    tree = nodes_anchor.union_all(
-        select(
-            orm.Node.id,
-            orm.Node.title,
-            orm.Node.parent_id,
-            (nodes_anchor.c.level + 1).label("level"),
-        ).where(nodes_anchor.c.parent_id == orm.Node.id)
+    ancestors = await get_nodes_ancestors(
+        db_session, node_ids=[node_id], include_self=include_self
     )
 
-    stmt = (
-        select(tree.c.id, tree.c.title).select_from(tree).order_by(tree.c.level.desc())
-    )
+    return ancestors.get(node_id, [])
+
+
+async def get_nodes_ancestors(
+    db_session: AsyncSession, node_ids: list[UUID], include_self=True
+) -> dict[UUID, List[Tuple[UUID, str]]]:
+    """Returns ancestors of each of `node_ids` nodes, using one single query
 
-    if not include_self:
-        stmt = stmt.where(tree.c.id != node_id)
+    Ancestors of each node are ordered the same way as in `get_ancestors`.
+    """
+    if closure.is_enabled():
+        nc = orm.NodeClosure
+        stmt = (
+            select(
+                nc.descendant_id.label("origin_id"),
+                orm.Node.id,
+                orm.Node.title,
+            )
+            .join(nc, nc.ancestor_id == orm.Node.id)
+            .where(nc.descendant_id.in_(node_ids))
+            .order_by(nc.descendant_id, nc.depth.desc())
+        )
+        if not include_self:
+            stmt = stmt.where(nc.depth > 0)
+    else:
+        nodes_anchor = (
+            select(
+                orm.Node.id.label("origin_id"),
+                orm.Node.id,
+                orm.Node.title,
+                orm.Node.parent_id,
+                literal(0).label("level"),
+            )
+            .where(orm.Node.id.in_(node_ids))
+            .cte(recursive=True, name="tree")
+        )
+        tree = nodes_anchor.union_all(
+            select(
+                nodes_anchor.c.origin_id,
+                orm.Node.id,
+                orm.Node.title,
+                orm.Node.parent_id,
+                (nodes_anchor.c.level + 1).label("level"),
+            ).where(nodes_anchor.c.parent_id == orm.Node.id)
+        )
+        stmt = (
+            select(tree.c.origin_id, tree.c.id, tree.c.title)
+            .select_from(tree)
+            .order_by(tree.c.origin_id, tree.c.level.desc())
+        )
+        if not include_self:
+            stmt = stmt.where(tree.c.level > 0)
 
     result = await db_session.execute(stmt)
+    ancestors = {node_id: [] for node_id in node_ids}
+    for row in result:
+        ancestors[row.origin_id].append((row.id, row.title))
 
-    return [(row.id, row.title) for row in result]
+    return ancestors
 
 
 async def get_descendants(
@@ -66,6 +104,21 @@ async def get_descendants(
     if len(node_ids) < 1:
         raise ValueError("len(node_ids) must be >= 1 ")
 
+    if closure.is_enabled():
+        nc = orm.NodeClosure
+        stmt = (
+            select(orm.Node.id, orm.Node.title)
+            .join(nc, nc.descendant_id == orm.Node.id)
+            .where(nc.ancestor_id.in_(node_ids))
+            .distinct()
+        )
+        if not include_selfs:
+            stmt = stmt.where(orm.Node.id.not_in(node_ids))
+
+        result = await db_session.execute(stmt)
+
+        return [(row.id, row.title) for row in result]
+
     nodes_anchor = (
         select(orm.Node.id, orm.Node.title)
         .where(orm.Node.id.in_(node_ids))
@@ -87,6 +140,70 @@ async def get_descendants(
     return [(row.id, row.title) for row in result]
 
 
+async def count_descendants(
+    db_session: AsyncSession, node_ids: list[UUID]
+) -> dict[UUID, int]:
+    """Returns number of descendants (the node itself not included) of each node
+
+    With closure table enabled, this is one aggregate over its
+    `ancestor_id` index, otherwise a recursive CTE walks the subtrees.
+    """
+    counts = {node_id: 0 for node_id in node_ids}
+    if len(node_ids) < 1:
+        return counts
+
+    if closure.is_enabled():
+        nc = orm.NodeClosure
+        stmt = (
+            select(nc.ancestor_id, func.count())
+            .where(nc.ancestor_id.in_(node_ids), nc.depth > 0)
+            .group_by(nc.ancestor_id)
+        )
+    else:
+        nodes_anchor = (
+            select(orm.Node.id.label("origin_id"), orm.Node.id)
+            .where(orm.Node.id.in_(node_ids))
+            .cte(recursive=True, name="tree")
+        )
+        tree = nodes_anchor.union_all(
+            select(nodes_anchor.c.origin_id, orm.Node.id).where(
+                nodes_anchor.c.id == orm.Node.parent_id
+            )
+        )
+        stmt = (
+            select(tree.c.origin_id, func.count())
+            .where(tree.c.id != tree.c.origin_id)
+            .group_by(tree.c.origin_id)
+        )
+
+    for node_id, count in await db_session.execute(stmt):
+        counts[node_id] = count
+
+    return counts
+
+
+# key in `Session.info` under which results of permission checks are memoized
+NODE_PERMS_CACHE_KEY = "node_perms"
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _clear_node_perms_cache(session: Session):
+    """Permission checks are memoized only until session's transaction ends
+
+    Any change of ownership, sharing or roles goes through a commit, thus
+    memoized results never outlive the data they were computed from.
+    """
+    session.info.pop(NODE_PERMS_CACHE_KEY, None)
+
+
+def _node_perms_cache(
+    db_session: AsyncSession, codename: str, user_id: UUID
+) -> dict[UUID, bool]:
+    cache = db_session.info.setdefault(NODE_PERMS_CACHE_KEY, {})
+    return cache.setdefault((user_id, codename), {})
+
+
 async def has_node_perm(
     # --- PATCH NOTE: To allow superuser bypass, add is_superuser param and return True if set. ---
     db_session: AsyncSession,
@@ -129,41 +246,169 @@ async def has_node_perm(
         AND p.codename = <perm>
         AND sn.node_id IN (<node_id> ancestors)
     )
+
+    The result is memoized for the duration of session's transaction,
+    see `has_nodes_perm`.
     """
-    ancestor_ids = [item[0] for item in await get_ancestors(db_session, node_id)]
+    return await has_nodes_perm(
+        db_session, node_ids=[node_id], codename=codename, user_id=user_id
+    )
+
 
+async def has_nodes_perm(
+    db_session: AsyncSession,
+    node_ids: Iterable[UUID],
+    codename: str,
+    user_id: UUID,
+) -> bool:
+    """
+    Has user `codename` permission for ALL nodes in `node_ids`?
+
+    Permissions of the nodes not checked yet (in current session's
+    transaction) are resolved with one single query, regardless of the
+    number of nodes; results are memoized in `db_session.info`, thus
+    repeated checks within the same request are free.
+    """
+    node_ids = set(node_ids)
+    cache = _node_perms_cache(db_session, codename=codename, user_id=user_id)
+    unknown_ids = [node_id for node_id in node_ids if node_id not in cache]
+
+    if len(unknown_ids) > 0:
+        granted_ids = await get_nodes_with_perm(
+            db_session, node_ids=unknown_ids, codename=codename, user_id=user_id
+        )
+        for node_id in unknown_ids:
+            cache[node_id] = node_id in granted_ids
+
+    return all(cache[node_id] for node_id in node_ids)
+
+
+async def get_nodes_with_perm(
+    db_session: AsyncSession,
+    node_ids: list[UUID],
+    codename: str,
+    user_id: UUID,
+) -> set[UUID]:
+    """Returns subset of `node_ids` user has `codename` permission for
+
+    User has permission for the node if user (or one of user's groups)
+    owns the node, or if the node or any of its ancestors is shared with
+    the user (or one of user's groups) via a role which includes
+    `codename` permission.
+
+    Ancestors of all nodes are resolved with one recursive CTE (or with
+    closure table, if enabled), which keeps track of the node it
+    started from (`origin_id`).
+    """
     ug = aliased(groups_orm.user_groups_association)
     # groups user belongs to
     user_group_ids = select(ug.c.group_id).where(ug.c.user_id == user_id)
+    ancestors = _ancestors_of(node_ids)
 
     node_access = select(orm.Node.id).where(
-        (orm.Node.id == node_id)
+        orm.Node.id.in_(node_ids)
         & ((orm.Node.user_id == user_id) | (orm.Node.group_id.in_(user_group_ids)))
     )
     sn = aliased(sn_orm.SharedNode)
-    n = aliased(orm.Node)
     r = aliased(roles_orm.Role)
     rp = aliased(roles_orm.roles_permissions_association)
     p = aliased(roles_orm.Permission)
 
     node_shared_access = (
-        select(sn.id)
-        .select_from(sn)
-        .join(n, n.id == sn.node_id)
+        select(ancestors.c.origin_id)
+        .select_from(ancestors)
+        .join(sn, sn.node_id == ancestors.c.id)
         .join(r, r.id == sn.role_id)
         .join(rp, rp.c.role_id == r.id)
         .join(p, p.id == rp.c.permission_id)
         .where(
             (p.codename == codename)
-            & (sn.node_id.in_(ancestor_ids))
             & ((sn.user_id == user_id) | (sn.group_id.in_(user_group_ids)))
         )
     )
-    stmt = exists(node_access.union_all(node_shared_access)).select()
+    stmt = node_access.union(node_shared_access)
+
+    result = await db_session.execute(stmt)
+
+    return {row[0] for row in result}
+
+
+def _ancestors_of(node_ids: list[UUID]):
+    """Selectable of (origin_id, id) pairs, `id` being ancestor of `origin_id`"""
+    if closure.is_enabled():
+        nc = orm.NodeClosure
+        return (
+            select(
+                nc.descendant_id.label("origin_id"),
+                nc.ancestor_id.label("id"),
+            )
+            .where(nc.descendant_id.in_(node_ids))
+            .subquery("ancestors")
+        )
+
+    nodes_anchor = (
+        select(
+            orm.Node.id.label("origin_id"),
+            orm.Node.id,
+            orm.Node.parent_id,
+        )
+        .where(orm.Node.id.in_(node_ids))
+        .cte(recursive=True, name="ancestors")
+    )
+    return nodes_anchor.union_all(
+        select(
+            nodes_anchor.c.origin_id,
+            orm.Node.id,
+            orm.Node.parent_id,
+        ).where(nodes_anchor.c.parent_id == orm.Node.id)
+    )
 
-    has_access = (await db_session.execute(stmt)).scalar_one()
 
-    return has_access
+def node_perm_filter(user_id: UUID, codename: str) -> ColumnElement[bool]:
+    """SQL condition on `orm.Node` rows user has `codename` permission for
+
+    Same rules as in `get_nodes_with_perm`, but usable for filtering
+    queries over arbitrary many nodes (e.g. search): user (or one of user's
+    groups) owns the node, or the node is a descendant of (or is itself) a node
+    shared with the user (or one of user's groups) via a role which includes
+    `codename` permission.
+    """
+    ug = aliased(groups_orm.user_groups_association)
+    user_group_ids = select(ug.c.group_id).where(ug.c.user_id == user_id)
+
+    sn = aliased(sn_orm.SharedNode)
+    rp = aliased(roles_orm.roles_permissions_association)
+    p = aliased(roles_orm.Permission)
+    shared_root_ids = (
+        select(sn.node_id)
+        .join(rp, rp.c.role_id == sn.role_id)
+        .join(p, p.id == rp.c.permission_id)
+        .where(
+            (p.codename == codename)
+            & ((sn.user_id == user_id) | (sn.group_id.in_(user_group_ids)))
+        )
+    )
+    if closure.is_enabled():
+        nc = orm.NodeClosure
+        shared_ids = select(nc.descendant_id).where(
+            nc.ancestor_id.in_(shared_root_ids)
+        )
+    else:
+        shared_anchor = (
+            select(orm.Node.id)
+            .where(orm.Node.id.in_(shared_root_ids))
+            .cte(recursive=True, name="shared_tree")
+        )
+        shared_tree = shared_anchor.union_all(
+            select(orm.Node.id).where(orm.Node.parent_id == shared_anchor.c.id)
+        )
+        shared_ids = select(shared_tree.c.id)
+
+    return or_(
+        orm.Node.user_id == user_id,
+        orm.Node.group_id.in_(user_group_ids),
+        orm.Node.id.in_(shared_ids),
+    )
 
 
 async def get_node_owner(db_session: AsyncSession, node_id: UUID) -> nodes_schema.Owner:
@@ -1,8 +1,19 @@
 import logging
 import os
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.pool import NullPool
+from pydantic import BaseModel
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from papermerge.core.config import get_settings
+
+config = get_settings()
 
 SQLALCHEMY_DATABASE_URL = os.environ.get(
     "PAPERMERGE__DATABASE__URL", "sqlite:////db/db.sqlite3"
@@ -14,16 +25,123 @@ SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace(
     "postgresql://", "postgresql+asyncpg://", 1
 )
 
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args, poolclass=NullPool
-)
+
+class PoolStats(BaseModel):
+    # 0 means that pooling is disabled
+    pool_size: int = 0
+    # connections currently in use by sessions
+    checked_out: int = 0
+    # idle connections in the pool
+    checked_in: int = 0
+    # connections opened above `pool_size`
+    overflow: int = 0
+    # sessions currently waiting for connection
+    waiting: int = 0
+    # number of times a session gave up waiting for connection
+    timeouts: int = 0
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool which keeps track of waiting sessions and timeouts"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.timeouts = 0
+
+    def _do_get(self):
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+
+def create_engine(url: str) -> AsyncEngine:
+    url = make_url(url)
+
+    if url.get_backend_name() != "postgresql" or config.papermerge__database__pool_size == 0:
+        return create_async_engine(url, connect_args=connect_args, poolclass=NullPool)
+
+    if url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict(
+            {
+                "prepared_statement_cache_size": str(
+                    config.papermerge__database__statement_cache_size
+                )
+            }
+        )
+
+    return create_async_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=MeteredQueuePool,
+        pool_size=config.papermerge__database__pool_size,
+        max_overflow=config.papermerge__database__max_overflow,
+        pool_timeout=config.papermerge__database__pool_timeout,
+        pool_recycle=config.papermerge__database__pool_recycle,
+        pool_pre_ping=config.papermerge__database__pool_pre_ping,
+    )
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+if config.papermerge__database__read_url:
+    read_engine = create_engine(
+        config.papermerge__database__read_url.replace(
+            "postgresql://", "postgresql+asyncpg://", 1
+        )
+    )
+else:
+    read_engine = engine
 
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+ReadAsyncSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False)
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
 
+async def get_read_db():
+    """Session for read only queries
+
+    Connected to read replica if `papermerge__database__read_url` is set,
+    otherwise to the primary database (same as `get_db`).
+    Data may lag behind the primary, thus use it only for
+    queries which tolerate that e.g. reports and statistics.
+    """
+    async with ReadAsyncSessionLocal() as session:
+        yield session
+
+
+def get_read_session_factory():
+    """Factory of read only sessions (see `get_read_db`)
+
+    For work outliving the request handler e.g. streamed response body:
+    sessions of `yield` dependencies may be closed (FastAPI < 0.118) before
+    the body is streamed.
+    """
+    return ReadAsyncSessionLocal
+
+
 def get_engine():
     return engine
+
+
+def get_pool_stats(engine: AsyncEngine = engine) -> PoolStats:
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, MeteredQueuePool):
+        return PoolStats()
+
+    return PoolStats(
+        pool_size=pool.size(),
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        waiting=pool.waiting,
+        timeouts=pool.timeouts,
+    )
@@ -0,0 +1,291 @@
+"""
+Keyset (cursor) pagination
+
+OFFSET pagination reads and throws away all rows before the requested page,
+thus deep pages of large folders get slower with every page. Keyset
+pagination instead continues right after the last row of the previous page:
+`WHERE (sort key) > (sort key of last row)`, which with a suitable index
+costs the same no matter how deep the page is.
+
+Rows are ordered by the endpoint's own ORDER BY clauses (e.g. as returned
+by `str2colexpr`) followed by the primary key, which makes the order total
+and thus pages stable. The cursor is an opaque (base64 encoded) list of
+sort key values of the last row of the page.
+
+Page number based pagination is still supported (and is used when no cursor
+is given); its response includes `next_cursor` as well, so that clients
+can switch to cursors after the first page.
+"""
+import base64
+import binascii
+import json
+import math
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Sequence
+
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    Select,
+    and_,
+    false,
+    func,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+from papermerge.core.types import TotalMode
+
+# Estimated totals below this number are replaced with exact count,
+# which for that few rows is cheap (and estimates are least accurate)
+ESTIMATE_MIN = 10_000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class SortKey:
+    expr: ColumnElement
+    desc: bool = False
+    nulls_first: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{'-' if self.desc else ''}{self.expr}"
+
+    def clause(self):
+        clause = self.expr.desc() if self.desc else self.expr.asc()
+        return clause.nulls_first() if self.nulls_first else clause.nulls_last()
+
+    def after(self, value) -> ColumnElement[bool]:
+        """Rows which come strictly after `value` in this key's order"""
+        if value is None:
+            return self.expr.is_not(None) if self.nulls_first else false()
+        cond = self.expr < value if self.desc else self.expr > value
+        if self.nulls_first:
+            return cond
+        return or_(cond, self.expr.is_(None))
+
+    def equals(self, value) -> ColumnElement[bool]:
+        if value is None:
+            return self.expr.is_(None)
+        return self.expr == value
+
+
+@dataclass
+class Page:
+    rows: Sequence[Row]
+    next_cursor: str | None
+    total: int | None
+
+    def num_pages(self, page_size: int) -> int | None:
+        if self.total is None:
+            return None
+        return math.ceil(self.total / page_size)
+
+
+def sort_key(clause) -> SortKey:
+    """Order by clause (e.g. `Node.title`, `Tag.name.desc()`,
+    `Group.name.asc().nullsfirst()`) as SortKey
+    """
+    desc = False
+    nulls_first = None
+    expr = clause
+    while isinstance(expr, UnaryExpression) and expr.modifier in (
+        operators.asc_op,
+        operators.desc_op,
+        operators.nulls_first_op,
+        operators.nulls_last_op,
+    ):
+        if expr.modifier is operators.desc_op:
+            desc = True
+        elif expr.modifier is operators.nulls_first_op:
+            nulls_first = True
+        elif expr.modifier is operators.nulls_last_op:
+            nulls_first = False
+        expr = expr.element
+
+    if hasattr(expr, "__clause_element__"):
+        expr = expr.__clause_element__()
+
+    if nulls_first is None:
+        # PostgreSQL's default: NULLs are larger than any value
+        nulls_first = desc
+
+    return SortKey(expr=expr, desc=desc, nulls_first=nulls_first)
+
+
+def sort_keys(order_by: Sequence, tiebreaker) -> list[SortKey]:
+    keys = [sort_key(clause) for clause in order_by]
+    tiebreaker = sort_key(tiebreaker)
+    if all(str(key.expr) != str(tiebreaker.expr) for key in keys):
+        keys.append(tiebreaker)
+
+    return keys
+
+
+def after(keys: list[SortKey], values: list) -> ColumnElement[bool]:
+    """Rows which come strictly after the row with `values`
+
+    Last key is the tiebreaker (primary key).
+    """
+    # columns of other (e.g. outer joined) tables may be NULL
+    # even when they are declared NOT NULL
+    table = getattr(keys[-1].expr, "table", None)
+    if (
+        len({key.desc for key in keys}) == 1
+        and all(value is not None for value in values)
+        and all(
+            getattr(key.expr, "table", None) is table
+            and not getattr(key.expr, "nullable", True)
+            for key in keys
+        )
+    ):
+        # row value comparison; can be answered by a (multicolumn) index scan
+        left = tuple_(*[key.expr for key in keys])
+        right = tuple_(*values)
+        return left < right if keys[0].desc else left > right
+
+    return or_(
+        *[
+            and_(
+                *[key.equals(value) for key, value in zip(keys[:i], values[:i])],
+                keys[i].after(values[i]),
+            )
+            for i in range(len(keys))
+        ]
+    )
+
+
+def encode_cursor(keys: list[SortKey], values: Sequence) -> str:
+    data = {"o": [key.name for key in keys], "v": [_dump(v) for v in values]}
+    raw = json.dumps(data, separators=(",", ":")).encode()
+
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(keys: list[SortKey], cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        names, values = data["o"], data["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+    if names != [key.name for key in keys] or len(values) != len(keys):
+        raise InvalidCursor("Cursor does not match requested order")
+
+    try:
+        return [_load(key.expr, value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+
+async def count(
+    db_session: AsyncSession, stmt: Select, mode: TotalMode = TotalMode.exact
+) -> int | None:
+    """Number of rows `stmt` returns
+
+    With `TotalMode.estimate` PostgreSQL planner's row estimate is used
+    (unless it is small); it does not read the rows, thus its cost does not
+    depend on their number.
+    """
+    if mode == TotalMode.none:
+        return None
+
+    stmt = stmt.order_by(None)
+    if mode == TotalMode.estimate:
+        estimate = await _estimate(db_session, stmt)
+        if estimate is not None and estimate >= ESTIMATE_MIN:
+            return estimate
+
+    return await db_session.scalar(select(func.count()).select_from(stmt.subquery()))
+
+
+async def paginate(
+    db_session: AsyncSession,
+    stmt: Select,
+    *,
+    order_by: Sequence,
+    tiebreaker,
+    page_size: int,
+    page_number: int = 1,
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.exact,
+) -> Page:
+    """Returns one page of `stmt`'s rows
+
+    Page is selected by `cursor` (if given) or by `page_number`.
+    Raises `InvalidCursor`.
+    """
+    keys = sort_keys(order_by, tiebreaker)
+    total_count = await count(db_session, stmt, total)
+
+    page_stmt = stmt.add_columns(
+        *[key.expr.label(f"_sort_key_{i}") for i, key in enumerate(keys)]
+    ).order_by(*[key.clause() for key in keys])
+    if cursor:
+        page_stmt = page_stmt.where(after(keys, decode_cursor(keys, cursor)))
+    else:
+        page_stmt = page_stmt.offset((page_number - 1) * page_size)
+    # one more row tells whether there is a next page
+    rows = (await db_session.execute(page_stmt.limit(page_size + 1))).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(keys, last[-len(keys) :])
+
+    return Page(rows=rows, next_cursor=next_cursor, total=total_count)
+
+
+async def _estimate(db_session: AsyncSession, stmt: Select) -> int | None:
+    dialect = db_session.get_bind().dialect
+    if dialect.name != "postgresql":
+        return None
+
+    sql = stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    conn = await db_session.connection()
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _dump(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    return value
+
+
+def _load(expr: ColumnElement, value) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = expr.type.python_type
+    except NotImplementedError:
+        return value
+
+    if python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    if python_type in (uuid.UUID, Decimal):
+        return python_type(value)
+    if python_type is float and isinstance(value, int):
+        return float(value)
+    if python_type in (int, float, bool, str) and not isinstance(value, python_type):
+        raise TypeError(f"Expected {python_type.__name__}, got {value!r}")
+
+    return value
@@ -0,0 +1,174 @@
+"""
+Process pool for CPU bound work (pikepdf/img2pdf transformations)
+
+PDF transformations are synchronous and may take seconds for large
+documents; running them directly inside `async def` handlers blocks the
+event loop of the whole uvicorn worker. Use `run_in_pool` to run such
+functions in a shared, bounded pool of worker processes:
+
+    page_count = await executor.run_in_pool(get_pdf_page_count, path)
+
+Functions (and their arguments) must be picklable i.e. module level
+functions with plain arguments (paths, numbers, pydantic models).
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import resource
+import signal
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, TypeVar
+
+from pydantic import BaseModel, computed_field
+
+from papermerge.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+T = TypeVar("T")
+
+_pool: Executor | None = None
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class ExecutorStats(BaseModel):
+    # number of worker processes; 0 means pool was not started (yet)
+    workers: int = 0
+    # jobs submitted to the pool which did not finish yet (queued + running)
+    queue_depth: int = 0
+    jobs_total: int = 0
+    jobs_failed: int = 0
+    # latency is measured from submission until result is available,
+    # thus it includes the time job waited in the queue
+    latency_total: float = 0.0  # seconds
+    latency_max: float = 0.0  # seconds
+
+    @computed_field
+    @property
+    def latency_avg(self) -> float:
+        if self.jobs_total == 0:
+            return 0.0
+        return self.latency_total / self.jobs_total
+
+
+_stats = ExecutorStats()
+
+
+def _init_worker(memory_limit: int | None):
+    """Applies per process memory limit (in MB)
+
+    Each worker process runs one job at a time, thus the limit
+    is effectively a per job limit.
+    """
+    if memory_limit:
+        limit = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _on_alarm(signum, frame):
+    raise JobTimeout()
+
+
+def _run_job(func: Callable[..., T], timeout: int | None, *args, **kwargs) -> T:
+    """Runs `func` inside worker process, interrupting it after `timeout` seconds"""
+    if timeout:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(timeout)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        if timeout:
+            signal.alarm(0)
+
+
+def get_pool() -> Executor | None:
+    """Returns shared process pool
+
+    Returns None if pool is disabled i.e. `papermerge__main__pdf_workers` = 0
+    """
+    global _pool
+
+    if config.papermerge__main__pdf_workers == 0:
+        return None
+
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=config.papermerge__main__pdf_workers,
+            # "spawn" - worker processes must not inherit event loop
+            # and DB connections of the uvicorn worker
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(config.papermerge__main__pdf_job_memory_limit,),
+        )
+        _stats.workers = _pool._max_workers
+
+    return _pool
+
+
+def shutdown_pool(wait: bool = True):
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(wait=wait, cancel_futures=True)
+        _pool = None
+
+
+def _discard_broken_pool(pool: Executor):
+    """Drops `pool` so that next job starts a fresh one
+
+    A pool is broken for good once one of its workers dies abruptly (e.g.
+    killed by the OOM killer or by the memory limit of the job).
+    """
+    global _pool
+
+    if _pool is pool:
+        _pool = None
+        _stats.workers = 0
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_pool(func: Callable[..., T], *args, **kwargs) -> T:
+    """Runs CPU bound `func` in the shared process pool
+
+    When pool is disabled, `func` is run in the default thread pool
+    executor, which still keeps the event loop responsive.
+    """
+    timeout = config.papermerge__main__pdf_job_timeout
+    pool = get_pool()
+    loop = asyncio.get_running_loop()
+
+    if pool is None:
+        job = functools.partial(func, *args, **kwargs)
+    else:
+        job = functools.partial(_run_job, func, timeout, *args, **kwargs)
+
+    _stats.queue_depth += 1
+    start = time.monotonic()
+    try:
+        return await loop.run_in_executor(pool, job)
+    except BrokenProcessPool as e:
+        _stats.jobs_failed += 1
+        logger.warning(f"Job {func.__name__} failed, worker died: {e!r}")
+        _discard_broken_pool(pool)
+        raise
+    except Exception as e:
+        _stats.jobs_failed += 1
+        logger.warning(f"Job {func.__name__} failed: {e!r}")
+        raise
+    finally:
+        latency = time.monotonic() - start
+        _stats.queue_depth -= 1
+        _stats.jobs_total += 1
+        _stats.latency_total += latency
+        _stats.latency_max = max(_stats.latency_max, latency)
+
+
+def get_stats() -> ExecutorStats:
+    return _stats.model_copy()
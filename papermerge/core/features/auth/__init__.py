@@ -11,6 +11,7 @@ from papermerge.core.features.users.db import api as usr_dbapi
 from papermerge.core.features.users import schema as users_schema
 from papermerge.core.features.auth.remote_scheme import RemoteUserScheme
 from papermerge.core.features.auth import scopes
+from papermerge.core.features.auth import principal_cache
 from papermerge.core.db import exceptions as db_exc
 from papermerge.core.utils import base64
 from papermerge.core.db.engine import get_db
@@ -64,57 +65,29 @@ async def get_current_user(
         token_data: types.TokenData = extract_token_data(token)
 
         if token_data is not None:
-            try:
-                user = await usr_dbapi.get_user(db_session, token_data.username)
-            except db_exc.UserNotFound:
-                # create normal user
-                user = await usr_dbapi.create_user(
-                    db_session,
-                    username=token_data.username,
-                    email=token_data.email,
-                    user_id=UUID(token_data.user_id),
-                    password="-",
-                )
-        total_scopes = token_data.scopes
-        # superusers have all privileges
-        if user.is_superuser:
-            total_scopes.extend(scopes.SCOPES.keys())
-        # augment user scopes with permissions associated to local groups
-        if len(token_data.groups) > 0:
-            s = await usr_dbapi.get_user_scopes_from_groups(
-                db_session,
-                user_id=UUID(token_data.user_id),
-                groups=token_data.groups,
+            key = principal_cache.make_key(
+                f"token:{token_data.user_id}", token_data.groups
             )
-            total_scopes.extend(s)
+            principal = await principal_cache.get(key)
+            if principal is None:
+                principal = await get_token_principal(db_session, token_data)
+                await principal_cache.set(key, principal)
+
+            user = principal.user
+            total_scopes = token_data.scopes
+            total_scopes.extend(principal.scopes)
 
     elif remote_user:  # get user from headers
-        # Using here external identity provider i.e.
-        # user management is done in external application
-        # If remote_user is not present in our DB then just create it
-        # (with its home folder ID, inbox folder ID etc)
-        try:
-            user = await usr_dbapi.get_user(db_session, remote_user.username)
-        except db_exc.UserNotFound:
-            # create normal user
-            user = usr_dbapi.create_user(
-                db_session,
-                username=remote_user.username,
-                email=remote_user.email,
-                password="-",
-            )
-        # superusers have all privileges
-        if user.is_superuser:
-            total_scopes.extend(scopes.SCOPES.keys())
-        # augment user scopes with permissions associated to local roles
-        if len(remote_user.roles) > 0:
-            s = await usr_dbapi.get_user_scopes_from_roles(
-                db_session, user_id=user.id, roles=remote_user.roles
-            )
-            total_scopes.extend(s)
+        key = principal_cache.make_key(
+            f"remote:{remote_user.username}", remote_user.roles
+        )
+        principal = await principal_cache.get(key)
+        if principal is None:
+            principal = await get_remote_user_principal(db_session, remote_user)
+            await principal_cache.set(key, principal)
 
-        if user is None:
-            raise HTTPException(status_code=401, detail="No credentials provided")
+        user = principal.user
+        total_scopes.extend(principal.scopes)
 
     if user is None:
         raise exc.HTTP401Unauthorized()
@@ -128,3 +101,66 @@ async def get_current_user(
     user.scopes = total_scopes  # is this required?
 
     return user
+
+
+async def get_token_principal(
+    db_session: AsyncSession, token_data: types.TokenData
+) -> principal_cache.Principal:
+    """Resolves user and its DB derived scopes for the token"""
+    total_scopes = []
+    try:
+        user = await usr_dbapi.get_user(db_session, token_data.username)
+    except db_exc.UserNotFound:
+        # create normal user
+        user, _ = await usr_dbapi.create_user(
+            db_session,
+            username=token_data.username,
+            email=token_data.email,
+            user_id=UUID(token_data.user_id),
+            password="-",
+        )
+    # superusers have all privileges
+    if user.is_superuser:
+        total_scopes.extend(scopes.SCOPES.keys())
+    # augment user scopes with permissions associated to local groups
+    if len(token_data.groups) > 0:
+        s = await usr_dbapi.get_user_scopes_from_groups(
+            db_session,
+            user_id=UUID(token_data.user_id),
+            groups=token_data.groups,
+        )
+        total_scopes.extend(s)
+
+    return principal_cache.Principal(user=user, scopes=total_scopes)
+
+
+async def get_remote_user_principal(
+    db_session: AsyncSession, remote_user: users_schema.RemoteUser
+) -> principal_cache.Principal:
+    """Resolves remote user and its DB derived scopes"""
+    # Using here external identity provider i.e.
+    # user management is done in external application
+    # If remote_user is not present in our DB then just create it
+    # (with its home folder ID, inbox folder ID etc)
+    total_scopes = []
+    try:
+        user = await usr_dbapi.get_user(db_session, remote_user.username)
+    except db_exc.UserNotFound:
+        # create normal user
+        user, _ = await usr_dbapi.create_user(
+            db_session,
+            username=remote_user.username,
+            email=remote_user.email,
+            password="-",
+        )
+    # superusers have all privileges
+    if user.is_superuser:
+        total_scopes.extend(scopes.SCOPES.keys())
+    # augment user scopes with permissions associated to local roles
+    if len(remote_user.roles) > 0:
+        s = await usr_dbapi.get_user_scopes_from_roles(
+            db_session, user_id=user.id, roles=remote_user.roles
+        )
+        total_scopes.extend(s)
+
+    return principal_cache.Principal(user=user, scopes=total_scopes)
@@ -0,0 +1,161 @@
+"""
+Cache of authenticated principals
+
+For every request `get_current_user` resolves the user and the scopes
+derived from the database: all scopes for superusers plus permissions of
+user's local groups/roles. Resolved principal is cached in two tiers:
+
+    1. in-process LRU cache with TTL
+    2. shared cache (Redis, see `papermerge.core.cache`), if enabled
+
+Cache key is the user identity plus fingerprint of groups/roles claimed
+by the token (or by the remote user headers), thus a changed claim is a
+cache miss.
+
+Any change of users, groups, roles or permissions must call `invalidate`,
+which switches cache to a new generation; entries of previous generations
+are never returned. Current generation is kept in the shared cache, thus
+with Redis enabled invalidation is seen by all processes; without Redis,
+other processes see the change only when their entries expire.
+
+Each process re-reads the generation from the shared cache at most once
+per `papermerge__main__principal_generation_ttl` seconds, i.e. a hit of
+the in-process tier does not go to Redis, and other processes see an
+invalidation with up to that delay.
+"""
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+
+from pydantic import BaseModel
+
+from papermerge.core.cache import client as cache
+from papermerge.core.config import get_settings
+from papermerge.core.features.users import schema as users_schema
+
+config = get_settings()
+
+GENERATION_KEY = "principals:generation"
+# must be (much) longer than principal's TTL, otherwise expired generation
+# key would revive entries of the previous generation
+GENERATION_TTL = 7 * 24 * 3600  # seconds
+
+
+class Principal(BaseModel):
+    user: users_schema.User
+    # scopes derived from the database i.e. without the scopes of the token
+    scopes: list[str]
+
+
+class LRUCache:
+    """Least recently used cache with per entry expiration"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+
+    def get(self, key: str) -> Principal | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Principal):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# (expires at, generation) last read from the shared cache
+_generation: tuple[float, str] | None = None
+
+_local = LRUCache(
+    maxsize=config.papermerge__main__principal_cache_size,
+    ttl=config.papermerge__main__principal_cache_ttl,
+)
+
+
+def make_key(identity: str, claims: list[str]) -> str:
+    """Builds cache key from user identity and groups/roles claims"""
+    fingerprint = hashlib.sha256(
+        "\n".join(sorted(claims)).encode("utf-8")
+    ).hexdigest()[:16]
+
+    return f"{identity}:{fingerprint}"
+
+
+def _remember_generation(generation: str) -> str:
+    global _generation
+
+    expires_at = time.monotonic() + config.papermerge__main__principal_generation_ttl
+    _generation = (expires_at, generation)
+    return generation
+
+
+async def _current_generation() -> str:
+    if _generation is not None and _generation[0] > time.monotonic():
+        return _generation[1]
+
+    generation = await cache.get(GENERATION_KEY) or b"0"
+    return _remember_generation(generation.decode())
+
+
+async def _full_key(key: str) -> str:
+    return f"principals:{await _current_generation()}:{key}"
+
+
+def is_enabled() -> bool:
+    return config.papermerge__main__principal_cache_ttl > 0
+
+
+async def get(key: str) -> Principal | None:
+    if not is_enabled():
+        return None
+
+    full_key = await _full_key(key)
+    principal = _local.get(full_key)
+    if principal is None:
+        value = await cache.get(full_key)
+        if value is None:
+            return None
+        principal = Principal.model_validate_json(value)
+        _local.set(full_key, principal)
+
+    # callers are free to modify returned user (e.g. `user.scopes`)
+    return principal.model_copy(deep=True)
+
+
+async def set(key: str, principal: Principal):
+    if not is_enabled():
+        return
+
+    full_key = await _full_key(key)
+    _local.set(full_key, principal.model_copy(deep=True))
+    await cache.set(
+        full_key,
+        principal.model_dump_json(),
+        ex=config.papermerge__main__principal_cache_ttl,
+    )
+
+
+async def invalidate():
+    """Discards all cached principals"""
+    _local.clear()
+    generation = _remember_generation(uuid.uuid4().hex)
+    await cache.set(GENERATION_KEY, generation, ex=GENERATION_TTL)
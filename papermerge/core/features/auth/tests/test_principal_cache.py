@@ -0,0 +1,120 @@
+import time
+
+from papermerge.core.features.auth import principal_cache
+from papermerge.core.features.users import schema as users_schema
+
+
+def make_principal(username: str = "john") -> principal_cache.Principal:
+    user = users_schema.User(
+        id="c7fa2ff1-8ac6-4a3b-b4d9-ad8e7ba8c0d0",
+        username=username,
+        email=f"{username}@example.com",
+        created_at="2025-01-01T00:00:00",
+        updated_at="2025-01-01T00:00:00",
+        home_folder_id=None,
+        inbox_folder_id=None,
+    )
+    return principal_cache.Principal(user=user, scopes=["node.view"])
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = principal_cache.LRUCache(maxsize=2, ttl=60)
+    cache.set("a", make_principal("a"))
+    cache.set("b", make_principal("b"))
+    cache.get("a")
+    cache.set("c", make_principal("c"))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_lru_cache_entries_expire(monkeypatch):
+    cache = principal_cache.LRUCache(maxsize=2, ttl=60)
+    cache.set("a", make_principal("a"))
+
+    now = time.monotonic()
+    monkeypatch.setattr(principal_cache.time, "monotonic", lambda: now + 61)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_key_depends_on_claims_but_not_their_order():
+    key1 = principal_cache.make_key("token:1", ["admins", "staff"])
+    key2 = principal_cache.make_key("token:1", ["staff", "admins"])
+    key3 = principal_cache.make_key("token:1", ["staff"])
+
+    assert key1 == key2
+    assert key1 != key3
+
+
+async def test_invalidate():
+    key = principal_cache.make_key("token:1", [])
+    await principal_cache.set(key, make_principal())
+
+    assert (await principal_cache.get(key)).user.username == "john"
+
+    await principal_cache.invalidate()
+
+    assert await principal_cache.get(key) is None
+
+
+async def test_generation_is_read_from_shared_cache_once_per_ttl(monkeypatch):
+    key = principal_cache.make_key("token:1", [])
+    await principal_cache.set(key, make_principal())
+    cache_get = principal_cache.cache.get
+    generation_reads = []
+
+    async def counting_get(cache_key):
+        if cache_key == principal_cache.GENERATION_KEY:
+            generation_reads.append(cache_key)
+        return await cache_get(cache_key)
+
+    monkeypatch.setattr(principal_cache.cache, "get", counting_get)
+
+    await principal_cache.get(key)
+    await principal_cache.get(key)
+    assert generation_reads == []
+
+    now = time.monotonic()
+    ttl = principal_cache.config.papermerge__main__principal_generation_ttl
+    monkeypatch.setattr(principal_cache.time, "monotonic", lambda: now + ttl + 1)
+    await principal_cache.get(key)
+    await principal_cache.get(key)
+    assert len(generation_reads) == 1
+
+
+async def test_returned_principal_is_a_copy():
+    key = principal_cache.make_key("token:1", [])
+    await principal_cache.set(key, make_principal())
+
+    (await principal_cache.get(key)).user.scopes.append("user.delete")
+
+    assert (await principal_cache.get(key)).user.scopes == []
+
+
+async def test_current_user_is_resolved_from_cache(auth_api_client, count_queries):
+    response = await auth_api_client.get("/users/me")
+    assert response.status_code == 200, response.json()
+
+    with count_queries() as queries:
+        response = await auth_api_client.get("/users/me")
+
+    assert response.status_code == 200, response.json()
+    assert not any("FROM users" in query for query in queries)
+
+
+async def test_group_change_invalidates_principals(auth_api_client, make_group):
+    response = await auth_api_client.get("/users/me")
+    assert response.status_code == 200, response.json()
+    key = principal_cache.make_key(f"token:{auth_api_client.user.id}", [])
+    assert await principal_cache.get(key) is not None
+
+    group = await make_group("accounting")
+    response = await auth_api_client.patch(
+        f"/groups/{group.id}", json={"name": "accounting-2"}
+    )
+
+    assert response.status_code == 200, response.json()
+    assert await principal_cache.get(key) is None
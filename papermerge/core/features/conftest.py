@@ -5,13 +5,14 @@ import io
 import uuid
 import json
 import tempfile
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
 
 import pytest
 from httpx import AsyncClient
 from httpx import ASGITransport
 from fastapi import FastAPI
-from sqlalchemy import select, text
+from sqlalchemy import event, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -19,8 +20,14 @@ from papermerge.core.tests.resource_file import ResourceFile
 from papermerge.core.types import OCRStatusEnum
 from papermerge.core import constants
 from papermerge.core.features.auth.scopes import SCOPES
+from papermerge.core.features.auth import principal_cache
 from papermerge.core.db.base import Base
-from papermerge.core.db.engine import engine, get_db
+from papermerge.core.db.engine import (
+    engine,
+    get_db,
+    get_read_db,
+    get_read_session_factory,
+)
 from papermerge.core.features.custom_fields import router as cf_router
 from papermerge.core.features.document.db import api as doc_dbapi
 from papermerge.core.features.document import schema as doc_schema
@@ -42,6 +49,7 @@ from papermerge.core.features.roles import router as roles_router
 from papermerge.core.features.tags import router as tags_router
 from papermerge.core.features.users import router as usr_router
 from papermerge.core.features.liveness_probe import router as probe_router
+from papermerge.core.features.useractivity import router as user_activity_router
 from papermerge.core import orm, dbapi, schema
 from papermerge.core import utils
 from papermerge.core.tests.types import AuthTestClient
@@ -49,6 +57,7 @@ from papermerge.core import config
 from papermerge.core.constants import ContentType
 from papermerge.core.features.shared_nodes.router import \
     router as shared_nodes_router
+from papermerge.search.routers.search import router as search_router
 
 DIR_ABS_PATH = os.path.abspath(os.path.dirname(__file__))
 RESOURCES = Path(DIR_ABS_PATH) / "document" / "tests" / "resources"
@@ -62,6 +71,17 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+async def clear_principal_cache():
+    """Principals cached by one test must not leak into the next one
+
+    Test users are rolled back after each test, while new ones may be
+    created with the same usernames.
+    """
+    await principal_cache.invalidate()
+    yield
+
+
 @pytest.fixture(autouse=True)
 def mock_media_root_env(monkeypatch):
     """Create test's scoped media root folder
@@ -287,6 +307,16 @@ async def my_documents_folder(db_session: AsyncSession, user, make_folder):
     return my_docs
 
 
+def session_factory(db_session: AsyncSession):
+    """Factory handing out the test's session, which it does not close"""
+
+    @asynccontextmanager
+    async def factory():
+        yield db_session
+
+    return factory
+
+
 def get_app_with_routes():
     app = FastAPI()
 
@@ -304,6 +334,8 @@ def get_app_with_routes():
     app.include_router(usr_router.router, prefix="")
     app.include_router(tags_router.router, prefix="")
     app.include_router(probe_router.router, prefix="")
+    app.include_router(user_activity_router.router, prefix="")
+    app.include_router(search_router, prefix="")
 
     return app
 
@@ -342,6 +374,10 @@ async def api_client(db_session):
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_read_session_factory] = (
+        lambda: session_factory(db_session)
+    )
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as c:
@@ -369,6 +405,10 @@ async def auth_api_client(db_session, user: orm.User):
     token = f"abc.{middle_part}.xyz"
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_read_session_factory] = (
+        lambda: session_factory(db_session)
+    )
     transport = ASGITransport(app=app)
 
     async with AsyncClient(
@@ -403,6 +443,10 @@ async def make_api_client(make_user, db_session):
         )
         token = f"abc.{middle_part}.xyz"
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        app.dependency_overrides[get_read_session_factory] = (
+            lambda: session_factory(db_session)
+        )
         transport = ASGITransport(app=app)
         async_client = AsyncClient(
             transport=transport,
@@ -422,6 +466,10 @@ async def login_as(db_session):
     async def _make(user):
         app = get_app_with_routes()
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        app.dependency_overrides[get_read_session_factory] = (
+            lambda: session_factory(db_session)
+        )
 
         middle_part = utils.base64.encode(
             {
@@ -809,3 +857,30 @@ def make_document_zdf(db_session: AsyncSession, document_type_zdf):
         return doc
 
     return _make_receipt
+
+
+@pytest.fixture()
+def count_queries():
+    """Returns context manager collecting SQL statements executed within it
+
+        with count_queries() as queries:
+            await dbapi.get_nodes(db_session, node_ids=ids)
+
+        assert len(queries) == 3
+    """
+    @contextmanager
+    def _counter():
+        queries = []
+
+        def _before_cursor_execute(conn, cursor, statement, *args):
+            queries.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+        try:
+            yield queries
+        finally:
+            event.remove(
+                engine.sync_engine, "before_cursor_execute", _before_cursor_execute
+            )
+
+    return _counter
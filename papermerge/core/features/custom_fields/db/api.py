@@ -1,12 +1,13 @@
-import math
 import logging
 import uuid
 
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, or_
 from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from papermerge.core import schema, orm
+from papermerge.core.db import pagination
+from papermerge.core.types import TotalMode
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,8 @@ async def get_custom_fields(
     page_number: int,
     filter: str,
     order_by: str = "name",
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.exact,
 ) -> schema.PaginatedResponse[schema.CustomField]:
 
     UserGroupAlias = aliased(orm.user_groups_association)
@@ -36,22 +39,8 @@ async def get_custom_fields(
         UserGroupAlias.c.user_id == user_id
     )
 
-    stmt_total_cf = select(func.count(orm.CustomField.id)).where(
-        or_(orm.CustomField.user_id == user_id, orm.CustomField.group_id.in_(subquery))
-    )
-
-    if filter:
-        stmt_total_cf = stmt_total_cf.where(
-            or_(
-                orm.CustomField.name.icontains(filter),
-                orm.CustomField.type.icontains(filter),
-            )
-        )
-
-    total_cf = (await db_session.execute(stmt_total_cf)).scalar()
     order_by_value = ORDER_BY_MAP.get(order_by, orm.CustomField.name.asc())
 
-    offset = page_size * (page_number - 1)
     stmt = (
         select(
             orm.CustomField,
@@ -65,9 +54,6 @@ async def get_custom_fields(
                 orm.CustomField.group_id.in_(subquery),
             )
         )
-        .limit(page_size)
-        .offset(offset)
-        .order_by(order_by_value)
     )
 
     if filter:
@@ -77,9 +63,19 @@ async def get_custom_fields(
                 orm.CustomField.type.icontains(filter),
             )
         )
-    items = []
+    page = await pagination.paginate(
+        db_session,
+        stmt,
+        order_by=[order_by_value],
+        tiebreaker=orm.CustomField.id,
+        page_size=page_size,
+        page_number=page_number,
+        cursor=cursor,
+        total=total,
+    )
 
-    for row in await db_session.execute(stmt):
+    items = []
+    for row in page.rows:
         kwargs = {
             "id": row.CustomField.id,
             "name": row.CustomField.name,
@@ -92,10 +88,13 @@ async def get_custom_fields(
 
         items.append(schema.CustomField(**kwargs))
 
-    total_pages = math.ceil(total_cf / page_size)
-
     return schema.PaginatedResponse[schema.CustomField](
-        items=items, page_size=page_size, page_number=page_number, num_pages=total_pages
+        items=items,
+        page_size=page_size,
+        page_number=page_number,
+        num_pages=page.num_pages(page_size),
+        next_cursor=page.next_cursor,
+        total=page.total,
     )
 
 
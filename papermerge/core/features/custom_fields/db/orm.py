@@ -2,7 +2,7 @@ from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
 
-from sqlalchemy import ForeignKey, func, CheckConstraint
+from sqlalchemy import ForeignKey, func, CheckConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from papermerge.core.db.base import Base
@@ -48,5 +48,11 @@ class CustomFieldValue(Base):
     value_yearmonth: Mapped[float] = mapped_column(nullable=True)
     created_at: Mapped[datetime] = mapped_column(insert_default=func.now())
 
+    __table_args__ = (
+        Index(
+            "custom_field_values_document_id_field_id_idx", "document_id", "field_id"
+        ),
+    )
+
     def __repr__(self):
         return f"CustomFieldValue(ID={self.id})"
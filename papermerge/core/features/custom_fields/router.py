@@ -15,6 +15,7 @@ from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
 from papermerge.core.features.users.schema import User
 from papermerge.core.features.users.db import api as user_dbapi
 from papermerge.core.db.engine import get_db
+from papermerge.core.db.pagination import InvalidCursor
 from .types import PaginatedQueryParams
 
 router = APIRouter(
@@ -81,14 +82,19 @@ async def get_custom_fields(
 
     Required scope: `{scope}`
     """
-    result = await dbapi.get_custom_fields(
-        db_session,
-        user_id=user.id,
-        page_size=params.page_size,
-        page_number=params.page_number,
-        order_by=params.order_by,
-        filter=params.filter,
-    )
+    try:
+        result = await dbapi.get_custom_fields(
+            db_session,
+            user_id=user.id,
+            page_size=params.page_size,
+            page_number=params.page_number,
+            order_by=params.order_by,
+            filter=params.filter,
+            cursor=params.cursor,
+            total=params.total,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return result
 
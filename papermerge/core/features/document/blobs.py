@@ -0,0 +1,285 @@
+"""
+Content addressed storage of document version files (local file server)
+
+File of each document version is stored once per content, in the blob
+store at `pathlib.blob_path(sha256)`: identical uploads, and versions
+whose file did not change, share one file. `DocumentVersion.sha256`
+references the `blobs` row of its file; the number of referencing
+versions is the reference count of the blob. Versions with NULL `sha256`
+(S3 file server, or created before the blob store) keep their file at
+`pathlib.docver_path(id, file_name)`; `dedup` moves those into the blob
+store.
+
+The blob store is opt-in (`papermerge__main__blob_store`): external
+workers sharing the media volume (OCR worker, S3 worker) receive only the
+version ID and look the file up at its per-version path.
+
+Versions are deleted in bulk (by cascades), thus reference counts are
+never maintained eagerly: `gc` removes blobs which are not referenced by
+any version and were not (re)used for `grace` time. Nothing runs it
+automatically: schedule `paper-cli blobs gc` (e.g. daily, from cron),
+otherwise space of deleted files is never reclaimed.
+
+A blob is never removed while it is being (re)used: `store` upserts the
+blob row (which bumps `last_used_at` and keeps the row locked until
+commit) before it looks for the file, while `gc` locks the rows it
+removes (`FOR UPDATE SKIP LOCKED`) and unlinks their files before it
+commits.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import constants as const
+from papermerge.core.config import FileServer, get_settings
+from papermerge.core.features.document.db.orm import Blob, DocumentVersion
+from papermerge.core.pathlib import abs_blob_path, abs_docver_path
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+
+@dataclass
+class DedupResult:
+    versions: int = 0  # versions moved to the blob store
+    duplicates: int = 0  # of which content was already in the blob store
+    saved_bytes: int = 0  # size of removed duplicate files
+    missing: int = 0  # versions without file
+
+
+@dataclass
+class GCResult:
+    blobs: int = 0  # removed unreferenced blobs
+    bytes: int = 0
+    orphans: int = 0  # removed files without blob row
+
+
+def is_enabled() -> bool:
+    return (
+        config.papermerge__main__blob_store
+        and config.papermerge__main__file_server == FileServer.LOCAL.value
+    )
+
+
+def file_sha256(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _upsert(db_session: AsyncSession, sha256: str, size: int):
+    if db_session.bind.dialect.name == "postgresql":
+        insert = postgresql.insert
+    else:
+        insert = sqlite.insert
+
+    return (
+        insert(Blob)
+        .values(sha256=sha256, size=size)
+        .on_conflict_do_update(
+            index_elements=[Blob.sha256], set_={"last_used_at": func.now()}
+        )
+    )
+
+
+async def store(
+    db_session: AsyncSession, src: Path, sha256: str | None = None
+) -> tuple[str, int]:
+    """Moves file `src` into the blob store
+
+    If the blob store already has the same content, `src` is removed.
+    `sha256` of the content is computed, unless given. Returns the
+    (sha256, size) of the blob.
+    """
+    if sha256 is None:
+        sha256 = await asyncio.to_thread(file_sha256, src)
+    size = src.stat().st_size
+
+    await db_session.execute(_upsert(db_session, sha256, size))
+
+    dst = abs_blob_path(sha256)
+    if dst.exists():
+        src.unlink()
+    else:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, dst)
+        # recent modification time protects the new blob from
+        # `gc(orphans=True)` until its row is committed
+        os.utime(dst)
+
+    return sha256, size
+
+
+async def ingest(
+    db_session: AsyncSession,
+    version: DocumentVersion,
+    src: Path | None = None,
+    sha256: str | None = None,
+):
+    """Makes `src` the file of the version
+
+    `src` defaults to the per version location (`docver_path`) e.g. the
+    file written there by page operations. The file is moved to the blob
+    store (or to the per version location, if the blob store is
+    disabled); the version is updated but not committed.
+    """
+    legacy_path = abs_docver_path(version.id, version.file_name)
+    src = src or legacy_path
+
+    if not is_enabled():
+        if src != legacy_path:
+            legacy_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(src, legacy_path)
+        version.size = legacy_path.stat().st_size
+        return
+
+    version.sha256, version.size = await store(db_session, src, sha256=sha256)
+    if src == legacy_path:
+        _remove_empty_dir(legacy_path.parent)
+
+
+async def dedup(
+    db_session: AsyncSession,
+    batch_size: int = 100,
+    min_age: timedelta = timedelta(minutes=1),
+) -> DedupResult:
+    """Moves files of versions without `sha256` to the blob store
+
+    Files modified within `min_age` are skipped, as they may still be
+    written to. Each batch is committed.
+    """
+    result = DedupResult()
+    last_id = None
+    while True:
+        stmt = (
+            select(DocumentVersion)
+            .where(DocumentVersion.sha256.is_(None))
+            .order_by(DocumentVersion.id)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            stmt = stmt.where(DocumentVersion.id > last_id)
+        versions = (await db_session.scalars(stmt)).all()
+        if len(versions) == 0:
+            break
+        last_id = versions[-1].id
+
+        threshold = datetime.now().timestamp() - min_age.total_seconds()
+        for version in versions:
+            path = abs_docver_path(version.id, version.file_name)
+            try:
+                mtime = path.stat().st_mtime
+            except (FileNotFoundError, NotADirectoryError):
+                result.missing += 1
+                continue
+            if mtime > threshold:
+                continue
+
+            sha256 = await asyncio.to_thread(file_sha256, path)
+            if abs_blob_path(sha256).exists():
+                result.duplicates += 1
+                result.saved_bytes += path.stat().st_size
+            await ingest(db_session, version, sha256=sha256)
+            result.versions += 1
+
+        await db_session.commit()
+
+    return result
+
+
+async def gc(
+    db_session: AsyncSession,
+    grace: timedelta = timedelta(hours=1),
+    batch_size: int = 500,
+    orphans: bool = False,
+    now: datetime | None = None,
+) -> GCResult:
+    """Removes blobs not referenced by any document version
+
+    Only blobs not (re)used for `grace` time are removed. With `orphans`,
+    also files of the blob store without blob row (e.g. left behind by
+    transactions rolled back after `store`) are removed, if they were not
+    modified for `grace` time; this scans the whole blob store.
+    """
+    now = now or datetime.now(timezone.utc)
+    result = GCResult()
+    referenced = exists().where(DocumentVersion.sha256 == Blob.sha256)
+
+    while True:
+        stmt = (
+            select(Blob.sha256, Blob.size)
+            .where(~referenced, Blob.last_used_at < now - grace)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = (await db_session.execute(stmt)).all()
+        if len(rows) == 0:
+            await db_session.commit()
+            break
+
+        for row in rows:
+            path = abs_blob_path(row.sha256)
+            path.unlink(missing_ok=True)
+            _remove_empty_dir(path.parent)
+        await db_session.execute(
+            delete(Blob).where(Blob.sha256.in_([row.sha256 for row in rows]))
+        )
+        await db_session.commit()
+        result.blobs += len(rows)
+        result.bytes += sum(row.size for row in rows)
+
+    if orphans:
+        result.orphans = await _remove_orphans(db_session, now - grace, batch_size)
+
+    logger.debug(f"Garbage collected {result}")
+
+    return result
+
+
+async def _remove_orphans(
+    db_session: AsyncSession, before: datetime, batch_size: int
+) -> int:
+    root = Path(config.papermerge__main__media_root) / const.BLOBS
+    if not root.exists():
+        return 0
+
+    removed = 0
+    batch: list[Path] = []
+
+    async def flush():
+        nonlocal removed
+        known = set(
+            await db_session.scalars(
+                select(Blob.sha256).where(Blob.sha256.in_([p.name for p in batch]))
+            )
+        )
+        for path in batch:
+            if path.name not in known:
+                path.unlink(missing_ok=True)
+                removed += 1
+        batch.clear()
+
+    for path in root.glob("*/*/*"):
+        if path.stat().st_mtime < before.timestamp():
+            batch.append(path)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    await db_session.commit()
+
+    return removed
+
+
+def _remove_empty_dir(path: Path):
+    try:
+        path.rmdir()
+    except OSError:
+        pass
@@ -20,6 +20,7 @@ def schedule_ocr(node_id: uuid.UUID, force: bool = False, lang: str | None = Non
             if lang is None:
                 lang = dbapi.get_document_lang(db_session, node_id)
             send_task(
+                db_session,
                 constants.WORKER_OCR_DOCUMENT,
                 kwargs={
                     "document_id": str(node_id),
@@ -27,6 +28,7 @@ def schedule_ocr(node_id: uuid.UUID, force: bool = False, lang: str | None = Non
                 },
                 route_name="ocr",
             )
+            db_session.commit()
         else:
             # get all descendants of node_id
             pass
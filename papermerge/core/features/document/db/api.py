@@ -1,39 +1,39 @@
 import io
 import logging
-import os
+from decimal import Decimal
 from os.path import getsize
 import uuid
 import tempfile
 from pathlib import Path
-from typing import Tuple, Sequence
+from typing import BinaryIO, Tuple, Sequence
 
 import img2pdf
 from pikepdf import Pdf
-from sqlalchemy import delete, func, insert, select, update, distinct, Select
+from sqlalchemy import delete, func, insert, select, update, distinct, Row, Select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from papermerge.core.features.document import s3
-from papermerge.core.utils.misc import copy_file
+from papermerge.core import executor
+from papermerge.core.features.document import blobs, manifests, previews, s3
+from papermerge.core.utils.misc import stream_file
 from papermerge.core import schema, orm, constants, tasks
-from papermerge.core.features.document_types.db.api import \
-    document_type_cf_count
+from papermerge.core.features.custom_fields.schema import CustomFieldType
 from papermerge.core.types import (
+    CFFilterOp,
     OrderEnum,
-    CFVValueColumn,
     ImagePreviewStatus,
 )
+from papermerge.core.exceptions import InvalidDateFormat
 from papermerge.core.db.common import get_ancestors, get_node_owner
 from papermerge.core.utils.misc import str2date, str2float, float2str
-from papermerge.core.pathlib import (
-    abs_docver_path,
-)
-from papermerge.core.features.document.schema import DocumentCFVRow
-from papermerge.core.features.document.ordered_document_cfv import \
-    OrderedDocumentCFV
 from papermerge.core import config
-from .selectors import select_doc_cfv, select_docs_by_type
+from .selectors import (
+    select_doc_cfv,
+    select_docs_by_type,
+    select_docs_by_type_ids,
+    select_document_type_cfs,
+)
 
 settings = config.get_settings()
 logger = logging.getLogger(__name__)
@@ -183,77 +183,94 @@ async def update_doc_type(
     await session.commit()
 
 
-async def get_docs_count_by_type(session: AsyncSession, type_id: uuid.UUID):
-    """Returns number of documents of specific document type"""
-    stmt = (
-        select(func.count())
-        .select_from(orm.Document)
-        .where(orm.Document.document_type_id == type_id)
-    )
+async def get_document_type_cfs(
+    session: AsyncSession, type_id: uuid.UUID
+) -> Sequence[Row]:
+    """(id, name, type) rows of document type's custom fields, ordered by name"""
+    stmt = select_document_type_cfs(document_type_id=type_id, user_id=None)
 
-    result = await session.scalars(stmt)
-    return result.one()
+    return (await session.execute(stmt)).all()
 
 
-async def get_cfv_column_name(db_session: AsyncSession, cf_name: str) -> CFVValueColumn:
-    result = await db_session.execute(
-        select(orm.CustomField.type).where(
-            orm.CustomField.name == cf_name
-        )
-    )
+def cf_filter_value(cf_type: CustomFieldType, op: CFFilterOp, value: str):
+    """Filter's (string) value converted to custom field's type
+
+    Raises `ValueError` if value can't be converted.
+    """
+    if op == CFFilterOp.contains and cf_type != CustomFieldType.text:
+        raise ValueError(f"Operator {op.value} is supported only for text fields")
 
-    value = result.scalar()
-
-    match value:
-        case "text":
-            ret = CFVValueColumn.TEXT
-        case "monetary":
-            ret = CFVValueColumn.MONETARY
-        case "date":
-            ret = CFVValueColumn.DATE
-        case "boolean":
-            ret = CFVValueColumn.BOOLEAN
-        case "yearmonth":
-            ret = CFVValueColumn.YEARMONTH
-        case "int":
-            ret = CFVValueColumn.INT
-        case "float":
-            ret = CFVValueColumn.FLOAT
-        case _:
-            raise ValueError("Unexpected custom field type")
-
-    return ret
-
-
-async def get_docs_by_type_no_cf(
+    try:
+        match cf_type:
+            case CustomFieldType.text:
+                return value
+            case CustomFieldType.int:
+                return int(value)
+            case CustomFieldType.float:
+                return float(value)
+            case CustomFieldType.monetary:
+                return Decimal(value)
+            case CustomFieldType.date:
+                return str2date(value)
+            case CustomFieldType.yearmonth:
+                return str2float(value)
+            case CustomFieldType.boolean:
+                if value.lower() in ("true", "t", "1"):
+                    return True
+                if value.lower() in ("false", "f", "0"):
+                    return False
+    except (ArithmeticError, InvalidDateFormat, ValueError) as e:
+        raise ValueError(f"Invalid {cf_type.value} value {value!r}") from e
+
+    raise ValueError(f"Invalid {cf_type.value} value {value!r}")
+
+
+def _typed_filters(
+    cfs: Sequence[Row],
+    order_by: str | None,
+    filters: Sequence[schema.DocumentCFVFilter],
+) -> list[tuple]:
+    """Validates `order_by` and `filters` against document type's `cfs`"""
+    cf_types = {cf.name: CustomFieldType(cf.type) for cf in cfs}
+    if order_by is not None and order_by not in cf_types:
+        raise ValueError(f"Document type has no custom field {order_by!r}")
+
+    typed_filters = []
+    for item in filters:
+        if item.name not in cf_types:
+            raise ValueError(f"Document type has no custom field {item.name!r}")
+        value = cf_filter_value(cf_types[item.name], item.op, item.value)
+        typed_filters.append((item.name, item.op, value))
+
+    return typed_filters
+
+
+async def get_docs_count_by_type(
     session: AsyncSession,
     type_id: uuid.UUID,
-    limit: int,
-    offset: int,
-    order_by: str | None = None,
-    order: OrderEnum = OrderEnum.desc,
-) -> list[schema.DocumentCFV]:
-    """Return all documents of specific type (with their empty custom fields)
+    filters: Sequence[schema.DocumentCFVFilter] = (),
+):
+    """Returns number of documents of specific document type
 
-    This method works correctly only in case document type does
-    not have custom fields
+    Raises `ValueError` if any of the `filters` is invalid.
     """
-    stmt = select(orm.Document).where(
-        orm.Document.document_type_id == type_id
-    ).limit(limit).offset(offset)
-
-    results = []
-
-    for doc in (await session.execute(stmt)).scalars():
-        item = schema.DocumentCFV(
-            id=doc.id,
-            title=doc.title,
+    if len(filters) == 0:
+        stmt = (
+            select(func.count())
+            .select_from(orm.Document)
+            .where(orm.Document.document_type_id == type_id)
+        )
+    else:
+        cfs = await get_document_type_cfs(session, type_id)
+        doc_ids = select_docs_by_type_ids(
             document_type_id=type_id,
-            custom_fields=[]
+            custom_fields=cfs,
+            filters=_typed_filters(cfs, order_by=None, filters=filters),
         )
-        results.append(item)
+        stmt = select(func.count()).select_from(doc_ids.order_by(None).subquery())
 
-    return results
+    result = await session.scalars(stmt)
+    return result.one()
 
 
 async def get_docs_by_type(
@@ -264,9 +281,16 @@ async def get_docs_by_type(
     order: OrderEnum = OrderEnum.desc,
     page_number: int = 1,
     page_size: int = 5,
+    filters: Sequence[schema.DocumentCFVFilter] = (),
 ) -> list[schema.DocumentCFV]:
     """
     Returns list of documents + doc CFv for all documents with of given type
+
+    Each document is one (pivoted) row with typed custom field values;
+    ordering by custom field value (`order_by` is custom field name),
+    filtering and pagination are all done by the database.
+
+    Raises `ValueError` if `order_by` or any of the `filters` is invalid.
     """
     if page_number < 1:
         raise ValueError(f"page_number must be >= 1; got value={page_number}")
@@ -274,49 +298,28 @@ async def get_docs_by_type(
     if page_size < 1:
         raise ValueError(f"page_size must be >= 1; got value={page_size}")
 
-    cf_count = await document_type_cf_count(session, document_type_id=type_id)
-
-    if cf_count == 0:
-        return await get_docs_by_type_no_cf(
-            session,
-            type_id=type_id,
-            order_by=order_by,
-            order=order,
-            limit=page_size,
-            offset=(page_number - 1) * page_size
-        )
-
-    cfv_column_name = None
-
-    if order_by is not None:
-        cfv_column_name = await get_cfv_column_name(session, order_by)
-
+    cfs = await get_document_type_cfs(session, type_id)
     stmt = select_docs_by_type(
         document_type_id=type_id,
-        user_id=user_id,
+        custom_fields=cfs,
         order_by=order_by,
         order=order,
-        cfv_column_name=cfv_column_name,
-        limit=cf_count * page_size,
-        offset=cf_count * (page_number - 1) * page_size
+        filters=_typed_filters(cfs, order_by=order_by, filters=filters),
+        limit=page_size,
+        offset=(page_number - 1) * page_size,
     )
 
-    ordered_doc_cfvs = OrderedDocumentCFV()
-    counter = 0
-    for row in (await session.execute(stmt)).all():
-        counter += 1
-        entry = DocumentCFVRow(
+    return [
+        schema.DocumentCFV(
+            id=row.doc_id,
             title=row.title,
-            doc_id=row.doc_id,
             document_type_id=row.document_type_id,
-            cf_name=row.cf_name,
-            cf_type=row.cf_type,
-            cf_value=row.cf_value
+            custom_fields=[
+                (cf.name, row[i + 3], cf.type) for i, cf in enumerate(cfs)
+            ],
         )
-
-        ordered_doc_cfvs.add(entry)
-
-    return list(ordered_doc_cfvs)
+        for row in await session.execute(stmt)
+    ]
 
 
 async def create_document(
@@ -441,11 +444,14 @@ async def version_bump_from_pages(
     first_page = pages[0]
     page_count = len(pages)
     error = None
+    await manifests.materialize(db_session, first_page.document_version_id)
     stmt = (
         select(orm.DocumentVersion)
         .where(
             orm.DocumentVersion.document_id == dst_document_id,
             orm.DocumentVersion.size == 0,
+            # manifests have no file (yet), but they are not empty
+            orm.DocumentVersion.manifest.is_(None),
         )
         .order_by(orm.DocumentVersion.number.desc())
     )
@@ -459,22 +465,16 @@ async def version_bump_from_pages(
             lang=dst_doc.lang,
         )
 
-    source_pdf = Pdf.open(first_page.document_version.file_path)
-    dst_pdf = Pdf.new()
-
-    for page in pages:
-        pdf_page = source_pdf.pages.p(page.number)
-        dst_pdf.pages.append(pdf_page)
-
     dst_document_version.file_name = first_page.document_version.file_name
     dst_document_version.page_count = page_count
 
-    dirname = os.path.dirname(dst_document_version.file_path)
-    os.makedirs(dirname, exist_ok=True)
-
-    dst_pdf.save(dst_document_version.file_path)
-
-    dst_document_version.size = getsize(dst_document_version.file_path)
+    dst_document_version.size = await executor.run_in_pool(
+        extract_pdf_pages,
+        src=first_page.document_version.file_path,
+        dst=dst_document_version.file_path,
+        page_numbers=[page.number for page in pages],
+    )
+    await blobs.ingest(db_session, dst_document_version)
 
     for page_number in range(1, page_count + 1):
         db_page = orm.Page(
@@ -488,9 +488,6 @@ async def version_bump_from_pages(
         await db_session.commit()
     except Exception as e:
         error = schema.Error(messages=[str(e)])
-    finally:
-        source_pdf.close()
-        dst_pdf.close()
 
     if error:
         return None, error
@@ -564,10 +561,12 @@ def file_type(content_type: str) -> str:
     raise ValueError(f"Invalid content type {content_type}")
 
 
-def get_pdf_page_count(content: io.BytesIO | bytes) -> int:
+def get_pdf_page_count(content: io.BytesIO | bytes | Path) -> int:
     if isinstance(content, bytes):
         pdf = Pdf.open(io.BytesIO(content))
     else:
+        # for a `Path` pikepdf reads only the xref table and the page
+        # tree, the file is not loaded in memory
         pdf = Pdf.open(content)
     page_count = len(pdf.pages)
     pdf.close()
@@ -575,6 +574,27 @@ def get_pdf_page_count(content: io.BytesIO | bytes) -> int:
     return page_count
 
 
+def convert_to_pdf(src: Path, dst: Path) -> None:
+    """Converts image file (jpeg, png, tiff) `src` to PDF file `dst`"""
+    with open(dst, "wb") as f:
+        img2pdf.convert(str(src), outputstream=f)
+
+
+def extract_pdf_pages(src: Path, dst: Path, page_numbers: list[int]) -> int:
+    """Saves pages `page_numbers` of `src` as new PDF file `dst`
+
+    Page numbering starts with 1. Returns size of `dst` in bytes.
+    """
+    with Pdf.open(src) as src_pdf, Pdf.new() as dst_pdf:
+        for number in page_numbers:
+            dst_pdf.pages.append(src_pdf.pages.p(number))
+
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst_pdf.save(dst)
+
+    return getsize(dst)
+
+
 async def create_next_version(
     db_session: AsyncSession,
     doc: orm.Document,
@@ -587,6 +607,8 @@ async def create_next_version(
         .where(
             orm.DocumentVersion.size == 0,
             orm.DocumentVersion.document_id == doc.id,
+            # manifests have no file (yet), but they are not empty
+            orm.DocumentVersion.manifest.is_(None),
         )
         .order_by(orm.DocumentVersion.number.desc())
     )
@@ -615,42 +637,58 @@ async def create_next_version(
 async def upload(
     db_session: AsyncSession,
     document_id: uuid.UUID,
-    content: io.BytesIO,
+    content: BinaryIO,
     size: int,
     file_name: str,
     content_type: str | None = None,
 ) -> Tuple[schema.Document | None, schema.Error | None]:
+    """Associates uploaded file with the document
 
+    `content` is a readable binary stream (e.g. the spooled temporary file
+    of the multipart upload). It is streamed chunk by chunk to its final
+    location in media root, thus memory usage does not depend on the
+    size of the uploaded file.
+    """
     doc = await db_session.get(orm.Document, document_id)
     orig_ver = None
+    # Temporary files are created inside media root, so that moving
+    # them into their final location (see `blobs.ingest`) is a cheap rename
+    media_root = Path(settings.papermerge__main__media_root)
+    media_root.mkdir(parents=True, exist_ok=True)
 
     if content_type != constants.ContentType.APPLICATION_PDF:
-        try:
-            with tempfile.TemporaryDirectory() as tmpdirname:
-                tmp_file_path = Path(tmpdirname) / f"{file_name}.pdf"
-                with open(tmp_file_path, "wb") as f:
-                    pdf_content = img2pdf.convert(content)
-                    f.write(pdf_content)
-        except img2pdf.ImageOpenError as e:
-            error = schema.Error(messages=[str(e)])
-            return None, error
-
-        orig_ver = await create_next_version(
-            db_session, doc=doc, file_name=file_name, file_size=size
-        )
-
-        pdf_ver = await create_next_version(
-            db_session,
-            doc=doc,
-            file_name=f"{file_name}.pdf",
-            file_size=len(pdf_content),
-            short_description=f"{file_type(content_type)} -> pdf",
-        )
-        await copy_file(src=content, dst=abs_docver_path(orig_ver.id, orig_ver.file_name))
-
-        await copy_file(src=pdf_content, dst=abs_docver_path(pdf_ver.id, pdf_ver.file_name))
+        # convert image to pdf before touching any document version,
+        # so that unsupported files leave neither DB entries nor files behind.
+        with tempfile.TemporaryDirectory(
+            dir=media_root
+        ) as tmpdirname:
+            tmp_orig_path = Path(tmpdirname) / file_name
+            tmp_pdf_path = Path(tmpdirname) / f"{file_name}.pdf"
+            orig_size, checksum = await stream_file(src=content, dst=tmp_orig_path)
+            logger.debug(f"Uploaded {file_name} sha256={checksum}")
+            try:
+                await executor.run_in_pool(
+                    convert_to_pdf, src=tmp_orig_path, dst=tmp_pdf_path
+                )
+            except img2pdf.ImageOpenError as e:
+                error = schema.Error(messages=[str(e)])
+                return None, error
+
+            page_count = await executor.run_in_pool(get_pdf_page_count, tmp_pdf_path)
+
+            orig_ver = await create_next_version(
+                db_session, doc=doc, file_name=file_name, file_size=orig_size
+            )
+            pdf_ver = await create_next_version(
+                db_session,
+                doc=doc,
+                file_name=f"{file_name}.pdf",
+                file_size=getsize(tmp_pdf_path),
+                short_description=f"{file_type(content_type)} -> pdf",
+            )
+            await blobs.ingest(db_session, orig_ver, tmp_orig_path, sha256=checksum)
+            await blobs.ingest(db_session, pdf_ver, tmp_pdf_path)
 
-        page_count = get_pdf_page_count(pdf_content)
         orig_ver.page_count = page_count
         pdf_ver.page_count = page_count
 
@@ -673,9 +711,15 @@ async def upload(
         pdf_ver = await create_next_version(
             db_session, doc=doc, file_name=file_name, file_size=size
         )
-        await copy_file(src=content, dst=abs_docver_path(pdf_ver.id, pdf_ver.file_name))
-
-        page_count = get_pdf_page_count(content)
+        with tempfile.TemporaryDirectory(dir=media_root) as tmpdirname:
+            tmp_pdf_path = Path(tmpdirname) / file_name
+            _, checksum = await stream_file(src=content, dst=tmp_pdf_path)
+            logger.debug(f"Uploaded {file_name} sha256={checksum}")
+            await blobs.ingest(db_session, pdf_ver, tmp_pdf_path, sha256=checksum)
+
+        page_count = await executor.run_in_pool(
+            get_pdf_page_count, pdf_ver.file_path
+        )
 
         pdf_ver.page_count = page_count
         for page_number in range(1, page_count + 1):
@@ -688,28 +732,12 @@ async def upload(
             db_session.add(db_page_pdf)
         db_session.add(pdf_ver)
 
-    try:
-        await db_session.commit()
-    except Exception as e:
-        error = schema.Error(messages=[str(e)])
-        return None, error
-
-    owner = await get_node_owner(db_session, node_id=doc.id)
-    doc.owner_name = owner.name
-    stmt = select(orm.Document).options(
-        selectinload(orm.Document.tags),
-        selectinload(orm.Document.versions).selectinload(orm.DocumentVersion.pages)
-    ).where(orm.Document.id == doc.id)
-
-    result = await db_session.execute(stmt)
-    doc_with_relations = result.scalar_one()
-    validated_model = schema.Document.model_validate(doc_with_relations)
-
     if orig_ver:
         # non PDF document
         # here `orig_ver` means - version which is not a PDF
         # may be Jpg, PNG or TIFF
         tasks.send_task(
+            db_session,
             constants.S3_WORKER_ADD_DOC_VER,
             kwargs={"doc_ver_ids": [str(orig_ver.id)]},
             route_name="s3",
@@ -717,6 +745,7 @@ async def upload(
 
     # PDF document
     tasks.send_task(
+        db_session,
         constants.S3_WORKER_ADD_DOC_VER,
         kwargs={"doc_ver_ids": [str(pdf_ver.id)]},
         route_name="s3",
@@ -726,6 +755,7 @@ async def upload(
         if doc.ocr is True:
             # user chose "schedule OCR" when uploading document
             tasks.send_task(
+                db_session,
                 constants.WORKER_OCR_DOCUMENT,
                 kwargs={
                     "document_id": str(doc.id),
@@ -734,6 +764,31 @@ async def upload(
                 route_name="ocr",
             )
 
+    try:
+        await db_session.commit()
+    except Exception as e:
+        error = schema.Error(messages=[str(e)])
+        return None, error
+
+    owner = await get_node_owner(db_session, node_id=doc.id)
+    doc.owner_name = owner.name
+    stmt = select(orm.Document).options(
+        selectinload(orm.Document.tags),
+        selectinload(orm.Document.versions).selectinload(orm.DocumentVersion.pages)
+    ).where(orm.Document.id == doc.id)
+
+    result = await db_session.execute(stmt)
+    doc_with_relations = result.scalar_one()
+    validated_model = schema.Document.model_validate(doc_with_relations)
+
+    # local file server: previews of all pages are rendered in background
+    previews.schedule(
+        doc.id,
+        pdf_ver.id,
+        file_path=pdf_ver.file_path,
+        pages=[(page.id, page.number) for page in pdf_ver.pages],
+    )
+
     return validated_model, None
 
 
@@ -1005,14 +1060,14 @@ async def get_docs_thumbnail_img_status(
     doc_ids_not_yet_considered_for_preview = []
     items = []
     if fserver == config.FileServer.S3.value:
-        for row in await db_session.execute(stmt):
-            url = None
-            if row.preview_status == ImagePreviewStatus.ready:
-                # image URL is returned if only and only if image
-                # preview is ready (generated and uploaded to S3)
-                if fserver == config.FileServer.S3:
-                    # Real world CDN setup
-                    url = s3.doc_thumbnail_signed_url(row.doc_id)
+        rows = (await db_session.execute(stmt)).all()
+        # image URL is returned if only and only if image
+        # preview is ready (generated and uploaded to S3)
+        urls = s3.doc_thumbnail_signed_urls(
+            [row.doc_id for row in rows if row.preview_status == ImagePreviewStatus.ready]
+        )
+        for row in rows:
+            url = urls.get(row.doc_id)
 
             if row.preview_status is None:
                 doc_ids_not_yet_considered_for_preview.append(row.doc_id)
@@ -1024,12 +1079,20 @@ async def get_docs_thumbnail_img_status(
             )
             items.append(item)
     else:
-        # Non-CDN setup
+        # Non-CDN setup: thumbnails are rendered in background
+        # and served by `/api/thumbnails/` endpoint once ready
         for row in await db_session.execute(stmt):
+            url = None
+            if row.preview_status == ImagePreviewStatus.ready:
+                url = f"/api/thumbnails/{row.doc_id}"
+
+            if row.preview_status is None:
+                doc_ids_not_yet_considered_for_preview.append(row.doc_id)
+
             item = schema.DocumentPreviewImageStatus(
                 doc_id=row.doc_id,
-                status=ImagePreviewStatus.ready,
-                preview_image_url=f"/api/thumbnails/{row.doc_id}"
+                status=row.preview_status,
+                preview_image_url=url
             )
             items.append(item)
 
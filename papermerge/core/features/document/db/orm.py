@@ -1,8 +1,10 @@
 import uuid
+from datetime import datetime
 from uuid import UUID
 from pathlib import Path
 
-from sqlalchemy import ForeignKey, Enum
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Enum, Index, JSON, String, func
+from sqlalchemy import text as sql_text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from papermerge.core.db.base import Base
@@ -51,6 +53,37 @@ class Document(Node):
         "polymorphic_identity": "document",
     }
 
+    __table_args__ = (
+        # documents of given type (tabular view of custom fields)
+        Index(
+            "documents_document_type_id_idx",
+            "document_type_id",
+            postgresql_where=sql_text("document_type_id IS NOT NULL"),
+            sqlite_where=sql_text("document_type_id IS NOT NULL"),
+        ),
+    )
+
+
+class Blob(Base):
+    """Content addressed document version file, see `document.blobs`
+
+    File is stored once per content, at `pathlib.blob_path(sha256)`, and
+    is shared by all document versions with the same `sha256`.
+    """
+
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(BigInteger)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    # unreferenced blobs are garbage collected only some time after
+    # they were last (re)used, see `blobs.gc`
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
 
 class DocumentVersion(Base):
     __tablename__ = "document_versions"
@@ -67,13 +100,28 @@ class DocumentVersion(Base):
     size: Mapped[int] = mapped_column(default=0)
     page_count: Mapped[int] = mapped_column(default=0)
     short_description: Mapped[str] = mapped_column(nullable=True)
+    # NULL = file is stored per version (at `docver_path(id, file_name)`),
+    # e.g. with S3 file server or before `paper-cli blobs dedup`
+    sha256: Mapped[str | None] = mapped_column(
+        String(64), ForeignKey("blobs.sha256"), nullable=True
+    )
+    # [[source version ID, page number, rotation], ...] of the version
+    # without its own PDF yet, see `document.manifests`; NULL = file based
+    manifest: Mapped[list | None] = mapped_column(JSON, nullable=True)
     pages: Mapped[list["Page"]] = relationship(
         back_populates="document_version", lazy="select"
     )
 
+    __table_args__ = (
+        # last version of the document: backward scan, first row
+        Index("document_versions_document_id_number_idx", "document_id", "number"),
+        # references of blobs, see `blobs.gc`
+        Index("document_versions_sha256_idx", "sha256"),
+    )
+
     @property
     def file_path(self) -> Path:
-        return abs_docver_path(self.id, self.file_name)
+        return abs_docver_path(self.id, self.file_name, sha256=self.sha256)
 
     def __repr__(self):
         return f"DocumentVersion(id={self.id}, number={self.number})"
@@ -91,5 +139,10 @@ class Page(Base):
         ForeignKey("document_versions.id", ondelete="CASCADE")
     )
     document_version: Mapped[DocumentVersion] = relationship(back_populates="pages")
+
+    __table_args__ = (
+        Index("pages_document_version_id_number_idx", "document_version_id", "number"),
+    )
+
     def __repr__(self):
         return f"Page(id={self.id}, number={self.number})"
@@ -1,10 +1,24 @@
 import uuid
-
-from sqlalchemy import select, Select, case, func, VARCHAR
+from typing import Any, Sequence
+
+from sqlalchemy import (
+    Boolean,
+    ColumnElement,
+    Date,
+    Integer,
+    Row,
+    Select,
+    VARCHAR,
+    case,
+    cast,
+    func,
+    select,
+)
 from sqlalchemy.orm import aliased
 
 from papermerge.core import orm
-from papermerge.core.types import OrderEnum, CFVValueColumn
+from papermerge.core.features.custom_fields.schema import CustomFieldType
+from papermerge.core.types import CFFilterOp, OrderEnum
 
 
 
@@ -83,44 +97,6 @@ def select_doc_cfv(document_id: uuid.UUID) -> Select:
     return stmt
 
 
-def select_doc_type_cfv(document_type_id: uuid.UUID, cf_name: str, cfv_column_name: CFVValueColumn) -> Select:
-    """Returns SqlAlchemy selector for document custom field values for
-    specific document type and custom field name
-
-    The point of this select is to use it as an extra JOIN for ordering
-    by specific custom field column. In order to be able to sort
-    by specific custom field column one need to have a "table" (subquery)
-    with - doc_id - custom field value - entries i.e. custom
-    field value for each document of specific type. Thus, this select
-    "returns tuples" for doc-id, cfv for all document of specific
-    type (even if that cfv is empty).
-
-    Mind duplicates - this selector (and subquery created from it) must
-    NOT return duplicated rows!
-    """
-    cfv = aliased(orm.CustomFieldValue, name="cfv")
-    cf = aliased(orm.CustomField, name="cf")
-    assoc = aliased(orm.DocumentTypeCustomField, name="assoc")
-    doc = aliased(orm.Document, name="doc")
-
-    stmt = select(
-        doc.id.label("doc_id"),
-        getattr(cfv, cfv_column_name).label("cf_value")
-    ).select_from(doc).join(
-        assoc,
-        (assoc.document_type_id == doc.document_type_id) & (doc.document_type_id == document_type_id)
-    ).join(
-        cf,
-        (cf.id == assoc.custom_field_id) & (cf.name == cf.name)
-    ).join(
-        cfv,
-        (cfv.document_id == doc.id) & (cfv.field_id == cf.id),
-        isouter=True
-    ).where(doc.document_type_id == document_type_id, cf.name == cf_name)
-
-    return stmt
-
-
 def select_document_type_cfs(
     document_type_id: uuid.UUID,
     user_id: uuid.UUID,
@@ -135,20 +111,16 @@ def select_document_type_cfs(
                 custom_fields.name AS name,
                 custom_fields.type AS type,
                 custom_fields.extra_data AS extra_data
-            FROM nodes
-            JOIN documents doc ON nodes.id = doc.node_id
-            JOIN document_types_custom_fields
-                ON document_types_custom_fields.document_type_id = doc.document_type_id
+            FROM document_types_custom_fields
             JOIN custom_fields
                 ON custom_fields.id = document_types_custom_fields.custom_field_id
-            WHERE doc.document_type_id = 'b88b030b-c8ef-472a-a9cf-393251226dbf'
+            WHERE document_types_custom_fields.document_type_id = 'b88b030b-c8ef-472a-a9cf-393251226dbf'
             GROUP BY custom_fields.id
 
-    SELECT generated by SqlAlchemy will have different style for `FROM nodes` part
-    but that is not important. Important part are other joins and `GROUP BY` clause
+    Documents of given type are not joined here: that made the cost of this
+    query grow with the number of documents.
     """
     assoc = aliased(orm.DocumentTypeCustomField, name="assoc")
-    doc = aliased(orm.Document, name="doc")
     cf = aliased(orm.CustomField, name="cf")
 
     stmt = select(
@@ -156,301 +128,196 @@ def select_document_type_cfs(
         cf.name.label("name"),
         cf.type.label("type")
     ).select_from(
-        doc
-    ).join(
-        assoc, assoc.document_type_id == doc.document_type_id
+        assoc
     ).join(
         cf, cf.id == assoc.custom_field_id
     ).where(
-        doc.document_type_id == document_type_id
+        assoc.document_type_id == document_type_id
     ).group_by(cf.name, cf.id).order_by(cf.name)
 
     return stmt
 
 
-def select_docs_by_type_without_ordering(
-    document_type_id: uuid.UUID,
-    user_id: uuid.UUID,
-):
-    """
-    Should return Sql query approximately like following one:
-
-        WITH
-            cf(id, name, type, extra_data) AS (
-                SELECT
-                    custom_fields.id AS id, custom_fields.name AS name,
-                    custom_fields.type AS type,
-                    custom_fields.extra_data AS extra_data
-                FROM nodes
-                JOIN documents doc ON nodes.id = doc.node_id
-                JOIN document_types_custom_fields ON document_types_custom_fields.document_type_id = doc.document_type_id
-                JOIN custom_fields ON custom_fields.id = document_types_custom_fields.custom_field_id
-                WHERE doc.document_type_id = 'b88b030b-c8ef-472a-a9cf-393251226dbf'
-                GROUP BY custom_fields.id
-            ),
-            all_documents(id, title, ctype, lang, user_id, parent_id, created_at, updated_at,document_type_id) AS (
-                SELECT
-                        nodes.id AS id,
-                        nodes.title AS title,
-                        nodes.ctype AS ctype,
-                        nodes.lang AS lang,
-                        nodes.user_id AS user_id,
-                        nodes.parent_id AS parent_id,
-                        nodes.created_at AS created_at,
-                        nodes.updated_at AS updated_at,
-                        documents.document_type_id AS document_type_id
-                    FROM nodes JOIN documents ON nodes.id = documents.node_id
-            )
-        SELECT
-            all_documents.id AS doc_id,
-            all_documents.title AS doc_title,
-            cf.id AS cf_id,
-            cf.name AS cf_name,
-            cfv.id AS cfv_id,
-            CASE
-                WHEN (cf.type = 'monetary') THEN CAST(cfv.value_monetary AS VARCHAR)
-                WHEN (cf.type = 'text') THEN CAST(cfv.value_text AS VARCHAR)
-                WHEN (cf.type = 'date') THEN substr(CAST(cfv.value_date AS VARCHAR), 0, 11)
-                WHEN (cf.type = 'boolean') THEN CAST(cfv.value_boolean AS VARCHAR)
-                WHEN (cf.type = 'float') THEN CAST(cfv.value_float AS VARCHAR)
-                WHEN (cf.type = 'int') THEN CAST(cfv.value_int AS VARCHAR)
-                WHEN (cf.type = 'yearmonth') THEN CAST(cfv.value_yearmonth AS VARCHAR)
-            END AS cfv_value
-        FROM cf
-        JOIN all_documents ON all_documents.document_type_id = 'b88b030b-c8ef-472a-a9cf-393251226dbf'
-        LEFT JOIN custom_field_values AS cfv
-             ON cfv.document_id = all_documents.id  AND cfv.field_id = cf.id
+def cf_value_column(cfv, cf_id: uuid.UUID, cf_type: CustomFieldType):
+    """Typed value of custom field `cf_id` of the document, as aggregate
+
+    Used in queries over documents joined with (all) their custom field
+    values and grouped by document: conditional aggregation picks the
+    value of one specific custom field (there is at most one per document).
     """
-    subq_1 = aliased(select_document_type_cfs(document_type_id, user_id).cte())
-    subq_2 = aliased(select(orm.Document).cte())
-    cfv = aliased(orm.CustomFieldValue)
+    column = getattr(cfv, f"value_{CustomFieldType(cf_type).value}")
+    is_cf = cfv.field_id == cf_id
 
-    stmt = select(
-        subq_2.c.title.label('title'),
-        subq_2.c.id.label('doc_id'),
-        subq_2.c.document_type_id.label('document_type_id'),
-        subq_1.c.id.label('cf_id'),
-        subq_1.c.name.label('cf_name'),
-        subq_1.c.type.label('cf_type'),
-        case(
-            (subq_1.c.type == 'monetary', func.cast(cfv.value_monetary, VARCHAR)),
-            (subq_1.c.type == 'text', func.cast(cfv.value_text, VARCHAR)),
-            (subq_1.c.type == 'date',
-             func.substr(func.cast(cfv.value_date, VARCHAR), 0, DATE_LEN)),
-            (subq_1.c.type == 'boolean', func.cast(cfv.value_boolean, VARCHAR)),
-            (subq_1.c.type == 'float', func.cast(cfv.value_float, VARCHAR)),
-            (subq_1.c.type == 'int', func.cast(cfv.value_int, VARCHAR)),
-            (subq_1.c.type == 'yearmonth', func.cast(cfv.value_yearmonth, VARCHAR)),
-        ).label("cf_value")
+    if cf_type == CustomFieldType.boolean:
+        # there is no max(boolean) in PostgreSQL
+        return cast(func.max(cast(column, Integer)).filter(is_cf), Boolean)
 
-    ).select_from(subq_1).join(
-        subq_2, subq_2.c.document_type_id == document_type_id
-    ).join(
-        cfv,
-        (cfv.field_id == subq_1.c.id) & (cfv.document_id == subq_2.c.id),
-        isouter=True
-    ).order_by(subq_2.c.id)
+    value = func.max(column).filter(is_cf)
+    if cf_type == CustomFieldType.date:
+        # `value_date` column is a timestamp
+        return func.date(value, type_=Date)
 
-    return stmt
+    return value
 
-def select_docs_by_type_with_ordering(
+
+def select_docs_by_type_ids(
     document_type_id: uuid.UUID,
-    user_id: uuid.UUID,
-    order_by: str,
-    cfv_column_name: CFVValueColumn,
+    custom_fields: Sequence[Row],
+    order_by: str | None = None,
     order: OrderEnum = OrderEnum.desc,
-):
+    filters: Sequence[tuple[str, CFFilterOp, Any]] = (),
+) -> Select:
     """
-    Trying to generate something like:
+    IDs (`doc_id` column) of documents of given type, filtered and ordered
+    by custom field values, plus the value they are ordered by (`sort_key`
+    column, only if `order_by` is given)
 
-    WITH dt_custom_fields(id, name, type, extra_data) AS (
-        SELECT
-            custom_fields.id AS id, custom_fields.name AS name,
-            custom_fields.type AS type,
-            custom_fields.extra_data AS extra_data
-        FROM nodes
-        JOIN documents doc ON nodes.id = doc.node_id
-        JOIN document_types_custom_fields ON document_types_custom_fields.document_type_id = doc.document_type_id
-        JOIN custom_fields ON custom_fields.id = document_types_custom_fields.custom_field_id
-        WHERE doc.document_type_id = 'b88b030b-c8ef-472a-a9cf-393251226dbf'
-        GROUP BY custom_fields.id
-    ),
-    all_documents(id, title, ctype, lang, user_id, parent_id, created_at, updated_at,document_type_id) AS (
-        SELECT
-                nodes.id AS id,
-                nodes.title AS title,
-                nodes.ctype AS ctype,
-                nodes.lang AS lang,
-                nodes.user_id AS user_id,
-                nodes.parent_id AS parent_id,
-                nodes.created_at AS created_at,
-                nodes.updated_at AS updated_at,
-                documents.document_type_id AS document_type_id
-            FROM nodes JOIN documents ON nodes.id = documents.node_id
-    ),
-    unordered_documents_with_cf AS (
-        SELECT
-            docs.id AS doc_id,
-            docs.title AS doc_title,
-            cf.id AS cf_id,
-            cf.name AS cf_name,
-            cfv.id AS cfv_id,
-            CASE
-                WHEN (cf.type = 'monetary') THEN CAST(cfv.value_monetary AS VARCHAR)
-                WHEN (cf.type = 'text') THEN CAST(cfv.value_text AS VARCHAR)
-                WHEN (cf.type = 'date') THEN substr(CAST(cfv.value_date AS VARCHAR), 0, 11)
-                WHEN (cf.type = 'boolean') THEN CAST(cfv.value_boolean AS VARCHAR)
-                WHEN (cf.type = 'float') THEN CAST(cfv.value_float AS VARCHAR)
-                WHEN (cf.type = 'int') THEN CAST(cfv.value_int AS VARCHAR)
-                WHEN (cf.type = 'yearmonth') THEN CAST(cfv.value_yearmonth AS VARCHAR)
-            END AS cfv_value
-        FROM dt_custom_fields cf
-        JOIN all_documents docs ON docs.document_type_id = 'b88b030b-c8ef-472a-a9cf-393251226dbf'
-        LEFT JOIN custom_field_values AS cfv
-             ON cfv.document_id = docs.id  AND cfv.field_id = cf.id
-    ),
-    ordered_documents_by_cf AS(
-        SELECT
-            cfv2.document_id AS doc_id,
-            cfv2.value_monetary AS cf_typed_value
-        FROM dt_custom_fields cf2
-        JOIN all_documents docs2 ON docs2.document_type_id = 'b88b030b-c8ef-472a-a9cf-393251226dbf'
-        LEFT JOIN custom_field_values AS cfv2
-             ON cfv2.document_id = docs2.id  AND cfv2.field_id = cf2.id
-        WHERE cf2.name = 'Gesamtbetrag'
-    )
-    SELECT  -- FINAL SELECT, based on W1 and W2
-        ucf.doc_id,
-        ucf.doc_title,
-        ucf.cf_name,
-        ucf.cfv_value
-    FROM unordered_documents_with_cf ucf
-    LEFT OUTER JOIN ordered_documents_by_cf ocf ON ocf.doc_id = ucf.doc_id
-    ORDER BY ocf.cf_typed_value
+    Only values of custom fields which are used for ordering and filtering
+    are read, and `nodes` table is not joined at all, thus this is the
+    cheapest query to pick one page of documents (or to count them).
     """
-    subq_1 = aliased(
-        select_document_type_cfs(document_type_id, user_id).cte("dt_custom_fields"),
-    )
-    subq_2 = aliased(
-        select(orm.Document).cte("all_documents"),
-    )
-    cfv = aliased(
-        orm.CustomFieldValue,
-        name="cfv"
+    docs = orm.Document.__table__
+    cfv = aliased(orm.CustomFieldValue, name="cfv")
+    names = {name for name, _, _ in filters}
+    if order_by is not None:
+        names.add(order_by)
+    key_cfs = [cf for cf in custom_fields if cf.name in names]
+    columns = {cf.name: cf_value_column(cfv, cf.id, cf.type) for cf in key_cfs}
+
+    stmt = select(docs.c.node_id.label("doc_id")).where(
+        docs.c.document_type_id == document_type_id
     )
+    if len(key_cfs) > 0:
+        stmt = stmt.outerjoin(
+            cfv,
+            (cfv.document_id == docs.c.node_id)
+            & cfv.field_id.in_([cf.id for cf in key_cfs]),
+        ).group_by(docs.c.node_id)
 
-    subq_3_stmt = select(
-        subq_2.c.title.label('title'),
-        subq_2.c.id.label('doc_id'),
-        subq_2.c.document_type_id.label('document_type_id'),
-        subq_1.c.id.label('cf_id'),
-        subq_1.c.name.label('cf_name'),
-        subq_1.c.type.label('cf_type'),
-        case(
-            (subq_1.c.type == 'monetary',
-             func.cast(cfv.value_monetary, VARCHAR)),
-            (subq_1.c.type == 'text', func.cast(cfv.value_text, VARCHAR)),
-            (subq_1.c.type == 'date',
-             func.substr(func.cast(cfv.value_date, VARCHAR), 0, DATE_LEN)),
-            (subq_1.c.type == 'boolean', func.cast(cfv.value_boolean, VARCHAR)),
-            (subq_1.c.type == 'float', func.cast(cfv.value_float, VARCHAR)),
-            (subq_1.c.type == 'int', func.cast(cfv.value_int, VARCHAR)),
-            (subq_1.c.type == 'yearmonth',
-             func.cast(cfv.value_yearmonth, VARCHAR)),
-        ).label("cf_value")
+    for name, op, value in filters:
+        stmt = stmt.having(_cf_filter(columns[name], op, value))
 
-    ).select_from(subq_1).join(
-        subq_2, subq_2.c.document_type_id == document_type_id
-    ).join(
-        cfv,
-        (cfv.field_id == subq_1.c.id) & (cfv.document_id == subq_2.c.id),
-        isouter=True
-    ).order_by(subq_2.c.id)
-
-    subq_unordered_docs = aliased(subq_3_stmt.cte("unordered_docs"))
-
-    entities = [
-        cfv.document_id.label('doc_id'),
-    ]
-
-    match cfv_column_name:
-        case CFVValueColumn.TEXT:
-            entities.append(cfv.value_text.label('cf_typed_value'))
-        case CFVValueColumn.DATE:
-            entities.append(cfv.value_date.label('cf_typed_value'))
-        case CFVValueColumn.BOOLEAN:
-            entities.append(cfv.value_boolean.label('cf_typed_value'))
-        case CFVValueColumn.INT:
-            entities.append(cfv.value_int.label('cf_typed_value'))
-        case CFVValueColumn.MONETARY:
-            entities.append(cfv.value_monetary.label('cf_typed_value'))
-        case CFVValueColumn.YEARMONTH:
-            entities.append(cfv.value_yearmonth.label('cf_typed_value'))
-        case CFVValueColumn.FLOAT:
-            entities.append(cfv.value_float.label('cf_typed_value'))
-        case _:
-            raise ValueError(f"Invalid value for cfv_column_name: {cfv_column_name}")
-
-    subq_4 = select(*entities).select_from(subq_1).join(
-        subq_2, subq_2.c.document_type_id == document_type_id
-    ).join(
-        cfv,
-        (cfv.field_id == subq_1.c.id) & (cfv.document_id == subq_2.c.id),
-        isouter=True
-    ).where(
-        subq_1.c.name==order_by
-    )
-
-    subq_ordered_docs = aliased(subq_4.cte("ordered_docs"))
+    if order_by is None:
+        return stmt.order_by(docs.c.node_id)
 
+    sort_key = columns[order_by]
+    stmt = stmt.add_columns(sort_key.label("sort_key"))
     if order == OrderEnum.asc:
-        order_entity = subq_ordered_docs.c.cf_typed_value.asc()
-    else:
-        order_entity = subq_ordered_docs.c.cf_typed_value.desc()
-
-    stmt = select(
-        subq_unordered_docs.c.title,
-        subq_unordered_docs.c.doc_id,
-        subq_unordered_docs.c.document_type_id,
-        subq_unordered_docs.c.cf_id,
-        subq_unordered_docs.c.cf_name,
-        subq_unordered_docs.c.cf_type,
-        subq_unordered_docs.c.cf_value,
-        subq_ordered_docs.c.cf_typed_value
-    ).select_from(subq_unordered_docs).join(
-        subq_ordered_docs,
-        subq_ordered_docs.c.doc_id == subq_unordered_docs.c.doc_id,
-        isouter=True
-    ).order_by(
-        order_entity,
-        subq_unordered_docs.c.doc_id.desc(),
-        subq_unordered_docs.c.cf_name.asc()
-    )
+        return stmt.order_by(sort_key.asc().nulls_last(), docs.c.node_id.asc())
 
-    return stmt
+    return stmt.order_by(sort_key.desc().nulls_last(), docs.c.node_id.desc())
 
 
 def select_docs_by_type(
     document_type_id: uuid.UUID,
-    user_id: uuid.UUID,
-    limit: int,
-    offset: int,
+    custom_fields: Sequence[Row],
     order_by: str | None = None,
-    cfv_column_name: CFVValueColumn | None = None,
     order: OrderEnum = OrderEnum.desc,
+    filters: Sequence[tuple[str, CFFilterOp, Any]] = (),
+    limit: int | None = None,
+    offset: int = 0,
 ) -> Select:
-
-    if order_by is None:
-        stmt = select_docs_by_type_without_ordering(document_type_id, user_id)
-    else:
-        stmt = select_docs_by_type_with_ordering(
+    """
+    Documents of given type, one row per document, with one (typed) column
+    per custom field
+
+    `custom_fields` are (id, name, type) rows of document type's custom
+    fields, e.g. as returned by `select_document_type_cfs`; their values are
+    in columns `cf_0`, `cf_1`, ... in the same order. `filters` are
+    (custom field name, operator, typed value) tuples. Rows are ordered
+    by `order_by` custom field (and then by document ID), or, without
+    `order_by`, just by document ID.
+
+    The page is picked first, by `select_docs_by_type_ids`, and only
+    custom field values of the documents on the page are then pivoted.
+    Generated SQL is approximately:
+
+        WITH page AS (
+            <select_docs_by_type_ids> LIMIT <limit> OFFSET <offset>
+        )
+        SELECT
+            page.doc_id,
+            nodes.title,
+            documents.document_type_id,
+            max(cfv.value_date) FILTER (WHERE cfv.field_id = <cf id 1>) AS cf_0,
+            max(cfv.value_text) FILTER (WHERE cfv.field_id = <cf id 2>) AS cf_1,
+            ...
+        FROM page
+        JOIN nodes ON nodes.id = page.doc_id
+        JOIN documents ON documents.node_id = page.doc_id
+        LEFT JOIN custom_field_values cfv
+            ON cfv.document_id = page.doc_id
+            AND cfv.field_id IN (<cf id 1>, <cf id 2>, ...)
+        GROUP BY page.doc_id, page.sort_key, nodes.title, documents.document_type_id
+        ORDER BY page.sort_key DESC NULLS LAST, page.doc_id DESC
+    """
+    page = (
+        select_docs_by_type_ids(
             document_type_id,
-            user_id,
-            order=order,
+            custom_fields,
             order_by=order_by,
-            cfv_column_name=cfv_column_name
+            order=order,
+            filters=filters,
         )
+        .limit(limit)
+        .offset(offset)
+        .cte("page")
+    )
+    cfv = aliased(orm.CustomFieldValue, name="cfv")
+    doc = orm.Document
 
-    stmt = stmt.limit(limit).offset(offset)
+    stmt = (
+        select(
+            page.c.doc_id,
+            doc.title.label("title"),
+            doc.document_type_id.label("document_type_id"),
+            *[
+                cf_value_column(cfv, cf.id, cf.type).label(f"cf_{i}")
+                for i, cf in enumerate(custom_fields)
+            ],
+        )
+        .select_from(page)
+        .join(doc, doc.id == page.c.doc_id)
+    )
 
-    return stmt
+    group_by = [page.c.doc_id, doc.title, doc.document_type_id]
+    if order_by is None:
+        order_by_clauses = [page.c.doc_id]
+    else:
+        group_by.append(page.c.sort_key)
+        if order == OrderEnum.asc:
+            order_by_clauses = [page.c.sort_key.asc().nulls_last(), page.c.doc_id.asc()]
+        else:
+            order_by_clauses = [
+                page.c.sort_key.desc().nulls_last(),
+                page.c.doc_id.desc(),
+            ]
+
+    if len(custom_fields) > 0:
+        stmt = stmt.outerjoin(
+            cfv,
+            (cfv.document_id == page.c.doc_id)
+            & cfv.field_id.in_([cf.id for cf in custom_fields]),
+        ).group_by(*group_by)
+
+    return stmt.order_by(*order_by_clauses)
+
+
+def _cf_filter(column, op: CFFilterOp, value) -> ColumnElement[bool]:
+    match op:
+        case CFFilterOp.eq:
+            return column == value
+        case CFFilterOp.ne:
+            return column != value
+        case CFFilterOp.lt:
+            return column < value
+        case CFFilterOp.le:
+            return column <= value
+        case CFFilterOp.gt:
+            return column > value
+        case CFFilterOp.ge:
+            return column >= value
+        case CFFilterOp.contains:
+            return column.icontains(value, autoescape=True)
+
+    raise ValueError(f"Unexpected filter operator {op}")
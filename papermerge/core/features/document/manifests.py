@@ -0,0 +1,201 @@
+"""
+Page manifests: document versions without their own PDF (yet)
+
+With `papermerge__main__page_manifests` (and files served locally), page
+operations within a document (reorder, rotate, delete pages - see
+`page_mngm.apply_pages_op`) do not rewrite the PDF. The new version stores a manifest instead: for
+each of its pages, the [version ID, page number, rotation] of the source
+page. Creating the version costs O(pages) of metadata and no PDF I/O,
+regardless of size of the PDF.
+
+Manifest entries reference only versions with a file (`manifest` NULL):
+manifest of a version created from a manifest version is composed with
+the manifest of the latter. Versions of a document are deleted only
+together with the document, thus sources outlive the manifest.
+
+PDF is materialized (written and ingested, see `blobs.ingest`), and
+`manifest` set to NULL, by `materialize`:
+
+    * in background, right after the page operation (if
+      `papermerge__main__page_manifests_eager`), see `schedule`
+    * on first use of the file (download, previews, OCR, operations which
+      read the file)
+
+Concurrent materializations of the same version are serialized by the
+lock of the version row; the first one writes the file, the others find
+`manifest` already NULL.
+"""
+import asyncio
+import logging
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from pikepdf import Pdf
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import executor
+from papermerge.core.config import FileServer, get_settings
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.document import blobs
+from papermerge.core.features.document.db.orm import DocumentVersion
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+# [source version ID, page number (starting with 1), rotation (degrees)]
+Entry = list
+# (page number in version, relative rotation)
+PageOp = tuple[int, int]
+
+# document version ID -> materialization task
+_in_flight: dict[uuid.UUID, asyncio.Task] = {}
+
+
+def is_enabled() -> bool:
+    # files served from S3 are uploaded right after the page operation,
+    # which a version without PDF has nothing to upload of
+    return (
+        config.papermerge__main__page_manifests
+        and config.papermerge__main__file_server == FileServer.LOCAL
+    )
+
+
+def compose(version: DocumentVersion, ops: list[PageOp]) -> list[Entry]:
+    """Manifest of pages `ops` of the `version` (file or manifest based)"""
+    entries = []
+    for number, angle in ops:
+        if version.manifest is None:
+            source_id, source_number, rotation = str(version.id), number, 0
+        else:
+            source_id, source_number, rotation = version.manifest[number - 1]
+        entries.append([source_id, source_number, (rotation + angle) % 360])
+
+    return entries
+
+
+def build_pdf(pages: list[tuple[Path, int, int]], dst: Path):
+    """Writes PDF of `pages` i.e. (source file, page number, rotation)"""
+    sources: dict[Path, Pdf] = {}
+    dst_pdf = Pdf.new()
+    try:
+        for path, number, rotation in pages:
+            if path not in sources:
+                sources[path] = Pdf.open(path)
+            page = sources[path].pages.p(number)
+            if rotation:
+                page.rotate(rotation, relative=True)
+            dst_pdf.pages.append(page)
+
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst_pdf.save(dst)
+    finally:
+        for pdf in sources.values():
+            pdf.close()
+
+
+async def materialize(
+    db_session: AsyncSession, doc_ver_id: uuid.UUID
+) -> DocumentVersion:
+    """Writes PDF file of the version, if it is a manifest; commits
+
+    Returns the version (with its file).
+    """
+    task = _in_flight.get(doc_ver_id)
+    if task is not None and task is not asyncio.current_task():
+        # materialized in background right now (in this process)
+        await asyncio.wait([task])
+
+    is_manifest = await db_session.scalar(
+        select(DocumentVersion.manifest.is_not(None)).where(
+            DocumentVersion.id == doc_ver_id
+        )
+    )
+    if not is_manifest:
+        # common case: version has its file; nothing is locked nor reloaded
+        return await db_session.get(DocumentVersion, doc_ver_id)
+
+    stmt = (
+        select(DocumentVersion)
+        .where(DocumentVersion.id == doc_ver_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    version = (await db_session.scalars(stmt)).one()
+    if version.manifest is None:
+        # materialized meanwhile (by another process); releases the lock
+        await db_session.commit()
+        return version
+
+    source_ids = {uuid.UUID(entry[0]) for entry in version.manifest}
+    sources = (
+        await db_session.scalars(
+            select(DocumentVersion).where(DocumentVersion.id.in_(source_ids))
+        )
+    ).all()
+    paths = {str(source.id): source.file_path for source in sources}
+    pages = [(paths[v], number, rotation) for v, number, rotation in version.manifest]
+
+    media_root = Path(config.papermerge__main__media_root)
+    media_root.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=media_root) as tmpdirname:
+        tmp_path = Path(tmpdirname) / version.file_name
+        await executor.run_in_pool(build_pdf, pages, tmp_path)
+        await blobs.ingest(db_session, version, tmp_path)
+
+    version.manifest = None
+    await db_session.commit()
+    logger.debug(f"Materialized {len(pages)} pages of document version {version.id}")
+
+    return version
+
+
+async def materialize_many(db_session: AsyncSession, doc_ver_ids: list[uuid.UUID]):
+    """Materializes those of the versions which are manifests"""
+    stmt = select(DocumentVersion.id).where(
+        DocumentVersion.id.in_(doc_ver_ids), DocumentVersion.manifest.is_not(None)
+    )
+    for doc_ver_id in (await db_session.scalars(stmt)).all():
+        await materialize(db_session, doc_ver_id)
+
+
+def schedule(
+    doc_ver_id: uuid.UUID,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> asyncio.Task | None:
+    """Materializes the version in background (if eager materialization is on)"""
+    if not config.papermerge__main__page_manifests_eager:
+        return None
+
+    task = _in_flight.get(doc_ver_id)
+    if task is not None:
+        return task
+
+    task = asyncio.create_task(
+        _materialize(doc_ver_id, session_factory), name=f"manifest-{doc_ver_id}"
+    )
+    _in_flight[doc_ver_id] = task
+    task.add_done_callback(lambda _: _in_flight.pop(doc_ver_id, None))
+
+    return task
+
+
+async def shutdown():
+    """Cancels materializations still in flight (done later on first use)"""
+    tasks = list(_in_flight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _materialize(
+    doc_ver_id: uuid.UUID, session_factory: Callable[[], AsyncSession]
+):
+    try:
+        async with session_factory() as db_session:
+            await materialize(db_session, doc_ver_id)
+    except Exception as e:
+        # will be retried on first use of the file
+        logger.warning(f"Materialization of {doc_ver_id} failed: {e!r}")
@@ -0,0 +1,177 @@
+"""
+Background generation of page previews (local file server)
+
+All `ImagePreviewSize` variants of all pages of a document version are
+rendered once, right after upload, in the shared process pool; HTTP handlers
+only serve already rendered files and never wait for the rendering.
+
+`preview_status` of the document is `pending` while rendering is in
+progress and `ready` / `failed` afterwards (`preview_error` holds the
+reason of the failure).
+
+Concurrent requests for the same document version are coalesced: while
+the version is being rendered, `schedule` returns the task already in
+flight. Renderers running in different processes (e.g. uvicorn workers)
+are coalesced per page by a file lock, see `image.gen_page_previews`.
+
+With S3 file server, previews are generated (and uploaded) by s3 worker.
+"""
+import asyncio
+import logging
+from pathlib import Path
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from papermerge.core import executor, orm
+from papermerge.core.config import FileServer, get_settings
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.document import manifests
+from papermerge.core.pathlib import abs_thumbnail_path
+from papermerge.core.types import ImagePreviewStatus
+from papermerge.core.utils import image
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+# document version ID -> rendering task
+_in_flight: dict[UUID, asyncio.Task] = {}
+
+
+def is_enabled() -> bool:
+    return config.papermerge__main__file_server == FileServer.LOCAL.value
+
+
+def schedule(
+    doc_id: UUID,
+    doc_ver_id: UUID,
+    file_path: Path | None,
+    pages: list[tuple[UUID, int]],
+) -> asyncio.Task | None:
+    """Schedules rendering of previews of `pages` i.e. (page_id, page_number)
+
+    `file_path` is None for page manifests: PDF is materialized first.
+    Returns immediately; returns None if there is nothing to render.
+    """
+    if not is_enabled() or len(pages) == 0:
+        return None
+
+    task = _in_flight.get(doc_ver_id)
+    if task is not None:
+        return task
+
+    task = asyncio.create_task(
+        _generate(doc_id, doc_ver_id, file_path=file_path, pages=pages),
+        name=f"previews-{doc_ver_id}",
+    )
+    _in_flight[doc_ver_id] = task
+    task.add_done_callback(lambda _: _in_flight.pop(doc_ver_id, None))
+
+    return task
+
+
+def schedule_doc_ver(doc_ver: orm.DocumentVersion) -> asyncio.Task | None:
+    """Schedules previews of document version (with loaded `pages`)"""
+    return schedule(
+        doc_ver.document_id,
+        doc_ver.id,
+        file_path=doc_ver.file_path if doc_ver.manifest is None else None,
+        pages=[(page.id, page.number) for page in doc_ver.pages],
+    )
+
+
+async def schedule_docs(
+    db_session: AsyncSession, doc_ids: list[UUID]
+) -> list[asyncio.Task]:
+    """Schedules previews of the last version of each of `doc_ids` documents"""
+    if not is_enabled() or len(doc_ids) == 0:
+        return []
+
+    last_versions = (
+        select(
+            orm.DocumentVersion.document_id,
+            func.max(orm.DocumentVersion.number).label("number"),
+        )
+        .where(orm.DocumentVersion.document_id.in_(doc_ids))
+        .group_by(orm.DocumentVersion.document_id)
+        .subquery()
+    )
+    stmt = (
+        select(orm.DocumentVersion)
+        .options(selectinload(orm.DocumentVersion.pages))
+        .join(
+            last_versions,
+            (orm.DocumentVersion.document_id == last_versions.c.document_id)
+            & (orm.DocumentVersion.number == last_versions.c.number),
+        )
+    )
+    doc_vers = (await db_session.scalars(stmt)).all()
+    tasks = [schedule_doc_ver(doc_ver) for doc_ver in doc_vers]
+
+    return [task for task in tasks if task is not None]
+
+
+async def shutdown():
+    """Cancels rendering tasks still in flight"""
+    tasks = list(_in_flight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _set_status(
+    doc_id: UUID, status: ImagePreviewStatus, error: str | None = None
+):
+    stmt = (
+        update(orm.Document)
+        .where(orm.Document.id == doc_id)
+        .values(preview_status=status, preview_error=error)
+    )
+    try:
+        async with AsyncSessionLocal() as db_session:
+            await db_session.execute(stmt)
+            await db_session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to set preview status of {doc_id}: {e!r}")
+
+
+async def _generate(
+    doc_id: UUID,
+    doc_ver_id: UUID,
+    file_path: Path | None,
+    pages: list[tuple[UUID, int]],
+) -> ImagePreviewStatus:
+    # paths are resolved here, in the process which owns configuration
+    # (pool's worker processes are spawned with default settings)
+    first_page_id = min(pages, key=lambda item: item[1])[0]
+    jobs = [
+        (page_number, image.page_preview_paths(page_id))
+        for page_id, page_number in pages
+    ]
+    await _set_status(doc_id, ImagePreviewStatus.pending)
+    try:
+        if file_path is None:
+            async with AsyncSessionLocal() as db_session:
+                doc_ver = await manifests.materialize(db_session, doc_ver_id)
+                file_path = doc_ver.file_path
+        rendered = await executor.run_in_pool(
+            image.gen_doc_ver_previews,
+            file_path,
+            pages=jobs,
+            thumbnail_path=abs_thumbnail_path(first_page_id),
+        )
+    except Exception as e:
+        logger.warning(f"Previews of document version {doc_ver_id} failed: {e!r}")
+        await _set_status(doc_id, ImagePreviewStatus.failed, str(e))
+        return ImagePreviewStatus.failed
+
+    if rendered < len(pages):
+        # remaining pages are being rendered by another process,
+        # which will set the final status
+        return ImagePreviewStatus.pending
+
+    await _set_status(doc_id, ImagePreviewStatus.ready)
+
+    return ImagePreviewStatus.ready
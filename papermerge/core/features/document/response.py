@@ -1,43 +1,70 @@
+import os
 from pathlib import Path
 import mimetypes
 from urllib.parse import quote
+from uuid import UUID
 
+from fastapi import Request, Response
 from fastapi.responses import FileResponse
 
+from papermerge.core.config import get_settings
+from papermerge.core.utils import http
+
+config = get_settings()
+
+# document version file never changes once written
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def content_type_of(path) -> str:
+    content_type, _ = mimetypes.guess_type(path)
+    if not content_type:
+        extension = Path(path).suffix.lower()
+        content_type_map = {
+            '.pdf': 'application/pdf',
+            '.png': 'image/png',
+            '.jpg': 'image/jpeg',
+            '.jpeg': 'image/jpeg',
+            '.tiff': 'image/tiff',
+            '.tif': 'image/tiff',
+        }
+        content_type = content_type_map.get(extension, 'application/octet-stream')
+
+    return content_type
+
+
+def content_disposition(filename: str, content_disposition_type: str = "attachment") -> str:
+    # Set Content-Disposition header with proper filename encoding
+    # This handles filenames with special characters or unicode
+    filename_ascii = filename.encode('ascii', 'ignore').decode('ascii')
+    filename_utf8 = quote(filename)
+
+    disposition = f'{content_disposition_type}; filename="{filename_ascii}"'
+    if filename != filename_ascii:
+        disposition += f"; filename*=UTF-8''{filename_utf8}"
+
+    return disposition
+
 
 class DocumentFileResponse(FileResponse):
-    def __init__(self, path, filename: str = None, content_disposition_type: str = "attachment", **kwargs):
-        # Auto-detect content type
-        content_type, _ = mimetypes.guess_type(path)
-        if not content_type:
-            extension = Path(path).suffix.lower()
-            content_type_map = {
-                '.pdf': 'application/pdf',
-                '.png': 'image/png',
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.tiff': 'image/tiff',
-                '.tif': 'image/tiff',
-            }
-            content_type = content_type_map.get(extension, 'application/octet-stream')
+    # Bigger chunks mean fewer reads and sends per file. Chunks are used only
+    # if the server does not support the zero-copy `http.response.pathsend`
+    # ASGI extension, or if byte ranges were requested
+    chunk_size = 1024 * 1024
 
+    def __init__(self, path, filename: str = None, content_disposition_type: str = "attachment", **kwargs):
         # If no filename provided, use the file's name
         if filename is None:
             filename = Path(path).name
 
-        # Prepare headers
-        headers = kwargs.get('headers', {})
-
-        # Set Content-Disposition header with proper filename encoding
-        # This handles filenames with special characters or unicode
-        filename_ascii = filename.encode('ascii', 'ignore').decode('ascii')
-        filename_utf8 = quote(filename)
+        # Auto-detect content type (blob store files have no extension)
+        content_type = content_type_of(filename)
 
-        disposition = f'{content_disposition_type}; filename="{filename_ascii}"'
-        if filename != filename_ascii:
-            disposition += f"; filename*=UTF-8''{filename_utf8}"
-
-        headers['Content-Disposition'] = disposition
+        # Prepare headers
+        headers = kwargs.get('headers') or {}
+        headers['Content-Disposition'] = content_disposition(
+            filename, content_disposition_type
+        )
         kwargs['headers'] = headers
 
         super().__init__(
@@ -45,3 +72,60 @@ class DocumentFileResponse(FileResponse):
             media_type=content_type,
             **kwargs
         )
+
+
+def doc_ver_etag(doc_ver_id: UUID, size: int) -> str:
+    """ETag of document version file
+
+    Version file is immutable, thus its ID (and size, which distinguishes
+    an empty placeholder version from the uploaded one) identifies content.
+    """
+    return f'"{doc_ver_id}-{size}"'
+
+
+def document_file_response(
+    request: Request,
+    path: Path,
+    etag: str,
+    filename: str | None = None,
+    content_disposition_type: str = "attachment",
+) -> Response:
+    """Response serving immutable document (version) file
+
+    * conditional requests (`If-None-Match` / `If-Modified-Since`) are
+      answered with 304
+    * single and multiple byte ranges (RFC 7233), including `If-Range`,
+      are served by `FileResponse` as 206 responses
+    * if `papermerge__main__download_accel_redirect` is set, the file is
+      sent by the reverse proxy (`X-Accel-Redirect`), otherwise via zero-copy
+      `pathsend` extension when the ASGI server supports it
+    """
+    stat_result = os.stat(path)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http.http_date(stat_result.st_mtime),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+    }
+    if http.is_not_modified(
+        request.headers, etag=etag, last_modified=stat_result.st_mtime
+    ):
+        return Response(status_code=304, headers=headers)
+
+    accel_prefix = config.papermerge__main__download_accel_redirect
+    if accel_prefix:
+        rel_path = Path(path).relative_to(config.papermerge__main__media_root)
+        headers["X-Accel-Redirect"] = (
+            f"{accel_prefix.rstrip('/')}/{quote(rel_path.as_posix())}"
+        )
+        headers["Content-Disposition"] = content_disposition(
+            filename or Path(path).name, content_disposition_type
+        )
+        return Response(media_type=content_type_of(filename or path), headers=headers)
+
+    return DocumentFileResponse(
+        path,
+        filename=filename,
+        content_disposition_type=content_disposition_type,
+        headers=headers,
+        stat_result=stat_result,
+    )
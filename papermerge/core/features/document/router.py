@@ -1,8 +1,6 @@
-import io
 import logging
 import uuid
 from typing import Annotated
-from datetime import datetime
 
 
 from fastapi import (
@@ -21,7 +19,9 @@ from papermerge.core import exceptions as exc
 from papermerge.core import constants as const
 from papermerge.core import utils, dbapi, schema
 from papermerge.core.features.auth import get_current_user, scopes
+from papermerge.core.features.document import previews
 from papermerge.core.features.document.schema import (
+    CFVFilters,
     DocumentTypeArg,
     PageNumber,
     PageSize,
@@ -33,8 +33,7 @@ from papermerge.core.types import OrderEnum, PaginatedResponse
 from papermerge.core.db import common as dbapi_common
 from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
 from papermerge.core.db.engine import get_db
-from papermerge.core.features.useractivity.db.orm import UserActivityStats
-from papermerge.core.features.useractivity.db.activity import Activity  # Import the Activity model
+from papermerge.core.features.useractivity import writer as activity_writer
 
 router = APIRouter(
     prefix="/documents",
@@ -81,6 +80,13 @@ async def update_document_custom_field_values(
     ):
         raise exc.HTTP403Forbidden()
 
+    # queued task is committed along with the update
+    send_task(
+        db_session,
+        const.PATH_TMPL_MOVE_DOCUMENT,
+        kwargs={"document_id": str(document_id)},
+        route_name="path_tmpl",
+    )
     try:
         updated_entries = await dbapi.update_doc_cfv(
             db_session,
@@ -90,12 +96,6 @@ async def update_document_custom_field_values(
     except NoResultFound:
         raise exc.HTTP404NotFound()
 
-    send_task(
-        const.PATH_TMPL_MOVE_DOCUMENT,
-        kwargs={"document_id": str(document_id)},
-        route_name="path_tmpl",
-    )
-
     return updated_entries
 
 
@@ -164,8 +164,6 @@ async def upload_file(
     Document model must be created beforehand via `POST /nodes` endpoint
     provided with `ctype` = `document`.
     """
-    content = file.file.read()
-
     # Check if the user has permission to upload
     if not await dbapi_common.has_node_perm(
         db_session,
@@ -175,12 +173,13 @@ async def upload_file(
     ):
         raise exc.HTTP403Forbidden()
 
-    # Perform the upload
+    # Perform the upload; `file.file` is the spooled temporary file of the
+    # multipart body and is streamed to media root in fixed size chunks
     doc, error = await dbapi.upload(
         db_session,
         document_id=document_id,
         size=file.size,
-        content=io.BytesIO(content),
+        content=file.file,
         file_name=file.filename,
         content_type=file.headers.get("content-type"),
     )
@@ -188,26 +187,12 @@ async def upload_file(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
-    # Log the upload activity in UserActivityStats
-    user_activity_log = UserActivityStats(
-        user_id=user.id,
-        node_id=document_id,
-        action_type="document_upload",
-        timestamp=datetime.utcnow(),
+    await activity_writer.log_stats(
+        user.id, "document_upload", node_id=document_id
     )
-    db_session.add(user_activity_log)
-
-    # Log the upload activity in Activity (ignoring metadata)
-    activity_log = Activity(
-        user_id=user.id,
-        node_id=document_id,
-        action="document_upload",
-        created_at=datetime.utcnow(),
+    await activity_writer.log_activity(
+        user.id, "document_upload", node_id=document_id
     )
-    db_session.add(activity_log)
-
-    # Commit both logs
-    await db_session.commit()
 
     return doc
 
@@ -357,6 +342,13 @@ async def update_document_type(
         ):
             raise exc.HTTP403Forbidden()
 
+        # queued task is committed along with the update
+        send_task(
+            db_session,
+            const.PATH_TMPL_MOVE_DOCUMENT,
+            kwargs={"document_id": str(document_id)},
+            route_name="path_tmpl",
+        )
         await dbapi.update_doc_type(
             db_session,
             document_id=document_id,
@@ -365,12 +357,6 @@ async def update_document_type(
     except NoResultFound:
         raise exc.HTTP404NotFound()
 
-    send_task(
-        const.PATH_TMPL_MOVE_DOCUMENT,
-        kwargs={"document_id": str(document_id)},
-        route_name="path_tmpl",
-    )
-
 
 @router.get("/type/{document_type_id}")
 @utils.docstring_parameter(scope=scopes.NODE_VIEW)
@@ -381,6 +367,7 @@ async def get_documents_by_type(
     page_number: PageNumber = 1,
     order_by: OrderBy = None,
     order: OrderEnum = OrderEnum.desc,
+    cf_filter: CFVFilters = None,
     db_session: AsyncSession = Depends(get_db),
 ) -> PaginatedResponse[schema.DocumentCFV]:
     """
@@ -388,16 +375,23 @@ async def get_documents_by_type(
 
     Required scope: `{scope}`
     """
-    items = await dbapi.get_docs_by_type(
-        db_session,
-        type_id=document_type_id,
-        user_id=user.id,
-        order_by=order_by,
-        order=order,
-        page_number=page_number,
-        page_size=page_size,
-    )
-    total_count = await dbapi.get_docs_count_by_type(db_session, type_id=document_type_id)
+    try:
+        filters = [schema.DocumentCFVFilter.parse(item) for item in cf_filter or []]
+        items = await dbapi.get_docs_by_type(
+            db_session,
+            type_id=document_type_id,
+            user_id=user.id,
+            order_by=order_by,
+            order=order,
+            page_number=page_number,
+            page_size=page_size,
+            filters=filters,
+        )
+        total_count = await dbapi.get_docs_count_by_type(
+            db_session, type_id=document_type_id, filters=filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return PaginatedResponse(
         page_size=page_size,
@@ -427,21 +421,21 @@ async def get_document_doc_thumbnail_status(
 
     Receives as input a list of document IDs (i.e. node IDs).
 
-    In case of CDN setup, for each document with NULL value in `preview_status`
-    field - one `S3worker` task will be scheduled for generating respective
-    document thumbnail.
+    For each document with NULL value in `preview_status` field generation
+    of respective document thumbnail is scheduled: in case of CDN setup
+    one `S3worker` task per document, otherwise background rendering of
+    document's previews.
 
     Required scope: `{scope}`
     """
 
-    for doc_id in doc_ids:
-        if not await dbapi_common.has_node_perm(
-            db_session,
-            node_id=doc_id,
-            codename=scopes.NODE_VIEW,
-            user_id=user.id,
-        ):
-            raise exc.HTTP403Forbidden()
+    if not await dbapi_common.has_nodes_perm(
+        db_session,
+        node_ids=doc_ids,
+        codename=scopes.NODE_VIEW,
+        user_id=user.id,
+    ):
+        raise exc.HTTP403Forbidden()
 
     response, doc_ids_not_yet_considered = await dbapi.get_docs_thumbnail_img_status(
         db_session, doc_ids=doc_ids
@@ -452,9 +446,13 @@ async def get_document_doc_thumbnail_status(
         if len(doc_ids_not_yet_considered) > 0:
             for doc_id in doc_ids_not_yet_considered:
                 send_task(
+                    db_session,
                     const.S3_WORKER_GENERATE_DOC_THUMBNAIL,
                     kwargs={"doc_id": str(doc_id)},
                     route_name="s3preview",
                 )
+            await db_session.commit()
+    elif len(doc_ids_not_yet_considered) > 0:
+        await previews.schedule_docs(db_session, doc_ids_not_yet_considered)
 
     return response
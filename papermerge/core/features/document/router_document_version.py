@@ -1,11 +1,10 @@
 import logging
 import uuid
-from datetime import datetime
 from typing import Annotated
 
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, HTTPException, Security, Depends, status
+from fastapi import APIRouter, HTTPException, Request, Security, Depends, status
 
 from papermerge.core import schema, utils, dbapi, orm
 from papermerge.core.features.auth import get_current_user
@@ -14,9 +13,14 @@ from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
 from papermerge.core.db import common as dbapi_common
 from papermerge.core import exceptions as exc
 from papermerge.core.db.engine import get_db
-from papermerge.core.features.document.response import DocumentFileResponse
-from papermerge.core.features.useractivity.db.orm import UserActivityStats
-from papermerge.core.features.useractivity.db.activity import Activity
+from papermerge.core.features.document.response import (
+    DocumentFileResponse,
+    doc_ver_etag,
+    document_file_response,
+)
+from papermerge.core.features.document import manifests
+from papermerge.core.features.useractivity import writer as activity_writer
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/document-versions", tags=["document-versions"])
@@ -38,6 +42,12 @@ router = APIRouter(prefix="/document-versions", tags=["document-versions"])
                 "image/tiff": {}
             }
         },
+        206: {
+            "description": "Requested byte range(s) of the file"
+        },
+        304: {
+            "description": "File did not change since the version client has"
+        },
         404: {
             "description": "Document version not found"
         }
@@ -46,6 +56,7 @@ router = APIRouter(prefix="/document-versions", tags=["document-versions"])
 @utils.docstring_parameter(scope=scopes.DOCUMENT_DOWNLOAD)
 async def download_document_version(
     document_version_id: uuid.UUID,
+    request: Request,
     user: Annotated[
         schema.User, Security(get_current_user, scopes=[scopes.DOCUMENT_DOWNLOAD])
     ],
@@ -53,6 +64,10 @@ async def download_document_version(
 ):
     """Downloads given document version
 
+    Supports byte range requests (`Range`, `If-Range`) and conditional
+    requests (`If-None-Match`, `If-Modified-Since`). Document version file
+    never changes, thus the response may be cached by the client forever.
+
     Required scope: `{scope}`
     """
     try:
@@ -77,28 +92,29 @@ async def download_document_version(
         error = schema.Error(messages=["Document version not found"])
         raise HTTPException(status_code=404, detail=error.model_dump())
 
+    if doc_ver.manifest is not None:
+        # PDF of the page manifest is written on first use
+        doc_ver = await manifests.materialize(db_session, doc_ver.id)
+
     if not doc_ver.file_path.exists():
         error = schema.Error(messages=["Document version file not found"])
         raise HTTPException(status_code=404, detail=error.model_dump())
 
-    # --- User activity logging for download ---
-    try:
-        new_activity = UserActivityStats(
-            user_id=user.id,
-            node_id=doc_id,  # <- use node ID
-            action_type="document_download",
-            timestamp=datetime.utcnow(),
-        )
-        db_session.add(new_activity)
-        # await db_session.commit()
-    except Exception as e:
-        logger.warning(f"Failed to log download activity for user {user.id}: {e}")
-
-    return DocumentFileResponse(
+    response = document_file_response(
+        request,
         doc_ver.file_path,
+        etag=doc_ver_etag(doc_ver.id, doc_ver.size),
         filename=doc_ver.file_name,
         content_disposition_type="attachment"
     )
+    # viewers fetch big files in many byte range requests and revalidate
+    # cached ones; only the download of the whole file is logged
+    if response.status_code == 304 or "range" in request.headers:
+        return response
+
+    await activity_writer.log_stats(user.id, "document_download", node_id=doc_id)
+
+    return response
 
 
 @router.get(
@@ -134,38 +150,19 @@ async def get_doc_ver_download_url(
         ):
             raise exc.HTTP403Forbidden()
 
+        # e.g. version created before switching to S3
+        await manifests.materialize(db_session, doc_ver_id)
         result = await dbapi.get_doc_version_download_url(
             db_session,
             doc_ver_id=doc_ver_id,
         )
 
-        # --- Log getting presigned download URL ---
-        try:
-            # Log using UserActivityStats
-            new_user_activity = UserActivityStats(
-                user_id=user.id,
-                node_id=doc_id,  # <- use node ID
-                action_type="document_download_url",
-                timestamp=datetime.utcnow(),
-            )
-            db_session.add(new_user_activity)
-
-            # Log using Activity
-            db_session.add(
-                Activity(
-                    user_id=user.id,
-                    node_id=doc_id,
-                    version_id=doc_ver_id,
-                    action="document_download_url",
-                    created_at=datetime.utcnow(),
-                )
-            )
-
-            # Commit the transaction
-            await db_session.commit()
-        except Exception as e:
-            await db_session.rollback()
-            logger.warning(f"Failed to log download-url activity for user {user.id}: {e}")
+        await activity_writer.log_stats(
+            user.id, "document_download_url", node_id=doc_id
+        )
+        await activity_writer.log_activity(
+            user.id, "document_download_url", node_id=doc_id, version_id=doc_ver_id
+        )
 
     except NoResultFound:
         raise exc.HTTP404NotFound()
@@ -11,18 +11,29 @@ settings = config.get_settings()
 VALID_FOR_SECONDS = 600
 
 
-def resource_sign_url(prefix, resource_path: Path):
-    from papermerge.core.cloudfront import sign_url
-
+def resource_url(prefix, resource_path: Path) -> str:
     encoded_path = quote(str(resource_path))
 
     if prefix:
-        url = f"https://{settings.papermerge__main__cf_domain}/{prefix}/{encoded_path}"
-    else:
-        url = f"https://{settings.papermerge__main__cf_domain}/{encoded_path}"
+        return f"https://{settings.papermerge__main__cf_domain}/{prefix}/{encoded_path}"
+
+    return f"https://{settings.papermerge__main__cf_domain}/{encoded_path}"
+
+
+def resource_sign_url(prefix, resource_path: Path):
+    from papermerge.core.cloudfront import sign_url
 
     return sign_url(
-        url,
+        resource_url(prefix, resource_path),
+        valid_for=VALID_FOR_SECONDS,
+    )
+
+
+def resource_sign_urls(prefix, resource_paths: list[Path]) -> list[str]:
+    from papermerge.core.cloudfront import sign_urls
+
+    return sign_urls(
+        [resource_url(prefix, path) for path in resource_paths],
         valid_for=VALID_FOR_SECONDS,
     )
 
@@ -34,6 +45,13 @@ def doc_thumbnail_signed_url(uid: UUID) -> str:
     return resource_sign_url(prefix, resource_path)
 
 
+def doc_thumbnail_signed_urls(uids: list[UUID]) -> dict[UUID, str]:
+    prefix = settings.papermerge__main__prefix
+    urls = resource_sign_urls(prefix, [plib.thumbnail_path(uid) for uid in uids])
+
+    return dict(zip(uids, urls))
+
+
 def page_image_jpg_signed_url(uid: UUID, size: ImagePreviewSize) -> str:
     resource_path = plib.page_preview_jpg_path(uid, size=size)
     prefix = settings.papermerge__main__prefix
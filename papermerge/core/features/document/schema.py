@@ -9,6 +9,7 @@ from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, \
 
 from papermerge.core.features.custom_fields.schema import CustomFieldType
 from papermerge.core.types import (
+    CFFilterOp,
     CFNameType,
     CFValueType,
     ImagePreviewStatus,
@@ -372,6 +373,17 @@ OrderBy = Annotated[
     ),
 ]
 
+CFVFilters = Annotated[
+    list[str] | None,
+    Query(
+        description="""
+    Filter by custom field value, written as `<name>:<op>:<value>`,
+    e.g. `Total:gt:100`; `op` is one of `eq`, `ne`, `lt`, `le`, `gt`, `ge`
+    and `contains` (text fields only). May be repeated; all filters must
+    match.
+    """
+    ),
+]
 PageSize = Annotated[int, Query(ge=1, lt=100, description="Number of items per page")]
 PageNumber = Annotated[
     int,
@@ -382,18 +394,30 @@ LimitedPageSize = Annotated[
 ]
 
 
-class DocumentCFVWithIndex(BaseModel):
-    dcfv: DocumentCFV
-    index: int
+class DocumentCFVFilter(BaseModel):
+    """Filter of documents by type on one of type's custom fields
 
+    In query string it is written as `<name>:<op>:<value>`,
+    e.g. `Total:gt:100` or `Shop:contains:rewe`
+    """
+    name: CFNameType
+    op: CFFilterOp = CFFilterOp.eq
+    value: str
 
-class DocumentCFVRow(BaseModel):
-    title: str
-    doc_id: UUID
-    document_type_id: UUID
-    cf_name: CFNameType
-    cf_type: CustomFieldType
-    cf_value: CFValueType
+    @classmethod
+    def parse(cls, value: str) -> "DocumentCFVFilter":
+        """Raises `ValueError` if `value` is not `<name>:<op>:<value>`"""
+        parts = value.split(":", 2)
+        if len(parts) != 3:
+            raise ValueError(f"Invalid filter {value!r}; expected <name>:<op>:<value>")
+
+        name, op, cf_value = parts
+        try:
+            op = CFFilterOp(op)
+        except ValueError:
+            raise ValueError(f"Invalid filter operator {op!r}")
+
+        return cls(name=name, op=op, value=cf_value)
 
 
 class DownloadURL(BaseModel):
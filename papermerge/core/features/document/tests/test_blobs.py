@@ -0,0 +1,139 @@
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.constants import ContentType
+from papermerge.core.features.document import blobs
+from papermerge.core.features.document.db import api as dbapi
+from papermerge.core.pathlib import abs_blob_path, abs_docver_path
+
+RESOURCES = Path(os.path.abspath(os.path.dirname(__file__))) / "resources"
+PDF_PATH = RESOURCES / "three-pages.pdf"
+
+
+@pytest.fixture(autouse=True)
+def blob_store(monkeypatch):
+    # opt-in
+    monkeypatch.setattr(blobs.config, "papermerge__main__blob_store", True)
+
+
+def later(hours: float = 2) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(hours=hours)
+
+
+async def upload_pdf(db_session: AsyncSession, doc) -> orm.DocumentVersion:
+    with open(PDF_PATH, "rb") as file:
+        await dbapi.upload(
+            db_session,
+            document_id=doc.id,
+            content=file,
+            file_name="three-pages.pdf",
+            size=os.stat(PDF_PATH).st_size,
+            content_type=ContentType.APPLICATION_PDF,
+        )
+
+    return await dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+
+
+async def test_same_content_is_stored_once(
+    make_document, user, db_session: AsyncSession
+):
+    doc1 = await make_document(title="doc1", user=user, parent=user.home_folder)
+    doc2 = await make_document(title="doc2", user=user, parent=user.home_folder)
+
+    ver1 = await upload_pdf(db_session, doc1)
+    ver2 = await upload_pdf(db_session, doc2)
+
+    assert ver1.sha256 == ver2.sha256 == blobs.file_sha256(PDF_PATH)
+    assert ver1.file_path == ver2.file_path == abs_blob_path(ver1.sha256)
+    assert ver1.file_path.read_bytes() == PDF_PATH.read_bytes()
+    assert not abs_docver_path(ver1.id, ver1.file_name).exists()
+    blob = await db_session.get(orm.Blob, ver1.sha256)
+    assert blob.size == os.stat(PDF_PATH).st_size
+
+
+async def test_gc_removes_unreferenced_blobs(
+    make_document, user, db_session: AsyncSession
+):
+    doc1 = await make_document(title="doc1", user=user, parent=user.home_folder)
+    doc2 = await make_document(title="doc2", user=user, parent=user.home_folder)
+    ver = await upload_pdf(db_session, doc1)
+    await upload_pdf(db_session, doc2)
+    path = ver.file_path
+
+    await db_session.execute(delete(orm.Node).where(orm.Node.id == doc1.id))
+    await db_session.commit()
+    # still referenced by the version of doc2
+    assert await blobs.gc(db_session, now=later()) == blobs.GCResult()
+
+    await db_session.execute(delete(orm.Node).where(orm.Node.id == doc2.id))
+    await db_session.commit()
+    # not yet out of grace period
+    assert (await blobs.gc(db_session)).blobs == 0
+    assert path.exists()
+
+    result = await blobs.gc(db_session, now=later())
+
+    assert result.blobs == 1
+    assert result.bytes == os.stat(PDF_PATH).st_size
+    assert not path.exists()
+    assert (await db_session.scalars(select(orm.Blob))).all() == []
+
+
+async def test_gc_removes_orphan_files(db_session: AsyncSession):
+    orphan = abs_blob_path("ab" * 32)
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"left behind by rolled back transaction")
+
+    assert (await blobs.gc(db_session, orphans=True)).orphans == 0
+    result = await blobs.gc(db_session, orphans=True, now=later())
+
+    assert result.orphans == 1
+    assert not orphan.exists()
+
+
+async def test_dedup_moves_per_version_files(
+    make_document, user, db_session: AsyncSession
+):
+    versions = []
+    for title in ("doc1", "doc2"):
+        doc = await make_document(title=title, user=user, parent=user.home_folder)
+        ver = await dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+        ver.file_name = "three-pages.pdf"
+        path = abs_docver_path(ver.id, ver.file_name)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(PDF_PATH.read_bytes())
+        versions.append(ver)
+    await db_session.commit()
+
+    result = await blobs.dedup(db_session, min_age=timedelta(0))
+
+    assert result.versions == 2
+    assert result.duplicates == 1
+    assert result.saved_bytes == os.stat(PDF_PATH).st_size
+    for ver in versions:
+        await db_session.refresh(ver)
+        assert ver.sha256 == blobs.file_sha256(PDF_PATH)
+        assert ver.file_path.read_bytes() == PDF_PATH.read_bytes()
+        assert not abs_docver_path(ver.id, ver.file_name).exists()
+    # nothing left to do
+    assert (await blobs.dedup(db_session, min_age=timedelta(0))).versions == 0
+
+
+async def test_upload_without_blob_store(
+    make_document, user, db_session: AsyncSession, monkeypatch
+):
+    monkeypatch.setattr(blobs.config, "papermerge__main__blob_store", False)
+    doc = await make_document(title="doc", user=user, parent=user.home_folder)
+
+    ver = await upload_pdf(db_session, doc)
+
+    assert ver.sha256 is None
+    assert ver.file_path == abs_docver_path(ver.id, ver.file_name)
+    assert ver.file_path.read_bytes() == PDF_PATH.read_bytes()
+    assert ver.size == os.stat(PDF_PATH).st_size
@@ -400,8 +400,8 @@ async def test_get_docs_by_type_one_doc_with_nonempty_cfv_with_tax_docs(
     for i in range(0, 2):
         cf = dict([(y[0], y[1]) for y in items[i].custom_fields])
         if items[i].id == doc_1.id:
-            #  tax_1.pdf has all cf set correctly
-            assert cf["Year"] == "2020"
+            #  tax_1.pdf has all cf set correctly (int, not string)
+            assert cf["Year"] == 2020
         else:
             # tax_2.pdf has all cf set to None
             assert cf["Year"] is None
@@ -552,6 +552,36 @@ async def test_document_upload_pdf(make_document, user, db_session: AsyncSession
     assert doc_ver.file_path.exists()
 
 
+async def test_document_upload_pdf_from_file_object(
+    make_document, user, db_session: AsyncSession
+):
+    """
+    Uploaded content may be any readable binary stream (e.g. the spooled
+    temporary file of the multipart request), not only `io.BytesIO`
+    """
+    doc: schema.Document = await make_document(
+        title="some doc", user=user, parent=user.home_folder
+    )
+    PDF_PATH = RESOURCES / "three-pages.pdf"
+
+    with open(PDF_PATH, "rb") as file:
+        await dbapi.upload(
+            db_session,
+            document_id=doc.id,
+            content=file,
+            file_name="three-pages.pdf",
+            size=os.stat(PDF_PATH).st_size,
+            content_type=ContentType.APPLICATION_PDF,
+        )
+
+    doc_ver = await dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+
+    assert doc_ver.page_count == 3
+    assert len(doc_ver.pages) == 3
+    assert doc_ver.size == os.stat(PDF_PATH).st_size
+    assert doc_ver.file_path.read_bytes() == PDF_PATH.read_bytes()
+
+
 async def test_document_upload_png(make_document, user, db_session: AsyncSession):
     """
     Upon creation document model has exactly one document version, and
@@ -74,3 +74,44 @@ async def test_get_doc_versions_list_two_docs(
     assert len(vers) == 2, data
     assert vers[0].number == 2, data
     assert vers[1].number == 1, data
+
+
+async def test_get_documents_by_type_filtered(
+    auth_api_client, make_document_receipt, user, db_session: AsyncSession
+):
+    doc1 = await make_document_receipt(title="receipt1.pdf", user=user)
+    doc2 = await make_document_receipt(title="receipt2.pdf", user=user)
+    await dbapi.update_doc_cfv(
+        db_session, document_id=doc1.id, custom_fields={"Total": "5.95"}
+    )
+    await dbapi.update_doc_cfv(
+        db_session, document_id=doc2.id, custom_fields={"Total": "120.50"}
+    )
+
+    resp = await auth_api_client.get(
+        f"/documents/type/{doc1.document_type_id}",
+        params={"cf_filter": ["Total:gt:10"], "order_by": "Total"},
+    )
+    assert resp.status_code == 200, resp.json()
+
+    data = resp.json()
+    assert [item["id"] for item in data["items"]] == [str(doc2.id)]
+    assert ["Total", 120.5, "monetary"] in data["items"][0]["custom_fields"]
+
+
+async def test_get_documents_by_type_invalid_filter(
+    auth_api_client, make_document_receipt, user
+):
+    doc = await make_document_receipt(title="receipt.pdf", user=user)
+
+    for params in (
+        {"cf_filter": ["Total:gt:a lot"]},
+        {"cf_filter": ["Total:between:1"]},
+        {"cf_filter": ["Total:contains:1"]},
+        {"cf_filter": ["NoSuchField:eq:1"]},
+        {"order_by": "NoSuchField"},
+    ):
+        resp = await auth_api_client.get(
+            f"/documents/type/{doc.document_type_id}", params=params
+        )
+        assert resp.status_code == 400, params
@@ -4,6 +4,8 @@ from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from papermerge.core import dbapi, schema
+from papermerge.core.features.document import blobs
+from papermerge.core.features.document import response as doc_response
 from papermerge.core.tests.resource_file import ResourceFile
 
 DIR_ABS_PATH = os.path.abspath(os.path.dirname(__file__))
@@ -23,6 +25,101 @@ async def test_download_document_version(
     assert response.status_code == 200
 
 
+async def test_download_document_version_cache_headers(
+    auth_api_client, make_document_from_resource, user, db_session: AsyncSession
+):
+    doc = await make_document_from_resource(
+        resource=ResourceFile.THREE_PAGES, user=user, parent=user.home_folder
+    )
+    last_ver = await dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+    url = f"/document-versions/{last_ver.id}/download"
+
+    response = await auth_api_client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert str(last_ver.id) in response.headers["etag"]
+    assert "immutable" in response.headers["cache-control"]
+    assert response.content == last_ver.file_path.read_bytes()
+
+    etag = response.headers["etag"]
+    response = await auth_api_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    last_modified = response.headers["last-modified"]
+    response = await auth_api_client.get(
+        url, headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+
+async def test_download_document_version_byte_ranges(
+    auth_api_client, make_document_from_resource, user, db_session: AsyncSession
+):
+    doc = await make_document_from_resource(
+        resource=ResourceFile.THREE_PAGES, user=user, parent=user.home_folder
+    )
+    last_ver = await dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+    url = f"/document-versions/{last_ver.id}/download"
+    content = last_ver.file_path.read_bytes()
+
+    response = await auth_api_client.get(url, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+
+    response = await auth_api_client.get(url, headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == content[-5:]
+
+    response = await auth_api_client.get(url, headers={"Range": "bytes=0-3,20-23"})
+    assert response.status_code == 206
+    assert response.headers["content-type"].startswith("multipart/byteranges")
+    assert content[0:4] in response.content
+    assert content[20:24] in response.content
+
+    # outdated `If-Range` validator - whole file is sent
+    response = await auth_api_client.get(
+        url, headers={"Range": "bytes=10-19", "If-Range": '"outdated"'}
+    )
+    assert response.status_code == 200
+    assert response.content == content
+
+    response = await auth_api_client.get(
+        url, headers={"Range": f"bytes={len(content) + 10}-"}
+    )
+    assert response.status_code == 416
+
+
+async def test_download_document_version_accel_redirect(
+    auth_api_client,
+    make_document_from_resource,
+    user,
+    db_session: AsyncSession,
+    monkeypatch,
+):
+    monkeypatch.setattr(
+        doc_response.config,
+        "papermerge__main__download_accel_redirect",
+        "/protected-media/",
+    )
+    monkeypatch.setattr(blobs.config, "papermerge__main__blob_store", True)
+    doc = await make_document_from_resource(
+        resource=ResourceFile.THREE_PAGES, user=user, parent=user.home_folder
+    )
+    last_ver = await dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+
+    response = await auth_api_client.get(f"/document-versions/{last_ver.id}/download")
+
+    assert response.status_code == 200
+    assert response.content == b""
+    # file is in the blob store, named after its content
+    assert response.headers["x-accel-redirect"].startswith("/protected-media/blobs/")
+    assert response.headers["x-accel-redirect"].endswith(last_ver.sha256)
+    assert response.headers["content-type"] == "application/pdf"
+
+
 async def test_document_version_download_request_non_existing_resource(auth_api_client):
     non_existing_resource_id = uuid.uuid4().hex
     response = await auth_api_client.get(
@@ -0,0 +1,145 @@
+import io
+
+import pikepdf
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import schema
+from papermerge.core.config import FileServer
+from papermerge.core.features.document import manifests
+from papermerge.core.features.document.db import api as doc_dbapi
+from papermerge.core.features.page_mngm.db import api as page_mngm_dbapi
+from papermerge.core.tests.resource_file import ResourceFile
+
+
+@pytest.fixture
+def page_manifests(monkeypatch):
+    monkeypatch.setattr(manifests.config, "papermerge__main__page_manifests", True)
+    # materialized on first use only
+    monkeypatch.setattr(
+        manifests.config, "papermerge__main__page_manifests_eager", False
+    )
+
+
+async def apply_pages_op(db_session: AsyncSession, doc_id, user_id, ops):
+    """Applies (page number, angle) `ops` on last version of the document"""
+    pages = await doc_dbapi.get_last_ver_pages(
+        db_session, document_id=doc_id, user_id=user_id
+    )
+    items = [
+        schema.PageAndRotOp(
+            page=schema.MovePage(id=pages[number - 1].id, number=number),
+            angle=angle,
+        )
+        for number, angle in ops
+    ]
+    await page_mngm_dbapi.apply_pages_op(db_session, items, user_id=user_id)
+
+    return await doc_dbapi.get_last_doc_ver(db_session, doc_id=doc_id)
+
+
+async def test_apply_pages_op_stores_manifest(
+    page_manifests, make_document_from_resource, user, db_session: AsyncSession
+):
+    doc = await make_document_from_resource(
+        resource=ResourceFile.THREE_PAGES, user=user, parent=user.home_folder
+    )
+    first_ver = await doc_dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+
+    # third page first (rotated), then the first one
+    new_ver = await apply_pages_op(db_session, doc.id, user.id, [(3, 90), (1, 0)])
+
+    assert new_ver.manifest == [[str(first_ver.id), 3, 90], [str(first_ver.id), 1, 0]]
+    assert len(new_ver.pages) == 2
+    assert not new_ver.file_path.exists()
+
+    new_ver = await manifests.materialize(db_session, new_ver.id)
+
+    assert new_ver.manifest is None
+    assert new_ver.size == new_ver.file_path.stat().st_size
+    with pikepdf.open(new_ver.file_path) as pdf:
+        assert len(pdf.pages) == 2
+        assert [page.get("/Rotate", 0) for page in pdf.pages] == [90, 0]
+
+
+async def test_manifest_of_manifest_references_file_versions(
+    page_manifests, make_document_from_resource, user, db_session: AsyncSession
+):
+    doc = await make_document_from_resource(
+        resource=ResourceFile.THREE_PAGES, user=user, parent=user.home_folder
+    )
+    first_ver = await doc_dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+
+    await apply_pages_op(db_session, doc.id, user.id, [(3, 90), (2, 0), (1, 180)])
+    last_ver = await apply_pages_op(db_session, doc.id, user.id, [(1, 270), (3, 0)])
+
+    # composed with the previous manifest: no materialization needed
+    assert last_ver.manifest == [[str(first_ver.id), 3, 0], [str(first_ver.id), 1, 180]]
+
+    last_ver = await manifests.materialize(db_session, last_ver.id)
+
+    with pikepdf.open(last_ver.file_path) as pdf:
+        assert [page.get("/Rotate", 0) for page in pdf.pages] == [0, 180]
+
+
+async def test_download_materializes_manifest(
+    page_manifests,
+    auth_api_client,
+    make_document_from_resource,
+    user,
+    db_session: AsyncSession,
+):
+    doc = await make_document_from_resource(
+        resource=ResourceFile.THREE_PAGES, user=user, parent=user.home_folder
+    )
+    new_ver = await apply_pages_op(db_session, doc.id, user.id, [(2, 0)])
+
+    response = await auth_api_client.get(f"/document-versions/{new_ver.id}/download")
+
+    assert response.status_code == 200
+    with pikepdf.open(io.BytesIO(response.content)) as pdf:
+        assert len(pdf.pages) == 1
+
+
+async def test_download_url_materializes_manifest(
+    page_manifests,
+    auth_api_client,
+    make_document_from_resource,
+    user,
+    db_session: AsyncSession,
+):
+    doc = await make_document_from_resource(
+        resource=ResourceFile.THREE_PAGES, user=user, parent=user.home_folder
+    )
+    new_ver = await apply_pages_op(db_session, doc.id, user.id, [(2, 0)])
+
+    response = await auth_api_client.get(
+        f"/document-versions/{new_ver.id}/download-url"
+    )
+
+    assert response.status_code == 200
+    new_ver = await doc_dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+    assert new_ver.manifest is None
+    assert new_ver.file_path.exists()
+
+
+async def test_pages_op_rewrites_pdf_with_s3(
+    page_manifests,
+    monkeypatch,
+    make_document_from_resource,
+    user,
+    db_session: AsyncSession,
+):
+    doc = await make_document_from_resource(
+        resource=ResourceFile.THREE_PAGES, user=user, parent=user.home_folder
+    )
+    # S3 upload of the new version needs its PDF right away
+    monkeypatch.setattr(
+        manifests.config, "papermerge__main__file_server", FileServer.S3
+    )
+
+    new_ver = await apply_pages_op(db_session, doc.id, user.id, [(2, 0)])
+
+    assert not manifests.is_enabled()
+    assert new_ver.manifest is None
+    assert new_ver.file_path.exists()
@@ -1,9 +1,10 @@
-from datetime import datetime
+from datetime import date
+from decimal import Decimal
 
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from papermerge.core.types import OrderEnum, CFVValueColumn
+from papermerge.core.types import CFFilterOp, OrderEnum
 from papermerge.core.features.document.db import selectors
 from papermerge.core import dbapi, orm
 
@@ -115,86 +116,18 @@ async def test_select_doc_cfv_with_tax_year_non_empty(make_document_tax, user, d
     } == set(cf_names)
 
 
-async def test_select_doc_type_cfv(make_document_receipt, user, db_session: AsyncSession):
-    doc1: orm.Document = await make_document_receipt(title="receipt1.pdf", user=user)
-    doc2 = await make_document_receipt(title="receipt2.pdf", user=user)
-
-    cf1 = {"EffectiveDate": "2024-11-16"}
-    cf2 = {"EffectiveDate": "2024-11-23"}
-
-    await dbapi.update_doc_cfv(db_session, document_id=doc1.id, custom_fields=cf1)
-    await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields=cf2)
-
-    stmt = selectors.select_doc_type_cfv(
-        doc1.document_type_id,
-        cf_name="EffectiveDate",
-        cfv_column_name=selectors.CFVValueColumn.DATE,
-    )
-    results = [(row.doc_id, row.cf_value) for row in await db_session.execute(stmt)]
-
-    assert len(results) == 2
-    expected_results = {
-        (doc1.id, datetime(2024, 11, 16, 0, 0)),
-        (doc2.id, datetime(2024, 11, 23, 0, 0)),
-    }
-
-    assert set(results) == expected_results
-
-
-async def test_select_doc_type_cfv_by_salary_custom_field(
-    make_document_salary, user, db_session: AsyncSession
-):
-    doc1: orm.Document = await make_document_salary(title="salary1.pdf", user=user)
-    doc2 = await make_document_salary(title="salary2.pdf", user=user)
-
-    cf1 = {"Month": "2024-11"}
-    cf2 = {"Month": "2024-03"}
-
-    await dbapi.update_doc_cfv(db_session, document_id=doc1.id, custom_fields=cf1)
-    await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields=cf2)
-
-    stmt = selectors.select_doc_type_cfv(
-        doc1.document_type_id,
-        cf_name="Month",
-        cfv_column_name=selectors.CFVValueColumn.YEARMONTH,
+async def docs_by_type(db_session: AsyncSession, document_type_id, **kwargs):
+    """(doc_id, <cf value>, <cf value>, ...) rows of `select_docs_by_type`"""
+    cfs = (
+        await db_session.execute(
+            selectors.select_document_type_cfs(document_type_id, user_id=None)
+        )
+    ).all()
+    stmt = selectors.select_docs_by_type(
+        document_type_id=document_type_id, custom_fields=cfs, **kwargs
     )
-    results = [(row.doc_id, row.cf_value) for row in await db_session.execute(stmt)]
-
-    assert len(results) == 2
-    expected_results = {
-        (doc1.id, 2024.11),
-        (doc2.id, 2024.03),
-    }
-
-    assert set(results) == expected_results
 
-
-async def test_select_doc_type_cfv_by_tax_year_custom_field(
-    make_document_tax, user, db_session: AsyncSession
-):
-    doc1: orm.Document = await make_document_tax(title="tax1.pdf", user=user)
-    doc2 = await make_document_tax(title="tax2.pdf", user=user)
-
-    cf1 = {"Year": 2024}
-    cf2 = {"Year": 2023}
-
-    await dbapi.update_doc_cfv(db_session, document_id=doc1.id, custom_fields=cf1)
-    await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields=cf2)
-
-    stmt = selectors.select_doc_type_cfv(
-        doc1.document_type_id,
-        cf_name="Year",
-        cfv_column_name=selectors.CFVValueColumn.INT,
-    )
-    results = [(row.doc_id, row.cf_value) for row in await db_session.execute(stmt)]
-
-    assert len(results) == 2
-    expected_results = {
-        (doc1.id, 2024),
-        (doc2.id, 2023),
-    }
-
-    assert set(results) == expected_results
+    return [(row.doc_id, *row[3:]) for row in await db_session.execute(stmt)]
 
 
 async def test_select_docs_by_type_no_cfv(make_document_receipt, user, db_session: AsyncSession):
@@ -206,21 +139,12 @@ async def test_select_docs_by_type_no_cfv(make_document_receipt, user, db_sessio
     doc2: orm.Document = await make_document_receipt(title="receipt2.pdf", user=user)
 
     # act
-    stmt = selectors.select_docs_by_type(
-        document_type_id=doc1.document_type_id, user_id=user.id, offset=0, limit=99
-    )
+    results = await docs_by_type(db_session, doc1.document_type_id)
 
-    # assert
-    results = [
-        (row.doc_id, row.cf_name, row.cf_value) for row in await db_session.execute(stmt)
-    ]
+    # assert: one row per document; columns EffectiveDate, Shop, Total
     expected_results = {
-        (doc1.id, "EffectiveDate", None),
-        (doc1.id, "Shop", None),
-        (doc1.id, "Total", None),
-        (doc2.id, "EffectiveDate", None),
-        (doc2.id, "Shop", None),
-        (doc2.id, "Total", None),
+        (doc1.id, None, None, None),
+        (doc2.id, None, None, None),
     }
 
     assert set(results) == expected_results
@@ -238,21 +162,12 @@ async def test_select_docs_by_type_with_one_doc_full_cfv(
     await dbapi.update_doc_cfv(db_session, document_id=doc1.id, custom_fields=cf1)
 
     # act
-    stmt = selectors.select_docs_by_type(
-        document_type_id=doc1.document_type_id, user_id=user.id, offset=0, limit=99
-    )
+    results = await docs_by_type(db_session, doc1.document_type_id)
 
-    # assert
-    results = [
-        (row.doc_id, row.cf_name, row.cf_value) for row in await db_session.execute(stmt)
-    ]
+    # assert: values are typed
     expected_results = {
-        (doc1.id, "EffectiveDate", "2024-11-16"),
-        (doc1.id, "Shop", "lidl"),
-        (doc1.id, "Total", "49"),
-        (doc2.id, "EffectiveDate", None),
-        (doc2.id, "Shop", None),
-        (doc2.id, "Total", None),
+        (doc1.id, date(2024, 11, 16), "lidl", Decimal("49")),
+        (doc2.id, None, None, None),
     }
 
     assert set(results) == expected_results
@@ -273,238 +188,77 @@ async def test_select_docs_by_type_with_partially_filled_cfv(
     await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields=cf2)
 
     # act
-    stmt = selectors.select_docs_by_type(
-        document_type_id=doc1.document_type_id, user_id=user.id, offset=0, limit=99
-    )
+    results = await docs_by_type(db_session, doc1.document_type_id)
 
     # assert
-    results = [
-        (row.doc_id, row.cf_name, row.cf_value) for row in await db_session.execute(stmt)
-    ]
     expected_results = {
-        (doc1.id, "EffectiveDate", "2024-11-16"),
-        (doc1.id, "Shop", "lidl"),
-        (doc1.id, "Total", None),
-        (doc2.id, "EffectiveDate", None),
-        (doc2.id, "Shop", "rewe"),
-        (doc2.id, "Total", "9.99"),
+        (doc1.id, date(2024, 11, 16), "lidl", None),
+        (doc2.id, None, "rewe", Decimal("9.99")),
     }
 
     assert set(results) == expected_results
 
 
-async def test_select_docs_by_type_ordered_date_asc(make_document_receipt, user, db_session: AsyncSession):
-    # arrange
-    doc1: orm.Document = await make_document_receipt(title="receipt1.pdf", user=user)
-    doc2: orm.Document = await make_document_receipt(title="receipt2.pdf", user=user)
-    doc3: orm.Document = await make_document_receipt(title="receipt3.pdf", user=user)
-    doc4: orm.Document = await make_document_receipt(title="receipt4.pdf", user=user)
-
-    cf1 = {"EffectiveDate": "2024-05-16"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc1.id, custom_fields=cf1)
-
-    cf2 = {"EffectiveDate": "2019-01-01"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields=cf2)
-
-    cf3 = {"EffectiveDate": "2024-12-25"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc3.id, custom_fields=cf3)
-
-    cf4 = {"EffectiveDate": "2023-04-02"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc4.id, custom_fields=cf4)
-
-    # act
-    stmt = selectors.select_docs_by_type(
-        document_type_id=doc1.document_type_id,
-        user_id=user.id,
-        order_by="EffectiveDate",
-        cfv_column_name=CFVValueColumn.DATE,
-        order=OrderEnum.asc,
-        offset=0,
-        limit=99,
-    )
-
-    # assert
-    results = [
-        (row.doc_id, row.cf_name, row.cf_value) for row in await db_session.execute(stmt)
-    ]
-    expected_results = [
-        (doc2.id, "EffectiveDate", "2019-01-01"),
-        (doc2.id, "Shop", None),
-        (doc2.id, "Total", None),
-        (doc4.id, "EffectiveDate", "2023-04-02"),
-        (doc4.id, "Shop", None),
-        (doc4.id, "Total", None),
-        (doc1.id, "EffectiveDate", "2024-05-16"),
-        (doc1.id, "Shop", None),
-        (doc1.id, "Total", None),
-        (doc3.id, "EffectiveDate", "2024-12-25"),
-        (doc3.id, "Shop", None),
-        (doc3.id, "Total", None),
-    ]
-
-    assert results == expected_results
-
-
-async def test_select_docs_by_type_ordered_date_desc(
-    make_document_receipt, make_document_zdf, user, db_session: AsyncSession
+@pytest.mark.parametrize(
+    "order,expected_order",
+    [(OrderEnum.asc, [2, 4, 1, 3]), (OrderEnum.desc, [3, 1, 4, 2])],
+)
+async def test_select_docs_by_type_ordered_date(
+    make_document_receipt,
+    make_document_zdf,
+    user,
+    db_session: AsyncSession,
+    order,
+    expected_order,
 ):
     # arrange
-    doc1: orm.Document = await make_document_receipt(title="receipt1.pdf", user=user)
-    doc2: orm.Document = await make_document_receipt(title="receipt2.pdf", user=user)
-    doc3: orm.Document = await make_document_receipt(title="receipt3.pdf", user=user)
-    doc4: orm.Document = await make_document_receipt(title="receipt4.pdf", user=user)
+    dates = {1: "2024-05-16", 2: "2019-01-01", 3: "2024-12-25", 4: "2023-04-02"}
+    docs = {}
+    for i, value in dates.items():
+        docs[i] = await make_document_receipt(title=f"receipt{i}.pdf", user=user)
+        await dbapi.update_doc_cfv(
+            db_session, document_id=docs[i].id, custom_fields={"EffectiveDate": value}
+        )
+    # documents of other type
     await make_document_zdf(title="zdf1.pdf", user=user)
     await make_document_zdf(title="zdf2.pdf", user=user)
 
-    cf1 = {"EffectiveDate": "2024-05-16"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc1.id, custom_fields=cf1)
-
-    cf2 = {"EffectiveDate": "2019-01-01"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields=cf2)
-
-    cf3 = {"EffectiveDate": "2024-12-25"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc3.id, custom_fields=cf3)
-
-    cf4 = {"EffectiveDate": "2023-04-02"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc4.id, custom_fields=cf4)
-
     # act
-    stmt = selectors.select_docs_by_type(
-        document_type_id=doc1.document_type_id,
-        user_id=user.id,
-        order_by="EffectiveDate",
-        cfv_column_name=CFVValueColumn.DATE,
-        order=OrderEnum.desc,
-        offset=0,
-        limit=99,
+    results = await docs_by_type(
+        db_session, docs[1].document_type_id, order_by="EffectiveDate", order=order
     )
 
     # assert
-    results = [
-        (row.doc_id, row.cf_name, row.cf_value) for row in await db_session.execute(stmt)
-    ]
-    expected_results = [
-        (doc3.id, "EffectiveDate", "2024-12-25"),
-        (doc3.id, "Shop", None),
-        (doc3.id, "Total", None),
-        (doc1.id, "EffectiveDate", "2024-05-16"),
-        (doc1.id, "Shop", None),
-        (doc1.id, "Total", None),
-        (doc4.id, "EffectiveDate", "2023-04-02"),
-        (doc4.id, "Shop", None),
-        (doc4.id, "Total", None),
-        (doc2.id, "EffectiveDate", "2019-01-01"),
-        (doc2.id, "Shop", None),
-        (doc2.id, "Total", None),
+    assert results == [
+        (docs[i].id, date.fromisoformat(dates[i]), None, None) for i in expected_order
     ]
 
-    assert results == expected_results
-
-
-async def test_select_docs_by_type_ordered_monetary_asc(
-    make_document_receipt, user, db_session: AsyncSession
-):
-    # arrange
-    doc1: orm.Document = await make_document_receipt(title="receipt1.pdf", user=user)
-    doc2: orm.Document = await make_document_receipt(title="receipt2.pdf", user=user)
-    doc3: orm.Document = await make_document_receipt(title="receipt3.pdf", user=user)
-    doc4: orm.Document = await make_document_receipt(title="receipt4.pdf", user=user)
 
-    cf1 = {"Total": "5.95"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc1.id, custom_fields=cf1)
-
-    cf2 = {"Total": "2"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields=cf2)
-
-    cf3 = {"Total": "5.99"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc3.id, custom_fields=cf3)
-
-    cf4 = {"Total": "20.34"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc4.id, custom_fields=cf4)
-
-    # act
-    stmt = selectors.select_docs_by_type(
-        document_type_id=doc1.document_type_id,
-        user_id=user.id,
-        order_by="Total",
-        cfv_column_name=CFVValueColumn.MONETARY,
-        order=OrderEnum.asc,
-        offset=0,
-        limit=99,
-    )
-
-    # assert
-    results = [
-        (row.doc_id, row.cf_name, row.cf_value) for row in await db_session.execute(stmt)
-    ]
-    expected_results = [
-        (doc2.id, "EffectiveDate", None),
-        (doc2.id, "Shop", None),
-        (doc2.id, "Total", "2"),
-        (doc1.id, "EffectiveDate", None),
-        (doc1.id, "Shop", None),
-        (doc1.id, "Total", "5.95"),
-        (doc3.id, "EffectiveDate", None),
-        (doc3.id, "Shop", None),
-        (doc3.id, "Total", "5.99"),
-        (doc4.id, "EffectiveDate", None),
-        (doc4.id, "Shop", None),
-        (doc4.id, "Total", "20.34"),
-    ]
-    assert results == expected_results
-
-
-async def test_select_docs_by_type_ordered_monetary_desc(
-    make_document_receipt, user, db_session: AsyncSession
+@pytest.mark.parametrize(
+    "order,expected_order",
+    [(OrderEnum.asc, [2, 1, 3, 4]), (OrderEnum.desc, [4, 3, 1, 2])],
+)
+async def test_select_docs_by_type_ordered_monetary(
+    make_document_receipt, user, db_session: AsyncSession, order, expected_order
 ):
     # arrange
-    doc1: orm.Document = await make_document_receipt(title="receipt1.pdf", user=user)
-    doc2: orm.Document = await make_document_receipt(title="receipt2.pdf", user=user)
-    doc3: orm.Document = await make_document_receipt(title="receipt3.pdf", user=user)
-    doc4: orm.Document = await make_document_receipt(title="receipt4.pdf", user=user)
-
-    cf1 = {"Total": "5.95"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc1.id, custom_fields=cf1)
-
-    cf2 = {"Total": "2"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields=cf2)
-
-    cf3 = {"Total": "5.99"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc3.id, custom_fields=cf3)
-
-    cf4 = {"Total": "20.34"}
-    await dbapi.update_doc_cfv(db_session, document_id=doc4.id, custom_fields=cf4)
+    totals = {1: "5.95", 2: "2", 3: "5.99", 4: "20.34"}
+    docs = {}
+    for i, value in totals.items():
+        docs[i] = await make_document_receipt(title=f"receipt{i}.pdf", user=user)
+        await dbapi.update_doc_cfv(
+            db_session, document_id=docs[i].id, custom_fields={"Total": value}
+        )
 
     # act
-    stmt = selectors.select_docs_by_type(
-        document_type_id=doc1.document_type_id,
-        user_id=user.id,
-        order_by="Total",
-        cfv_column_name=CFVValueColumn.MONETARY,
-        order=OrderEnum.desc,
-        offset=0,
-        limit=99,
+    results = await docs_by_type(
+        db_session, docs[1].document_type_id, order_by="Total", order=order
     )
 
-    # assert
-    results = [
-        (row.doc_id, row.cf_name, row.cf_value) for row in await db_session.execute(stmt)
-    ]
-    expected_results = [
-        (doc4.id, "EffectiveDate", None),
-        (doc4.id, "Shop", None),
-        (doc4.id, "Total", "20.34"),
-        (doc3.id, "EffectiveDate", None),
-        (doc3.id, "Shop", None),
-        (doc3.id, "Total", "5.99"),
-        (doc1.id, "EffectiveDate", None),
-        (doc1.id, "Shop", None),
-        (doc1.id, "Total", "5.95"),
-        (doc2.id, "EffectiveDate", None),
-        (doc2.id, "Shop", None),
-        (doc2.id, "Total", "2"),
+    # assert: ordered numerically, not as strings
+    assert results == [
+        (docs[i].id, None, None, Decimal(totals[i])) for i in expected_order
     ]
-    assert results == expected_results
 
 
 async def test_select_docs_by_type_ordered_year_asc(make_document_tax, user, db_session: AsyncSession):
@@ -523,44 +277,65 @@ async def test_select_docs_by_type_ordered_year_asc(make_document_tax, user, db_
     await dbapi.update_doc_cfv(db_session, document_id=doc3.id, custom_fields=cf3)
 
     # act
-    stmt = selectors.select_docs_by_type(
-        document_type_id=doc1.document_type_id,
-        user_id=user.id,
-        order_by="Year",
-        cfv_column_name=CFVValueColumn.INT,
-        order=OrderEnum.asc,
-        offset=0,
-        limit=99,
+    results = await docs_by_type(
+        db_session, doc1.document_type_id, order_by="Year", order=OrderEnum.asc
     )
 
     # assert
-    results = [
-        (row.doc_id, row.cf_name, row.cf_value) for row in await db_session.execute(stmt)
-    ]
-    expected_results = [
-        (doc3.id, "Year", "2021"),
-        (doc1.id, "Year", "2022"),
-        (doc2.id, "Year", "2023"),
-    ]
+    assert results == [(doc3.id, 2021), (doc1.id, 2022), (doc2.id, 2023)]
 
-    assert results == expected_results
 
+async def test_select_docs_by_type_ordered_nulls_last(
+    make_document_tax, user, db_session: AsyncSession
+):
+    doc1: orm.Document = await make_document_tax(title="tax1.pdf", user=user)
+    doc2: orm.Document = await make_document_tax(title="tax2.pdf", user=user)
+    await dbapi.update_doc_cfv(db_session, document_id=doc2.id, custom_fields={"Year": 2020})
 
-async def test_select_document_type_cfs(make_document_receipt, user, db_session: AsyncSession):
-    doc = await make_document_receipt(title="receipt.pdf", user=user)
-    stmt = selectors.select_document_type_cfs(doc.document_type_id, doc.user_id)
+    for order in (OrderEnum.asc, OrderEnum.desc):
+        results = await docs_by_type(
+            db_session, doc1.document_type_id, order_by="Year", order=order
+        )
+        assert results == [(doc2.id, 2020), (doc1.id, None)]
 
-    rows = [row for row in await db_session.execute(stmt)]
-    # receipt document type has 3 custom fields
-    assert len(rows) == 3
+
+async def test_select_docs_by_type_filtered(
+    make_document_receipt, user, db_session: AsyncSession
+):
+    values = {
+        1: {"Shop": "REWE City", "Total": "5.95"},
+        2: {"Shop": "lidl", "Total": "20"},
+        3: {"Shop": "rewe", "Total": "120.50"},
+    }
+    docs = {}
+    for i, cf in values.items():
+        docs[i] = await make_document_receipt(title=f"receipt{i}.pdf", user=user)
+        await dbapi.update_doc_cfv(db_session, document_id=docs[i].id, custom_fields=cf)
+    await make_document_receipt(title="receipt4.pdf", user=user)
+    type_id = docs[1].document_type_id
+
+    results = await docs_by_type(
+        db_session,
+        type_id,
+        filters=[("Shop", CFFilterOp.contains, "rewe")],
+    )
+    assert {row[0] for row in results} == {docs[1].id, docs[3].id}
+
+    results = await docs_by_type(
+        db_session,
+        type_id,
+        filters=[
+            ("Shop", CFFilterOp.contains, "rewe"),
+            ("Total", CFFilterOp.gt, Decimal("10")),
+        ],
+    )
+    assert [row[0] for row in results] == [docs[3].id]
 
 
-async def test_select_docs_by_type_without_ordering(make_document_receipt, user, db_session: AsyncSession):
+async def test_select_document_type_cfs(make_document_receipt, user, db_session: AsyncSession):
     doc = await make_document_receipt(title="receipt.pdf", user=user)
-    stmt = selectors.select_docs_by_type_without_ordering(
-        doc.document_type_id, doc.user_id
-    )
+    stmt = selectors.select_document_type_cfs(doc.document_type_id, doc.user_id)
 
     rows = [row for row in await db_session.execute(stmt)]
-
+    # receipt document type has 3 custom fields
     assert len(rows) == 3
@@ -283,23 +283,18 @@ async def update_document_type(
             "Either attrs.user_id or attrs.group_id should be non-empty value"
         )
 
-    notify_path_tmpl_worker = False
     if doc_type.path_template != attrs.path_template:
         doc_type.path_template = attrs.path_template
-        notify_path_tmpl_worker = True
-
-    session.add(doc_type)
-    await session.commit()
-
-    result = schema.DocumentType.model_validate(doc_type)
-
-    if notify_path_tmpl_worker:
         # background task to move all doc_type documents
         # to new target path based on path template evaluation
         send_task(
+            session,
             const.PATH_TMPL_MOVE_DOCUMENTS,
             kwargs={"document_type_id": str(document_type_id)},
             route_name="path_tmpl",
         )
 
-    return result
+    session.add(doc_type)
+    await session.commit()
+
+    return schema.DocumentType.model_validate(doc_type)
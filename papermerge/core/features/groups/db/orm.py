@@ -1,7 +1,7 @@
 import uuid
 from uuid import UUID
 
-from sqlalchemy import Column, ForeignKey, Table
+from sqlalchemy import Column, ForeignKey, Index, Table
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from papermerge.core.db.base import Base
@@ -18,6 +18,8 @@ user_groups_association = Table(
         "group_id",
         ForeignKey("groups.id"),
     ),
+    # groups of the user; part of every permission check
+    Index("users_groups_user_id_idx", "user_id"),
 )
 
 
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from papermerge.core import utils, schema
 from papermerge.core.features.auth import get_current_user
 from papermerge.core.features.auth import scopes
+from papermerge.core.features.auth import principal_cache
 from papermerge.core.features.groups.db import api as dbapi
 from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
 from papermerge.core.routers.params import CommonQueryParams
@@ -105,6 +106,8 @@ async def create_group(
             raise HTTPException(status_code=400, detail="Group already exists")
         raise HTTPException(status_code=400, detail=error_msg)
 
+    await principal_cache.invalidate()
+
     return group
 
 
@@ -135,6 +138,8 @@ async def delete_group(
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Group not found")
 
+    await principal_cache.invalidate()
+
 
 @router.patch("/{group_id}", status_code=200, response_model=schema.Group)
 @utils.docstring_parameter(scope=scopes.GROUP_UPDATE)
@@ -183,4 +188,6 @@ async def update_group(
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Group not found")
 
+    await principal_cache.invalidate()
+
     return group
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Response, Depends
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from papermerge.core import executor
+from papermerge.core.db import engine
 from papermerge.core.db.engine import get_db
 
 router = APIRouter(
@@ -16,3 +18,15 @@ async def probe_endpoint(db_session: AsyncSession = Depends(get_db)):
     await db_session.execute(text("select 1"))
 
     return Response()
+
+
+@router.get("/executor")
+async def executor_stats_endpoint() -> executor.ExecutorStats:
+    """Queue depth and job latency of the PDF process pool"""
+    return executor.get_stats()
+
+
+@router.get("/db-pool")
+async def db_pool_stats_endpoint() -> engine.PoolStats:
+    """Connection pool usage of the primary database"""
+    return engine.get_pool_stats()
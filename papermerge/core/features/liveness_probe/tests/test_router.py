@@ -2,3 +2,15 @@
 async def test_liveness_probe(api_client):
     response = await api_client.get("/probe/")
     assert response.status_code == 200, response.json()
+
+
+async def test_executor_stats(api_client):
+    response = await api_client.get("/probe/executor")
+    assert response.status_code == 200, response.json()
+    assert {"queue_depth", "jobs_total", "latency_avg"} <= response.json().keys()
+
+
+async def test_db_pool_stats(api_client):
+    response = await api_client.get("/probe/db-pool")
+    assert response.status_code == 200, response.json()
+    assert {"checked_out", "waiting", "timeouts"} <= response.json().keys()
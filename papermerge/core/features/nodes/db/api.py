@@ -1,6 +1,5 @@
 import logging
 import uuid
-import math
 from typing import Union, Tuple, Iterable
 from uuid import UUID
 
@@ -10,10 +9,16 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from papermerge.core.exceptions import EntityNotFound
-from papermerge.core.db.common import get_ancestors, get_descendants
+from papermerge.core.db import closure, pagination
+from papermerge.core.db.common import (
+    get_ancestors,
+    get_descendants,
+    get_nodes_ancestors,
+)
 from papermerge.core import schema
-from papermerge.core.types import PaginatedResponse
+from papermerge.core.types import PaginatedResponse, TotalMode
 from papermerge.core.features.nodes import events
+from papermerge.core.features.useractivity import writer as activity_writer
 from papermerge.core.features.nodes.schema import DeleteDocumentsData
 from papermerge.core import orm
 from .orm import Folder
@@ -65,28 +70,36 @@ def str2colexpr(keys: list[str]):
 async def get_nodes(
     db_session: AsyncSession, user_id: UUID | None = None, node_ids: list[UUID] | None = None
 ) -> list[schema.Document | schema.Folder]:
+    """Returns nodes with their tags, breadcrumbs and (for documents)
+    versions and pages
+
+    Number of issued SQL queries does not depend on the number of nodes.
+    """
     items = []
     if node_ids is None:
         node_ids = []
 
+    stmt = select(orm.Node).options(
+        selectin_polymorphic(orm.Node, [Folder, orm.Document]),
+        selectinload(orm.Node.tags),
+        selectinload(orm.Document.versions).selectinload(orm.DocumentVersion.pages),
+    )
     if len(node_ids) > 0:
-        stmt = (
-            select(orm.Node)
-            .options(selectinload(orm.Node.tags))
-            .filter(orm.Node.id.in_(node_ids))
-        )
-    else:
-        stmt = select(orm.Node).options(selectinload(orm.Node.tags))
+        stmt = stmt.filter(orm.Node.id.in_(node_ids))
 
     if user_id is not None:
         stmt = stmt.filter(orm.Node.user_id == user_id)
 
     nodes = (await db_session.scalars(stmt)).all()
+    if len(nodes) == 0:
+        return items
+
+    breadcrumbs = await get_nodes_ancestors(
+        db_session, node_ids=[node.id for node in nodes], include_self=False
+    )
 
     for node in nodes:
-        breadcrumb = await get_ancestors(db_session, node.id, include_self=False)
-        node = await load_node(db_session, node)
-        node.breadcrumb = breadcrumb
+        node.breadcrumb = breadcrumbs[node.id]
         if node.ctype == "folder":
             items.append(schema.Folder.model_validate(node))
         else:
@@ -109,7 +122,14 @@ async def get_paginated_nodes(
     page_number: int,
     order_by: list[str],
     filter: str | None = None,
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.exact,
 ) -> PaginatedResponse[Union[schema.Document, schema.Folder]]:
+    """Returns one page of `parent_id`'s children
+
+    Page is selected either by `cursor` (see `pagination`) or by
+    `page_number`. Raises `pagination.InvalidCursor`.
+    """
     loader_opt = selectin_polymorphic(orm.Node, [Folder, orm.Document])
     subq = exists().where(orm.SharedNode.node_id == orm.Node.id)
     if filter:
@@ -130,26 +150,19 @@ async def get_paginated_nodes(
             .filter_by(parent_id=parent_id)
         )
 
-    stmt = (
-        query.offset((page_number - 1) * page_size)
-        .order_by(*str2colexpr(order_by))
-        .limit(page_size)
-        .options(loader_opt)
-    )
-
-    count_stmt = (
-        select(func.count())
-        .select_from(orm.Node)
-        .where(orm.Node.parent_id == parent_id)
+    page = await pagination.paginate(
+        db_session,
+        query.options(loader_opt),
+        order_by=str2colexpr(order_by),
+        tiebreaker=orm.Node.id,
+        page_size=page_size,
+        page_number=page_number,
+        cursor=cursor,
+        total=total,
     )
 
-    total_nodes = await db_session.scalar(count_stmt)
-    rows = (await db_session.execute(stmt)).all()
-
     items = []
-    num_pages = math.ceil(total_nodes / page_size)
-
-    for row in rows:
+    for row in page.rows:
         node = row.Node
         node.is_shared = row.is_shared
         if node.ctype == "folder":
@@ -160,8 +173,10 @@ async def get_paginated_nodes(
     return PaginatedResponse[Union[schema.DocumentNode, schema.Folder]](
         page_size=page_size,
         page_number=page_number,
-        num_pages=num_pages,
+        num_pages=page.num_pages(page_size),
         items=items,
+        next_cursor=page.next_cursor,
+        total=page.total,
     )
 
 
@@ -255,15 +270,7 @@ async def assign_node_tags(
     try:
         node.tags = db_tags.all()
         await db_session.commit()
-
-        # Log activity for attaching tags
-        activity = orm.Activity(
-            user_id=user_id,
-            node_id=node_id,
-            action="attach_tags",
-        )
-        db_session.add(activity)
-        await db_session.commit()
+        await activity_writer.log_activity(user_id, "attach_tags", node_id=node_id)
 
     except Exception as e:
         error = schema.Error(messages=[str(e)])
@@ -349,15 +356,7 @@ async def remove_node_tags(
     try:
         await db_session.execute(delete_stmt)
         await db_session.commit()
-
-        # Log activity for removing tags
-        activity = orm.Activity(
-            user_id=user_id,
-            node_id=node_id,
-            action="remove_tags",
-        )
-        db_session.add(activity)
-        await db_session.commit()
+        await activity_writer.log_activity(user_id, "remove_tags", node_id=node_id)
 
     except Exception as e:
         error = schema.Error(messages=[str(e)])
@@ -408,12 +407,12 @@ async def delete_nodes(
     try:
         await db_session.execute(stmt)
         await db_session.execute(sqlite_hack_stmt)
+        events.delete_documents_s3_data(db_session, delete_details)
         await db_session.commit()
     except Exception as e:
         error = schema.Error(messages=[str(e)])
         return error
 
-    events.delete_documents_s3_data(delete_details)
     return None
 
 
@@ -443,6 +442,7 @@ async def move_nodes(db_session: AsyncSession, source_ids: list[UUID], target_id
 
     result = await db_session.execute(stmt)
     await db_session.execute(stmt_update_owner)
+    await closure.move_nodes(db_session, node_ids=source_ids, target_id=target_id)
     await db_session.commit()
 
     return result.rowcount
@@ -2,7 +2,14 @@ import uuid
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, String, func, UniqueConstraint, CheckConstraint
+from sqlalchemy import (
+    ForeignKey,
+    String,
+    func,
+    UniqueConstraint,
+    CheckConstraint,
+    Index,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship, deferred
 
 from papermerge.core.features.users.db.orm import User
@@ -74,6 +81,11 @@ class Node(Base):
             "group_id",
             name="unique title per parent per group",
         ),
+        # folder listing in default order (by `ctype`, `title`); children of
+        # a node (e.g. descendants CTE) are looked up by `parent_id` prefix
+        Index("nodes_parent_id_ctype_title_idx", "parent_id", "ctype", "title"),
+        # recently created documents are rolled up, see `useractivity.rollup`
+        Index("nodes_created_at_idx", "created_at"),
         CheckConstraint(
             "user_id IS NOT NULL OR group_id IS NOT NULL",
             name="check__user_id_not_null__or__group_id_not_null",
@@ -97,3 +109,26 @@ class Folder(Node):
     __mapper_args__ = {
         "polymorphic_identity": "folder",
     }
+
+
+class NodeClosure(Base):
+    """Closure table of the nodes tree
+
+    For every node there is one row per each of its ancestors (including
+    the node itself, with `depth` = 0). Maintained only when
+    `papermerge__main__nodes_closure_table` is enabled,
+    see `papermerge.core.db.closure`.
+    """
+    __tablename__ = "nodes_closure"
+
+    ancestor_id: Mapped[UUID] = mapped_column(
+        ForeignKey("nodes.id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id: Mapped[UUID] = mapped_column(
+        ForeignKey("nodes.id", ondelete="CASCADE"), primary_key=True
+    )
+    depth: Mapped[int]
+
+    __table_args__ = (
+        Index("nodes_closure_descendant_id_depth_idx", "descendant_id", "depth"),
+    )
@@ -1,6 +1,5 @@
 import logging
 import uuid
-from datetime import datetime
 from typing import Annotated, Iterable, Union
 from uuid import UUID
 
@@ -20,9 +19,10 @@ from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
 from papermerge.core.routers.params import CommonQueryParams
 from papermerge.core.types import PaginatedResponse
 from papermerge.core.db import common as dbapi_common
+from papermerge.core.db.pagination import InvalidCursor
 from papermerge.core import exceptions as exc
 from papermerge.core.db.engine import get_db
-from papermerge.core.features.useractivity.db.activity import Activity  # <-- Added import
+from papermerge.core.features.useractivity import writer as activity_writer
 
 router = APIRouter(prefix="/nodes", tags=["nodes"])
 
@@ -67,15 +67,20 @@ async def get_node(
             raise exc.HTTP403Forbidden()
     # --- END PATCH ---
 
-    nodes = await nodes_dbapi.get_paginated_nodes(
-        db_session=db_session,
-        parent_id=parent_id,
-        user_id=user.id,
-        page_size=params.page_size,
-        page_number=params.page_number,
-        order_by=order_by,
-        filter=params.filter,
-    )
+    try:
+        nodes = await nodes_dbapi.get_paginated_nodes(
+            db_session=db_session,
+            parent_id=parent_id,
+            user_id=user.id,
+            page_size=params.page_size,
+            page_number=params.page_number,
+            order_by=order_by,
+            filter=params.filter,
+            cursor=params.cursor,
+            total=params.total,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return nodes
 
@@ -112,14 +117,19 @@ async def create_node(
     The only nodes with `parent_id` set to empty value are "user custom folders"
     like Home and Inbox.
     """
+    node_id = pynode.id or uuid.uuid4()
+    # queued task is committed along with the new node
+    send_task(
+        db_session, INDEX_ADD_NODE, kwargs={"node_id": str(node_id)}, route_name="i3"
+    )
+
     if pynode.ctype == "folder":
         attrs = dict(
+            id=node_id,
             title=pynode.title,
             ctype="folder",
             parent_id=pynode.parent_id,
         )
-        if pynode.id:
-            attrs["id"] = pynode.id
         new_folder = schema.NewFolder(**attrs)
         created_node, error = await nodes_dbapi.create_folder(db_session, new_folder)
     else:
@@ -137,9 +147,8 @@ async def create_node(
             ocr=pynode.ocr,
             file_name=pynode.title,
             ctype="document",
+            id=node_id,
         )
-        if pynode.id:
-            attrs["id"] = pynode.id
 
         new_document = schema.NewDocument(**attrs)
 
@@ -156,7 +165,6 @@ async def create_node(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
-    send_task(INDEX_ADD_NODE, kwargs={"node_id": str(created_node.id)}, route_name="i3")
     return created_node
 
 
@@ -194,12 +202,14 @@ async def update_node(
     ):
         raise exc.HTTP403Forbidden()
 
+    # queued task is committed along with the update
+    send_task(
+        db_session, INDEX_ADD_NODE, kwargs={"node_id": str(node_id)}, route_name="i3"
+    )
     updated_node = await nodes_dbapi.update_node(
         db_session, node_id=node_id, user_id=user.id, attrs=node
     )
 
-    send_task(INDEX_ADD_NODE, kwargs={"node_id": str(updated_node.id)}, route_name="i3")
-
     return updated_node
 
 
@@ -228,31 +238,27 @@ async def delete_nodes(
     Logs an attempt to delete nodes in the Activity table.
     """
     # Log the deletion attempt for each node
-    try:
-        for node_id in list_of_uuids:
-            db_session.add(
-                Activity(
-                    user_id=user.id,
-                    node_id=node_id,  # Log the node_id even if there's no FK
-                    action="node_delete_attempt",
-                    created_at=datetime.utcnow(),
-                )
-            )
-        await db_session.commit()
-    except Exception as e:
-        await db_session.rollback()
-        logger.warning(f"Failed to log delete attempt for user {user.id}: {e}")
+    for node_id in list_of_uuids:
+        await activity_writer.log_activity(
+            user.id, "node_delete_attempt", node_id=node_id
+        )
 
     # Check permissions and delete nodes
-    for node_id in list_of_uuids:
-        if not await dbapi_common.has_node_perm(
-            db_session,
-            node_id=node_id,
-            codename=scopes.NODE_DELETE,
-            user_id=user.id,
-        ):
-            raise exc.HTTP403Forbidden()
+    if not await dbapi_common.has_nodes_perm(
+        db_session,
+        node_ids=list_of_uuids,
+        codename=scopes.NODE_DELETE,
+        user_id=user.id,
+    ):
+        raise exc.HTTP403Forbidden()
 
+    # queued task is committed along with the deletion
+    send_task(
+        db_session,
+        INDEX_REMOVE_NODE,
+        kwargs={"item_ids": [str(i) for i in list_of_uuids]},
+        route_name="i3",
+    )
     error = await nodes_dbapi.delete_nodes(
         db_session, node_ids=list_of_uuids, user_id=user.id
     )
@@ -260,12 +266,6 @@ async def delete_nodes(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
-    send_task(
-        INDEX_REMOVE_NODE,
-        kwargs={"item_ids": [str(i) for i in list_of_uuids]},
-        route_name="i3",
-    )
-
 
 @router.post(
     "/move",
@@ -317,14 +317,13 @@ async def move_nodes(
     Returns UUIDs of successfully moved nodes.
     """
     try:
-        for source_id in params.source_ids:
-            if not await dbapi_common.has_node_perm(
-                db_session,
-                node_id=source_id,
-                codename=scopes.NODE_MOVE,
-                user_id=user.id,
-            ):
-                raise exc.HTTP403Forbidden()
+        if not await dbapi_common.has_nodes_perm(
+            db_session,
+            node_ids=params.source_ids,
+            codename=scopes.NODE_MOVE,
+            user_id=user.id,
+        ):
+            raise exc.HTTP403Forbidden()
 
         if not await dbapi_common.has_node_perm(
             db_session,
@@ -410,6 +409,13 @@ async def assign_node_tags(
         ):
             raise exc.HTTP403Forbidden()
 
+        # queued task is committed along with the tags
+        send_task(
+            db_session,
+            INDEX_ADD_NODE,
+            kwargs={"node_id": str(node_id)},
+            route_name="i3",
+        )
         node, error = await nodes_dbapi.assign_node_tags(
             db_session, node_id=node_id, tags=tags, user_id=user.id
         )
@@ -419,8 +425,6 @@ async def assign_node_tags(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
-    send_task(INDEX_ADD_NODE, kwargs={"node_id": str(node_id)}, route_name="i3")
-
     return node
 
 
@@ -454,14 +458,13 @@ async def get_nodes_details(
     if len(node_ids) == 0:
         return []
 
-    for node_id in node_ids:
-        if not await dbapi_common.has_node_perm(
-            db_session,
-            node_id=node_id,
-            codename=scopes.NODE_VIEW,
-            user_id=user.id,
-        ):
-            raise exc.HTTP403Forbidden()
+    if not await dbapi_common.has_nodes_perm(
+        db_session,
+        node_ids=node_ids,
+        codename=scopes.NODE_VIEW,
+        user_id=user.id,
+    ):
+        raise exc.HTTP403Forbidden()
 
     nodes = await nodes_dbapi.get_nodes(db_session, node_ids=node_ids, user_id=user.id)
 
@@ -518,6 +521,13 @@ async def update_node_tags(
         ):
             raise exc.HTTP403Forbidden()
 
+        # queued task is committed along with the tags
+        send_task(
+            db_session,
+            INDEX_ADD_NODE,
+            kwargs={"node_id": str(node_id)},
+            route_name="i3",
+        )
         node, error = await nodes_dbapi.update_node_tags(
             db_session, node_id=node_id, tags=tags, user_id=user.id
         )
@@ -527,8 +537,6 @@ async def update_node_tags(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
-    send_task(INDEX_ADD_NODE, kwargs={"node_id": str(node_id)}, route_name="i3")
-
     return node
 
 
@@ -607,23 +615,17 @@ async def remove_node_tags(
         ):
             raise exc.HTTP403Forbidden()
 
-        # --- Log tag deletion activity BEFORE actual removal ---
-        try:
-            new_activity = UserActivityStats(
-                user_id=user.id,
-                node_id=node_id,
-                action_type="tag_delete",
-                timestamp=datetime.utcnow(),
-            )
-            db_session.add(new_activity)
-            await db_session.flush()  # ensures FK constraint passes
-        except Exception as e:
-            logger.warning(f"Failed to log tag delete activity for user {user.id}: {e}")
-
+        # queued task is committed along with the tags
+        send_task(
+            db_session,
+            INDEX_ADD_NODE,
+            kwargs={"node_id": str(node_id)},
+            route_name="i3",
+        )
         node, error = await nodes_dbapi.remove_node_tags(
             db_session, node_id=node_id, tags=tags, user_id=user.id
         )
-        await db_session.commit()  # commit activity + changes
+        await activity_writer.log_stats(user.id, "tag_delete", node_id=node_id)
 
     except EntityNotFound:
         raise HTTP404NotFound
@@ -631,6 +633,4 @@ async def remove_node_tags(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
-    send_task(INDEX_ADD_NODE, kwargs={"node_id": str(node_id)}, route_name="i3")
-
     return node
@@ -5,7 +5,7 @@ from typing import Annotated
 
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, HTTPException, Security, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, Security, Depends
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
@@ -13,9 +13,10 @@ from papermerge.core import utils
 from papermerge.core.features.users import schema as usr_schema
 from papermerge.core.features.auth import get_current_user
 from papermerge.core.features.auth import scopes
+from papermerge.core.features.document import previews
 from papermerge.core.features.document.db import api as dbapi
-from papermerge.core.pathlib import rel2abs, thumbnail_path
-from papermerge.core.utils import image
+from papermerge.core.pathlib import abs_thumbnail_path
+from papermerge.core.utils import http
 from papermerge.core.db.common import has_node_perm
 from papermerge.core.exceptions import HTTP403Forbidden, HTTP404NotFound
 from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
@@ -37,6 +38,13 @@ class JPEGFileResponse(FileResponse):
     media_type = "application/jpeg"
 
 
+# thumbnail of the document changes when new version is uploaded, thus
+# clients must revalidate it (cheap, thanks to ETag / 304 responses)
+CACHE_CONTROL = "private, no-cache"
+# seconds after which client may ask again for thumbnail being rendered
+RETRY_AFTER = 2
+
+
 @router.get(
     "/{document_id}",
     response_class=JPEGFileResponse,
@@ -48,6 +56,10 @@ class JPEGFileResponse(FileResponse):
             code.""",
             "content": OPEN_API_GENERIC_JSON_DETAIL,
         },
+        304: {
+            "description": """Thumbnail did not change since the version
+            client has (as per `If-None-Match` / `If-Modified-Since` headers)""",
+        },
         404: {
             "description": """Document with specified UUID was not found""",
             "content": OPEN_API_GENERIC_JSON_DETAIL,
@@ -57,6 +69,7 @@ class JPEGFileResponse(FileResponse):
 @utils.docstring_parameter(scope=scopes.NODE_VIEW)
 async def get_document_thumbnail(
     document_id: uuid.UUID,
+    request: Request,
     user: Annotated[
         usr_schema.User, Security(get_current_user, scopes=[scopes.NODE_VIEW])
     ],
@@ -64,6 +77,10 @@ async def get_document_thumbnail(
 ):
     """Retrieves thumbnail of the document last version's first page
 
+    Thumbnails are pre-generated in background; if thumbnail is not
+    rendered yet, its rendering is scheduled and response has status
+    code 309 (with `Retry-After` header).
+
     Required scope: `{scope}`
     """
 
@@ -85,14 +102,28 @@ async def get_document_thumbnail(
             detail="Not ready for preview yet",
         )
 
-    jpg_abs_path = rel2abs(thumbnail_path(page.id))
+    jpg_abs_path = abs_thumbnail_path(page.id)
 
-    if not os.path.exists(jpg_abs_path):
-        image.gen_doc_thumbnail(
-            page_id=page.id,
-            doc_ver_id=doc_ver.id,
-            page_number=1,
-            file_name=doc_ver.file_name,
+    try:
+        stat_result = os.stat(jpg_abs_path)
+    except FileNotFoundError:
+        previews.schedule_doc_ver(doc_ver)
+        raise HTTPException(
+            status_code=309,
+            detail="Not ready for preview yet",
+            headers={"Retry-After": str(RETRY_AFTER)},
         )
 
-    return JPEGFileResponse(jpg_abs_path)
+    headers = {
+        "ETag": http.file_etag(stat_result),
+        "Last-Modified": http.http_date(stat_result.st_mtime),
+        "Cache-Control": CACHE_CONTROL,
+    }
+    if http.is_not_modified(
+        request.headers,
+        etag=headers["ETag"],
+        last_modified=stat_result.st_mtime,
+    ):
+        return Response(status_code=304, headers=headers)
+
+    return JPEGFileResponse(jpg_abs_path, headers=headers, stat_result=stat_result)
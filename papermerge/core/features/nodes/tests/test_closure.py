@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.db import closure
+from papermerge.core.db.common import (
+    count_descendants,
+    get_ancestors,
+    get_descendants,
+)
+from papermerge.core.features.nodes.db import api as nodes_dbapi
+
+
+@pytest.fixture()
+def closure_enabled(monkeypatch):
+    monkeypatch.setattr(
+        closure.config, "papermerge__main__nodes_closure_table", True
+    )
+
+
+async def test_closure_ancestors_of_new_nodes(
+    closure_enabled, make_folder, make_document, user, db_session: AsyncSession
+):
+    await closure.rebuild(db_session)
+    my_docs = await make_folder("My Documents", user=user, parent=user.home_folder)
+    vertraege = await make_folder("Verträge", user=user, parent=my_docs)
+    vz = await make_document("vertrag.pdf", user=user, parent=vertraege)
+
+    actual_titles = [
+        item[1]
+        for item in await get_ancestors(db_session, node_id=vz.id, include_self=False)
+    ]
+
+    assert actual_titles == ["home", "My Documents", "Verträge"]
+
+
+async def test_closure_descendants(
+    closure_enabled, make_folder, make_document, user, db_session: AsyncSession
+):
+    await closure.rebuild(db_session)
+    f1 = await make_folder("F1", user=user, parent=user.home_folder)
+    f2 = await make_folder("F2", user=user, parent=f1)
+    doc = await make_document("doc.pdf", user=user, parent=f2)
+    await make_folder("Other", user=user, parent=user.home_folder)
+
+    descendant_ids = {
+        item[0] for item in await get_descendants(db_session, node_ids=[f1.id])
+    }
+
+    assert descendant_ids == {f1.id, f2.id, doc.id}
+
+
+async def test_count_descendants_closure_and_cte_agree(
+    monkeypatch, make_folder, make_document, user, db_session: AsyncSession
+):
+    monkeypatch.setattr(closure.config, "papermerge__main__nodes_closure_table", True)
+    await closure.rebuild(db_session)
+    f1 = await make_folder("F1", user=user, parent=user.home_folder)
+    f2 = await make_folder("F2", user=user, parent=f1)
+    await make_document("doc1.pdf", user=user, parent=f1)
+    await make_document("doc2.pdf", user=user, parent=f2)
+    empty = await make_folder("Empty", user=user, parent=user.home_folder)
+    node_ids = [f1.id, f2.id, empty.id]
+
+    with_closure = await count_descendants(db_session, node_ids)
+    monkeypatch.setattr(closure.config, "papermerge__main__nodes_closure_table", False)
+    with_cte = await count_descendants(db_session, node_ids)
+
+    assert with_closure == with_cte == {f1.id: 3, f2.id: 1, empty.id: 0}
+
+
+async def test_closure_move_nodes(
+    closure_enabled, make_folder, make_document, user, db_session: AsyncSession
+):
+    await closure.rebuild(db_session)
+    f1 = await make_folder("F1", user=user, parent=user.home_folder)
+    f2 = await make_folder("F2", user=user, parent=f1)
+    doc = await make_document("doc.pdf", user=user, parent=f2)
+    target = await make_folder("Target", user=user, parent=user.inbox_folder)
+
+    await nodes_dbapi.move_nodes(db_session, source_ids=[f2.id], target_id=target.id)
+
+    actual_titles = [
+        item[1]
+        for item in await get_ancestors(db_session, node_id=doc.id, include_self=False)
+    ]
+    assert actual_titles == ["inbox", "Target", "F2"]
+
+    descendant_ids = {
+        item[0] for item in await get_descendants(db_session, node_ids=[f1.id])
+    }
+    assert descendant_ids == {f1.id}
+
+
+async def test_closure_rebuild_matches_incremental_maintenance(
+    closure_enabled, make_folder, make_document, user, db_session: AsyncSession
+):
+    await closure.rebuild(db_session)
+    f1 = await make_folder("F1", user=user, parent=user.home_folder)
+    f2 = await make_folder("F2", user=user, parent=f1)
+    await make_document("doc.pdf", user=user, parent=f2)
+    target = await make_folder("Target", user=user, parent=user.inbox_folder)
+    await nodes_dbapi.move_nodes(db_session, source_ids=[f2.id], target_id=target.id)
+
+    stmt = select(
+        orm.NodeClosure.ancestor_id,
+        orm.NodeClosure.descendant_id,
+        orm.NodeClosure.depth,
+    )
+    incremental = set((await db_session.execute(stmt)).all())
+    count = await closure.rebuild(db_session)
+    rebuilt = set((await db_session.execute(stmt)).all())
+
+    assert incremental == rebuilt
+    assert count == len(rebuilt)
+
+
+async def test_closure_rows_are_removed_with_node(
+    closure_enabled, make_folder, user, db_session: AsyncSession
+):
+    await closure.rebuild(db_session)
+    f1 = await make_folder("F1", user=user, parent=user.home_folder)
+    await make_folder("F2", user=user, parent=f1)
+
+    await nodes_dbapi.delete_nodes(db_session, node_ids=[f1.id], user_id=user.id)
+
+    stmt = select(func.count()).where(
+        (orm.NodeClosure.ancestor_id == f1.id) | (orm.NodeClosure.descendant_id == f1.id)
+    )
+    assert (await db_session.execute(stmt)).scalar() == 0
@@ -1,6 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from papermerge.core.db.common import get_ancestors, has_node_perm
+from papermerge.core.db.common import (
+    get_ancestors,
+    has_node_perm,
+    has_nodes_perm,
+    NODE_PERMS_CACHE_KEY,
+)
 from papermerge.core.features.auth import scopes
 from papermerge.core import dbapi
 
@@ -122,3 +127,71 @@ async def test_has_node_perm_recursive_nodes(
         assert not await has_node_perm(
             db_session, node_id=node_id, codename=scopes.NODE_UPDATE, user_id=david.id
         )
+
+
+async def test_has_nodes_perm(
+    make_user, make_folder, make_document, db_session: AsyncSession
+):
+    """
+    John shares folder "receipts" with David. David should have access
+    to all nodes of the "receipts" subtree, but as soon as one of
+    John's private nodes is part of the batch - the check fails.
+    """
+    await dbapi.sync_perms(db_session)
+
+    john = await make_user("john", is_superuser=False)
+    david = await make_user("david", is_superuser=False)
+
+    receipts = await make_folder("John's Receipts", user=john, parent=john.home_folder)
+    descendant_f1 = await make_folder("Descendant F1", user=john, parent=receipts)
+    grandchild_d1 = await make_document("Grandchild D1", user=john, parent=descendant_f1)
+    private = await make_folder("Private", user=john, parent=john.home_folder)
+    davids_folder = await make_folder("David's", user=david, parent=david.home_folder)
+
+    role, _ = await dbapi.create_role(db_session, "View Node Role", scopes=[scopes.NODE_VIEW])
+    await dbapi.create_shared_nodes(
+        db_session,
+        user_ids=[david.id],
+        node_ids=[receipts.id],
+        role_ids=[role.id],
+        owner_id=john.id,
+    )
+
+    shared_ids = [receipts.id, descendant_f1.id, grandchild_d1.id]
+
+    assert await has_nodes_perm(
+        db_session,
+        node_ids=shared_ids + [davids_folder.id],
+        codename=scopes.NODE_VIEW,
+        user_id=david.id,
+    )
+    assert not await has_nodes_perm(
+        db_session,
+        node_ids=shared_ids + [private.id],
+        codename=scopes.NODE_VIEW,
+        user_id=david.id,
+    )
+    assert not await has_nodes_perm(
+        db_session,
+        node_ids=shared_ids,
+        codename=scopes.NODE_UPDATE,
+        user_id=david.id,
+    )
+
+
+async def test_has_node_perm_is_memoized_until_commit(
+    make_user, make_folder, db_session: AsyncSession
+):
+    await dbapi.sync_perms(db_session)
+    john = await make_user("john", is_superuser=False)
+    receipts = await make_folder("John's Receipts", user=john, parent=john.home_folder)
+
+    assert await has_node_perm(
+        db_session, node_id=receipts.id, codename=scopes.NODE_VIEW, user_id=john.id
+    )
+    cache = db_session.info[NODE_PERMS_CACHE_KEY]
+    assert cache[(john.id, scopes.NODE_VIEW)] == {receipts.id: True}
+
+    await db_session.commit()
+
+    assert NODE_PERMS_CACHE_KEY not in db_session.info
@@ -380,3 +380,42 @@ async def test_move_nodes(
         result = await db_session.execute(stmt)
         node = result.scalar_one()
         assert node.group_id == family.id
+
+
+async def test_get_nodes_query_count_does_not_depend_on_nodes_count(
+    make_folder, make_document, count_queries, db_session: AsyncSession, user
+):
+    folder = await make_folder(title="My Documents", parent=user.home_folder, user=user)
+    docs = [
+        await make_document(title=f"doc{i}.pdf", user=user, parent=folder)
+        for i in range(5)
+    ]
+
+    with count_queries() as queries:
+        few = await dbapi.get_nodes(db_session, node_ids=[folder.id, docs[0].id])
+    few_count = len(queries)
+
+    with count_queries() as queries:
+        many = await dbapi.get_nodes(
+            db_session, node_ids=[folder.id] + [doc.id for doc in docs]
+        )
+
+    assert len(few) == 2
+    assert len(many) == 6
+    assert len(queries) == few_count
+    assert few_count <= 7
+
+
+async def test_get_nodes_breadcrumbs_and_versions(
+    make_folder, make_document, db_session: AsyncSession, user
+):
+    folder = await make_folder(title="My Documents", parent=user.home_folder, user=user)
+    doc = await make_document(title="doc.pdf", user=user, parent=folder)
+
+    nodes = await dbapi.get_nodes(db_session, node_ids=[folder.id, doc.id])
+    by_id = {node.id: node for node in nodes}
+
+    assert [title for _, title in by_id[folder.id].breadcrumb] == ["home"]
+    assert [title for _, title in by_id[doc.id].breadcrumb] == ["home", "My Documents"]
+    assert isinstance(by_id[doc.id], schema.Document)
+    assert len(by_id[doc.id].versions) == 1
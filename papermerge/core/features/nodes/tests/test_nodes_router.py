@@ -671,3 +671,78 @@ async def test_get_node_tags_router_when_node_is_document(
     tag_names = {schema.Tag.model_validate(t).name for t in response.json()}
 
     assert tag_names == {"tag1", "tag2"}
+
+
+async def test_get_node_cursor_pagination(
+    make_folder, make_document, user, auth_api_client: AuthTestClient
+):
+    """Walking pages with `next_cursor` returns the same nodes, in the same
+    order, as walking them by page number
+    """
+    for i in range(4):
+        await make_folder(title=f"folder {i}", user=user, parent=user.home_folder)
+        await make_document(title=f"doc {i}.pdf", user=user, parent=user.home_folder)
+
+    url = f"/nodes/{user.home_folder.id}"
+    # nodes created in one transaction have same created_at / updated_at
+    for order_by in ("ctype", "-title", "-created_at"):
+        by_number = []
+        for page_number in range(1, 4):
+            params = {"page_size": 3, "page_number": page_number, "order_by": order_by}
+            response = await auth_api_client.get(url, params=params)
+            assert response.status_code == 200, response.json()
+            by_number.extend(item["id"] for item in response.json()["items"])
+
+        by_cursor = []
+        params = {"page_size": 3, "order_by": order_by, "total": "none"}
+        while True:
+            response = await auth_api_client.get(url, params=params)
+            assert response.status_code == 200, response.json()
+            page = response.json()
+            assert page["num_pages"] is None
+            by_cursor.extend(item["id"] for item in page["items"])
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+
+        assert len(by_cursor) == 8
+        assert by_cursor == by_number
+
+
+async def test_get_node_total_and_next_cursor(
+    make_folder, user, auth_api_client: AuthTestClient
+):
+    for i in range(3):
+        await make_folder(title=f"folder {i}", user=user, parent=user.home_folder)
+
+    url = f"/nodes/{user.home_folder.id}"
+    response = await auth_api_client.get(url, params={"page_size": 2, "filter": "folder"})
+    page = response.json()
+    assert page["num_pages"] == 2
+    assert page["total"] == 3
+
+    response = await auth_api_client.get(
+        url, params={"page_size": 2, "cursor": page["next_cursor"]}
+    )
+    page = response.json()
+    assert [item["title"] for item in page["items"]] == ["folder 2"]
+    assert page["next_cursor"] is None
+
+
+async def test_get_node_invalid_cursor(
+    make_folder, user, auth_api_client: AuthTestClient
+):
+    for i in range(2):
+        await make_folder(title=f"folder {i}", user=user, parent=user.home_folder)
+
+    url = f"/nodes/{user.home_folder.id}"
+    response = await auth_api_client.get(url, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+    response = await auth_api_client.get(url, params={"page_size": 1})
+    cursor = response.json()["next_cursor"]
+    # cursor of one order can not be used with another one
+    response = await auth_api_client.get(
+        url, params={"cursor": cursor, "order_by": "-title"}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,289 @@
+"""
+Query plan regression tests
+
+Hot queries are run against a seeded dataset; their plans (EXPLAIN, with
+the very statements and parameters the application sends) must not read
+large tables entirely. A failure usually means that an index was dropped
+or that a query was changed in a way no index can serve (e.g. a function
+applied to indexed column, a filter applied only after a CTE was
+materialized).
+
+Plans are computed with `enable_seqscan = off`: for a table of a few
+thousand rows a sequential scan is the cheapest plan even when a suitable
+index exists, thus without it results would depend on the size of the
+seeded dataset. With it, planner falls back to a sequential (or to an
+unconditional index) scan only when there is no other way.
+"""
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import dbapi, orm
+from papermerge.core.db import common as dbapi_common
+from papermerge.core.features.document.db import api as doc_dbapi
+from papermerge.core.features.nodes.db import api as nodes_dbapi
+
+# tables which grow with number of documents
+LARGE_TABLES = {
+    "nodes",
+    "documents",
+    "document_versions",
+    "pages",
+    "custom_field_values",
+    "shared_nodes",
+    "nodes_tags",
+}
+FOLDERS = 50
+DOCUMENTS = 10_000
+DOCUMENT_TYPES = 100
+
+SEED = [
+    """
+    INSERT INTO nodes (id, title, ctype, lang, user_id, parent_id, created_at, updated_at)
+    SELECT gen_random_uuid(), 'folder ' || i, 'folder', 'deu', :user_id, :home_id,
+           now(), now()
+    FROM generate_series(1, :folders) AS i
+    """,
+    """
+    INSERT INTO folders (node_id)
+    SELECT id FROM nodes WHERE parent_id = :home_id AND ctype = 'folder'
+    """,
+    """
+    INSERT INTO document_types (id, name, user_id, created_at)
+    SELECT gen_random_uuid(), 'type ' || i, :user_id, now()
+    FROM generate_series(1, :document_types) AS i
+    """,
+    """
+    INSERT INTO custom_fields (id, name, type, user_id, created_at)
+    VALUES (gen_random_uuid(), 'amount', 'int', :user_id, now()),
+           (gen_random_uuid(), 'shop', 'text', :user_id, now())
+    """,
+    """
+    INSERT INTO document_types_custom_fields (document_type_id, custom_field_id)
+    SELECT dt.id, cf.id FROM document_types dt, custom_fields cf
+    WHERE dt.user_id = :user_id AND cf.user_id = :user_id
+    """,
+    """
+    WITH folders AS (
+        SELECT id, row_number() OVER (ORDER BY id) - 1 AS n
+        FROM nodes WHERE parent_id = :home_id AND ctype = 'folder'
+    )
+    INSERT INTO nodes (id, title, ctype, lang, user_id, parent_id, created_at, updated_at)
+    SELECT gen_random_uuid(), 'document ' || i || '.pdf', 'document', 'deu',
+           :user_id, folders.id, now(), now()
+    FROM generate_series(1, :documents) AS i
+    JOIN folders ON folders.n = i % :folders
+    """,
+    """
+    WITH types AS (
+        SELECT id, row_number() OVER (ORDER BY id) - 1 AS n FROM document_types
+    )
+    INSERT INTO documents (node_id, ocr, ocr_status, document_type_id)
+    SELECT nodes.id, false, 'UNKNOWN', types.id
+    FROM nodes
+    LEFT JOIN types
+        ON types.n = abs(hashtext(nodes.id::text)) % (:document_types * 2)
+    WHERE nodes.ctype = 'document'
+    AND NOT EXISTS (SELECT 1 FROM documents WHERE documents.node_id = nodes.id)
+    """,
+    # every fifth document has two versions
+    """
+    INSERT INTO document_versions (
+        id, number, document_id, lang, size, page_count, file_name
+    )
+    SELECT gen_random_uuid(), v, node_id, 'deu', 0, 3, 'file.pdf'
+    FROM documents
+    CROSS JOIN generate_series(1, 2) AS v
+    WHERE (v = 1 OR abs(hashtext(node_id::text)) % 5 = 0)
+    AND NOT EXISTS (
+        SELECT 1 FROM document_versions dv WHERE dv.document_id = documents.node_id
+    )
+    """,
+    """
+    INSERT INTO pages (id, number, page_count, lang, text, document_version_id)
+    SELECT gen_random_uuid(), p, 3, 'deu', 'text', document_versions.id
+    FROM document_versions CROSS JOIN generate_series(1, 3) AS p
+    WHERE document_versions.file_name = 'file.pdf'
+    """,
+    """
+    INSERT INTO custom_field_values (id, document_id, field_id, value_int, created_at)
+    SELECT gen_random_uuid(), documents.node_id, custom_fields.id, 1, now()
+    FROM documents CROSS JOIN custom_fields
+    WHERE documents.document_type_id IS NOT NULL AND custom_fields.user_id = :user_id
+    """,
+    """
+    INSERT INTO tags (id, name, user_id, pinned, bg_color, fg_color)
+    VALUES (gen_random_uuid(), 'plan', :user_id, false, 'red', 'white')
+    """,
+    """
+    INSERT INTO nodes_tags (node_id, tag_id)
+    SELECT nodes.id, tags.id FROM nodes, tags
+    WHERE nodes.ctype = 'document' AND abs(hashtext(nodes.id::text)) % 3 = 0
+    AND tags.name = 'plan'
+    """,
+    """
+    INSERT INTO roles (id, name) VALUES (gen_random_uuid(), 'plan viewer')
+    """,
+    """
+    INSERT INTO shared_nodes (id, node_id, user_id, role_id, owner_id, created_at, updated_at)
+    SELECT gen_random_uuid(), nodes.id, :user_id, roles.id, :user_id, now(), now()
+    FROM nodes, roles
+    WHERE nodes.ctype = 'document' AND abs(hashtext(nodes.id::text)) % 20 = 0
+    AND roles.name = 'plan viewer'
+    """,
+    "ANALYZE",
+]
+
+
+@pytest.fixture()
+async def seeded(db_session: AsyncSession, user):
+    params = {
+        "user_id": user.id,
+        "home_id": user.home_folder_id,
+        "folders": FOLDERS,
+        "documents": DOCUMENTS,
+        "document_types": DOCUMENT_TYPES,
+    }
+    for statement in SEED:
+        await db_session.execute(text(statement), params)
+
+    return user
+
+
+@asynccontextmanager
+async def capture_queries(db_session: AsyncSession):
+    """Collects (statement, parameters) of all queries executed within"""
+    queries = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, *args):
+        queries.append((statement, parameters))
+
+    conn = (await db_session.connection()).sync_connection
+    event.listen(conn, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(conn, "before_cursor_execute", _before_cursor_execute)
+
+
+async def full_scans(db_session: AsyncSession, queries) -> list[str]:
+    """Scans of entire large tables in plans of `queries`"""
+    conn = await db_session.connection()
+    await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    found = []
+    try:
+        for statement, parameters in queries:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for node in _walk(plan[0]["Plan"]):
+                if node.get("Relation Name") in LARGE_TABLES and _is_full_scan(node):
+                    found.append(
+                        f"{node['Node Type']} on {node['Relation Name']} in:\n"
+                        f"{statement}"
+                    )
+    finally:
+        await conn.exec_driver_sql("RESET enable_seqscan")
+
+    return found
+
+
+def _is_full_scan(node: dict) -> bool:
+    if node["Node Type"] == "Seq Scan":
+        # no index could be used at all
+        return True
+    # Index scanned without condition (instead of seq scan); for smaller
+    # tables, e.g. `nodes_tags`, that can be cheaper than a nested loop of
+    # index lookups, thus only scans of (about) all documents count
+    return (
+        node["Node Type"] in ("Index Scan", "Index Only Scan")
+        and "Index Cond" not in node
+        and node["Plan Rows"] >= DOCUMENTS // 2
+    )
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+async def a_folder(db_session: AsyncSession, user) -> orm.Node:
+    stmt = text(
+        "SELECT id FROM nodes WHERE parent_id = :home_id AND ctype = 'folder' LIMIT 1"
+    )
+    return await db_session.scalar(stmt, {"home_id": user.home_folder_id})
+
+
+async def a_document(db_session: AsyncSession, document_type_id=None):
+    stmt = text(
+        "SELECT node_id FROM documents "
+        "WHERE document_type_id IS NOT DISTINCT FROM :type_id LIMIT 1"
+    )
+    return await db_session.scalar(stmt, {"type_id": document_type_id})
+
+
+async def test_get_paginated_nodes_plan(seeded, db_session: AsyncSession):
+    folder_id = await a_folder(db_session, seeded)
+
+    async with capture_queries(db_session) as queries:
+        # seeding is what takes time, thus all orderings in one test
+        for order_by in (["ctype", "title"], ["-title"], ["-created_at"]):
+            page = await nodes_dbapi.get_paginated_nodes(
+                db_session,
+                parent_id=folder_id,
+                user_id=seeded.id,
+                page_size=20,
+                page_number=3,
+                order_by=order_by,
+            )
+            await nodes_dbapi.get_paginated_nodes(
+                db_session,
+                parent_id=folder_id,
+                user_id=seeded.id,
+                page_size=20,
+                page_number=1,
+                order_by=order_by,
+                cursor=page.next_cursor,
+            )
+
+    assert await full_scans(db_session, queries) == []
+
+
+async def test_has_node_perm_plan(seeded, db_session: AsyncSession):
+    doc_id = await a_document(db_session)
+
+    async with capture_queries(db_session) as queries:
+        await dbapi_common.has_node_perm(
+            db_session, node_id=doc_id, codename="node.view", user_id=seeded.id
+        )
+
+    assert len(queries) == 1
+    assert await full_scans(db_session, queries) == []
+
+
+async def test_get_docs_by_type_plan(seeded, db_session: AsyncSession):
+    type_id = await db_session.scalar(text("SELECT id FROM document_types LIMIT 1"))
+
+    async with capture_queries(db_session) as queries:
+        for order_by in (None, "amount"):
+            docs = await doc_dbapi.get_docs_by_type(
+                db_session, type_id=type_id, user_id=seeded.id, order_by=order_by
+            )
+            assert len(docs) > 0
+    assert await full_scans(db_session, queries) == []
+
+
+async def test_get_last_doc_ver_plan(seeded, db_session: AsyncSession):
+    doc_id = await a_document(db_session)
+
+    async with capture_queries(db_session) as queries:
+        await dbapi.get_last_doc_ver(db_session, doc_id=doc_id)
+
+    assert await full_scans(db_session, queries) == []
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import dbapi, orm
+from papermerge.core.features.auth import scopes
+from papermerge.search.backends.postgres import PGBackend
+from papermerge.search import indexer
+from papermerge.search.backends.sqlite import fts5_query
+from papermerge.search.db.orm import SearchIndexEntry
+from papermerge.search.schema import Folder, SearchIndex
+
+
+def page_item(doc, text: str, page_number: int = 1, lang: str = "deu", tags=None):
+    return SearchIndex(
+        id=str(uuid.uuid4()),
+        document_id=str(doc.id),
+        title=doc.title,
+        user_id=str(doc.user_id),
+        lang=lang,
+        text=text,
+        page_number=page_number,
+        tags=tags or [],
+    )
+
+
+async def test_search_uses_language_stemming(
+    make_document, user, db_session: AsyncSession
+):
+    backend = PGBackend()
+    invoice = await make_document("scan-01.pdf", user=user, parent=user.home_folder)
+    letter = await make_document("scan-02.pdf", user=user, parent=user.home_folder)
+    await backend.add(
+        db_session,
+        [
+            page_item(invoice, "Die Rechnungen wurden bezahlt", lang="deu"),
+            page_item(letter, "He was running late", lang="eng"),
+        ],
+    )
+
+    result = await backend.search(db_session, "Rechnung", user_id=user.id)
+    assert [item.document_id for item in result.items] == [str(invoice.id)]
+
+    result = await backend.search(db_session, "runs", user_id=user.id)
+    assert [item.document_id for item in result.items] == [str(letter.id)]
+
+    # German stemming does not reduce "running" to "run"
+    result = await backend.search(db_session, "running", user_id=user.id, lang="deu")
+    assert result.items == []
+
+
+async def test_search_returns_best_page_once_per_document(
+    make_document, make_folder, user, db_session: AsyncSession
+):
+    backend = PGBackend()
+    doc = await make_document("Vertrag.pdf", user=user, parent=user.home_folder)
+    other = await make_document("scan.pdf", user=user, parent=user.home_folder)
+    folder = await make_folder("Contracts", user=user, parent=user.home_folder)
+    best_page = page_item(other, "Vertrag und noch ein Vertrag", page_number=2)
+    await backend.add(
+        db_session,
+        [
+            page_item(doc, "Anlage", page_number=1),
+            page_item(doc, "Seite zwei", page_number=2),
+            page_item(other, "ein Vertrag", page_number=1),
+            best_page,
+            SearchIndex(
+                id=str(folder.id),
+                title=folder.title,
+                user_id=str(user.id),
+                lang="eng",
+            ),
+        ],
+    )
+
+    result = await backend.search(db_session, "Vertrag", user_id=user.id)
+    assert len(result.items) == 2
+    # title match ranks higher than text match
+    assert result.items[0].document_id == str(doc.id)
+    assert result.items[1].id == best_page.id
+    assert result.items[1].page_number == 2
+
+    result = await backend.search(db_session, "Vertrag", user_id=user.id, page_size=1)
+    assert result.num_pages == 2
+    assert result.items[0].document_id == str(doc.id)
+
+    result = await backend.search(
+        db_session, "Vertrag", user_id=user.id, page_size=1, page_number=2
+    )
+    assert result.items[0].id == best_page.id
+
+    result = await backend.search(db_session, "contract", user_id=user.id)
+    assert isinstance(result.items[0], Folder)
+    assert result.items[0].id == str(folder.id)
+
+
+async def test_search_filters_by_permissions(
+    make_user, make_document, make_folder, db_session: AsyncSession
+):
+    await dbapi.sync_perms(db_session)
+    backend = PGBackend()
+    john = await make_user("john", is_superuser=False)
+    david = await make_user("david", is_superuser=False)
+    shared = await make_folder("Shared", user=john, parent=john.home_folder)
+    shared_doc = await make_document("shared.pdf", user=john, parent=shared)
+    private_doc = await make_document("private.pdf", user=john, parent=john.home_folder)
+    await backend.add(
+        db_session,
+        [
+            page_item(shared_doc, "Steuererklärung 2024"),
+            page_item(private_doc, "Steuererklärung 2023"),
+        ],
+    )
+
+    result = await backend.search(db_session, "Steuererklärung", user_id=david.id)
+    assert result.items == []
+
+    role, _ = await dbapi.create_role(
+        db_session, "View Node Role", scopes=[scopes.NODE_VIEW]
+    )
+    await dbapi.create_shared_nodes(
+        db_session,
+        user_ids=[david.id],
+        node_ids=[shared.id],
+        role_ids=[role.id],
+        owner_id=john.id,
+    )
+
+    result = await backend.search(db_session, "Steuererklärung", user_id=david.id)
+    assert [item.document_id for item in result.items] == [str(shared_doc.id)]
+
+    result = await backend.search(db_session, "Steuererklärung", user_id=john.id)
+    assert len(result.items) == 2
+
+
+async def test_search_index_add_replaces_and_remove(
+    make_document, user, db_session: AsyncSession
+):
+    backend = PGBackend()
+    doc = await make_document("notes.pdf", user=user, parent=user.home_folder)
+    item = page_item(doc, "erste Fassung", tags=["draft"])
+    await backend.add(db_session, [item])
+
+    result = await backend.search(db_session, "draft", user_id=user.id)
+    assert result.items[0].tags == ["draft"]
+
+    item.text = "zweite Fassung"
+    await backend.add(db_session, [item])
+    assert (await backend.search(db_session, "erste", user_id=user.id)).items == []
+    assert len((await backend.search(db_session, "zweite", user_id=user.id)).items) == 1
+
+    await backend.remove(db_session, [item.id])
+    assert (await backend.search(db_session, "zweite", user_id=user.id)).items == []
+
+
+async def test_search_rejects_invalid_paging(auth_api_client):
+    for params in (
+        {"page_size": 0},
+        {"page_size": 1000},
+        {"page_number": 0},
+        {"page_number": -1},
+    ):
+        response = await auth_api_client.get("/search/", params={"q": "x", **params})
+
+        assert response.status_code == 422, params
+
+    response = await auth_api_client.get(
+        "/search/", params={"q": "x", "page_number": 2, "page_size": 100}
+    )
+    assert response.status_code == 200
+    assert response.json()["num_pages"] == 0
+
+
+def test_fts5_query():
+    assert fts5_query("invoice 2024") == '"invoice" "2024"'
+    # FTS5 operators and syntax characters are not interpreted
+    assert fts5_query('title:"x" OR NEAR(a') == '"title" "x" "OR" "NEAR" "a"'
+    assert fts5_query("?!") is None
+
+
+def shared_session(db_session: AsyncSession):
+    """Session factory for indexer workers, all using test's session in turn"""
+    lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def factory():
+        async with lock:
+            yield db_session
+
+    return factory
+
+
+async def add_version(db_session: AsyncSession, doc, number: int, texts: list[str]):
+    doc_ver = orm.DocumentVersion(document_id=doc.id, number=number)
+    db_session.add(doc_ver)
+    await db_session.flush()
+    for page_number, text in enumerate(texts, start=1):
+        db_session.add(
+            orm.Page(
+                document_version_id=doc_ver.id,
+                number=page_number,
+                page_count=len(texts),
+                text=text,
+                lang="deu",
+            )
+        )
+    await db_session.flush()
+
+
+async def test_index_nodes_in_chunks(
+    make_document, make_folder, user, db_session: AsyncSession
+):
+    backend = PGBackend()
+    doc = await make_document("brief.pdf", user=user, parent=user.home_folder)
+    await add_version(db_session, doc, number=2, texts=["alte Fassung"])
+    await add_version(db_session, doc, number=3, texts=["Mahnung", "Anhang"])
+    folder = await make_folder("Mahnung", user=user, parent=user.home_folder)
+    node_ids = [doc.id, folder.id, user.home_folder.id]
+
+    stats = await indexer.index_nodes(
+        backend,
+        node_ids=node_ids,
+        chunk_size=1,
+        workers=2,
+        session_factory=shared_session(db_session),
+    )
+
+    assert (stats.nodes, stats.documents, stats.pages) == (3, 1, 2)
+    result = await backend.search(db_session, "Mahnung", user_id=user.id)
+    assert len(result.items) == 2
+    found = {getattr(item, "document_id", item.id) for item in result.items}
+    assert found == {str(doc.id), str(folder.id)}
+    # only last version is indexed
+    assert (await backend.search(db_session, "Fassung", user_id=user.id)).items == []
+
+
+async def test_index_nodes_drops_entries_of_replaced_versions(
+    make_document, user, db_session: AsyncSession
+):
+    backend = PGBackend()
+    doc = await make_document("brief.pdf", user=user, parent=user.home_folder)
+    await add_version(db_session, doc, number=2, texts=["alte Fassung"])
+    await indexer.index_nodes(
+        backend, node_ids=[doc.id], session_factory=shared_session(db_session)
+    )
+    assert len((await backend.search(db_session, "Fassung", user_id=user.id)).items) == 1
+
+    await add_version(db_session, doc, number=3, texts=["Mahnung"])
+    await indexer.index_nodes(
+        backend, node_ids=[doc.id], session_factory=shared_session(db_session)
+    )
+
+    assert (await backend.search(db_session, "Fassung", user_id=user.id)).items == []
+    assert len((await backend.search(db_session, "Mahnung", user_id=user.id)).items) == 1
+
+
+async def test_index_nodes_resumes_from_checkpoint(
+    make_folder, user, db_session: AsyncSession, tmp_path
+):
+    backend = PGBackend()
+    folders = [
+        await make_folder(f"Ordner {i}", user=user, parent=user.home_folder)
+        for i in range(5)
+    ]
+    node_ids = sorted(folder.id for folder in folders)
+    path = tmp_path / "checkpoint.json"
+    path.write_text(json.dumps({"last_node_id": str(node_ids[1])}))
+
+    stats = await indexer.index_nodes(
+        backend,
+        node_ids=node_ids,
+        chunk_size=2,
+        checkpoint=indexer.Checkpoint(path),
+        session_factory=shared_session(db_session),
+    )
+
+    assert stats.nodes == 3
+    indexed = await db_session.scalars(select(SearchIndexEntry.node_id))
+    assert sorted(indexed) == node_ids[2:]
+    # all done, next run starts from the beginning
+    assert not path.exists()
+
+
+def test_checkpoint_advances_over_consecutive_chunks(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    checkpoint = indexer.Checkpoint(path)
+    ids = [uuid.uuid4() for _ in range(3)]
+
+    checkpoint.done(1, ids[1])
+    assert checkpoint.last_node_id is None
+    assert not path.exists()
+
+    checkpoint.done(0, ids[0])
+    assert checkpoint.last_node_id == ids[1]
+
+    checkpoint.done(2, ids[2])
+    assert indexer.Checkpoint(path).last_node_id == ids[2]
@@ -0,0 +1,160 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import dbapi, orm, schema
+from papermerge.core.features.nodes.db import api as nodes_dbapi
+from papermerge.search import sync
+from papermerge.search.backends.postgres import PGBackend
+from papermerge.search.db import triggers
+from papermerge.search.db.orm import SearchChange, SearchIndexEntry
+
+
+async def search(db_session, query: str, user) -> list[str]:
+    result = await PGBackend().search(db_session, query, user_id=user.id)
+    return sorted(getattr(item, "document_id", item.id) for item in result.items)
+
+
+async def add_pages(db_session: AsyncSession, doc, texts: list[str]):
+    doc_ver = await dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+    for number, text in enumerate(texts, start=1):
+        db_session.add(
+            orm.Page(
+                document_version_id=doc_ver.id,
+                number=number,
+                page_count=len(texts),
+                text=text,
+                lang="deu",
+            )
+        )
+    await db_session.flush()
+
+    return doc_ver
+
+
+async def test_changes_are_logged_and_synced(
+    make_document, make_folder, user, db_session: AsyncSession
+):
+    backend = PGBackend()
+    doc = await make_document("scan.pdf", user=user, parent=user.home_folder)
+    doc_ver = await add_pages(db_session, doc, ["Kaufvertrag", "Anlage"])
+    folder = await make_folder("Verträge", user=user, parent=user.home_folder)
+
+    result = await sync.sync(db_session, backend)
+    assert result.nodes >= 2
+    assert await search(db_session, "Kaufvertrag", user) == [str(doc.id)]
+    assert await search(db_session, "Verträge", user) == [str(folder.id)]
+    # log is consumed
+    assert await db_session.scalar(select(func.count()).select_from(SearchChange)) == 0
+
+    # page text written directly (e.g. by OCR worker)
+    await db_session.execute(
+        update(orm.Page)
+        .where(orm.Page.document_version_id == doc_ver.id, orm.Page.number == 2)
+        .values(text="Grundbuchauszug")
+    )
+    tag = orm.Tag(name="wichtig", user_id=user.id)
+    db_session.add(tag)
+    await db_session.flush()
+    db_session.add(orm.NodeTagsAssociation(node_id=doc.id, tag_id=tag.id))
+    await nodes_dbapi.update_node(
+        db_session,
+        node_id=folder.id,
+        user_id=user.id,
+        attrs=schema.UpdateNode(title="Mietverträge"),
+    )
+
+    await sync.sync(db_session, backend)
+    assert await search(db_session, "Grundbuchauszug", user) == [str(doc.id)]
+    assert await search(db_session, "Anlage", user) == []
+    assert await search(db_session, "wichtig", user) == [str(doc.id)]
+    assert await search(db_session, "Mietverträge", user) == [str(folder.id)]
+
+    await db_session.execute(delete(orm.Node).where(orm.Node.id == doc.id))
+    await sync.sync(db_session, backend)
+    assert await search(db_session, "Kaufvertrag", user) == []
+
+
+async def test_sync_indexes_only_last_version(
+    make_document, user, db_session: AsyncSession
+):
+    backend = PGBackend()
+    doc = await make_document("scan.pdf", user=user, parent=user.home_folder)
+    await add_pages(db_session, doc, ["Entwurf"])
+    await sync.sync(db_session, backend)
+
+    new_ver = orm.DocumentVersion(document_id=doc.id, number=2)
+    db_session.add(new_ver)
+    await db_session.flush()
+    await add_pages(db_session, doc, ["Endfassung"])
+
+    await sync.sync(db_session, backend, batch_size=1)
+    assert await search(db_session, "Entwurf", user) == []
+    assert await search(db_session, "Endfassung", user) == [str(doc.id)]
+
+
+async def test_reconcile_queues_missing_and_outdated_nodes(
+    make_document, make_folder, user, db_session: AsyncSession
+):
+    backend = PGBackend()
+    doc = await make_document("scan.pdf", user=user, parent=user.home_folder)
+    await add_pages(db_session, doc, ["Quittung"])
+    folder = await make_folder("Belege", user=user, parent=user.home_folder)
+    await sync.sync(db_session, backend)
+    assert await sync.reconcile(db_session) == 0
+
+    # e.g. index entries lost or written before the log existed
+    await db_session.execute(
+        delete(SearchIndexEntry).where(SearchIndexEntry.node_id == doc.id)
+    )
+    await db_session.execute(
+        update(SearchIndexEntry)
+        .where(SearchIndexEntry.node_id == folder.id)
+        .values(updated_at=func.now() - func.make_interval(0, 0, 0, 1))
+    )
+
+    assert await sync.reconcile(db_session) == 2
+    await sync.sync(db_session, backend)
+    assert await search(db_session, "Quittung", user) == [str(doc.id)]
+
+
+async def test_sync_worker_drains_log(make_folder, user, db_session: AsyncSession):
+    synced = asyncio.Event()
+
+    @asynccontextmanager
+    async def session_factory():
+        # test data is not committed: worker uses the test's session, which
+        # is not touched until the worker is done with it
+        yield db_session
+        synced.set()
+
+    worker = sync.SearchSync(
+        interval=60, backend=PGBackend, session_factory=session_factory
+    )
+    folder = await make_folder("Rechnungen", user=user, parent=user.home_folder)
+
+    worker.start()
+    await asyncio.wait_for(synced.wait(), timeout=10)
+    await worker.shutdown()
+
+    assert not worker.running
+    assert await db_session.scalar(select(func.count()).select_from(SearchChange)) == 0
+    assert await search(db_session, "Rechnungen", user) == [str(folder.id)]
+
+
+async def test_uninstalled_triggers_log_nothing(
+    make_folder, user, db_session: AsyncSession
+):
+    conn = await db_session.connection()
+    await make_folder("Alt", user=user, parent=user.home_folder)
+
+    await conn.run_sync(triggers.uninstall)
+    # log is discarded, new changes are not logged
+    await make_folder("Neu", user=user, parent=user.home_folder)
+    assert await db_session.scalar(select(func.count()).select_from(SearchChange)) == 0
+
+    await conn.run_sync(triggers.install)
+    await make_folder("Neuer", user=user, parent=user.home_folder)
+    assert await db_session.scalar(select(func.count()).select_from(SearchChange)) == 1
@@ -1,6 +1,12 @@
-import uuid
+import asyncio
 
-from papermerge.core.tests.types import AuthTestClient, TestClient
+from papermerge.core.features.document import previews
+from papermerge.core.features.document.db import api as dbapi
+from papermerge.core.features.nodes import router_thumbnails
+from papermerge.core.pathlib import abs_thumbnail_path
+from papermerge.core.tests.types import AuthTestClient
+from papermerge.core.types import ImagePreviewStatus
+from papermerge.core.utils import image
 
 
 async def test_thumbnails_router(
@@ -9,6 +15,12 @@ async def test_thumbnails_router(
     doc = await make_document_with_pages(
         title="brief.pdf", parent=user.home_folder, user=user
     )
+    # thumbnail is not rendered yet; its rendering is scheduled
+    response = await auth_api_client.get(f"/thumbnails/{doc.id}")
+    assert response.status_code == 309
+
+    await asyncio.gather(*previews._in_flight.values())
+
     response = await auth_api_client.get(f"/thumbnails/{doc.id}")
 
     assert response.status_code == 200
@@ -27,3 +39,79 @@ async def test_thumbnails_router_no_auth(
     response = await api_client.get(f"/thumbnails/{doc.id}")
 
     assert response.status_code == 401
+
+
+async def test_thumbnail_not_ready_does_not_block(
+    auth_api_client: AuthTestClient, make_document_with_pages, user, monkeypatch
+):
+    """Missing thumbnail is rendered in background, exactly once"""
+    rendered = []
+    statuses = []
+    release = asyncio.Event()
+
+    orig_run_in_pool = previews.executor.run_in_pool
+
+    async def run_in_pool(func, *args, **kwargs):
+        if func is not image.gen_doc_ver_previews:
+            return await orig_run_in_pool(func, *args, **kwargs)
+        rendered.append(args)
+        await release.wait()
+        return len(kwargs["pages"])
+
+    async def set_status(doc_id, status, error=None):
+        statuses.append(status)
+
+    monkeypatch.setattr(previews.executor, "run_in_pool", run_in_pool)
+    monkeypatch.setattr(previews, "_set_status", set_status)
+
+    doc = await make_document_with_pages(
+        title="brief.pdf", parent=user.home_folder, user=user
+    )
+    first = await auth_api_client.get(f"/thumbnails/{doc.id}")
+    second = await auth_api_client.get(f"/thumbnails/{doc.id}")
+    release.set()
+    await asyncio.gather(*previews._in_flight.values())
+
+    assert first.status_code == 309
+    assert first.headers["Retry-After"] == str(router_thumbnails.RETRY_AFTER)
+    assert second.status_code == 309
+    # concurrent requests were coalesced into one rendering
+    assert len(rendered) == 1
+    assert statuses == [ImagePreviewStatus.pending, ImagePreviewStatus.ready]
+
+
+async def test_thumbnail_conditional_get(
+    auth_api_client: AuthTestClient, make_document_with_pages, user, db_session
+):
+    doc = await make_document_with_pages(
+        title="brief.pdf", parent=user.home_folder, user=user
+    )
+    doc_ver = await dbapi.get_last_doc_ver(db_session, doc_id=doc.id)
+    page = await dbapi.get_first_page(db_session, doc_ver_id=doc_ver.id)
+    thb_path = abs_thumbnail_path(page.id)
+    thb_path.parent.mkdir(parents=True)
+    thb_path.write_bytes(b"jpeg")
+
+    response = await auth_api_client.get(f"/thumbnails/{doc.id}")
+    assert response.status_code == 200
+    assert response.content == b"jpeg"
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    response = await auth_api_client.get(
+        f"/thumbnails/{doc.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    response = await auth_api_client.get(
+        f"/thumbnails/{doc.id}", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+    response = await auth_api_client.get(
+        f"/thumbnails/{doc.id}", headers={"If-None-Match": '"outdated"'}
+    )
+    assert response.status_code == 200
+
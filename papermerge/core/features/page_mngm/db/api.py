@@ -1,5 +1,6 @@
 """Page Management"""
 
+import asyncio
 import io
 import logging
 import uuid
@@ -11,12 +12,12 @@ from sqlalchemy import select, delete, ScalarResult
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from papermerge.core import tasks
+from papermerge.core import executor, tasks
 from papermerge.core import constants as const
+from papermerge.core.features.document import blobs, manifests
 from papermerge.core.features.document.schema import DocumentVersion
-from papermerge.core.pathlib import abs_page_path
+from papermerge.core.pathlib import page_path
 from papermerge.core.storage import get_storage_instance
-from papermerge.core.utils.decorators import if_redis_present
 from papermerge.core import orm, schema, types
 from papermerge.core.features.document.db import api as doc_dbapi
 
@@ -99,18 +100,33 @@ async def apply_pages_op(
         db_session, doc_id=doc.id, user_id=user_id, page_count=len(items)
     )
 
-    copy_pdf_pages(src=old_version.file_path, dst=new_version.file_path, items=items)
+    if manifests.is_enabled():
+        # O(pages) of metadata instead of rewriting the whole PDF
+        new_version.manifest = manifests.compose(
+            old_version, [(item.page.number, item.angle) for item in items]
+        )
+    else:
+        await manifests.materialize(db_session, old_version.id)
+        await executor.run_in_pool(
+            copy_pdf_pages,
+            src=old_version.file_path,
+            dst=new_version.file_path,
+            items=items,
+        )
+        await blobs.ingest(db_session, new_version)
 
+    # tasks are committed along with the text fields
+    notify_version_update(
+        db_session, remove_ver_id=str(old_version.id), add_ver_id=str(new_version.id)
+    )
     await copy_text_field(
         db_session,
         src=old_version,
         dst=new_version,
         page_numbers=[p.number for p in pages],
     )
-
-    notify_version_update(
-        remove_ver_id=str(old_version.id), add_ver_id=str(new_version.id)
-    )
+    if new_version.manifest is not None:
+        manifests.schedule(new_version.id)
     doc = await doc_dbapi.load_doc(db_session, doc.id)
     return doc
 
@@ -202,26 +218,39 @@ def insert_pdf_pages(
     dst_old_pdf.save(dst_new)
 
 
-def reuse_ocr_data(
+async def reuse_ocr_data(
     source_ids: list[uuid.UUID], target_ids: list[uuid.UUID]
 ) -> list[uuid.UUID]:
-    """Copies OCR data from source locations to target locations
+    """Copies OCR data of source pages to target pages
 
-    Location is path of the OCR data (abs_page_page(id)) for given page ID.
-    Returns
+    OCR data of the page is `page_path(id)` directory. Data of all pages is
+    copied in one batch (see `Storage.copy_many`). Returns IDs of
+    source pages without OCR data.
     """
-    storage_instance = get_storage_instance()
-    not_copied_ids = []
+    source_ids = list(source_ids)
+    pairs = [
+        (page_path(src_id), page_path(dst_id))
+        for src_id, dst_id in zip(source_ids, target_ids)
+    ]
+    missing = set(
+        await asyncio.to_thread(get_storage_instance().copy_many, pairs)
+    )
+
+    return [
+        src_id for src_id, (src, _) in zip(source_ids, pairs) if src in missing
+    ]
 
-    for src_uuid, dst_uuid in zip(source_ids, target_ids):
-        if abs_page_path(src_uuid).is_dir():
-            storage_instance.copy_page(
-                src=abs_page_path(src_uuid), dst=abs_page_path(dst_uuid)
-            )
-        else:
-            not_copied_ids.append(src_uuid)
 
-    return not_copied_ids
+async def materialize_page_versions(
+    db_session: AsyncSession, page_ids: list[uuid.UUID]
+):
+    """Writes PDF files of versions of the pages, which are manifests"""
+    version_ids = await db_session.scalars(
+        select(orm.Page.document_version_id)
+        .where(orm.Page.id.in_(page_ids))
+        .distinct()
+    )
+    await manifests.materialize_many(db_session, version_ids.all())
 
 
 async def move_pages(
@@ -237,6 +266,9 @@ async def move_pages(
     Returned source may be None - this is the case when all
     pages of the source document are moved out.
     """
+    # pages are copied from (and into) PDF files of other documents
+    await materialize_page_versions(db_session, [*source_page_ids, target_page_id])
+
     if move_strategy == schema.MoveStrategy.REPLACE:
         return await move_pages_replace(
             db_session,
@@ -301,13 +333,15 @@ async def move_pages_mix(
         short_description=f"{moved_pages_count} page(s) moved in",
     )
 
-    insert_pdf_pages(
+    await executor.run_in_pool(
+        insert_pdf_pages,
         src_old=src_old_version.file_path,
         dst_old=dst_old_version.file_path,
         dst_new=dst_new_version.file_path,
         src_page_numbers=[p.number for p in moved_pages],
         dst_position=dst_page.number,
     )
+    await blobs.ingest(db_session, dst_new_version)
     src_keys_1 = moved_page_ids
     dst_values_1 = [
         page.id  # IDs of the pages in new version of the source
@@ -322,7 +356,7 @@ async def move_pages_mix(
         for page in sorted(dst_new_version.pages, key=lambda x: x.number)
         if page.number > len(moved_page_ids)
     ]
-    if not_copied_ids := reuse_ocr_data(
+    if not_copied_ids := await reuse_ocr_data(
         source_ids=src_keys_1 + src_keys_2, target_ids=dst_values_1 + dst_values_2
     ):
         logger.info(f"Pages with IDs {not_copied_ids} do not have OCR data")
@@ -340,9 +374,11 @@ async def move_pages_mix(
         return None, _dst_doc
 
     notify_version_update(
+        db_session,
         add_ver_id=str(dst_new_version.id),
         remove_ver_id=str(dst_old_version.id),
     )
+    await db_session.commit()
     _src_doc = src_new_version.document
     _dst_doc = dst_new_version.document
 
@@ -392,7 +428,8 @@ async def move_pages_replace(
         user_id=user_id,
     )
 
-    insert_pdf_pages(
+    await executor.run_in_pool(
+        insert_pdf_pages,
         src_old=src_old_version.file_path,
         dst_old=None,  # !!! Important
         dst_new=dst_new_version.file_path,
@@ -401,13 +438,14 @@ async def move_pages_replace(
         ],
         dst_position=0,
     )
+    await blobs.ingest(db_session, dst_new_version)
 
     src_keys = moved_page_ids
     dst_values = [
         page.id for page in sorted(dst_new_version.pages, key=lambda x: x.number)
     ]
 
-    reuse_ocr_data(src_keys, dst_values)
+    await reuse_ocr_data(src_keys, dst_values)
 
     if len(src_old_version.pages) == moved_pages_count:
         # !!!this means new source (src_new_version) has zero pages!!!
@@ -420,8 +458,11 @@ async def move_pages_replace(
         return None, _dst_doc
 
     notify_version_update(
-        add_ver_id=str(dst_new_version.id), remove_ver_id=str(dst_old_version.id)
+        db_session,
+        add_ver_id=str(dst_new_version.id),
+        remove_ver_id=str(dst_old_version.id),
     )
+    await db_session.commit()
     _src_doc = src_new_version.document
     _dst_doc = dst_new_version.document
     return _src_doc, _dst_doc
@@ -440,6 +481,8 @@ async def extract_pages(
     is source document and second element is the list
     of newly created documents
     """
+    # extracted pages are copied from the PDF file of the source
+    await materialize_page_versions(db_session, source_page_ids)
     # source document's source will bumped
     # source document's new version = old version minus extracted pages
     [old_doc_ver, new_doc_ver, moved_pages_count] = await copy_without_pages(
@@ -474,7 +517,7 @@ async def extract_pages(
         logger.debug(f"Notifying index to add doc.title={doc.title} doc.id={doc.id}")
         logger.debug(f"Doc last version={doc.versions[-1]}")
 
-    notify_add_docs(db_session, [doc.id for doc in target_docs])
+    await notify_add_docs(db_session, [doc.id for doc in target_docs])
 
     logger.debug(
         "len(old_doc_ver.pages) == moved_pages_count: "
@@ -492,6 +535,7 @@ async def extract_pages(
         await db_session.commit()
         return [None, target_docs]
 
+    await db_session.commit()
     stmt = select(orm.Document).options(
         selectinload(orm.Document.versions)
     ).where(orm.Document.id == source_doc.id)
@@ -547,7 +591,7 @@ async def extract_to_single_paged_docs(
         )
 
         dst_doc = await doc_dbapi.load_doc(db_session, doc_id=dst_doc.id)
-        reuse_ocr_data(
+        await reuse_ocr_data(
             source_ids=[page.id], target_ids=[dst_doc.versions[0].pages[0].id]
         )
 
@@ -608,7 +652,7 @@ async def extract_to_multi_paged_doc(
         .order_by(orm.Page.number)
     )).scalars()
 
-    reuse_ocr_data(
+    await reuse_ocr_data(
         source_ids=[page.id for page in pages],
         target_ids=[page.id for page in dst_pages],
     )
@@ -659,11 +703,24 @@ async def copy_without_pages(
         user_id=user_id,
     )
 
-    copy_pdf(
-        src=src_old_version.file_path,
-        dst=src_new_version.file_path,
-        page_numbers=[page.number for page in moved_pages],
-    )
+    if manifests.is_enabled():
+        src_new_version.manifest = manifests.compose(
+            src_old_version,
+            [
+                (page.number, 0)
+                for page in sorted(src_old_version.pages, key=lambda p: p.number)
+                if page.id not in moved_page_ids
+            ],
+        )
+    else:
+        await manifests.materialize(db_session, src_old_version.id)
+        await executor.run_in_pool(
+            copy_pdf,
+            src=src_old_version.file_path,
+            dst=src_new_version.file_path,
+            page_numbers=[page.number for page in moved_pages],
+        )
+        await blobs.ingest(db_session, src_new_version)
 
     src_old_version_page_ids = (await db_session.execute(
         select(orm.Page.id)
@@ -683,7 +740,7 @@ async def copy_without_pages(
         .order_by("number")
     )).scalars()
 
-    if not_copied_ids := reuse_ocr_data(src_keys, dst_values):
+    if not_copied_ids := await reuse_ocr_data(src_keys, dst_values):
         logger.info(f"Pages with IDs {not_copied_ids} do not have OCR data")
 
     page_numbers = [
@@ -697,10 +754,14 @@ async def copy_without_pages(
     )
 
     notify_version_update(
-        remove_ver_id=str(src_old_version.id), add_ver_id=str(src_new_version.id)
+        db_session,
+        remove_ver_id=str(src_old_version.id),
+        add_ver_id=str(src_new_version.id),
     )
 
     await db_session.commit()
+    if src_new_version.manifest is not None:
+        manifests.schedule(src_new_version.id)
 
     return (
         src_old_version,  # orig. ver where pages were copied from
@@ -720,32 +781,36 @@ async def get_docver_ids(db_session: AsyncSession, document_ids: list[uuid.UUID]
     return (await db_session.execute(stmt)).scalars()
 
 
-@if_redis_present
-def notify_version_update(add_ver_id: str, remove_ver_id: str):
+def notify_version_update(
+    db_session: AsyncSession, add_ver_id: str, remove_ver_id: str
+):
     # Send tasks to the index to remove/add pages
     tasks.send_task(
+        db_session,
         const.INDEX_UPDATE,
         kwargs={"add_ver_id": add_ver_id, "remove_ver_id": str(remove_ver_id)},
         route_name="i3",
     )
 
     tasks.send_task(
+        db_session,
         const.S3_WORKER_ADD_DOC_VER,
         kwargs={"doc_ver_ids": [add_ver_id]},
         route_name="s3",
     )
     tasks.send_task(
+        db_session,
         const.S3_WORKER_REMOVE_DOC_VER,
         kwargs={"doc_ver_ids": [remove_ver_id]},
         route_name="s3",
     )
 
 
-@if_redis_present
-def notify_add_docs(db_session, add_doc_ids: List[uuid.UUID]):
+async def notify_add_docs(db_session: AsyncSession, add_doc_ids: List[uuid.UUID]):
     # send task to index
     logger.debug(f"Sending task {const.INDEX_ADD_DOCS} with {add_doc_ids}")
     tasks.send_task(
+        db_session,
         const.INDEX_ADD_DOCS,
         kwargs={
             "doc_ids": [str(i) for i in add_doc_ids],
@@ -754,10 +819,12 @@ def notify_add_docs(db_session, add_doc_ids: List[uuid.UUID]):
     )
 
     ids = [
-        str(doc_id) for doc_id in get_docver_ids(db_session, document_ids=add_doc_ids)
+        str(doc_ver_id)
+        for doc_ver_id in await get_docver_ids(db_session, document_ids=add_doc_ids)
     ]
 
     tasks.send_task(
+        db_session,
         const.S3_WORKER_ADD_DOC_VER,
         kwargs={"doc_ver_ids": ids},
         route_name="s3",
@@ -10,6 +10,7 @@ from papermerge.core.features.conftest import make_document_from_resource
 from papermerge.core import orm, schema
 from papermerge.core.tests.resource_file import ResourceFile
 from papermerge.core import constants
+from papermerge.core.pathlib import abs_page_path, abs_page_txt_path
 from papermerge.core.features.page_mngm.db import api as page_mngm_dbapi
 from papermerge.core.features.document.db import api as doc_dbapi
 
@@ -372,6 +373,40 @@ async def test_move_pages_one_single_page_strategy_mix(
         assert len(my_pdf.pages) == 4
 
 
+async def test_move_pages_reuses_ocr_data(
+    make_document_from_resource, db_session: AsyncSession, user
+):
+    """OCR data of moved (and of shifted) pages is copied to the pages
+    of the new versions"""
+    src = await make_document_from_resource(
+        resource=ResourceFile.LIVING_THINGS, user=user, parent=user.home_folder
+    )
+    dst = await make_document_from_resource(
+        resource=ResourceFile.D3_PDF, user=user, parent=user.home_folder
+    )
+    src_ver = await doc_dbapi.get_last_doc_ver(db_session, doc_id=src.id)
+    dst_ver = await doc_dbapi.get_last_doc_ver(db_session, doc_id=dst.id)
+    for page in src_ver.pages + dst_ver.pages:
+        abs_page_path(page.id).mkdir(parents=True)
+        abs_page_txt_path(page.id).write_text(f"text of {page.id}")
+    src_page = src_ver.pages[1]
+    dst_pages = sorted(dst_ver.pages, key=lambda p: p.number)
+
+    await page_mngm_dbapi.move_pages(
+        db_session,
+        source_page_ids=[src_page.id],
+        target_page_id=dst_pages[0].id,
+        move_strategy=schema.MoveStrategy.MIX,
+        user_id=user.id,
+    )
+
+    dst_last_version = await doc_dbapi.get_last_doc_ver(db_session, doc_id=dst.id)
+    new_pages = sorted(dst_last_version.pages, key=lambda p: p.number)
+    assert [abs_page_txt_path(p.id).read_text() for p in new_pages] == [
+        f"text of {p.id}" for p in [src_page] + dst_pages
+    ]
+
+
 async def test_move_pages_two_pages_strategy_mix(
     make_document_from_resource, db_session: AsyncSession, user
 ):
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from papermerge.core import utils, schema
 from papermerge.core.features.auth import get_current_user
 from papermerge.core.features.auth import scopes
+from papermerge.core.features.auth import principal_cache
 from papermerge.core.features.roles.db import api as dbapi
 from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
 from papermerge.core.routers.params import CommonQueryParams
@@ -136,6 +137,9 @@ async def create_role(
                 status_code=500,
                 detail="Failed to create role"
             )
+
+    await principal_cache.invalidate()
+
     return role
 
 
@@ -166,6 +170,8 @@ async def delete_role(
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Role not found")
 
+    await principal_cache.invalidate()
+
 
 @router.patch("/{role_id}", status_code=200, response_model=schema.Role)
 @utils.docstring_parameter(scope=scopes.ROLE_UPDATE)
@@ -188,4 +194,6 @@ async def update_role(
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Role not found")
 
+    await principal_cache.invalidate()
+
     return role
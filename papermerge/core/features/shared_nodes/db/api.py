@@ -1,5 +1,4 @@
 import uuid
-import math
 from typing import Union, Tuple, Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,9 +7,9 @@ from sqlalchemy.orm import aliased, selectin_polymorphic, selectinload
 
 from papermerge.core.features.shared_nodes import schema as sn_schema
 from papermerge.core.features.shared_nodes.db import orm as sn_orm
-from papermerge.core.types import PaginatedResponse
+from papermerge.core.types import PaginatedResponse, TotalMode
 from papermerge.core import orm, schema, dbapi
-from papermerge.core.db import common as dbapi_common
+from papermerge.core.db import common as dbapi_common, pagination
 
 
 def str2colexpr(keys: list[str]):
@@ -85,6 +84,8 @@ async def get_paginated_shared_nodes(
     page_number: int,
     order_by: list[str],
     filter: str | None = None,
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.exact,
 ) -> PaginatedResponse[schema.Document | schema.Folder]:
     loader_opt = selectin_polymorphic(orm.Node, [orm.Folder, orm.Document])
     UserGroupAlias = aliased(orm.user_groups_association)
@@ -128,16 +129,15 @@ async def get_paginated_shared_nodes(
     else:
         stmt = base_stmt
 
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total_nodes = await db_session.scalar(count_stmt)
-
-    num_pages = math.ceil(total_nodes / page_size)
-
-    paginated_stmt = (
-        stmt.offset((page_number - 1) * page_size)
-        .order_by(*str2colexpr(order_by))
-        .limit(page_size)
-        .options(loader_opt)
+    page = await pagination.paginate(
+        db_session,
+        stmt.options(loader_opt),
+        order_by=str2colexpr(order_by),
+        tiebreaker=orm.Node.id,
+        page_size=page_size,
+        page_number=page_number,
+        cursor=cursor,
+        total=total,
     )
 
     perms = {}
@@ -150,7 +150,7 @@ async def get_paginated_shared_nodes(
 
     items = []
 
-    for row in await db_session.execute(paginated_stmt):
+    for row in page.rows:
         if row.Node.ctype == "folder":
             new_item = schema.Folder.model_validate(row.Node)
         else:
@@ -163,8 +163,10 @@ async def get_paginated_shared_nodes(
     return PaginatedResponse[Union[schema.Document, schema.Folder]](
         page_size=page_size,
         page_number=page_number,
-        num_pages=num_pages,
+        num_pages=page.num_pages(page_size),
         items=items,
+        next_cursor=page.next_cursor,
+        total=page.total,
     )
 
 
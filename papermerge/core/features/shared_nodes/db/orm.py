@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import ForeignKey, func, CheckConstraint
+from sqlalchemy import ForeignKey, func, CheckConstraint, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -66,6 +66,24 @@ class SharedNode(Base):
             "user_id IS NOT NULL OR group_id IS NOT NULL",
             name="check__user_id_not_null__or__group_id_not_null",
         ),
+        # nodes shared with the user / with user's groups; every share has
+        # either user or group, thus partial indexes
+        Index(
+            "shared_nodes_user_id_node_id_idx",
+            "user_id",
+            "node_id",
+            postgresql_where=text("user_id IS NOT NULL"),
+            sqlite_where=text("user_id IS NOT NULL"),
+        ),
+        Index(
+            "shared_nodes_group_id_node_id_idx",
+            "group_id",
+            "node_id",
+            postgresql_where=text("group_id IS NOT NULL"),
+            sqlite_where=text("group_id IS NOT NULL"),
+        ),
+        # shares of node's ancestors (permission checks)
+        Index("shared_nodes_node_id_idx", "node_id"),
     )
 
     def __repr__(self):
@@ -1,10 +1,11 @@
 import uuid
 from typing import Annotated, Union
 
-from fastapi import APIRouter, Security, Depends, Response, status
+from fastapi import APIRouter, HTTPException, Security, Depends, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from papermerge.core.db.engine import get_db
+from papermerge.core.db.pagination import InvalidCursor
 from papermerge.core import utils, schema, dbapi
 from papermerge.core.routers.params import CommonQueryParams
 from papermerge.core.features.auth import scopes, get_current_user
@@ -33,14 +34,19 @@ async def get_shared_nodes(
     if params.order_by:
         order_by = [item.strip() for item in params.order_by.split(",")]
 
-    nodes = await dbapi.get_paginated_shared_nodes(
-        db_session=db_session,
-        page_size=params.page_size,
-        page_number=params.page_number,
-        order_by=order_by,
-        filter=params.filter,
-        user_id=user.id,
-    )
+    try:
+        nodes = await dbapi.get_paginated_shared_nodes(
+            db_session=db_session,
+            page_size=params.page_size,
+            page_number=params.page_number,
+            order_by=order_by,
+            filter=params.filter,
+            user_id=user.id,
+            cursor=params.cursor,
+            total=params.total,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return nodes
 
@@ -62,15 +68,20 @@ async def get_node(
     if params.order_by:
         order_by = [item.strip() for item in params.order_by.split(",")]
 
-    nodes = await nodes_api.get_paginated_nodes(
-        db_session=db_session,
-        parent_id=uuid.UUID(parent_id),
-        user_id=user.id,
-        page_size=params.page_size,
-        page_number=params.page_number,
-        order_by=order_by,
-        filter=params.filter,
-    )
+    try:
+        nodes = await nodes_api.get_paginated_nodes(
+            db_session=db_session,
+            parent_id=uuid.UUID(parent_id),
+            user_id=user.id,
+            page_size=params.page_size,
+            page_number=params.page_number,
+            order_by=order_by,
+            filter=params.filter,
+            cursor=params.cursor,
+            total=params.total,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return nodes
 
@@ -1,8 +1,7 @@
 import uuid
-import math
 from typing import Tuple
 
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, or_
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,6 +9,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from papermerge.core.exceptions import EntityNotFound
 from papermerge.core import schema
 from papermerge.core import orm
+from papermerge.core.db import pagination
+from papermerge.core.types import TotalMode
 
 ORDER_BY_MAP = {
     "name": orm.Tag.name.asc(),
@@ -52,6 +53,8 @@ async def get_tags(
     page_number: int,
     filter: str | None = None,
     order_by: str = "name",
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.exact,
 ) -> schema.PaginatedResponse[schema.Tag]:
 
     UserGroupAlias = aliased(orm.user_groups_association)
@@ -59,22 +62,8 @@ async def get_tags(
         UserGroupAlias.c.user_id == user_id
     )
 
-    stmt_total_tags = select(func.count(orm.Tag.id)).where(
-        or_(orm.Tag.user_id == user_id, orm.Tag.group_id.in_(subquery))
-    )
-
-    if filter:
-        stmt_total_tags = stmt_total_tags.where(
-            or_(
-                orm.Tag.name.icontains(filter),
-                orm.Tag.description.icontains(filter),
-            )
-        )
-
-    total_tags = (await db_session.execute(stmt_total_tags)).scalar()
     order_by_value = ORDER_BY_MAP.get(order_by, orm.Tag.name.asc())
 
-    offset = page_size * (page_number - 1)
     stmt = (
         select(
             orm.Tag,
@@ -88,9 +77,6 @@ async def get_tags(
                 orm.Tag.group_id.in_(subquery),
             )
         )
-        .limit(page_size)
-        .offset(offset)
-        .order_by(order_by_value)
     )
 
     if filter:
@@ -101,8 +87,19 @@ async def get_tags(
             )
         )
 
+    page = await pagination.paginate(
+        db_session,
+        stmt,
+        order_by=[order_by_value],
+        tiebreaker=orm.Tag.id,
+        page_size=page_size,
+        page_number=page_number,
+        cursor=cursor,
+        total=total,
+    )
+
     items = []
-    for row in await db_session.execute(stmt):
+    for row in page.rows:
         kwargs = {
             "id": row.Tag.id,
             "name": row.Tag.name,
@@ -117,10 +114,13 @@ async def get_tags(
 
         items.append(schema.Tag(**kwargs))
 
-    total_pages = math.ceil(total_tags / page_size)
-
     return schema.PaginatedResponse[schema.Tag](
-        items=items, page_size=page_size, page_number=page_number, num_pages=total_pages
+        items=items,
+        page_size=page_size,
+        page_number=page_number,
+        num_pages=page.num_pages(page_size),
+        next_cursor=page.next_cursor,
+        total=page.total,
     )
 
 
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import ForeignKey, UniqueConstraint, CheckConstraint
+from sqlalchemy import ForeignKey, UniqueConstraint, CheckConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from papermerge.core.db.base import Base
@@ -15,6 +15,13 @@ class NodeTagsAssociation(Base):
         ForeignKey("tags.id", ondelete="CASCADE"),
     )
 
+    __table_args__ = (
+        # tags of listed nodes (loaded with every node listing)
+        Index("nodes_tags_node_id_idx", "node_id"),
+        # nodes with given tag, tag renames / deletion
+        Index("nodes_tags_tag_id_idx", "tag_id"),
+    )
+
 
 class Tag(Base):
     __tablename__ = "tags"
@@ -10,12 +10,13 @@ from papermerge.core.features.users import schema as usr_schema
 from papermerge.core.features.auth import get_current_user
 from papermerge.core.features.auth import scopes
 from papermerge.core.db.engine import get_db
+from papermerge.core.db.pagination import InvalidCursor
 from papermerge.core.features.users.db import api as users_dbapi
 from papermerge.core.features.tags.db import api as tags_dbapi
 from papermerge.core.features.tags import schema as tags_schema
 from papermerge.core.exceptions import EntityNotFound
 from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
-from papermerge.core.features.useractivity.db.activity import Activity
+from papermerge.core.features.useractivity import writer as activity_writer
 from .types import PaginatedQueryParams
 
 router = APIRouter(
@@ -68,14 +69,19 @@ async def retrieve_tags(
 
     Required scope: `{scope}`
     """
-    tags = await tags_dbapi.get_tags(
-        db_session,
-        user_id=user.id,
-        page_number=params.page_number,
-        page_size=params.page_size,
-        order_by=params.order_by,
-        filter=params.filter,
-    )
+    try:
+        tags = await tags_dbapi.get_tags(
+            db_session,
+            user_id=user.id,
+            page_number=params.page_number,
+            page_size=params.page_size,
+            order_by=params.order_by,
+            filter=params.filter,
+            cursor=params.cursor,
+            total=params.total,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return tags
 
@@ -98,13 +104,7 @@ async def get_tag_details(
     except EntityNotFound:
         raise HTTPException(status_code=404, detail="Does not exists")
 
-    # Log activity
-    activity = Activity(
-        user_id=user.id,
-        action="get_tag_details",
-    )
-    db_session.add(activity)
-    await db_session.commit()
+    await activity_writer.log_activity(user.id, "get_tag_details")
 
     return tag
 
@@ -145,13 +145,7 @@ async def create_tag(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
-    # Log activity
-    activity = Activity(
-        user_id=user.id,
-        action="create_tag",
-    )
-    db_session.add(activity)
-    await db_session.commit()
+    await activity_writer.log_activity(user.id, "create_tag")
 
     return tag
 
@@ -174,13 +168,7 @@ async def delete_tag(
     except EntityNotFound:
         raise HTTPException(status_code=404, detail="Does not exists")
 
-    # Log activity
-    activity = Activity(
-        user_id=user.id,
-        action="delete_tag",
-    )
-    db_session.add(activity)
-    await db_session.commit()
+    await activity_writer.log_activity(user.id, "delete_tag")
 
 
 @router.patch(
@@ -220,12 +208,6 @@ async def update_tag(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
-    # Log activity
-    activity = Activity(
-        user_id=user.id,
-        action="update_tag",
-    )
-    db_session.add(activity)
-    await db_session.commit()
+    await activity_writer.log_activity(user.id, "update_tag")
 
     return tag
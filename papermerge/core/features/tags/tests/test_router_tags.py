@@ -235,3 +235,39 @@ async def test__positive__tags_all_route_with_group_id_param(
     assert response.status_code == 200, response.json()
     dtype_names = {schema.Tag(**kw).name for kw in response.json()}
     assert dtype_names == {"tag research 1", "tag research 2"}
+
+
+async def test_tags_cursor_pagination_by_group_name(
+    db_session: AsyncSession, make_tag, auth_api_client: AuthTestClient, user, make_group
+):
+    """Ordering by (nullable) group name: tags owned by the user have no group"""
+    research = await make_group("research")
+    admin = await make_group("admin")
+    for i in range(3):
+        await make_tag(name=f"Tag {i}", user=user)
+        await make_tag(name=f"research {i}", group_id=research.id)
+    await make_tag(name="admin", group_id=admin.id)
+    user.groups.extend([research, admin])
+    db_session.add(user)
+    await db_session.commit()
+
+    for order_by in ("group_name", "-group_name"):
+        names = []
+        params = {"page_size": 2, "order_by": order_by}
+        while True:
+            response = await auth_api_client.get("/tags/", params=params)
+            assert response.status_code == 200, response.json()
+            page = response.json()
+            names.extend(item["name"] for item in page["items"])
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+
+        groups = [
+            "admin" if name == "admin" else "research" if "research" in name else None
+            for name in names
+        ]
+        assert len(names) == 7
+        assert len(set(names)) == 7
+        expected = ["admin"] + ["research"] * 3 + [None] * 3
+        assert groups == (expected if order_by == "group_name" else expected[::-1])
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, DateTime, Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from papermerge.core.db.base import Base
+
+
+class OutboxMessage(Base):
+    """Celery task to be published
+
+    Rows are inserted by `papermerge.core.tasks.send_task` in the same
+    transaction as the change which triggers the task, and published (then
+    deleted) by `papermerge.core.features.tasks.outbox`.
+    """
+
+    __tablename__ = "task_outbox"
+
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer(), "sqlite"), primary_key=True
+    )
+    task_name: Mapped[str] = mapped_column(String)
+    kwargs: Mapped[dict] = mapped_column(JSON, default=dict)
+    route_name: Mapped[str | None] = mapped_column(String)
+    # messages with same key (task name, route and kwargs) are coalesced
+    key: Mapped[str] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    # next attempt to publish; later than `created_at` after failures
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    attempts: Mapped[int] = mapped_column(default=0)
+    last_error: Mapped[str | None]
+
+    __table_args__ = (Index("task_outbox_available_at_idx", "available_at"),)
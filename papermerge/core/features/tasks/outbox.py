@@ -0,0 +1,266 @@
+"""
+Transactional outbox of Celery tasks
+
+`papermerge.core.tasks.send_task` does not talk to the broker: it adds a
+`task_outbox` row to the caller's session, thus the task is sent if, and
+only if, the change which triggered it is committed. Request handlers are
+not slowed down (or failed) by broker retries, and no task is lost while
+Redis is down.
+
+These guarantees hold only with Redis configured
+(`papermerge__redis__url`): without a broker there are no workers to
+send tasks to, and `send_task` drops them (warning about it once).
+
+The relay (`OutboxRelay`, started by the application or by
+`paper-cli tasks relay`) publishes messages in batches, all of a batch over
+one broker connection. Messages are held back for `coalesce_window`
+seconds; messages with the same key (task name, route and kwargs) which
+are due together are published once, e.g. a burst of tag edits of one node
+results in one `INDEX_ADD_NODE` task. Messages which could not be
+published are retried with exponential backoff.
+
+As with `papermerge.search.sync`, rows are picked with
+`FOR UPDATE SKIP LOCKED`, so several relays can run at the same time.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.celery_app import app as celery_app
+from papermerge.core.config import get_settings
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.tasks.db.orm import OutboxMessage
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    kwargs: dict
+    route_name: str | None
+
+
+# publishes tasks; returns, for each of them, the error (None if published)
+Publisher = Callable[[list[Task]], list[Exception | None]]
+
+
+@dataclass
+class RelayResult:
+    published: int = 0  # tasks sent to the broker
+    coalesced: int = 0  # messages not sent, as duplicates of published ones
+    failed: int = 0  # messages to be retried
+
+
+def message_key(name: str, kwargs: dict, route_name: str | None) -> str:
+    data = json.dumps([name, route_name, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def enqueue(
+    db_session: AsyncSession,
+    name: str,
+    kwargs: dict | None = None,
+    route_name: str | None = None,
+) -> OutboxMessage:
+    """Adds the task to the outbox; it is sent after the session commits"""
+    kwargs = kwargs or {}
+    message = OutboxMessage(
+        task_name=name,
+        kwargs=kwargs,
+        route_name=route_name,
+        key=message_key(name, kwargs, route_name),
+    )
+    db_session.add(message)
+
+    return message
+
+
+def celery_publish(tasks: list[Task]) -> list[Exception | None]:
+    """Sends tasks to the broker over one connection (blocking)"""
+    errors = []
+    with celery_app.producer_or_acquire() as producer:
+        for task in tasks:
+            try:
+                celery_app.send_task(
+                    task.name,
+                    kwargs=task.kwargs,
+                    route_name=task.route_name,
+                    producer=producer,
+                )
+            except Exception as e:
+                errors.append(e)
+            else:
+                errors.append(None)
+
+    return errors
+
+
+def backoff(attempts: int, base: float, maximum: float) -> timedelta:
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), maximum))
+
+
+async def relay_batch(
+    db_session: AsyncSession,
+    publish: Publisher = celery_publish,
+    batch_size: int = 100,
+    coalesce_window: float = 1.0,
+    retry_backoff: float = 1.0,
+    retry_backoff_max: float = 300.0,
+    now: datetime | None = None,
+) -> RelayResult:
+    """Publishes (at most) `batch_size` oldest due messages"""
+    now = now or datetime.now(timezone.utc)
+    stmt = (
+        select(OutboxMessage)
+        .where(
+            OutboxMessage.available_at <= now,
+            OutboxMessage.created_at <= now - timedelta(seconds=coalesce_window),
+        )
+        .order_by(OutboxMessage.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    messages = (await db_session.execute(stmt)).scalars().all()
+    result = RelayResult()
+    if len(messages) == 0:
+        await db_session.commit()
+        return result
+
+    groups: dict[str, list[OutboxMessage]] = {}
+    for message in messages:
+        # re-inserted key moves to the end: tasks are sent in the order of
+        # their latest occurrence
+        group = groups.pop(message.key, [])
+        group.append(message)
+        groups[message.key] = group
+
+    tasks = [
+        Task(group[-1].task_name, group[-1].kwargs, group[-1].route_name)
+        for group in groups.values()
+    ]
+    try:
+        errors = await asyncio.to_thread(publish, tasks)
+    except Exception as e:
+        # e.g. broker not reachable
+        errors = [e] * len(tasks)
+
+    published_ids = []
+    for group, error in zip(groups.values(), errors):
+        if error is None:
+            result.published += 1
+            result.coalesced += len(group) - 1
+            published_ids.extend(message.id for message in group)
+            continue
+
+        result.failed += len(group)
+        for message in group:
+            message.attempts += 1
+            message.available_at = now + backoff(
+                message.attempts, retry_backoff, retry_backoff_max
+            )
+            message.last_error = repr(error)
+
+    if published_ids:
+        await db_session.execute(
+            delete(OutboxMessage).where(OutboxMessage.id.in_(published_ids))
+        )
+    await db_session.commit()
+
+    if result.failed:
+        logger.warning(
+            f"Failed to publish {result.failed} tasks ({errors[0]!r}); will retry"
+        )
+
+    return result
+
+
+async def relay(db_session: AsyncSession, **kwargs) -> RelayResult:
+    """Publishes all due messages (see `relay_batch` for arguments)"""
+    result = RelayResult()
+    while True:
+        batch = await relay_batch(db_session, **kwargs)
+        result.published += batch.published
+        result.coalesced += batch.coalesced
+        result.failed += batch.failed
+        # failed messages are not due anymore, but stop anyway: the
+        # broker is likely down
+        if batch.failed or batch.published + batch.coalesced == 0:
+            break
+
+    return result
+
+
+class OutboxRelay:
+    """Publishes outbox messages every `poll_interval` seconds"""
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        poll_interval: float = 0.5,
+        coalesce_window: float = 1.0,
+        retry_backoff: float = 1.0,
+        retry_backoff_max: float = 300.0,
+        publish: Publisher = celery_publish,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.poll_interval = poll_interval
+        self.session_factory = session_factory
+        self.options = dict(
+            publish=publish,
+            batch_size=max(batch_size, 1),
+            coalesce_window=coalesce_window,
+            retry_backoff=retry_backoff,
+            retry_backoff_max=retry_backoff_max,
+        )
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def relay(self) -> RelayResult:
+        async with self.session_factory() as db_session:
+            return await relay(db_session, **self.options)
+
+    def start(self):
+        """Starts the relay in the running event loop"""
+        if self.running:
+            return
+
+        self._task = asyncio.create_task(self._run(), name="outbox-relay")
+
+    async def shutdown(self):
+        """Stops the relay; unpublished messages stay in the outbox"""
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.relay()
+            except Exception as e:
+                logger.warning(f"Outbox relay failed: {e!r}")
+            await asyncio.sleep(self.poll_interval)
+
+
+relay_worker = OutboxRelay(
+    batch_size=config.papermerge__outbox__batch_size,
+    poll_interval=config.papermerge__outbox__poll_interval,
+    coalesce_window=config.papermerge__outbox__coalesce_window,
+    retry_backoff=config.papermerge__outbox__retry_backoff,
+    retry_backoff_max=config.papermerge__outbox__retry_backoff_max,
+)
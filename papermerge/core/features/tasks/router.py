@@ -1,10 +1,15 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Security
+from fastapi import APIRouter, Depends, Security
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from papermerge.core import constants, schema, utils
 from papermerge.core.features.auth import get_current_user, scopes
 from papermerge.core import tasks
+from papermerge.core.db.engine import get_db
+from papermerge.core.features.document import manifests
+from papermerge.core.features.document.db import api as doc_dbapi
 
 from .schema import OCRTaskIn
 
@@ -16,16 +21,27 @@ router = APIRouter(
 
 @router.post("/ocr")
 @utils.docstring_parameter(scope=scopes.TASK_OCR)
-def start_ocr(
+async def start_ocr(
     ocr_task: OCRTaskIn,
     user: Annotated[schema.User, Security(get_current_user, scopes=[scopes.TASK_OCR])],
+    db_session: AsyncSession = Depends(get_db),
 ):
     """Triggers OCR for specific document
 
     Required scope: `{scope}`
     """
+    # OCR worker reads the PDF file of the last version
+    try:
+        doc_ver = await doc_dbapi.get_last_doc_ver(
+            db_session, doc_id=ocr_task.document_id
+        )
+    except NoResultFound:
+        pass
+    else:
+        await manifests.materialize(db_session, doc_ver.id)
 
     tasks.send_task(
+        db_session,
         constants.WORKER_OCR_DOCUMENT,
         kwargs={
             "document_id": str(ocr_task.document_id),
@@ -33,3 +49,4 @@ def start_ocr(
         },
         route_name="ocr",
     )
+    await db_session.commit()
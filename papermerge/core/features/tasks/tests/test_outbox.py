@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import constants, orm, tasks
+from papermerge.core.features.tasks import outbox
+from papermerge.core.tasks import send_task
+from papermerge.core.tests.types import AuthTestClient
+
+
+@pytest.fixture(autouse=True)
+def redis_url(monkeypatch):
+    # tasks are queued only when there is a broker to publish them to
+    monkeypatch.setattr(
+        tasks.config, "papermerge__redis__url", "redis://localhost:6379/0"
+    )
+
+
+class FakeBroker:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.published = []
+
+    def __call__(self, tasks):
+        if self.fail:
+            raise ConnectionError("broker is down")
+        self.published.extend(tasks)
+        return [None] * len(tasks)
+
+
+def later(seconds: float = 5) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+def index_node(db_session: AsyncSession, node_id: str):
+    send_task(
+        db_session,
+        constants.INDEX_ADD_NODE,
+        kwargs={"node_id": node_id},
+        route_name="i3",
+    )
+
+
+async def get_messages(db_session: AsyncSession) -> list[orm.OutboxMessage]:
+    stmt = select(orm.OutboxMessage).order_by(orm.OutboxMessage.id)
+    return (await db_session.scalars(stmt)).all()
+
+
+async def test_relay_coalesces_duplicates(db_session: AsyncSession):
+    index_node(db_session, "n1")
+    index_node(db_session, "n2")
+    index_node(db_session, "n1")
+    index_node(db_session, "n1")
+    await db_session.commit()
+    broker = FakeBroker()
+
+    result = await outbox.relay(db_session, publish=broker, now=later())
+
+    assert result == outbox.RelayResult(published=2, coalesced=2, failed=0)
+    # in order of the latest occurrence
+    assert [task.kwargs["node_id"] for task in broker.published] == ["n2", "n1"]
+    assert broker.published[0].route_name == "i3"
+    assert await get_messages(db_session) == []
+
+
+async def test_relay_holds_back_recent_messages(db_session: AsyncSession):
+    index_node(db_session, "n1")
+    await db_session.commit()
+    broker = FakeBroker()
+
+    result = await outbox.relay_batch(
+        db_session, publish=broker, coalesce_window=60, now=later()
+    )
+
+    assert result.published == 0
+    assert len(await get_messages(db_session)) == 1
+
+
+async def test_relay_retries_with_backoff(db_session: AsyncSession):
+    index_node(db_session, "n1")
+    await db_session.commit()
+    now = later()
+
+    result = await outbox.relay(
+        db_session, publish=FakeBroker(fail=True), retry_backoff=10, now=now
+    )
+
+    assert result.failed == 1
+    [message] = await get_messages(db_session)
+    assert message.attempts == 1
+    assert message.available_at == now + timedelta(seconds=10)
+    assert "broker is down" in message.last_error
+
+    broker = FakeBroker()
+    result = await outbox.relay(
+        db_session, publish=broker, now=now + timedelta(seconds=5)
+    )
+    assert result.published == 0
+
+    result = await outbox.relay(
+        db_session, publish=broker, now=now + timedelta(seconds=10)
+    )
+    assert result.published == 1
+    assert await get_messages(db_session) == []
+
+
+async def test_tasks_are_dropped_without_broker(
+    monkeypatch, caplog, db_session: AsyncSession
+):
+    monkeypatch.setattr(tasks.config, "papermerge__redis__url", None)
+    monkeypatch.setattr(tasks, "_drop_reported", False)
+
+    index_node(db_session, "n1")
+    index_node(db_session, "n2")
+    await db_session.commit()
+
+    assert await get_messages(db_session) == []
+    # reported once
+    warnings = [r for r in caplog.records if r.levelname == "WARNING"]
+    assert len(warnings) == 1
+    assert "PAPERMERGE__REDIS__URL" in warnings[0].getMessage()
+
+
+async def test_backoff_is_capped():
+    assert outbox.backoff(1, base=1, maximum=300) == timedelta(seconds=1)
+    assert outbox.backoff(4, base=1, maximum=300) == timedelta(seconds=8)
+    assert outbox.backoff(20, base=1, maximum=300) == timedelta(seconds=300)
+
+
+async def test_tags_update_queues_index_task(
+    auth_api_client: AuthTestClient, make_folder, db_session: AsyncSession
+):
+    user = auth_api_client.user
+    folder = await make_folder(title="Receipts", user=user, parent=user.inbox_folder)
+
+    for tags in (["paid"], ["paid", "important"]):
+        response = await auth_api_client.post(f"/nodes/{folder.id}/tags", json=tags)
+        assert response.status_code == 200, response.json()
+
+    messages = await get_messages(db_session)
+    assert [(m.task_name, m.kwargs) for m in messages] == [
+        (constants.INDEX_ADD_NODE, {"node_id": str(folder.id)}),
+    ] * 2
+
+    broker = FakeBroker()
+    result = await outbox.relay(db_session, publish=broker, now=later())
+    assert (result.published, result.coalesced) == (1, 1)
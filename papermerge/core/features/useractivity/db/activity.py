@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -40,6 +40,13 @@ class Activity(Base):
         default=datetime.utcnow
     )
 
+    __table_args__ = (
+        # user's activities, latest first
+        Index("activities_user_id_created_at_idx", "user_id", "created_at"),
+        # all activities, in (created_at, id) order, see `/stats/all-activities`
+        Index("activities_created_at_id_idx", "created_at", "id"),
+    )
+
     def __repr__(self):
         return (
             f"Activity(id={self.id}, user_id={self.user_id}, node_id={self.node_id}, "
@@ -0,0 +1,316 @@
+"""Statistics read from rollups (see `useractivity.rollup`) and activities"""
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from datetime import date
+
+from sqlalchemy import BigInteger, Row, Select, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.db import pagination
+from papermerge.core.features.useractivity import schema
+from papermerge.core.features.useractivity.rollup import date_range
+from papermerge.core.types import PaginatedResponse, TotalMode
+
+LARGEST_DOCUMENTS = 10
+
+
+def _sum(column, *where):
+    """Sum of `column` (of rows matching `where`) as an integer; 0 if none"""
+    total = func.sum(column)
+    if where:
+        total = total.filter(*where)
+    # sum of bigint is numeric in PostgreSQL
+    return func.coalesce(cast(total, BigInteger), 0)
+
+
+def _rows(result) -> list[dict]:
+    return [dict(row._mapping) for row in result]
+
+
+async def get_activity_totals(
+    db_session: AsyncSession,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> dict:
+    hourly = orm.ActivityHourly
+    uploads = hourly.action == "document_upload"
+    stmt = select(
+        _sum(hourly.count, uploads).label("total_uploads"),
+        # uploaded documents which were deleted since
+        _sum(hourly.without_node, uploads).label("total_deletions"),
+        _sum(hourly.count, hourly.action == "document_download_url").label(
+            "total_downloads"
+        ),
+    ).where(*date_range(hourly.bucket, date_from, date_to))
+
+    return dict((await db_session.execute(stmt)).one()._mapping)
+
+
+async def get_summary(
+    db_session: AsyncSession,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> dict:
+    daily = orm.DocumentsDaily
+    active_users = (
+        select(
+            daily.user_id,
+            orm.User.username,
+            _sum(daily.documents).label("document_count"),
+        )
+        .join(orm.User, orm.User.id == daily.user_id)
+        .where(*date_range(daily.day, date_from, date_to))
+        .group_by(daily.user_id, orm.User.username)
+        .order_by(orm.User.username)
+    )
+
+    shares = orm.SharedNodeStats
+    shared_documents = (
+        select(
+            shares.node_id,
+            orm.Node.title.label("file_name"),
+            (orm.Node.ctype == "folder").label("is_folder"),
+            orm.User.username.label("shared_by_user"),
+            shares.shares.label("share_count"),
+            shares.user_shares,
+            shares.group_shares,
+        )
+        .join(orm.Node, orm.Node.id == shares.node_id)
+        .outerjoin(orm.User, orm.User.id == orm.Node.user_id)
+        .order_by(shares.shares.desc(), shares.node_id)
+    )
+
+    roles = orm.RoleStats
+    roles_summary = (
+        select(
+            orm.Role.id.label("role_id"),
+            orm.Role.name.label("role_name"),
+            func.coalesce(roles.users, 0).label("total_users"),
+            func.coalesce(roles.nodes, 0).label("total_docs_accessed"),
+        )
+        .outerjoin(roles, roles.role_id == orm.Role.id)
+        .order_by(orm.Role.name)
+    )
+
+    return {
+        "active_users": _rows(await db_session.execute(active_users)),
+        "shared_documents": _rows(await db_session.execute(shared_documents)),
+        "roles_summary": _rows(await db_session.execute(roles_summary)),
+    }
+
+
+async def get_advanced_summary(
+    db_session: AsyncSession,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> dict:
+    daily = orm.DocumentsDaily
+    in_range = date_range(daily.day, date_from, date_to)
+    totals = (
+        _sum(daily.bytes).label("total_bytes"),
+        _sum(daily.documents).label("total_documents"),
+    )
+
+    per_user = (
+        select(orm.User.id.label("user_id"), orm.User.username, *totals)
+        .join(daily, daily.user_id == orm.User.id)
+        .where(*in_range)
+        .group_by(orm.User.id, orm.User.username)
+        .order_by(orm.User.username)
+    )
+    per_group = (
+        select(
+            orm.Group.id.label("group_id"),
+            orm.Group.name.label("group_name"),
+            *totals,
+        )
+        .join(daily, daily.group_id == orm.Group.id)
+        .where(*in_range)
+        .group_by(orm.Group.id, orm.Group.name)
+        .order_by(orm.Group.name)
+    )
+    per_document_type = (
+        select(
+            orm.DocumentType.id.label("document_type_id"),
+            orm.DocumentType.name.label("document_type_name"),
+            *totals,
+        )
+        .join(daily, daily.document_type_id == orm.DocumentType.id)
+        .where(*in_range)
+        .group_by(orm.DocumentType.id, orm.DocumentType.name)
+        .order_by(orm.DocumentType.name)
+    )
+
+    largest = orm.LargestDocument
+    largest_documents = (
+        select(
+            largest.node_id,
+            orm.Node.title,
+            largest.bytes.label("total_size_bytes"),
+            largest.versions.label("version_count"),
+        )
+        .join(orm.Node, orm.Node.id == largest.node_id)
+        .order_by(largest.bytes.desc(), largest.node_id)
+        .limit(LARGEST_DOCUMENTS)
+    )
+
+    sizes = orm.FileSizesDaily
+    file_size_distribution = (
+        select(
+            sizes.size_category,
+            _sum(sizes.files).label("file_count"),
+            _sum(sizes.bytes).label("total_bytes"),
+        )
+        .where(*date_range(sizes.day, date_from, date_to))
+        .group_by(sizes.size_category)
+        .order_by(sizes.size_category)
+    )
+
+    return {
+        "per_user": _rows(await db_session.execute(per_user)),
+        "per_group": _rows(await db_session.execute(per_group)),
+        "per_document_type": _rows(await db_session.execute(per_document_type)),
+        "largest_documents": _rows(await db_session.execute(largest_documents)),
+        "file_size_distribution": _rows(
+            await db_session.execute(file_size_distribution)
+        ),
+    }
+
+
+async def get_tags_by_group(db_session: AsyncSession) -> dict[str, list[dict]]:
+    """Number of documents per tag of each group"""
+    doc_count = func.coalesce(orm.TagStats.documents, 0)
+    stmt = (
+        select(
+            orm.Group.name.label("group_name"),
+            orm.Tag.name.label("tag_name"),
+            doc_count.label("doc_count"),
+        )
+        .join(orm.Group, orm.Group.id == orm.Tag.group_id)
+        .outerjoin(orm.TagStats, orm.TagStats.tag_id == orm.Tag.id)
+        .order_by(orm.Group.name, doc_count.desc())
+    )
+
+    grouped = {}
+    for row in await db_session.execute(stmt):
+        grouped.setdefault(row.group_name, []).append(
+            {"tag": row.tag_name, "count": row.doc_count}
+        )
+
+    return grouped
+
+
+def select_activities(filter: schema.ActivityFilter) -> Select:
+    """Activities (with usernames) matching `filter`, unordered"""
+    activity = orm.Activity
+    stmt = select(
+        activity.id,
+        activity.user_id,
+        orm.User.username,
+        activity.node_id,
+        activity.version_id,
+        activity.action,
+        activity.created_at,
+    ).join(orm.User, orm.User.id == activity.user_id)
+
+    if filter.user_id is not None:
+        stmt = stmt.where(activity.user_id == filter.user_id)
+    if filter.action is not None:
+        stmt = stmt.where(activity.action == filter.action)
+    if filter.since is not None:
+        stmt = stmt.where(activity.created_at >= filter.since)
+    if filter.until is not None:
+        stmt = stmt.where(activity.created_at < filter.until)
+
+    return stmt
+
+
+async def get_activities(
+    db_session: AsyncSession,
+    *,
+    filter: schema.ActivityFilter,
+    page_size: int,
+    page_number: int = 1,
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.exact,
+) -> PaginatedResponse[schema.ActivityRecord]:
+    """Activities matching `filter`, latest first
+
+    Raises `pagination.InvalidCursor`.
+    """
+    page = await pagination.paginate(
+        db_session,
+        select_activities(filter),
+        order_by=[orm.Activity.created_at.desc()],
+        tiebreaker=orm.Activity.id.desc(),
+        page_size=page_size,
+        page_number=page_number,
+        cursor=cursor,
+        total=total,
+    )
+
+    return PaginatedResponse[schema.ActivityRecord](
+        page_size=page_size,
+        page_number=page_number,
+        num_pages=page.num_pages(page_size),
+        items=[schema.ActivityRecord.model_validate(row) for row in page.rows],
+        next_cursor=page.next_cursor,
+        total=page.total,
+    )
+
+
+async def stream_activities(
+    db_session: AsyncSession,
+    filter: schema.ActivityFilter,
+    batch_size: int = 1000,
+) -> AsyncIterator[Sequence[Row]]:
+    """Activities matching `filter`, oldest first, in batches
+
+    Rows are fetched from a server side cursor, `batch_size` at a time,
+    thus memory use does not depend on the number of rows.
+    """
+    stmt = (
+        select_activities(filter)
+        .order_by(orm.Activity.created_at, orm.Activity.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db_session.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
+
+
+async def get_user_nodes(
+    db_session: AsyncSession,
+    *,
+    user_id: uuid.UUID,
+    page_size: int,
+    page_number: int = 1,
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.exact,
+) -> PaginatedResponse[dict]:
+    """Nodes owned by the user, latest first
+
+    Raises `pagination.InvalidCursor`.
+    """
+    nodes = orm.Node.__table__
+    page = await pagination.paginate(
+        db_session,
+        select(nodes).where(nodes.c.user_id == user_id),
+        order_by=[nodes.c.created_at.desc()],
+        tiebreaker=nodes.c.id.desc(),
+        page_size=page_size,
+        page_number=page_number,
+        cursor=cursor,
+        total=total,
+    )
+    columns = nodes.c.keys()
+
+    return PaginatedResponse[dict](
+        page_size=page_size,
+        page_number=page_number,
+        num_pages=page.num_pages(page_size),
+        items=[{name: row._mapping[name] for name in columns} for row in page.rows],
+        next_cursor=page.next_cursor,
+        total=page.total,
+    )
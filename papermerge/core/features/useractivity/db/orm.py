@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -35,6 +35,11 @@ class UserActivityStats(Base):
         default=datetime.utcnow
     )
 
+    __table_args__ = (
+        # recent events are rolled up, see `useractivity.rollup`
+        Index("user_activity_stats_timestamp_idx", "timestamp"),
+    )
+
     def __repr__(self):
         return (
             f"UserActivityStats(id={self.id}, user_id={self.user_id}, "
@@ -0,0 +1,106 @@
+"""
+Rollup tables read by statistics endpoints
+
+Time bucketed rollups (`stats_activity_hourly`, `stats_documents_daily`,
+`stats_file_sizes_daily`) are recomputed only for recent buckets on each
+run of `papermerge.core.features.useractivity.rollup`; the remaining
+(`stats_tags`, `stats_roles`, `stats_shared_nodes`,
+`stats_largest_documents`) are small snapshots of the current state.
+
+There are no foreign keys: rows of deleted users, nodes etc. are dropped
+by the next recomputation and deleting e.g. a user does not have to touch
+rollups.
+"""
+from datetime import date, datetime
+from uuid import UUID
+
+from sqlalchemy import BigInteger, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from papermerge.core.db.base import Base
+
+
+class ActivityHourly(Base):
+    """`user_activity_stats` per hour, user and action"""
+
+    __tablename__ = "stats_activity_hourly"
+
+    bucket: Mapped[datetime] = mapped_column(primary_key=True)
+    user_id: Mapped[UUID] = mapped_column(primary_key=True)
+    action: Mapped[str] = mapped_column(String, primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger)
+    # events whose node no longer exists (`node_id` was set to NULL)
+    without_node: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class DocumentsDaily(Base):
+    """Documents per day of creation, owner (user or group) and type"""
+
+    __tablename__ = "stats_documents_daily"
+
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer(), "sqlite"), primary_key=True
+    )
+    day: Mapped[date]
+    user_id: Mapped[UUID] = mapped_column(nullable=True)
+    group_id: Mapped[UUID] = mapped_column(nullable=True)
+    document_type_id: Mapped[UUID] = mapped_column(nullable=True)
+    documents: Mapped[int] = mapped_column(BigInteger)
+    versions: Mapped[int] = mapped_column(BigInteger)
+    # size of all versions
+    bytes: Mapped[int] = mapped_column(BigInteger)
+
+    __table_args__ = (Index("stats_documents_daily_day_idx", "day"),)
+
+
+class FileSizesDaily(Base):
+    """Document versions per day of document creation and size category"""
+
+    __tablename__ = "stats_file_sizes_daily"
+
+    day: Mapped[date] = mapped_column(primary_key=True)
+    size_category: Mapped[str] = mapped_column(String(32), primary_key=True)
+    files: Mapped[int] = mapped_column(BigInteger)
+    bytes: Mapped[int] = mapped_column(BigInteger)
+
+
+class TagStats(Base):
+    __tablename__ = "stats_tags"
+
+    tag_id: Mapped[UUID] = mapped_column(primary_key=True)
+    documents: Mapped[int] = mapped_column(BigInteger)
+
+
+class RoleStats(Base):
+    __tablename__ = "stats_roles"
+
+    role_id: Mapped[UUID] = mapped_column(primary_key=True)
+    users: Mapped[int] = mapped_column(BigInteger)
+    # nodes owned by users with the role
+    nodes: Mapped[int] = mapped_column(BigInteger)
+
+
+class SharedNodeStats(Base):
+    __tablename__ = "stats_shared_nodes"
+
+    node_id: Mapped[UUID] = mapped_column(primary_key=True)
+    shares: Mapped[int] = mapped_column(BigInteger)
+    user_shares: Mapped[int] = mapped_column(BigInteger)
+    group_shares: Mapped[int] = mapped_column(BigInteger)
+
+
+class LargestDocument(Base):
+    __tablename__ = "stats_largest_documents"
+
+    node_id: Mapped[UUID] = mapped_column(primary_key=True)
+    bytes: Mapped[int] = mapped_column(BigInteger)
+    versions: Mapped[int] = mapped_column(BigInteger)
+
+
+class RollupState(Base):
+    """Up to when rollups were computed"""
+
+    __tablename__ = "stats_rollup_state"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    rolled_up_until: Mapped[datetime]
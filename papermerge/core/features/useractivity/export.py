@@ -0,0 +1,66 @@
+"""Streaming export of activities
+
+Activities are read in batches from a server side cursor and every batch
+is encoded into one chunk of the response body; neither the rows nor the
+body are ever held in memory in full.
+"""
+import csv
+import io
+from collections.abc import AsyncIterator, Callable, Sequence
+
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core.features.useractivity import schema
+from papermerge.core.features.useractivity.db import api as stats_dbapi
+
+FIELDS = list(schema.ActivityRecord.model_fields)
+
+MEDIA_TYPES = {
+    schema.ExportFormat.ndjson: "application/x-ndjson",
+    schema.ExportFormat.csv: "text/csv",
+}
+
+
+def encode_ndjson(rows: Sequence[Row]) -> str:
+    return "".join(
+        schema.ActivityRecord.model_validate(row).model_dump_json() + "\n"
+        for row in rows
+    )
+
+
+def encode_csv(rows: Sequence[Row], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(FIELDS)
+    for row in rows:
+        record = schema.ActivityRecord.model_validate(row)
+        writer.writerow(record.model_dump(mode="json").values())
+
+    return buffer.getvalue()
+
+
+async def export_activities(
+    session_factory: Callable[[], AsyncSession],
+    filter: schema.ActivityFilter,
+    format: schema.ExportFormat,
+    batch_size: int = 1000,
+) -> AsyncIterator[str]:
+    """Activities matching `filter` (oldest first) encoded as `format`
+
+    Session (and its cursor) is opened from `session_factory` and closed
+    here, as the body is streamed after request's dependencies exit.
+    """
+    if format == schema.ExportFormat.csv:
+        # header is sent even if there are no activities
+        yield encode_csv([], header=True)
+
+    async with session_factory() as db_session:
+        async for rows in stats_dbapi.stream_activities(
+            db_session, filter, batch_size=batch_size
+        ):
+            if format == schema.ExportFormat.csv:
+                yield encode_csv(rows)
+            else:
+                yield encode_ndjson(rows)
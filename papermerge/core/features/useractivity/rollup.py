@@ -0,0 +1,398 @@
+"""
+Maintenance of statistics rollups (see `useractivity.db.rollup`)
+
+Statistics endpoints read only rollup tables, thus their cost does not
+depend on the size of `user_activity_stats`, `nodes` or
+`document_versions`. Rollups are maintained by `StatsRollup`, started by
+the application (with `papermerge__stats__rollup_in_app`), or by
+`paper-cli stats rollup` (once, e.g. from cron, or with `--follow`).
+Until the first run, statistics endpoints answer 503.
+
+Runs are serialized by the lock of the `RollupState` row, thus several
+processes may maintain rollups at the same time.
+
+Each run recomputes, from raw rows, the time buckets starting `lookback`
+before the previous run: hourly activity buckets of events logged (or
+flushed by the buffered activity writer) late and daily buckets of newly
+created documents are thus complete, while older buckets are left
+untouched and the cost of a run depends only on the number of recent
+rows. Changes of older rows, e.g. a new version of an old document or
+deletion of a document uploaded long ago, are reflected after a full
+recomputation (`--full`).
+
+Snapshots of the current state (tags, roles, shares, largest documents)
+are small, but computing them reads entire tables; they are refreshed
+less often (`snapshots=True`).
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    case,
+    delete,
+    func,
+    insert,
+    literal_column,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.config import get_settings
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.roles.db.orm import users_roles_association
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+STATE_NAME = "default"
+LARGEST_DOCUMENTS = 100
+# (upper limit in bytes, name) of size categories of document versions
+SIZE_CATEGORIES = [
+    (1_000_000, "small (<1MB)"),
+    (10_000_000, "medium (1-10MB)"),
+]
+LARGE_SIZE_CATEGORY = "large (>10MB)"
+
+
+@dataclass
+class RollupResult:
+    # beginning of recomputed time buckets; None = all of them
+    since: datetime | None
+    until: datetime
+    activity_rows: int = 0
+    document_rows: int = 0
+    snapshots: bool = False
+
+
+async def rollup(
+    db_session: AsyncSession,
+    lookback: timedelta = timedelta(hours=1),
+    full: bool = False,
+    snapshots: bool = True,
+    now: datetime | None = None,
+) -> RollupResult:
+    """Brings rollups up to date
+
+    Recomputes buckets starting `lookback` before the previous run
+    (all buckets if `full` or on the first run) and, if `snapshots`
+    (or on the first run), the snapshots.
+    """
+    now = now or datetime.utcnow()
+    state = await db_session.get(
+        orm.RollupState, STATE_NAME, with_for_update=True, populate_existing=True
+    )
+
+    since = None
+    if not full and state is not None:
+        since = min(state.rolled_up_until, now) - lookback
+
+    result = RollupResult(since=since, until=now)
+    dialect = db_session.bind.dialect.name
+    result.activity_rows = await _rollup_activity(db_session, dialect, since)
+    result.document_rows = await _rollup_documents(db_session, since)
+    if snapshots or since is None:
+        await _refresh_snapshots(db_session)
+        result.snapshots = True
+
+    if state is None:
+        db_session.add(orm.RollupState(name=STATE_NAME, rolled_up_until=now))
+    else:
+        state.rolled_up_until = now
+    await db_session.commit()
+
+    logger.debug(f"Rollups computed: {result}")
+
+    return result
+
+
+async def is_computed(db_session: AsyncSession) -> bool:
+    """Whether rollups were computed at least once"""
+    state = await db_session.scalar(
+        select(orm.RollupState.name).where(orm.RollupState.name == STATE_NAME)
+    )
+
+    return state is not None
+
+
+class StatsRollup:
+    """Brings rollups up to date every `interval` seconds
+
+    Snapshots are refreshed every `snapshot_interval` seconds (and on the
+    first run).
+    """
+
+    def __init__(
+        self,
+        interval: float = 60.0,
+        snapshot_interval: float = 3600.0,
+        lookback: timedelta = timedelta(hours=1),
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self.lookback = lookback
+        self.session_factory = session_factory
+        self._last_snapshot: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def rollup(self) -> RollupResult:
+        start = time.monotonic()
+        snapshots = (
+            self._last_snapshot is None
+            or start - self._last_snapshot >= self.snapshot_interval
+        )
+        async with self.session_factory() as db_session:
+            result = await rollup(
+                db_session, lookback=self.lookback, snapshots=snapshots
+            )
+        if result.snapshots:
+            self._last_snapshot = start
+
+        return result
+
+    def start(self):
+        """Starts rollups in the running event loop; the first one right away"""
+        if self.running:
+            return
+
+        self._task = asyncio.create_task(self._run(), name="stats-rollup")
+
+    async def shutdown(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rollup()
+            except Exception as e:
+                logger.warning(f"Statistics rollup failed: {e!r}")
+            await asyncio.sleep(self.interval)
+
+
+rollup_worker = StatsRollup(
+    interval=config.papermerge__stats__rollup_interval,
+    snapshot_interval=config.papermerge__stats__snapshot_interval,
+    lookback=timedelta(minutes=config.papermerge__stats__rollup_lookback),
+)
+
+
+def hour_bucket(dialect: str, column):
+    if dialect == "sqlite":
+        # same format as of SQLAlchemy's DateTime, thus comparable as strings
+        fmt = literal_column("'%Y-%m-%d %H:00:00.000000'")
+        return func.strftime(fmt, column, type_=DateTime)
+
+    return func.date_trunc(literal_column("'hour'"), column, type_=DateTime)
+
+
+def day_bucket(column):
+    return func.date(column, type_=Date)
+
+
+def size_category(size_column):
+    return case(
+        *[
+            (size_column < literal_column(str(limit)), literal_column(f"'{name}'"))
+            for limit, name in SIZE_CATEGORIES
+        ],
+        else_=literal_column(f"'{LARGE_SIZE_CATEGORY}'"),
+    )
+
+
+async def _rollup_activity(
+    db_session: AsyncSession, dialect: str, since: datetime | None
+) -> int:
+    stats = orm.UserActivityStats
+    bucket = hour_bucket(dialect, stats.timestamp)
+    stmt = select(
+        bucket,
+        stats.user_id,
+        stats.action_type,
+        func.sum(stats.count),
+        func.sum(case((stats.node_id.is_(None), stats.count), else_=0)),
+    ).group_by(bucket, stats.user_id, stats.action_type)
+
+    clear = delete(orm.ActivityHourly)
+    if since is not None:
+        since_hour = since.replace(minute=0, second=0, microsecond=0)
+        stmt = stmt.where(stats.timestamp >= since_hour)
+        clear = clear.where(orm.ActivityHourly.bucket >= since_hour)
+
+    await db_session.execute(clear)
+    result = await db_session.execute(
+        insert(orm.ActivityHourly).from_select(
+            ["bucket", "user_id", "action", "count", "without_node"], stmt
+        )
+    )
+
+    return result.rowcount
+
+
+async def _rollup_documents(db_session: AsyncSession, since: datetime | None) -> int:
+    nodes = orm.Node.__table__
+    documents = orm.Document.__table__
+    versions = orm.DocumentVersion.__table__
+
+    day = day_bucket(nodes.c.created_at).label("day")
+    since_day = since.date() if since is not None else None
+
+    per_document = (
+        select(
+            day,
+            nodes.c.user_id,
+            nodes.c.group_id,
+            documents.c.document_type_id,
+            func.count(versions.c.id).label("versions"),
+            func.coalesce(func.sum(versions.c.size), 0).label("bytes"),
+        )
+        .select_from(nodes)
+        .join(documents, documents.c.node_id == nodes.c.id)
+        .outerjoin(versions, versions.c.document_id == nodes.c.id)
+        .group_by(nodes.c.id, documents.c.document_type_id)
+    )
+    category = size_category(versions.c.size).label("size_category")
+    per_size = (
+        select(
+            day, category, func.count(), func.coalesce(func.sum(versions.c.size), 0)
+        )
+        .select_from(nodes)
+        .join(versions, versions.c.document_id == nodes.c.id)
+        .group_by(day, category)
+    )
+
+    clear_documents = delete(orm.DocumentsDaily)
+    clear_sizes = delete(orm.FileSizesDaily)
+    if since_day is not None:
+        start = datetime.combine(since_day, datetime.min.time())
+        per_document = per_document.where(nodes.c.created_at >= start)
+        per_size = per_size.where(nodes.c.created_at >= start)
+        clear_documents = clear_documents.where(orm.DocumentsDaily.day >= since_day)
+        clear_sizes = clear_sizes.where(orm.FileSizesDaily.day >= since_day)
+
+    per_document = per_document.subquery()
+    stmt = select(
+        per_document.c.day,
+        per_document.c.user_id,
+        per_document.c.group_id,
+        per_document.c.document_type_id,
+        func.count(),
+        func.sum(per_document.c.versions),
+        func.sum(per_document.c.bytes),
+    ).group_by(
+        per_document.c.day,
+        per_document.c.user_id,
+        per_document.c.group_id,
+        per_document.c.document_type_id,
+    )
+
+    await db_session.execute(clear_documents)
+    await db_session.execute(clear_sizes)
+    result = await db_session.execute(
+        insert(orm.DocumentsDaily).from_select(
+            [
+                "day",
+                "user_id",
+                "group_id",
+                "document_type_id",
+                "documents",
+                "versions",
+                "bytes",
+            ],
+            stmt,
+        )
+    )
+    await db_session.execute(
+        insert(orm.FileSizesDaily).from_select(
+            ["day", "size_category", "files", "bytes"], per_size
+        )
+    )
+
+    return result.rowcount
+
+
+async def _refresh_snapshots(db_session: AsyncSession):
+    nodes = orm.Node.__table__
+    versions = orm.DocumentVersion.__table__
+    shared = orm.SharedNode.__table__
+    nodes_tags = orm.NodeTagsAssociation.__table__
+    users_roles = users_roles_association
+
+    tags = select(nodes_tags.c.tag_id, func.count()).group_by(nodes_tags.c.tag_id)
+
+    nodes_per_user = (
+        select(nodes.c.user_id, func.count().label("nodes"))
+        .where(nodes.c.user_id.is_not(None))
+        .group_by(nodes.c.user_id)
+        .subquery()
+    )
+    roles = (
+        select(
+            users_roles.c.role_id,
+            func.count(users_roles.c.user_id),
+            func.coalesce(func.sum(nodes_per_user.c.nodes), 0),
+        )
+        .outerjoin(nodes_per_user, nodes_per_user.c.user_id == users_roles.c.user_id)
+        .group_by(users_roles.c.role_id)
+    )
+
+    shares = select(
+        shared.c.node_id,
+        func.count(),
+        func.count(shared.c.user_id),
+        func.count(shared.c.group_id),
+    ).group_by(shared.c.node_id)
+
+    total_size = func.sum(versions.c.size)
+    largest = (
+        select(versions.c.document_id, total_size, func.count())
+        .group_by(versions.c.document_id)
+        .order_by(total_size.desc())
+        .limit(LARGEST_DOCUMENTS)
+    )
+
+    snapshots = [
+        (orm.TagStats, ["tag_id", "documents"], tags),
+        (orm.RoleStats, ["role_id", "users", "nodes"], roles),
+        (
+            orm.SharedNodeStats,
+            ["node_id", "shares", "user_shares", "group_shares"],
+            shares,
+        ),
+        (orm.LargestDocument, ["node_id", "bytes", "versions"], largest),
+    ]
+    for model, columns, stmt in snapshots:
+        await db_session.execute(delete(model))
+        await db_session.execute(insert(model).from_select(columns, stmt))
+
+
+def date_range(column, date_from: date | None, date_to: date | None) -> list:
+    """Conditions of `column` (day or hour bucket) within inclusive range"""
+    conditions = []
+    is_hourly = isinstance(column.type, DateTime)
+    if date_from is not None:
+        start = datetime.combine(date_from, datetime.min.time())
+        conditions.append(column >= (start if is_hourly else date_from))
+    if date_to is not None:
+        end = date_to + timedelta(days=1)
+        if is_hourly:
+            end = datetime.combine(end, datetime.min.time())
+        conditions.append(column < end)
+
+    return conditions
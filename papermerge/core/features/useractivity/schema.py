@@ -0,0 +1,31 @@
+from datetime import datetime
+from enum import Enum
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class ActivityRecord(BaseModel):
+    id: UUID
+    user_id: UUID
+    username: str
+    node_id: UUID | None = None
+    version_id: UUID | None = None
+    action: str
+    created_at: datetime
+
+    # Config
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ActivityFilter(BaseModel):
+    user_id: UUID | None = None
+    action: str | None = None
+    # activities created in [since, until)
+    since: datetime | None = None
+    until: datetime | None = None
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.features.useractivity import export, schema
+from papermerge.core.features.useractivity.db import api as stats_dbapi
+from papermerge.core.tests.types import AuthTestClient
+
+START = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+async def add_activities(db_session: AsyncSession, user, actions: list[str]):
+    for minute, action in enumerate(actions):
+        db_session.add(
+            orm.Activity(
+                user_id=user.id,
+                action=action,
+                created_at=START + timedelta(minutes=minute),
+            )
+        )
+    await db_session.flush()
+
+
+def session_factory(db_session: AsyncSession):
+    @asynccontextmanager
+    async def factory():
+        yield db_session
+
+    return factory
+
+
+async def test_get_activities_cursor(db_session: AsyncSession, user, make_user):
+    other = await make_user("john")
+    await add_activities(db_session, user, ["document_upload"] * 5)
+    await add_activities(db_session, other, ["document_upload"])
+
+    filter = schema.ActivityFilter(user_id=user.id)
+    first = await stats_dbapi.get_activities(db_session, filter=filter, page_size=3)
+    second = await stats_dbapi.get_activities(
+        db_session, filter=filter, page_size=3, cursor=first.next_cursor
+    )
+
+    assert first.total == 5
+    assert first.num_pages == 2
+    items = first.items + second.items
+    assert [item.created_at for item in items] == [
+        START + timedelta(minutes=m) for m in (4, 3, 2, 1, 0)
+    ]
+    assert {item.username for item in items} == {user.username}
+    assert second.next_cursor is None
+
+
+async def test_get_activities_filter(db_session: AsyncSession, user):
+    await add_activities(
+        db_session,
+        user,
+        ["document_upload", "document_download", "document_upload", "document_upload"],
+    )
+
+    filter = schema.ActivityFilter(
+        action="document_upload",
+        since=START + timedelta(minutes=1),
+        until=START + timedelta(minutes=3),
+    )
+    page = await stats_dbapi.get_activities(db_session, filter=filter, page_size=10)
+
+    assert [item.created_at for item in page.items] == [START + timedelta(minutes=2)]
+
+
+async def test_export_activities_in_batches(db_session: AsyncSession, user):
+    await add_activities(db_session, user, ["document_upload"] * 5)
+
+    chunks = [
+        chunk
+        async for chunk in export.export_activities(
+            session_factory(db_session),
+            schema.ActivityFilter(user_id=user.id),
+            schema.ExportFormat.ndjson,
+            batch_size=2,
+        )
+    ]
+
+    # one chunk per batch
+    assert len(chunks) == 3
+    records = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert [r["created_at"] for r in records] == sorted(r["created_at"] for r in records)
+    assert len(records) == 5
+
+
+async def test_export_activities_csv(
+    auth_api_client: AuthTestClient, db_session: AsyncSession
+):
+    user = auth_api_client.user
+    await add_activities(db_session, user, ["document_upload", "document_download"])
+
+    response = await auth_api_client.get(
+        "/stats/activities/export",
+        params={"format": "csv", "user_id": str(user.id), "action": "document_upload"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(r["username"], r["action"]) for r in rows] == [
+        (user.username, "document_upload")
+    ]
+
+
+async def test_all_activities_invalid_cursor(auth_api_client: AuthTestClient):
+    response = await auth_api_client.get(
+        "/stats/all-activities", params={"cursor": "not-a-cursor"}
+    )
+
+    assert response.status_code == 400
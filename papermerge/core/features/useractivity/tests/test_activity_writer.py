@@ -0,0 +1,161 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.config import ActivityOverflow
+from papermerge.core.features.useractivity.writer import ActivityWriter, Event
+
+
+@pytest.fixture()
+def make_writer(db_session: AsyncSession):
+    writers = []
+
+    def session_factory():
+        # own session in a savepoint of test's transaction: failed inserts
+        # roll back only the savepoint
+        return AsyncSession(
+            bind=db_session.bind, join_transaction_mode="create_savepoint"
+        )
+
+    def _make(**kwargs) -> ActivityWriter:
+        writer = ActivityWriter(session_factory=session_factory, **kwargs)
+        writers.append(writer)
+        return writer
+
+    yield _make
+
+    for writer in writers:
+        if writer._task is not None:
+            writer._task.cancel()
+
+
+def activity(user_id, action: str = "test", node_id=None) -> Event:
+    values = {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "node_id": node_id,
+        "version_id": None,
+        "action": action,
+        "metadata": None,
+        "created_at": datetime.utcnow(),
+    }
+    return Event(orm.Activity.__table__, values)
+
+
+async def activity_actions(db_session: AsyncSession, user_id) -> list[str]:
+    stmt = (
+        select(orm.Activity.action)
+        .where(orm.Activity.user_id == user_id)
+        .order_by(orm.Activity.created_at)
+    )
+    return list((await db_session.scalars(stmt)).all())
+
+
+async def wait_until_written(writer: ActivityWriter, count: int):
+    async with asyncio.timeout(5):
+        while writer.stats().written < count:
+            await asyncio.sleep(0.01)
+
+
+async def test_flush_on_batch_size(make_writer, db_session, user):
+    writer = make_writer(batch_size=3, flush_interval=60)
+    writer.start()
+
+    for action in ("a", "b"):
+        writer.record(activity(user.id, action))
+    await asyncio.sleep(0.05)
+    # below batch size, flush interval not reached
+    assert writer.stats().written == 0
+
+    writer.record(activity(user.id, "c"))
+    await wait_until_written(writer, 3)
+
+    assert await activity_actions(db_session, user.id) == ["a", "b", "c"]
+    assert writer.stats().buffered == 0
+
+
+async def test_flush_on_interval(make_writer, db_session, user):
+    writer = make_writer(batch_size=100, flush_interval=0.05)
+    writer.start()
+
+    writer.record(activity(user.id))
+    await wait_until_written(writer, 1)
+
+    assert await activity_actions(db_session, user.id) == ["test"]
+
+
+async def test_shutdown_flushes_buffered_events(make_writer, db_session, user):
+    writer = make_writer(batch_size=100, flush_interval=60)
+    writer.start()
+
+    for action in ("a", "b"):
+        writer.record(activity(user.id, action))
+    await writer.shutdown()
+
+    assert not writer.running
+    assert await activity_actions(db_session, user.id) == ["a", "b"]
+
+
+@pytest.mark.parametrize(
+    "overflow, expected",
+    [
+        (ActivityOverflow.DROP_NEWEST, ["a", "b"]),
+        (ActivityOverflow.DROP_OLDEST, ["b", "c"]),
+    ],
+)
+async def test_overflow_drops_events(make_writer, db_session, user, overflow, expected):
+    writer = make_writer(queue_size=2, overflow=overflow)
+
+    accepted = [writer.record(activity(user.id, action)) for action in "abc"]
+    await writer.flush()
+
+    assert accepted == [True, True, overflow == ActivityOverflow.DROP_OLDEST]
+    assert writer.stats().dropped == 1
+    assert await activity_actions(db_session, user.id) == expected
+
+
+async def test_block_waits_for_free_space(make_writer, db_session, user):
+    writer = make_writer(
+        queue_size=1, flush_interval=60, overflow=ActivityOverflow.BLOCK
+    )
+    writer.start()
+
+    assert await writer.put(activity(user.id, "a"))
+    # buffer is full: `put` wakes up the flusher and waits for it
+    assert await writer.put(activity(user.id, "b"))
+    await writer.shutdown()
+
+    assert writer.stats().dropped == 0
+    assert await activity_actions(db_session, user.id) == ["a", "b"]
+
+
+async def test_block_drops_after_timeout(make_writer, user):
+    # flusher is not running, nothing will make room
+    writer = make_writer(
+        queue_size=1, overflow=ActivityOverflow.BLOCK, block_timeout=0.01
+    )
+
+    assert await writer.put(activity(user.id, "a"))
+    assert not await writer.put(activity(user.id, "b"))
+    assert writer.stats().dropped == 1
+
+
+async def test_failed_event_does_not_lose_batch(make_writer, db_session, user):
+    writer = make_writer()
+
+    writer.record(activity(user.id, "a"))
+    # no such node
+    writer.record(activity(user.id, "b", node_id=uuid.uuid4()))
+    writer.record(activity(user.id, "c"))
+    await writer.flush()
+
+    stats = writer.stats()
+    assert (stats.written, stats.failed) == (2, 1)
+    assert await activity_actions(db_session, user.id) == ["a", "c"]
+    count = select(func.count()).select_from(orm.Activity)
+    assert await db_session.scalar(count) == 2
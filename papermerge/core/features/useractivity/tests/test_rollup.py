@@ -0,0 +1,204 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.features.useractivity import rollup
+from papermerge.core.features.useractivity.db import api as stats_dbapi
+from papermerge.core.tests.types import AuthTestClient
+
+NOW = datetime(2026, 3, 10, 12, 30)
+
+
+def add_event(
+    db_session: AsyncSession, user, action_type: str, timestamp: datetime, node_id=None
+):
+    db_session.add(
+        orm.UserActivityStats(
+            user_id=user.id,
+            node_id=node_id,
+            action_type=action_type,
+            timestamp=timestamp,
+        )
+    )
+
+
+async def add_document(
+    db_session: AsyncSession, user, created_at: datetime, sizes: list[int]
+) -> orm.Document:
+    doc_id = uuid.uuid4()
+    doc = orm.Document(
+        id=doc_id,
+        ctype="document",
+        title=f"Document {doc_id}",
+        user_id=user.id,
+        parent_id=user.home_folder_id,
+        lang="deu",
+        created_at=created_at,
+    )
+    db_session.add(doc)
+    for number, size in enumerate(sizes, start=1):
+        db_session.add(
+            orm.DocumentVersion(
+                document=doc, number=number, size=size, lang="deu", page_count=1
+            )
+        )
+    await db_session.flush()
+
+    return doc
+
+
+async def test_activity_rollup(db_session: AsyncSession, user):
+    add_event(db_session, user, "document_upload", NOW - timedelta(minutes=20))
+    add_event(db_session, user, "document_upload", NOW - timedelta(minutes=10))
+    # upload of a document deleted since
+    add_event(db_session, user, "document_upload", NOW - timedelta(days=2))
+    add_event(db_session, user, "document_download_url", NOW - timedelta(days=2))
+    await db_session.flush()
+
+    await rollup.rollup(db_session, now=NOW)
+
+    hourly = (
+        await db_session.execute(
+            select(orm.ActivityHourly.action, orm.ActivityHourly.count).order_by(
+                orm.ActivityHourly.bucket, orm.ActivityHourly.action
+            )
+        )
+    ).all()
+    assert hourly == [
+        ("document_download_url", 1),
+        ("document_upload", 1),
+        ("document_upload", 2),
+    ]
+
+    totals = await stats_dbapi.get_activity_totals(db_session)
+    assert totals == {"total_uploads": 3, "total_deletions": 3, "total_downloads": 1}
+
+    totals = await stats_dbapi.get_activity_totals(db_session, date_from=NOW.date())
+    assert totals == {"total_uploads": 2, "total_deletions": 2, "total_downloads": 0}
+
+
+async def test_rollup_recomputes_only_recent_buckets(db_session: AsyncSession, user):
+    add_event(db_session, user, "document_upload", NOW - timedelta(minutes=10))
+    await db_session.flush()
+    await rollup.rollup(db_session, now=NOW)
+
+    later = NOW + timedelta(minutes=30)
+    # logged late, but within lookback
+    add_event(db_session, user, "document_upload", NOW - timedelta(minutes=5))
+    # older than lookback e.g. written directly to the database
+    add_event(db_session, user, "document_upload", NOW - timedelta(days=1))
+    await db_session.flush()
+
+    result = await rollup.rollup(
+        db_session, now=later, lookback=timedelta(hours=1), snapshots=False
+    )
+
+    assert result.since == NOW - timedelta(hours=1)
+    assert result.snapshots is False
+    totals = await stats_dbapi.get_activity_totals(db_session)
+    assert totals["total_uploads"] == 2
+
+    await rollup.rollup(db_session, now=later, full=True)
+
+    totals = await stats_dbapi.get_activity_totals(db_session)
+    assert totals["total_uploads"] == 3
+
+
+async def test_documents_rollup(db_session: AsyncSession, user):
+    await add_document(db_session, user, NOW - timedelta(days=3), [500, 2_000_000])
+    await add_document(db_session, user, NOW, [20_000_000])
+    biggest = await add_document(db_session, user, NOW, [30_000_000])
+
+    await rollup.rollup(db_session, now=NOW)
+
+    summary = await stats_dbapi.get_advanced_summary(db_session)
+    assert summary["per_user"] == [
+        {
+            "user_id": user.id,
+            "username": user.username,
+            "total_bytes": 52_000_500,
+            "total_documents": 3,
+        }
+    ]
+    assert summary["largest_documents"][0]["node_id"] == biggest.id
+    assert summary["file_size_distribution"] == [
+        {"size_category": "large (>10MB)", "file_count": 2, "total_bytes": 50_000_000},
+        {"size_category": "medium (1-10MB)", "file_count": 1, "total_bytes": 2_000_000},
+        {"size_category": "small (<1MB)", "file_count": 1, "total_bytes": 500},
+    ]
+
+    summary = await stats_dbapi.get_advanced_summary(
+        db_session, date_from=NOW.date(), date_to=NOW.date()
+    )
+    assert summary["per_user"][0]["total_documents"] == 2
+    assert [item["size_category"] for item in summary["file_size_distribution"]] == [
+        "large (>10MB)"
+    ]
+
+
+async def test_stats_summary_date_range(
+    auth_api_client: AuthTestClient, db_session: AsyncSession
+):
+    user = auth_api_client.user
+    await add_document(db_session, user, datetime(2026, 1, 15, 8), [100])
+    await add_document(db_session, user, datetime(2026, 2, 15, 8), [100])
+    await rollup.rollup(db_session, now=NOW)
+
+    response = await auth_api_client.get(
+        "/stats/stats/summary",
+        params={"date_from": date(2026, 2, 1), "date_to": date(2026, 2, 28)},
+    )
+
+    assert response.status_code == 200, response.json()
+    active_users = response.json()["active_users"]
+    assert [(u["username"], u["document_count"]) for u in active_users] == [
+        (user.username, 1)
+    ]
+
+
+async def test_stats_endpoints(auth_api_client: AuthTestClient, db_session: AsyncSession):
+    await add_document(db_session, auth_api_client.user, NOW, [100])
+    await rollup.rollup(db_session, now=NOW)
+
+    for url in (
+        "/stats/summary",
+        "/stats/stats/summary",
+        "/stats/stats/advanced-summary",
+        "/stats/stats/tags-by-group",
+    ):
+        response = await auth_api_client.get(url)
+        assert response.status_code == 200, (url, response.json())
+
+
+async def test_stats_endpoints_before_first_rollup(
+    auth_api_client: AuthTestClient, db_session: AsyncSession
+):
+    for url in ("/stats/summary", "/stats/stats/tags-by-group"):
+        response = await auth_api_client.get(url)
+        assert response.status_code == 503, (url, response.json())
+
+
+async def test_rollup_worker(db_session: AsyncSession, user):
+    rolled_up = asyncio.Event()
+
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+        rolled_up.set()
+
+    await add_document(db_session, user, datetime.utcnow(), [100])
+    worker = rollup.StatsRollup(interval=60, session_factory=session_factory)
+
+    worker.start()
+    await asyncio.wait_for(rolled_up.wait(), timeout=10)
+    await worker.shutdown()
+
+    assert not worker.running
+    assert await rollup.is_computed(db_session)
+    docs = await db_session.scalar(select(func.sum(orm.DocumentsDaily.documents)))
+    assert docs == 1
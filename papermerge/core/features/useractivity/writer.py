@@ -0,0 +1,291 @@
+"""
+Buffered writer of user activity (audit) events
+
+Request handlers only append events (`Activity` and `UserActivityStats`
+rows) to an in memory buffer; a background task writes them in bulk
+INSERTs, in its own session, when the buffer holds `batch_size` events or
+every `flush_interval` seconds. Thus logging adds neither queries nor
+commits to the request path.
+
+Buffer is bounded (`queue_size` events). When it is full:
+
+    drop_newest - new event is dropped
+    drop_oldest - oldest buffered event is dropped to make room
+    block - `put` waits (up to `block_timeout`) until the flusher makes room,
+        then drops the event
+
+Dropped events, as well as events which could not be written, are counted
+(see `ActivityWriter.stats`). Events recorded before `start` stay buffered
+and are written once the flusher runs; `shutdown` writes everything still
+buffered. Counters are per process.
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import Table, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core.config import ActivityOverflow, get_settings
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.features.useractivity.db.activity import Activity
+from papermerge.core.features.useractivity.db.orm import UserActivityStats
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+
+@dataclass(frozen=True)
+class Event:
+    table: Table
+    values: dict[str, Any]
+
+
+@dataclass(frozen=True)
+class WriterStats:
+    buffered: int
+    written: int
+    dropped: int  # buffer was full
+    failed: int  # insert failed, e.g. referenced node was deleted meanwhile
+
+
+class ActivityWriter:
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        queue_size: int = 10_000,
+        overflow: ActivityOverflow = ActivityOverflow.DROP_OLDEST,
+        block_timeout: float = 1.0,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.queue_size = max(queue_size, 1)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.session_factory = session_factory
+
+        self._buffer: deque[Event] = deque()
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        # asyncio primitives are bound to event loop, thus they are
+        # created in `start` (i.e. in the loop which runs the flusher)
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._space: asyncio.Event | None = None
+        self._flushing: asyncio.Lock | None = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def stats(self) -> WriterStats:
+        return WriterStats(
+            buffered=len(self._buffer),
+            written=self._written,
+            dropped=self._dropped,
+            failed=self._failed,
+        )
+
+    def record(self, event: Event) -> bool:
+        """Buffers the event; never blocks
+
+        Returns False if the event was dropped (buffer full). With `block`
+        policy behaves as `drop_newest`; use `put` to wait for free space.
+        """
+        if len(self._buffer) >= self.queue_size:
+            if self.overflow == ActivityOverflow.DROP_OLDEST:
+                self._buffer.popleft()
+                self._drop()
+            else:
+                self._drop()
+                return False
+
+        self._buffer.append(event)
+        if len(self._buffer) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+        return True
+
+    async def put(self, event: Event) -> bool:
+        """Buffers the event; waits for free space only with `block` policy"""
+        if (
+            self.overflow == ActivityOverflow.BLOCK
+            and len(self._buffer) >= self.queue_size
+            and self.running
+        ):
+            self._wakeup.set()
+            try:
+                async with asyncio.timeout(self.block_timeout):
+                    while len(self._buffer) >= self.queue_size:
+                        self._space.clear()
+                        await self._space.wait()
+            except TimeoutError:
+                pass
+
+        return self.record(event)
+
+    def start(self):
+        """Starts the flusher in the running event loop"""
+        if self.running:
+            return
+
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._flushing = asyncio.Lock()
+        self._task = asyncio.create_task(self._run(), name="activity-writer")
+
+    async def shutdown(self, timeout: float = 10):
+        """Stops the flusher after it wrote all buffered events"""
+        if self.running:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except TimeoutError:
+                self._task.cancel()
+                logger.warning(
+                    f"Activity writer did not finish in {timeout}s;"
+                    f" {len(self._buffer)} events lost"
+                )
+        self._task = None
+
+    async def flush(self):
+        """Writes all buffered events"""
+        if self._flushing is None:
+            await self._flush()
+            return
+
+        async with self._flushing:
+            await self._flush()
+
+    async def _flush(self):
+        while self._buffer:
+            count = min(self.batch_size, len(self._buffer))
+            batch = [self._buffer.popleft() for _ in range(count)]
+            if self._space is not None:
+                self._space.set()
+            await self._write(batch)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._safe_flush()
+        # events recorded while the last flush was in progress
+        await self._safe_flush()
+
+    async def _safe_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Activity writer failed to flush: {e!r}")
+
+    async def _write(self, batch: list[Event]):
+        rows: dict[Table, list[dict]] = {}
+        for event in batch:
+            rows.setdefault(event.table, []).append(event.values)
+
+        try:
+            async with self.session_factory() as db_session:
+                for table, values in rows.items():
+                    await db_session.execute(insert(table), values)
+                await db_session.commit()
+        except Exception as e:
+            logger.warning(
+                f"Bulk insert of {len(batch)} activity events failed ({e!r});"
+                " inserting them one by one"
+            )
+            await self._write_each(batch)
+            return
+
+        self._written += len(batch)
+
+    async def _write_each(self, batch: list[Event]):
+        """Inserts events one by one, skipping (and counting) failed ones"""
+        written = 0
+        try:
+            async with self.session_factory() as db_session:
+                for event in batch:
+                    try:
+                        async with db_session.begin_nested():
+                            await db_session.execute(
+                                insert(event.table), [event.values]
+                            )
+                    except Exception as e:
+                        logger.debug(f"Activity event {event.values} skipped: {e!r}")
+                    else:
+                        written += 1
+                await db_session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to write {len(batch)} activity events: {e!r}")
+            written = 0
+
+        self._written += written
+        self._failed += len(batch) - written
+
+    def _drop(self):
+        self._dropped += 1
+        # one warning per power of two, not one per event
+        if self._dropped & (self._dropped - 1) == 0:
+            logger.warning(
+                f"Activity buffer is full ({self.queue_size} events);"
+                f" {self._dropped} events dropped so far"
+            )
+
+
+writer = ActivityWriter(
+    batch_size=config.papermerge__activity__batch_size,
+    flush_interval=config.papermerge__activity__flush_interval,
+    queue_size=config.papermerge__activity__queue_size,
+    overflow=config.papermerge__activity__overflow,
+    block_timeout=config.papermerge__activity__block_timeout,
+)
+
+
+async def log_activity(
+    user_id: uuid.UUID,
+    action: str,
+    node_id: uuid.UUID | None = None,
+    version_id: uuid.UUID | None = None,
+    metadata: dict | None = None,
+) -> bool:
+    """Records `Activity` row; returns False if the event was dropped"""
+    values = {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "node_id": node_id,
+        "version_id": version_id,
+        "action": action,
+        "metadata": metadata,
+        "created_at": datetime.utcnow(),
+    }
+    return await writer.put(Event(Activity.__table__, values))
+
+
+async def log_stats(
+    user_id: uuid.UUID,
+    action_type: str,
+    node_id: uuid.UUID | None = None,
+) -> bool:
+    """Records `UserActivityStats` row; returns False if the event was dropped"""
+    values = {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "node_id": node_id,
+        "action_type": action_type,
+        "count": 1,
+        "timestamp": datetime.utcnow(),
+    }
+    return await writer.put(Event(UserActivityStats.__table__, values))
@@ -1,5 +1,4 @@
 import uuid
-import math
 import logging
 from typing import Tuple
 
@@ -9,9 +8,11 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from papermerge.core import orm, schema
+from papermerge.core.db import pagination
 from papermerge.core.utils.misc import is_valid_uuid
 from papermerge.core.features.auth import scopes
 from papermerge.core import constants
+from papermerge.core.types import TotalMode
 from papermerge.core.schemas import error as err_schema
 from papermerge.core.features.groups.db.orm import user_groups_association
 from .orm import User
@@ -149,21 +150,32 @@ async def get_user_details(
 
 
 async def get_users(
-    db_session: AsyncSession, *, page_size: int, page_number: int
+    db_session: AsyncSession,
+    *,
+    page_size: int,
+    page_number: int,
+    cursor: str | None = None,
+    total: TotalMode = TotalMode.exact,
 ) -> schema.PaginatedResponse[schema.User]:
-    stmt_total_users = select(func.count(orm.User.id))
-    total_users = (await db_session.execute(stmt_total_users)).scalar()
-
-    offset = page_size * (page_number - 1)
-    stmt = select(orm.User).limit(page_size).offset(offset)
-
-    db_users = (await db_session.scalars(stmt)).all()
-    items = [schema.User.model_validate(db_user) for db_user in db_users]
-
-    total_pages = math.ceil(total_users / page_size)
+    page = await pagination.paginate(
+        db_session,
+        select(orm.User),
+        order_by=[orm.User.username],
+        tiebreaker=orm.User.id,
+        page_size=page_size,
+        page_number=page_number,
+        cursor=cursor,
+        total=total,
+    )
+    items = [schema.User.model_validate(row.User) for row in page.rows]
 
     return schema.PaginatedResponse[schema.User](
-        items=items, page_size=page_size, page_number=page_number, num_pages=total_pages
+        items=items,
+        page_size=page_size,
+        page_number=page_number,
+        num_pages=page.num_pages(page_size),
+        next_cursor=page.next_cursor,
+        total=page.total,
     )
 
 
@@ -10,10 +10,12 @@ from papermerge.core import schema, dbapi
 from papermerge.core import utils
 from papermerge.core.features import auth
 from papermerge.core.features.auth import scopes
-from papermerge.core.tasks import delete_user_data
+from papermerge.core.features.auth import principal_cache
+from papermerge.core.tasks import delete_user_data, send_task
 from papermerge.core.routers.common import OPEN_API_GENERIC_JSON_DETAIL
 from papermerge.core.routers.params import CommonQueryParams
 from papermerge.core.db.engine import get_db
+from papermerge.core.db.pagination import InvalidCursor
 
 router = APIRouter(
     prefix="/users",
@@ -90,9 +92,16 @@ async def get_users(
     Required scope: `{scope}`
     """
 
-    paginated_users = await dbapi.get_users(
-        db_session, page_size=params.page_size, page_number=params.page_number
-    )
+    try:
+        paginated_users = await dbapi.get_users(
+            db_session,
+            page_size=params.page_size,
+            page_number=params.page_number,
+            cursor=params.cursor,
+            total=params.total,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return paginated_users
 
@@ -141,6 +150,8 @@ async def create_user(
     if error:
         raise HTTPException(status_code=400, detail=error.model_dump())
 
+    await principal_cache.invalidate()
+
     return user
 
 
@@ -210,13 +221,18 @@ async def delete_user(
 
     try:
         if os.environ.get("PAPERMERGE__REDIS__URL"):
-            delete_user_data.apply_async(kwargs={"user_id": str(user_id)})
+            send_task(
+                db_session, delete_user_data.name, kwargs={"user_id": str(user_id)}
+            )
+            await db_session.commit()
         else:
             await dbapi.delete_user(db_session, user_id=user_id)
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=469, detail=str(e))
 
+    await principal_cache.invalidate()
+
 
 @router.patch("/{user_id}", status_code=200, response_model=schema.UserDetails)
 @utils.docstring_parameter(scope=scopes.USER_UPDATE)
@@ -237,6 +253,8 @@ async def update_user(
     if error:
         raise HTTPException(status_code=404, detail=error.model_dump())
 
+    await principal_cache.invalidate()
+
     return user
 
 
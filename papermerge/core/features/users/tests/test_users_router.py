@@ -2,7 +2,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from papermerge.core import schema, dbapi, orm
+from papermerge.core import schema, dbapi, orm, tasks
 from papermerge.core.tests.types import AuthTestClient
 from .utils import verify_password
 
@@ -140,6 +140,25 @@ async def test_delete_user(
     assert response.status_code == 204, response.text
 
 
+async def test_delete_user_task_invalidates_principals_after_delete(
+    make_user, monkeypatch, db_session: AsyncSession
+):
+    user = await make_user(username="Karl")
+    existing = []
+
+    async def invalidate():
+        stmt = select(orm.User.id).where(orm.User.id == user.id)
+        existing.append((await db_session.execute(stmt)).scalar())
+
+    monkeypatch.setattr(tasks.principal_cache, "invalidate", invalidate)
+
+    await tasks.delete_user(db_session, user.id)
+    # already deleted
+    await tasks.delete_user(db_session, user.id)
+
+    assert existing == [None, None]
+
+
 async def test_change_user_password(
     make_user, auth_api_client: AuthTestClient, random_string, db_session: AsyncSession
 ):
@@ -1,6 +1,6 @@
 from .features.users.db.orm import User, user_groups_association
-from .features.document.db.orm import Document, DocumentVersion, Page
-from .features.nodes.db.orm import Folder, Node
+from .features.document.db.orm import Blob, Document, DocumentVersion, Page
+from .features.nodes.db.orm import Folder, Node, NodeClosure
 from .features.tags.db.orm import Tag, NodeTagsAssociation
 from .features.custom_fields.db.orm import CustomField, CustomFieldValue
 from .features.groups.db.orm import Group
@@ -10,15 +10,29 @@ from .features.shared_nodes.db.orm import SharedNode
 from .features.eventlog.db.orm import EventLog
 from .features.useractivity.db.orm import UserActivityStats
 from .features.useractivity.db.activity import Activity  # Import the new Activity model
+from .features.useractivity.db.rollup import (
+    ActivityHourly,
+    DocumentsDaily,
+    FileSizesDaily,
+    LargestDocument,
+    RoleStats,
+    RollupState,
+    SharedNodeStats,
+    TagStats,
+)
+from .features.tasks.db.orm import OutboxMessage
+from papermerge.search.db.orm import SearchChange, SearchIndexEntry
 
 __all__ = [
     'User',
     'user_groups_association',
+    'Blob',
     'Document',
     'DocumentVersion',
     'Page',
     'Folder',
     'Node',
+    'NodeClosure',
     'Tag',
     'NodeTagsAssociation',
     'CustomField',
@@ -32,7 +46,18 @@ __all__ = [
     'SharedNode',
     'EventLog',
     'UserActivityStats',
-    'Activity'  # Add Activity to the __all__ list
+    'Activity',  # Add Activity to the __all__ list
+    'ActivityHourly',
+    'DocumentsDaily',
+    'FileSizesDaily',
+    'LargestDocument',
+    'RoleStats',
+    'RollupState',
+    'SharedNodeStats',
+    'TagStats',
+    'OutboxMessage',
+    'SearchIndexEntry',
+    'SearchChange',
 ]
 
 
@@ -10,6 +10,7 @@ config = get_settings()
 __all__ = [
     'thumbnail_path',
     'docver_path',
+    'blob_path',
     'page_txt_path',
     'page_path',
     'page_svg_path',
@@ -17,6 +18,7 @@ __all__ = [
     'page_hocr_path',
     'abs_thumbnail_path',
     'abs_docver_path',
+    'abs_blob_path',
     'abs_page_txt_path',
     'abs_page_path',
     'abs_page_svg_path',
@@ -55,8 +57,18 @@ def abs_thumbnail_path(
 
 def docver_path(
     uuid: UUID | str,
-    file_name: str
+    file_name: str,
+    sha256: str | None = None,
 ) -> Path:
+    """
+    Relative path to the document version file.
+
+    Files of versions with `sha256` are kept (once per content) in the
+    blob store, see `blob_path`.
+    """
+    if sha256:
+        return blob_path(sha256)
+
     uuid_str = str(uuid)
 
     return Path(
@@ -70,14 +82,26 @@ def docver_path(
 
 def abs_docver_path(
     uuid: UUID | str,
-    file_name: str
+    file_name: str,
+    sha256: str | None = None,
 ):
     return Path(
         config.papermerge__main__media_root,
-        docver_path(uuid, file_name)
+        docver_path(uuid, file_name, sha256=sha256)
     )
 
 
+def blob_path(sha256: str) -> Path:
+    """
+    Relative path to the content addressed file with given SHA-256 digest.
+    """
+    return Path(const.BLOBS, sha256[0:2], sha256[2:4], sha256)
+
+
+def abs_blob_path(sha256: str) -> Path:
+    return Path(config.papermerge__main__media_root) / blob_path(sha256)
+
+
 def page_path(
     uuid: UUID | str,
 ) -> Path:
@@ -1,6 +1,7 @@
 from fastapi import Query
 from pydantic import BaseModel
 from papermerge.core.features.nodes.schema import OrderBy
+from papermerge.core.types import TotalMode
 
 
 class CommonQueryParams(BaseModel):
@@ -8,5 +9,11 @@ class CommonQueryParams(BaseModel):
     page_number: int = Query(
         1, ge=1, description="Page number. It is first, second etc. page?"
     )
+    cursor: str | None = Query(
+        None,
+        description="`next_cursor` of the previous page; if given,"
+        " `page_number` is ignored",
+    )
+    total: TotalMode = TotalMode.exact
     order_by: OrderBy | None = None
     filter: str | None = None
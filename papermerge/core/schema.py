@@ -20,6 +20,7 @@ from .features.document.schema import (
     CFV,
     DocumentCustomFieldsUpdate,
     DocumentCFV,
+    DocumentCFVFilter,
     ExtractPagesIn,
     ExtractPagesOut,
     PageAndRotOp,
@@ -83,6 +84,7 @@ __all__ = [
     'CustomFieldType',
     'CustomFieldValue',
     'DocumentCFV',
+    'DocumentCFVFilter',
     'CFV',
     'DocumentCustomFieldsUpdate',
     'ExtractPagesIn',
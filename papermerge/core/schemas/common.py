@@ -10,8 +10,11 @@ T = TypeVar("T")
 class PaginatedResponse(BaseModel, Generic[T]):
     page_size: int
     page_number: int
-    num_pages: int
+    num_pages: int | None
     items: Sequence[T]
+    # pass as `cursor` to get the next page; None on the last page
+    next_cursor: str | None = None
+    total: int | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
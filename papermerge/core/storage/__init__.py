@@ -0,0 +1,72 @@
+"""
+Storage of media files (page data i.e. OCR artifacts, ...)
+
+Backend is selected by `papermerge__main__file_server`:
+
+    * local - files in media root; copies share data blocks (reflink) or
+      are done in kernel, see `local.clone_file`
+    * s3 - objects in `papermerge__s3__bucket_name` bucket; copies are done
+      server side
+"""
+import logging
+import os
+from functools import lru_cache
+from importlib import import_module
+from pathlib import Path
+
+from papermerge.core.config import FileServer, get_settings
+from papermerge.core.storage.base import Storage
+from papermerge.core.storage.local import LocalStorage, clone_file
+
+logger = logging.getLogger(__name__)
+MEDIA_ROOT = os.environ.get("PAPERMERGE__MAIN__MEDIA_ROOT", "./media")
+
+
+def get_storage_class(import_path: str | None = None) -> type[Storage]:
+    """Storage class given by dotted `import_path` (default: by file server)"""
+    if import_path:
+        module_name, _, class_name = import_path.rpartition(".")
+        return getattr(import_module(module_name), class_name)
+
+    if get_settings().papermerge__main__file_server == FileServer.S3.value:
+        from papermerge.core.storage.s3 import S3Storage
+
+        return S3Storage
+
+    return LocalStorage
+
+
+@lru_cache(maxsize=1)
+def get_storage_instance() -> Storage:
+    config = get_settings()
+    storage_class = get_storage_class()
+
+    if storage_class is LocalStorage:
+        return LocalStorage(hardlink=config.papermerge__storage__hardlink)
+
+    bucket = config.papermerge__s3__bucket_name
+    if not bucket:
+        raise ValueError(
+            "PAPERMERGE__S3__BUCKET_NAME must be set when file server is s3"
+        )
+
+    return storage_class(
+        bucket=bucket,
+        prefix=config.papermerge__main__prefix,
+        endpoint_url=os.environ.get("AWS_S3_ENDPOINT_URL"),
+        max_workers=config.papermerge__storage__s3_max_workers,
+    )
+
+
+def abs_path(some_relative_path: Path) -> Path:
+    return Path(MEDIA_ROOT) / some_relative_path
+
+
+__all__ = [
+    "get_storage_class",
+    "get_storage_instance",
+    "abs_path",
+    "clone_file",
+    "Storage",
+    "LocalStorage",
+]
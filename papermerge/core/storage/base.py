@@ -0,0 +1,45 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable
+
+
+class Storage(ABC):
+    """Files of the media root (locally or in object storage)
+
+    Files are addressed by keys i.e. paths relative to the media root, as
+    returned by `papermerge.core.pathlib` functions (`page_path`, ...).
+    A key is either a file or a "directory" i.e. all files under it.
+
+    Operations are batched: backends copy (delete) all files of all
+    given keys in one go, in parallel where it pays off.
+    """
+
+    @abstractmethod
+    def exists(self, key: Path) -> bool:
+        """True if there is a file at, or under, `key`"""
+
+    @abstractmethod
+    def copy_many(self, pairs: Iterable[tuple[Path, Path]]) -> list[Path]:
+        """Copies `src` (file or all files under it) to `dst`, for each pair
+
+        Files already at destination are overwritten. Returns sources
+        which do not exist (nothing was copied for them).
+        """
+
+    @abstractmethod
+    def delete_many(self, keys: Iterable[Path]) -> int:
+        """Deletes `keys` (files or all files under them)
+
+        Missing keys are ignored. Returns number of deleted files.
+        """
+
+    def copy(self, src: Path, dst: Path) -> bool:
+        """Copies `src` to `dst`; returns False if `src` does not exist"""
+        return len(self.copy_many([(src, dst)])) == 0
+
+    def delete(self, key: Path) -> int:
+        return self.delete_many([key])
+
+    def copy_page(self, src: Path, dst: Path) -> bool:
+        """Copies page data (OCR text, hOCR, SVG, ...) i.e. `page_path` dir"""
+        return self.copy(src, dst)
@@ -0,0 +1,120 @@
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from papermerge.core.config import get_settings
+from papermerge.core.storage.base import Storage
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+# ioctl of Linux: makes destination share data blocks of the source
+# (btrfs, XFS with reflink=1, bcachefs, ...)
+FICLONE = 0x40049409
+
+
+def clone_file(src: Path, dst: Path, hardlink: bool = False):
+    """Copies file `src` to `dst` doing as little I/O as possible
+
+    In order of preference:
+
+        * hard link (only with `hardlink`; both paths then refer to the
+          same file, which must not be modified in place anymore)
+        * reflink: copy on write clone, no data is copied at all
+        * copy in kernel, see `misc.copy_fileobj`
+    """
+    if hardlink:
+        try:
+            dst.unlink(missing_ok=True)
+            os.link(src, dst)
+            return
+        except OSError as e:
+            # e.g. different file systems, too many links
+            logger.debug(f"Failed to link {src} to {dst}: {e!r}")
+
+    # `papermerge.core.utils` imports this package
+    from papermerge.core.utils.misc import copy_fileobj
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        if not _reflink(fsrc, fdst):
+            copy_fileobj(fsrc, fdst)
+
+
+def _reflink(fsrc: BinaryIO, fdst: BinaryIO) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        return False
+
+    return True
+
+
+def _walk(path: Path) -> Iterator[Path]:
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            yield Path(dirpath, name)
+
+
+class LocalStorage(Storage):
+    """Files in a directory (by default the media root)"""
+
+    def __init__(self, root: Path | None = None, hardlink: bool = False):
+        self._root = root
+        self.hardlink = hardlink
+
+    @property
+    def root(self) -> Path:
+        return Path(self._root or config.papermerge__main__media_root)
+
+    def path(self, key: Path) -> Path:
+        return self.root / key
+
+    def exists(self, key: Path) -> bool:
+        return self.path(key).exists()
+
+    def copy_many(self, pairs: Iterable[tuple[Path, Path]]) -> list[Path]:
+        missing = []
+        # each destination directory is created once per batch
+        created_dirs = set()
+        for src, dst in pairs:
+            src_path, dst_path = self.path(src), self.path(dst)
+            if src_path.is_dir():
+                files = [
+                    (path, dst_path / path.relative_to(src_path))
+                    for path in _walk(src_path)
+                ]
+            elif src_path.is_file():
+                files = [(src_path, dst_path)]
+            else:
+                missing.append(src)
+                continue
+
+            for file_src, file_dst in files:
+                if file_dst.parent not in created_dirs:
+                    file_dst.parent.mkdir(parents=True, exist_ok=True)
+                    created_dirs.add(file_dst.parent)
+                clone_file(file_src, file_dst, hardlink=self.hardlink)
+
+        return missing
+
+    def delete_many(self, keys: Iterable[Path]) -> int:
+        deleted = 0
+        for key in keys:
+            path = self.path(key)
+            if path.is_dir():
+                deleted += sum(1 for _ in _walk(path))
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.exists():
+                path.unlink(missing_ok=True)
+                deleted += 1
+
+        return deleted
@@ -0,0 +1,116 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched
+from pathlib import Path
+from typing import Iterable
+
+from papermerge.core.storage.base import Storage
+
+logger = logging.getLogger(__name__)
+
+# max number of keys per DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+
+class S3Storage(Storage):
+    """Files in S3 (or S3 compatible e.g. MinIO) bucket
+
+    Key of the object is `<prefix>/<key>` i.e. the same layout as used
+    by the s3 worker and CloudFront URLs (see `document.s3`). Objects are
+    copied server side (`CopyObject`); data never passes through this
+    process. Listing, copy and delete requests of a batch run in parallel,
+    on `max_workers` threads.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client=None,
+        endpoint_url: str | None = None,
+        max_workers: int = 16,
+    ):
+        if client is None:
+            # optional dependency: papermerge-core[cloud]
+            import boto3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.max_workers = max(max_workers, 1)
+
+    def key(self, key: Path) -> str:
+        key = Path(key).as_posix()
+        if self.prefix:
+            return f"{self.prefix}/{key}"
+
+        return key
+
+    def exists(self, key: Path) -> bool:
+        return len(self._list(self.key(key), limit=1)) > 0
+
+    def copy_many(self, pairs: Iterable[tuple[Path, Path]]) -> list[Path]:
+        pairs = list(pairs)
+        missing = []
+        copies = []
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            listings = pool.map(lambda pair: self._list(self.key(pair[0])), pairs)
+            for (src, dst), src_keys in zip(pairs, listings):
+                if len(src_keys) == 0:
+                    missing.append(src)
+                    continue
+                src_prefix, dst_prefix = self.key(src), self.key(dst)
+                copies.extend(
+                    (src_key, dst_prefix + src_key[len(src_prefix):])
+                    for src_key in src_keys
+                )
+            # consume results, so that errors are raised
+            list(pool.map(self._copy_object, copies))
+
+        return missing
+
+    def delete_many(self, keys: Iterable[Path]) -> int:
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            listings = pool.map(lambda key: self._list(self.key(key)), keys)
+            object_keys = [key for listing in listings for key in listing]
+            deleted = pool.map(
+                self._delete_objects, batched(object_keys, DELETE_BATCH_SIZE)
+            )
+            return sum(deleted)
+
+    def _list(self, key: str, limit: int | None = None) -> list[str]:
+        """Keys of the object `key` and of objects "under" `key/`"""
+        result = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=key):
+            for item in page.get("Contents", []):
+                # prefix "a/b" also matches "a/bc"
+                if item["Key"] == key or item["Key"].startswith(f"{key}/"):
+                    result.append(item["Key"])
+                    if limit and len(result) >= limit:
+                        return result
+
+        return result
+
+    def _copy_object(self, keys: tuple[str, str]):
+        src_key, dst_key = keys
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=dst_key,
+            CopySource={"Bucket": self.bucket, "Key": src_key},
+        )
+
+    def _delete_objects(self, keys: tuple[str, ...]) -> int:
+        response = self.client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        errors = response.get("Errors", [])
+        for error in errors:
+            logger.warning(
+                f"Failed to delete {error.get('Key')}: {error.get('Message')}"
+            )
+
+        return len(keys) - len(errors)
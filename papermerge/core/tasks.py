@@ -1,28 +1,72 @@
+import asyncio
 import logging
+import uuid
 
 from celery import shared_task
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from papermerge.celery_app import app as celery_app
-from papermerge.core.utils.decorators import if_redis_present
-
-#from papermerge.core.models import User
+from papermerge.core.cache import client as cache
+from papermerge.core.config import get_settings
+from papermerge.core.db.engine import AsyncSessionLocal, engine
+from papermerge.core.features.auth import principal_cache
+from papermerge.core.features.tasks import outbox
+from papermerge.core.features.users.db import api as users_dbapi
 
 logger = logging.getLogger(__name__)
+config = get_settings()
+
+# whether dropping of tasks (no broker) was reported already
+_drop_reported = False
 
 
 @shared_task
 def delete_user_data(user_id):
-    pass
-    #try:
-    #    user = User.objects.get(id=user_id)
-        # first delete all files associated with the user
-    #    user.delete_user_data()
-        # then delete the user DB entry
-    #    user.delete()
-    #except User.DoesNotExist:
-    #    logger.info(f"User: {user_id} already deleted")
-
-@if_redis_present
-def send_task(*args, **kwargs):
-    logger.debug(f"Send task {args} {kwargs}")
-    celery_app.send_task(*args, **kwargs)
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db_session:
+                await delete_user(db_session, uuid.UUID(user_id))
+        finally:
+            # connections are bound to this task's event loop
+            await engine.dispose()
+            await cache.close()
+
+    asyncio.run(run())
+
+
+async def delete_user(db_session: AsyncSession, user_id: uuid.UUID):
+    try:
+        await users_dbapi.delete_user(db_session, user_id=user_id)
+    except NoResultFound:
+        logger.info(f"User: {user_id} already deleted")
+    # user's requests made since `delete_user` endpoint invalidated the
+    # cache (outbox, broker) may have cached the principal again
+    await principal_cache.invalidate()
+
+
+def send_task(
+    db_session: AsyncSession,
+    name: str,
+    kwargs: dict | None = None,
+    route_name: str | None = None,
+):
+    """Queues the task in the outbox; it is published once `db_session` commits
+
+    See `papermerge.core.features.tasks.outbox`. Without a broker
+    (`papermerge__redis__url` not defined) the task is dropped, as nothing
+    would ever publish it; the first drop is logged as a warning.
+    """
+    global _drop_reported
+
+    if config.papermerge__redis__url is None:
+        if not _drop_reported:
+            _drop_reported = True
+            logger.warning(
+                "PAPERMERGE__REDIS__URL is not set: background tasks"
+                f" (e.g. {name}) are not sent to workers"
+            )
+        logger.debug(f"No broker, task {name} {kwargs} dropped")
+        return
+
+    logger.debug(f"Queue task {name} {kwargs}")
+    outbox.enqueue(db_session, name, kwargs=kwargs, route_name=route_name)
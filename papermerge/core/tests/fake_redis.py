@@ -0,0 +1,106 @@
+"""In-process fake of the `redis.asyncio.Redis` subset used by cache client"""
+import time
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+class FakeRedis:
+    def __init__(self):
+        # key -> (value, expires at)
+        self.data: dict[str, tuple[bytes, float | None]] = {}
+        # number of requests sent to the "server"
+        self.round_trips = 0
+
+    def _get(self, name: str) -> bytes | None:
+        entry = self.data.get(name)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[name]
+            return None
+        return value
+
+    def _set(self, name, value, ex=None, px=None, nx=False) -> bool | None:
+        if nx and self._get(name) is not None:
+            return None
+        expires_at = None
+        if ex is not None:
+            expires_at = time.monotonic() + ex
+        elif px is not None:
+            expires_at = time.monotonic() + px / 1000
+        self.data[name] = (_encode(value), expires_at)
+        return True
+
+    def _delete(self, *names) -> int:
+        return sum(1 for name in names if self.data.pop(name, None) is not None)
+
+    def ttl(self, name: str) -> float | None:
+        """Remaining time to live in seconds (test helper, not async)"""
+        _, expires_at = self.data[name]
+        if expires_at is None:
+            return None
+        return expires_at - time.monotonic()
+
+    async def get(self, name):
+        self.round_trips += 1
+        return self._get(name)
+
+    async def set(self, name, value, ex=None, px=None, nx=False):
+        self.round_trips += 1
+        return self._set(name, value, ex=ex, px=px, nx=nx)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self._get(key) for key in keys]
+
+    async def delete(self, *names):
+        self.round_trips += 1
+        return self._delete(*names)
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        """Only the compare and delete script (`RELEASE_LOCK`) is supported"""
+        self.round_trips += 1
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        if self._get(keys[0]) == _encode(args[0]):
+            return self._delete(keys[0])
+        return 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def get(self, name):
+        self.commands.append(lambda: self.redis._get(name))
+        return self
+
+    def set(self, name, value, ex=None, px=None, nx=False):
+        self.commands.append(
+            lambda: self.redis._set(name, value, ex=ex, px=px, nx=nx)
+        )
+        return self
+
+    def delete(self, *names):
+        self.commands.append(lambda: self.redis._delete(*names))
+        return self
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        result = [command() for command in self.commands]
+        self.commands = []
+        return result
+
+    async def reset(self):
+        self.commands = []
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from papermerge.core.cache import EmptyClient, RedisClient
+from papermerge.core.tests.fake_redis import FakeRedis
+
+
+@pytest.fixture()
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture()
+def cache(redis):
+    return RedisClient(prefix="pm", ttl_jitter=0.1, connection=redis)
+
+
+async def test_get_is_single_round_trip(cache, redis):
+    await cache.set("a", "value")
+    redis.round_trips = 0
+
+    assert await cache.get("a") == b"value"
+    assert await cache.get("missing") is None
+    assert redis.round_trips == 2
+
+
+async def test_keys_are_namespaced(cache, redis):
+    await cache.set("a", b"\x00\xff")
+
+    assert list(redis.data.keys()) == ["pm:a"]
+    assert await cache.get("a") == b"\x00\xff"
+
+
+async def test_ttl_jitter(cache, redis):
+    await cache.set("a", "value", ex=100)
+
+    assert 99 < redis.ttl("pm:a") <= 110
+
+
+async def test_mget_and_mset(cache, redis):
+    await cache.mset({"a": "1", "b": b"2"}, ex=60)
+
+    assert redis.round_trips == 1
+    assert await cache.mget(["a", "missing", "b"]) == [b"1", None, b"2"]
+    assert redis.round_trips == 2
+
+
+async def test_pipeline(cache, redis):
+    await cache.set("a", "1")
+    redis.round_trips = 0
+
+    async with cache.pipeline() as pipe:
+        pipe.set("b", "2").get("a").delete("a")
+        result = await pipe.execute()
+
+    assert result == [True, b"1", 1]
+    assert redis.round_trips == 1
+    assert await cache.get("a") is None
+
+
+async def test_get_or_compute_caches_value(cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "computed"
+
+    assert await cache.get_or_compute("a", compute) == b"computed"
+    assert await cache.get_or_compute("a", compute) == b"computed"
+    assert len(calls) == 1
+
+
+async def test_get_or_compute_concurrent_callers_compute_once(cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return b"computed"
+
+    results = await asyncio.gather(
+        *[cache.get_or_compute("a", compute) for _ in range(10)]
+    )
+
+    assert results == [b"computed"] * 10
+    assert len(calls) == 1
+
+
+async def test_get_or_compute_waits_for_other_process(cache, redis):
+    """Another process holds the lock and computes the value"""
+    await redis.set("pm:lock:a", "other", px=5000)
+
+    async def other_process():
+        await asyncio.sleep(0.1)
+        await redis.set("pm:a", b"from other process", ex=60)
+
+    async def compute():
+        raise AssertionError("must not be called")
+
+    _, value = await asyncio.gather(
+        other_process(), cache.get_or_compute("a", compute)
+    )
+
+    assert value == b"from other process"
+
+
+async def test_get_or_compute_propagates_errors(cache, redis):
+    async def compute():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await cache.get_or_compute("a", compute)
+
+    # lock is released
+    assert "pm:lock:a" not in redis.data
+
+
+async def test_get_or_compute_keeps_lock_taken_over_by_other_process(cache, redis):
+    """Computation outlived the lock, which another process holds now"""
+
+    async def compute():
+        redis._set("pm:lock:a", "other", px=5000)
+        return b"computed"
+
+    assert await cache.get_or_compute("a", compute, lock_timeout=0.01) == b"computed"
+    assert redis._get("pm:lock:a") == b"other"
+
+
+async def test_empty_client():
+    cache = EmptyClient()
+    await cache.set("a", "1")
+
+    async def compute():
+        return "computed"
+
+    assert await cache.get("a") is None
+    assert await cache.mget(["a", "b"]) == [None, None]
+    assert await cache.get_or_compute("a", compute) == b"computed"
+    async with cache.pipeline() as pipe:
+        pipe.set("a", "1").get("a")
+        assert await pipe.execute() == [None, None]
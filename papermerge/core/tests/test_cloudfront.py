@@ -0,0 +1,65 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from papermerge.core import cloudfront
+
+
+@pytest.fixture()
+def cf_key(tmp_path, monkeypatch):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    key_path = tmp_path / "private_key.pem"
+    key_path.write_bytes(
+        private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+    )
+    monkeypatch.setattr(
+        cloudfront.settings, "papermerge__main__cf_sign_url_private_key", str(key_path)
+    )
+    monkeypatch.setattr(cloudfront.settings, "papermerge__main__cf_sign_url_key_id", "K1")
+
+    return key_path
+
+
+def test_expires_at_is_aligned_to_buckets():
+    # bucket = 450 seconds (75% of 600)
+    assert cloudfront.expires_at(600, now=900) == 900 + 600
+    assert cloudfront.expires_at(600, now=1349) == 900 + 600
+    assert cloudfront.expires_at(600, now=1350) == 1350 + 600
+    # URL is valid at least 25% of `valid_for`
+    assert cloudfront.expires_at(600, now=1349) - 1349 >= 150
+
+
+def test_signed_url_is_reused_within_bucket(cf_key):
+    url = "https://cdn.example.com/thumbnails/1.jpg"
+
+    signed1 = cloudfront.sign_url(url)
+    signed2 = cloudfront.sign_url(url)
+    query = parse_qs(urlparse(signed1).query)
+
+    assert signed1 == signed2
+    assert query["Key-Pair-Id"] == ["K1"]
+    assert int(query["Expires"][0]) == cloudfront.expires_at(600)
+
+
+def test_sign_urls(cf_key):
+    urls = [f"https://cdn.example.com/thumbnails/{i}.jpg" for i in range(3)]
+
+    signed = cloudfront.sign_urls(urls)
+
+    assert len(signed) == 3
+    assert [s.split("?")[0] for s in signed] == urls
+    assert signed[0] == cloudfront.sign_url(urls[0])
+
+
+def test_private_key_is_parsed_once(cf_key):
+    cloudfront.load_private_key.cache_clear()
+
+    cloudfront.sign_urls([f"https://cdn.example.com/{i}.jpg" for i in range(5)])
+
+    assert cloudfront.load_private_key.cache_info().misses == 1
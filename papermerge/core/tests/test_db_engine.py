@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import exc
+
+from papermerge.core.db import engine as db_engine
+
+
+@pytest.fixture()
+def small_pool(monkeypatch):
+    monkeypatch.setattr(db_engine.config, "papermerge__database__pool_size", 1)
+    monkeypatch.setattr(db_engine.config, "papermerge__database__max_overflow", 0)
+    monkeypatch.setattr(db_engine.config, "papermerge__database__pool_timeout", 1)
+
+
+async def test_pool_stats_count_checked_out_and_timeouts(small_pool):
+    if not db_engine.SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
+        pytest.skip("connection pooling is used only with PostgreSQL")
+
+    engine = db_engine.create_engine(db_engine.SQLALCHEMY_DATABASE_URL)
+    try:
+        async with engine.connect():
+            stats = db_engine.get_pool_stats(engine)
+            assert stats.pool_size == 1
+            assert stats.checked_out == 1
+
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        stats = db_engine.get_pool_stats(engine)
+        assert stats.checked_out == 0
+        assert stats.checked_in == 1
+        assert stats.waiting == 0
+        assert stats.timeouts == 1
+    finally:
+        await engine.dispose()
+
+
+def test_pooling_disabled(monkeypatch):
+    monkeypatch.setattr(db_engine.config, "papermerge__database__pool_size", 0)
+
+    engine = db_engine.create_engine("postgresql+asyncpg://user@localhost/db")
+
+    assert db_engine.get_pool_stats(engine).pool_size == 0
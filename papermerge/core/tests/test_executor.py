@@ -0,0 +1,52 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from papermerge.core import executor
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def fail():
+    raise ValueError("boom")
+
+
+def die():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+async def test_run_in_pool():
+    stats_before = executor.get_stats()
+
+    assert await executor.run_in_pool(add, 1, b=2) == 3
+
+    stats_after = executor.get_stats()
+    assert stats_after.jobs_total == stats_before.jobs_total + 1
+    assert stats_after.queue_depth == 0
+
+
+async def test_run_in_pool_propagates_errors():
+    stats_before = executor.get_stats()
+
+    with pytest.raises(ValueError):
+        await executor.run_in_pool(fail)
+
+    assert executor.get_stats().jobs_failed == stats_before.jobs_failed + 1
+
+
+async def test_run_in_pool_recovers_from_dead_worker(monkeypatch):
+    monkeypatch.setattr(executor.config, "papermerge__main__pdf_workers", 1)
+    executor.shutdown_pool()
+
+    try:
+        with pytest.raises(BrokenProcessPool):
+            await executor.run_in_pool(die)
+
+        # broken pool was replaced by a fresh one
+        assert await executor.run_in_pool(add, 1, b=2) == 3
+    finally:
+        executor.shutdown_pool()
@@ -0,0 +1,48 @@
+import os
+
+from starlette.datastructures import Headers
+
+from papermerge.core.utils import http
+
+
+def test_file_etag_changes_with_file(tmp_path):
+    path = tmp_path / "sm.jpg"
+    path.write_bytes(b"one")
+    etag1 = http.file_etag(os.stat(path))
+    path.write_bytes(b"one-two")
+    etag2 = http.file_etag(os.stat(path))
+
+    assert etag1.startswith('"') and etag1.endswith('"')
+    assert etag1 != etag2
+
+
+def test_is_not_modified_if_none_match():
+    etag = '"abc"'
+
+    assert http.is_not_modified(Headers({"if-none-match": '"abc"'}), etag)
+    assert http.is_not_modified(Headers({"if-none-match": 'W/"abc"'}), etag)
+    assert http.is_not_modified(Headers({"if-none-match": '"x", "abc"'}), etag)
+    assert http.is_not_modified(Headers({"if-none-match": "*"}), etag)
+    assert not http.is_not_modified(Headers({"if-none-match": '"x"'}), etag)
+    assert not http.is_not_modified(Headers({}), etag)
+
+
+def test_is_not_modified_if_modified_since():
+    mtime = 1_700_000_000.5
+    since = http.http_date(mtime)
+
+    assert http.is_not_modified(
+        Headers({"if-modified-since": since}), '"abc"', last_modified=mtime
+    )
+    assert not http.is_not_modified(
+        Headers({"if-modified-since": since}), '"abc"', last_modified=mtime + 10
+    )
+    assert not http.is_not_modified(
+        Headers({"if-modified-since": "garbage"}), '"abc"', last_modified=mtime
+    )
+    # If-None-Match takes precedence
+    assert not http.is_not_modified(
+        Headers({"if-modified-since": since, "if-none-match": '"x"'}),
+        '"abc"',
+        last_modified=mtime,
+    )
@@ -0,0 +1,20 @@
+from papermerge.core.utils import image
+
+
+def test_page_lock_is_exclusive(tmp_path):
+    with image.page_lock(tmp_path) as acquired:
+        assert acquired
+
+        with image.page_lock(tmp_path) as acquired_again:
+            assert not acquired_again
+
+
+def test_page_lock_removes_lock_file(tmp_path):
+    with image.page_lock(tmp_path) as acquired:
+        assert acquired
+        assert (tmp_path / image.LOCK_FILE_NAME).exists()
+
+    assert not (tmp_path / image.LOCK_FILE_NAME).exists()
+
+    with image.page_lock(tmp_path) as acquired:
+        assert acquired
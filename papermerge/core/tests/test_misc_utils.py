@@ -1,4 +1,10 @@
+import hashlib
+import io
+import os
 from datetime import datetime
+
+import pytest
+
 from papermerge.core.utils import misc
 
 
@@ -39,3 +45,77 @@ def test_float2str_with_str_as_input():
 
     assert misc.float2str("2018.12") == "2018-12"
     assert misc.float2str("1983.06") == "1983-06"
+
+
+async def test_stream_file(tmp_path):
+    content = b"0123456789" * 1000
+    dst = tmp_path / "a" / "b" / "file.bin"
+
+    size, checksum = await misc.stream_file(
+        io.BytesIO(content), dst, chunk_size=333
+    )
+
+    assert size == len(content)
+    assert checksum == hashlib.sha256(content).hexdigest()
+    assert dst.read_bytes() == content
+
+
+async def test_copy_file_path_to_path(tmp_path):
+    src = tmp_path / "src.bin"
+    content = os.urandom(3 * 1024 * 1024 + 5)
+    src.write_bytes(content)
+    dst = tmp_path / "a" / "b" / "dst.bin"
+
+    size = await misc.copy_file(src, dst, fsync=True)
+
+    assert size == len(content)
+    assert dst.read_bytes() == content
+    # no temporary files left behind
+    assert os.listdir(dst.parent) == ["dst.bin"]
+
+
+async def test_copy_file_from_streams(tmp_path):
+    content = b"0123456789" * 1000
+    dst = tmp_path / "file.bin"
+
+    for src in (content, io.BytesIO(content), io.BufferedReader(io.BytesIO(content))):
+        dst.write_bytes(b"old content")
+        assert await misc.copy_file(src, dst, chunk_size=333) == len(content)
+        assert dst.read_bytes() == content
+
+
+async def test_copy_file_keeps_destination_on_error(tmp_path):
+    dst = tmp_path / "file.bin"
+    dst.write_bytes(b"old content")
+
+    with pytest.raises(FileNotFoundError):
+        await misc.copy_file(tmp_path / "missing.bin", dst)
+
+    assert dst.read_bytes() == b"old content"
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+
+async def test_copy_file_mode(tmp_path):
+    new = tmp_path / "new.bin"
+    existing = tmp_path / "existing.bin"
+    existing.write_bytes(b"old content")
+    existing.chmod(0o640)
+
+    await misc.copy_file(b"content", new)
+    await misc.copy_file(b"new content", existing)
+
+    # as if created with `open`, not readable by the owner only (`mkstemp`)
+    assert new.stat().st_mode & 0o777 == 0o666 & ~misc._UMASK
+    assert existing.stat().st_mode & 0o777 == 0o640
+
+
+def test_copy_fileobj_from_offset(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"header" + b"x" * 10000)
+
+    with open(src, "rb") as fsrc, open(tmp_path / "dst.bin", "wb") as fdst:
+        fsrc.seek(6)
+        fdst.write(b"new ")
+        assert misc.copy_fileobj(fsrc, fdst) == 10000
+
+    assert (tmp_path / "dst.bin").read_bytes() == b"new " + b"x" * 10000
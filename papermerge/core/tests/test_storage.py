@@ -0,0 +1,156 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from papermerge.core import storage as core_storage
+from papermerge.core.config import FileServer, get_settings
+from papermerge.core.storage import LocalStorage, clone_file
+from papermerge.core.storage.s3 import S3Storage
+
+
+class FakeS3Client:
+    """In memory stand-in of S3 compatible storage (e.g. MinIO)
+
+    Implements the subset of boto3 S3 client API used by `S3Storage`.
+    """
+
+    def __init__(self, page_size: int = 2):
+        self.buckets: dict[str, dict[str, bytes]] = {}
+        self.page_size = page_size
+        self.calls: dict[str, int] = {}
+
+    def put_object(self, Bucket, Key, Body: bytes):
+        self.buckets.setdefault(Bucket, {})[Key] = Body
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        self._count("list_objects_v2")
+        keys = sorted(k for k in self.buckets.get(Bucket, {}) if k.startswith(Prefix))
+        for i in range(0, max(len(keys), 1), self.page_size):
+            page = keys[i:i + self.page_size]
+            yield {"Contents": [{"Key": k} for k in page]} if page else {}
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self._count("copy_object")
+        bucket = self.buckets[CopySource["Bucket"]]
+        self.buckets[Bucket][Key] = bucket[CopySource["Key"]]
+
+    def delete_objects(self, Bucket, Delete):
+        self._count("delete_objects")
+        assert len(Delete["Objects"]) <= 1000
+        for obj in Delete["Objects"]:
+            self.buckets[Bucket].pop(obj["Key"], None)
+        return {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+
+def make_page(root: Path, key: str, text: str):
+    (root / key).mkdir(parents=True)
+    (root / key / "page.txt").write_text(text)
+    (root / key / "svg").mkdir()
+    (root / key / "svg" / "page.svg").write_text(f"<svg>{text}</svg>")
+
+
+def test_clone_file(tmp_path: Path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+
+    clone_file(src, tmp_path / "copy.bin")
+    clone_file(src, tmp_path / "link.bin", hardlink=True)
+
+    assert (tmp_path / "copy.bin").read_bytes() == src.read_bytes()
+    assert not (tmp_path / "copy.bin").samefile(src)
+    assert (tmp_path / "link.bin").samefile(src)
+
+
+def test_local_copy_many(tmp_path: Path):
+    make_page(tmp_path, "pages/a", "A")
+    make_page(tmp_path, "pages/b", "B")
+    (tmp_path / "pages/c").mkdir()
+    (tmp_path / "pages/c/page.txt").write_text("old")
+    storage = LocalStorage(root=tmp_path)
+
+    missing = storage.copy_many(
+        [
+            (Path("pages/a"), Path("pages/c")),
+            (Path("pages/b"), Path("pages/d")),
+            (Path("pages/x"), Path("pages/e")),
+        ]
+    )
+
+    assert missing == [Path("pages/x")]
+    assert (tmp_path / "pages/c/page.txt").read_text() == "A"
+    assert (tmp_path / "pages/d/svg/page.svg").read_text() == "<svg>B</svg>"
+    assert not storage.exists(Path("pages/e"))
+
+
+def test_local_delete_many(tmp_path: Path):
+    make_page(tmp_path, "pages/a", "A")
+    make_page(tmp_path, "pages/b", "B")
+    storage = LocalStorage(root=tmp_path)
+
+    deleted = storage.delete_many(
+        [Path("pages/a"), Path("pages/b/page.txt"), Path("pages/x")]
+    )
+
+    assert deleted == 3
+    assert not storage.exists(Path("pages/a"))
+    assert storage.exists(Path("pages/b/svg/page.svg"))
+
+
+def test_s3_copy_many():
+    client = FakeS3Client()
+    client.buckets["media"] = {}
+    for name in ("page.txt", "page.hocr", "svg/page.svg"):
+        client.put_object("media", f"pm/pages/a/{name}", name.encode())
+    client.put_object("media", "pm/pages/ab/page.txt", b"other page")
+    storage = S3Storage("media", prefix="/pm/", client=client, max_workers=4)
+
+    missing = storage.copy_many(
+        [(Path("pages/a"), Path("pages/c")), (Path("pages/x"), Path("pages/y"))]
+    )
+
+    assert missing == [Path("pages/x")]
+    assert sorted(k for k in client.buckets["media"] if "pages/c" in k) == [
+        "pm/pages/c/page.hocr",
+        "pm/pages/c/page.txt",
+        "pm/pages/c/svg/page.svg",
+    ]
+    assert client.buckets["media"]["pm/pages/c/page.txt"] == b"page.txt"
+    # one request per object, "pages/ab" is not copied
+    assert client.calls["copy_object"] == 3
+    assert storage.exists(Path("pages/c/page.txt"))
+    assert not storage.exists(Path("pages/y"))
+
+
+def test_s3_delete_many_in_batches():
+    client = FakeS3Client(page_size=1000)
+    client.buckets["media"] = {}
+    for i in range(1500):
+        client.put_object("media", f"pages/{i % 500}/{i}.txt", b"x")
+    storage = S3Storage("media", client=client)
+
+    deleted = storage.delete_many(Path(f"pages/{i}") for i in range(500))
+
+    assert deleted == 1500
+    assert client.buckets["media"] == {}
+    assert client.calls["delete_objects"] == 2
+
+
+def test_s3_storage_requires_bucket(monkeypatch):
+    config = get_settings()
+    monkeypatch.setattr(config, "papermerge__main__file_server", FileServer.S3)
+    monkeypatch.setattr(config, "papermerge__s3__bucket_name", None)
+    core_storage.get_storage_instance.cache_clear()
+
+    try:
+        with pytest.raises(ValueError, match="PAPERMERGE__S3__BUCKET_NAME"):
+            core_storage.get_storage_instance()
+    finally:
+        core_storage.get_storage_instance.cache_clear()
@@ -24,8 +24,11 @@ class OCRStatusEnum(str, Enum):
 class PaginatedResponse(BaseModel, Generic[T]):
     page_size: int
     page_number: int
-    num_pages: int
+    num_pages: int | None
     items: Sequence[T]
+    # pass as `cursor` to get the next page; None on the last page
+    next_cursor: str | None = None
+    total: int | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -47,6 +50,24 @@ class OrderEnum(str, Enum):
     asc = "asc"
     desc = "desc"
 
+class TotalMode(str, Enum):
+    """How paginated endpoints count the total number of items"""
+    exact = "exact"
+    estimate = "estimate"  # query planner's estimate; cheap for large sets
+    none = "none"  # don't count; `num_pages` and `total` are null
+
+
+class CFFilterOp(str, Enum):
+    """Comparison of custom field value in documents by type filters"""
+    eq = "eq"
+    ne = "ne"
+    lt = "lt"
+    le = "le"
+    gt = "gt"
+    ge = "ge"
+    contains = "contains"  # text fields only; case insensitive
+
+
 class CFVValueColumn(str, Enum):
     TEXT = 'value_text'
     INT = 'value_int'
@@ -62,6 +83,12 @@ class PaginatedQueryParams(BaseModel):
     page_number: int = Query(
         1, ge=1, description="Page number. It is first, second etc. page?"
     )
+    cursor: str | None = Query(
+        None,
+        description="`next_cursor` of the previous page; if given,"
+        " `page_number` is ignored",
+    )
+    total: TotalMode = TotalMode.exact
     filter: str | None = None
 
 
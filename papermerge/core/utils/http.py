@@ -0,0 +1,47 @@
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.datastructures import Headers
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong ETag of a file, computed the same way as `FileResponse` does"""
+    etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+    digest = hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()
+
+    return f'"{digest}"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(
+    request_headers: Headers,
+    etag: str,
+    last_modified: float | None = None,
+) -> bool:
+    """Should conditional GET request be answered with 304 Not Modified?
+
+    `If-None-Match` takes precedence over `If-Modified-Since`
+    (RFC 9110, section 13.2.2).
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag.removeprefix("W/") in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    # HTTP dates have one second resolution
+    return int(last_modified) <= since.timestamp()
@@ -1,10 +1,12 @@
+import fcntl
 import logging
+import os
+from contextlib import contextmanager
 from pathlib import Path
 from uuid import UUID
 
 from pdf2image import convert_from_path
 
-from papermerge.core import constants as const
 from papermerge.core import pathlib as core_pathlib
 from papermerge.core.types import ImagePreviewSize
 from papermerge.core import config
@@ -14,63 +16,137 @@ settings = config.get_settings()
 PREVIEW_IMAGE_MAP = {
     # size name        : size in pixels
     ImagePreviewSize.sm: settings.papermerge__preview__page_size_sm,
+    ImagePreviewSize.md: settings.papermerge__preview__page_size_md,
+    ImagePreviewSize.lg: settings.papermerge__preview__page_size_lg,
+    ImagePreviewSize.xl: settings.papermerge__preview__page_size_xl,
 }
 
+# name of the lock file inside page's preview folder
+LOCK_FILE_NAME = ".lock"
+
 logger = logging.getLogger(__name__)
 
 
-def file_name_generator(size):
-    yield str(size)
+@contextmanager
+def page_lock(folder: Path):
+    """Non blocking, inter process lock of page's preview folder
 
+    Yields True if lock was acquired and False if some other process
+    (or thread) holds it i.e. is already rendering previews of the same page.
 
-def gen_doc_thumbnail(
-    page_id: UUID,
-    doc_ver_id: UUID,
-    page_number: int,
-    file_name: str,
-    size: int = const.DEFAULT_THUMBNAIL_SIZE,
-):
+    Lock file is removed by its holder on release (while still holding
+    it); whoever locked the removed file meanwhile notices it is not the
+    current lock file anymore and locks the new one instead.
     """
-    Extracts jpg image of page `page_number` from PDF file associated with
-    given `doc_ver_id`.
+    folder.mkdir(exist_ok=True, parents=True)
+    lock_path = folder / LOCK_FILE_NAME
+    while True:
+        lock_file = open(lock_path, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            yield False
+            return
+        if _is_same_file(lock_file, lock_path):
+            break
+        lock_file.close()
+
+    try:
+        yield True
+    finally:
+        lock_path.unlink(missing_ok=True)
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+def _is_same_file(file, path: Path) -> bool:
+    try:
+        return os.stat(path).st_ino == os.fstat(file.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _save_jpg(img, path: Path):
+    """Saves image atomically i.e. readers never see partially written file"""
+    path.parent.mkdir(exist_ok=True, parents=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    img.save(tmp_path, format="JPEG")
+    os.replace(tmp_path, path)
+
+
+def page_preview_paths(page_id: UUID) -> dict[ImagePreviewSize, Path]:
+    """Absolute paths of all preview variants of the page"""
+    return {
+        size: core_pathlib.abs_page_preview_jpg_path(page_id, size=size)
+        for size in PREVIEW_IMAGE_MAP
+    }
 
-    `doc_ver_id` and `file_name` are required for getting the PDF
-    file location.
-    `page_id` and `size` are required for knowing where to save
-    jpg file.
+
+def gen_page_previews(
+    pdf_path: Path,
+    page_number: int,
+    paths: dict[ImagePreviewSize, Path],
+    thumbnail_path: Path | None = None,
+) -> bool:
+    """Renders all `ImagePreviewSize` variants of one page
+
+    PDF page is rasterized only once (in largest size), smaller
+    variants are downscaled from it and saved to respective `paths`.
+    If `thumbnail_path` is given, the small variant is saved there as well.
+
+    Rendering of the same page is coalesced across processes with
+    `page_lock`. Returns False if the page is being rendered by someone else,
+    otherwise True (also when all previews were already present).
     """
-    thb_path = core_pathlib.abs_thumbnail_path(str(page_id))
-    pdf_path = core_pathlib.abs_docver_path(str(doc_ver_id), file_name)
+    folder = paths[ImagePreviewSize.sm].parent
 
-    generate_preview(
-        pdf_path=pdf_path,
-        output_folder=thb_path.parent,
-        page_number=page_number,
-        size_px=settings.papermerge__preview__page_size_sm,
-        size_name=ImagePreviewSize.sm.value,
-    )
+    with page_lock(folder) as acquired:
+        if not acquired:
+            return False
 
+        targets = list(paths.values())
+        if thumbnail_path is not None:
+            targets.append(thumbnail_path)
+        if all(path.exists() for path in targets):
+            return True
 
-def generate_preview(
+        [img] = convert_from_path(
+            str(pdf_path),
+            fmt="jpg",
+            first_page=page_number,
+            last_page=page_number,
+            size=(max(PREVIEW_IMAGE_MAP.values()), None),
+        )
+        for size, size_px in PREVIEW_IMAGE_MAP.items():
+            height = round(img.height * size_px / img.width)
+            resized = img.resize((size_px, height))
+            _save_jpg(resized, paths[size])
+            if size == ImagePreviewSize.sm and thumbnail_path is not None:
+                _save_jpg(resized, thumbnail_path)
+
+    return True
+
+
+def gen_doc_ver_previews(
     pdf_path: Path,
-    output_folder: Path,
-    size_px: int,
-    size_name: str,
-    page_number: int = 1,
-):
-    """Generate jpg thumbnail/preview images of PDF document"""
-    kwargs = {
-        "pdf_path": str(pdf_path),
-        "output_folder": str(output_folder),
-        "fmt": "jpg",
-        "first_page": page_number,
-        "last_page": page_number,
-        "single_file": True,
-        "size": (size_px, None),
-        "output_file": file_name_generator(size_name),
-    }
+    pages: list[tuple[int, dict[ImagePreviewSize, Path]]],
+    thumbnail_path: Path,
+) -> int:
+    """Renders previews of all `pages` i.e. (page_number, paths) pairs
 
-    output_folder.mkdir(exist_ok=True, parents=True)
+    Document thumbnail is generated from the first page.
+    Returns number of pages whose previews are in place after this call
+    (pages locked by another renderer are not counted).
+    """
+    rendered = 0
+    for page_number, paths in pages:
+        if gen_page_previews(
+            pdf_path,
+            page_number=page_number,
+            paths=paths,
+            thumbnail_path=thumbnail_path if page_number == 1 else None,
+        ):
+            rendered += 1
 
-    # generates jpeg previews of PDF file using pdftoppm (poppler-utils)
-    convert_from_path(**kwargs)
+    return rendered
@@ -1,20 +1,31 @@
+import asyncio
+import errno
+import hashlib
 import io
 import logging
 import math
+import os
+import tempfile
 import aiofiles
 import aiofiles.os
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import BinaryIO, Optional
 from uuid import UUID
 
 
 from papermerge.core import constants
+from papermerge.core.config import get_settings
 from papermerge.core.exceptions import InvalidDateFormat
 
 
 logger = logging.getLogger(__name__)
 
+# `os.umask` can only be read by setting it, which is not thread safe:
+# read once, at import
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 
 def is_valid_uuid(uuid_to_test: str) -> bool:
     """
@@ -111,27 +122,216 @@ def float2str(value: float | str | None) -> Optional[str]:
     return f"{year}-{month:02d}"
 
 
-async def copy_file(src: Path | io.BytesIO | bytes, dst: Path):
-    """Copy source file to destination"""
+# `copy_file_range` / `sendfile` can not be used for this pair of files;
+# nothing was copied yet, thus the next method can take over
+_KERNEL_COPY_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+    errno.EPERM,
+}
+
+
+def copy_fileobj(
+    fsrc: BinaryIO,
+    fdst: BinaryIO,
+    chunk_size: int = constants.COPY_CHUNK_SIZE,
+) -> int:
+    """Copy regular file `fsrc` to `fdst`, from current positions
+
+    Data is copied in kernel where possible (`copy_file_range`, which
+    reflinks on some file systems and copies server side on NFS 4.2/SMB3,
+    then `sendfile`); otherwise one chunk of `chunk_size` bytes at a time.
+
+    Returns number of copied bytes.
+    """
+    fdst.flush()
+    for kernel_copy in (_copy_file_range, _sendfile):
+        copied = kernel_copy(fsrc, fdst)
+        if copied is not None:
+            return copied
+
+    copied = 0
+    while chunk := fsrc.read(chunk_size):
+        fdst.write(chunk)
+        copied += len(chunk)
+
+    return copied
+
+
+def _copy_file_range(fsrc: BinaryIO, fdst: BinaryIO) -> int | None:
+    if not hasattr(os, "copy_file_range"):
+        return None
+    return _kernel_copy(
+        lambda count: os.copy_file_range(fsrc.fileno(), fdst.fileno(), count),
+        fsrc,
+        fdst,
+    )
+
+
+def _sendfile(fsrc: BinaryIO, fdst: BinaryIO) -> int | None:
+    if not hasattr(os, "sendfile"):
+        return None
+
+    # `sendfile` with explicit offset does not move position of the source
+    offset = fsrc.tell()
+
+    def send(count: int) -> int:
+        nonlocal offset
+        sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, count)
+        offset += sent
+        return sent
+
+    copied = _kernel_copy(send, fsrc, fdst)
+    if copied is not None:
+        fsrc.seek(offset)
+
+    return copied
+
+
+def _kernel_copy(copy, fsrc: BinaryIO, fdst: BinaryIO) -> int | None:
+    # at most 1 GiB per system call (a call copies up to ~2 GiB anyway)
+    max_count = 1 << 30
+    remaining = os.fstat(fsrc.fileno()).st_size - fsrc.tell()
+    copied = 0
+    while remaining > 0:
+        try:
+            n = copy(min(remaining, max_count))
+        except OSError as e:
+            if copied == 0 and e.errno in _KERNEL_COPY_UNSUPPORTED:
+                return None
+            raise
+        if n == 0:  # source was truncated meanwhile
+            break
+        copied += n
+        remaining -= n
+
+    # file objects do not know that the kernel moved the position
+    fdst.seek(0, os.SEEK_END)
+
+    return copied
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _file_mode(path: Path) -> int:
+    """Mode of existing `path`, otherwise mode `open` would create it with"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_file_atomic(
+    src: Path | BinaryIO | bytes,
+    dst: Path,
+    chunk_size: int = constants.COPY_CHUNK_SIZE,
+    fsync: bool = False,
+) -> int:
+    """Blocking version of `copy_file`"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=dst.parent, prefix=f".{dst.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as fdst:
+            if isinstance(src, Path):
+                with open(src, "rb") as fsrc:
+                    size = copy_fileobj(fsrc, fdst, chunk_size)
+            elif isinstance(src, io.BytesIO):
+                # view of the buffer, not a copy of it (`getvalue`)
+                with src.getbuffer() as view:
+                    size = fdst.write(view)
+            elif isinstance(src, bytes):
+                size = fdst.write(src)
+            elif hasattr(src, "read"):
+                size = 0
+                while chunk := src.read(chunk_size):
+                    size += fdst.write(chunk)
+            else:
+                raise ValueError(
+                    f"src ({src}) is neither instance of Path, binary stream,"
+                    " nor bytes"
+                )
+            # `mkstemp` creates files readable by the owner only
+            os.fchmod(fdst.fileno(), _file_mode(dst))
+            if fsync:
+                fdst.flush()
+                os.fsync(fdst.fileno())
+        os.replace(tmp_name, dst)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    if fsync:
+        # makes the rename durable
+        _fsync_dir(dst.parent)
+
+    return size
+
+
+async def copy_file(
+    src: Path | BinaryIO | bytes,
+    dst: Path,
+    chunk_size: int = constants.COPY_CHUNK_SIZE,
+    fsync: bool | None = None,
+) -> int:
+    """Copy source file to destination
+
+    `src` is a path, a readable binary stream (e.g. `io.BytesIO`) or
+    bytes. Memory usage does not depend on the size of the file: path to
+    path copies are done in kernel (see `copy_fileobj`), streams are copied
+    one chunk of `chunk_size` bytes at a time and `io.BytesIO` is written
+    from its buffer, without copying it.
+
+    Content is written to a temporary file next to `dst`, which is renamed
+    to `dst` once complete: `dst` is never seen partially written. With
+    `fsync` (default: `papermerge__main__fsync`) the content and the rename
+    are flushed to disk before returning.
+
+    Returns number of bytes copied.
+    """
     logger.debug(f"copying {src} to {dst}")
+    if fsync is None:
+        fsync = get_settings().papermerge__main__fsync
+
+    return await asyncio.to_thread(
+        write_file_atomic, src, dst, chunk_size=chunk_size, fsync=fsync
+    )
+
+
+async def stream_file(
+    src: BinaryIO,
+    dst: Path,
+    chunk_size: int = constants.COPY_CHUNK_SIZE,
+) -> tuple[int, str]:
+    """Copy binary stream `src` to `dst` one chunk at a time
+
+    At most `chunk_size` bytes of the source are held in memory at any
+    given moment. Size and SHA-256 checksum of the content are computed
+    in the same pass.
+
+    Returns a tuple (number of bytes written, sha256 hex digest).
+    """
+    logger.debug(f"streaming {src} to {dst}")
 
     if not dst.parent.exists():
         await aiofiles.os.makedirs(dst.parent, exist_ok=True)
 
-    if isinstance(src, Path):
-        logger.debug(f"{src} is a Path instance")
-        # For file-to-file copying, read and write asynchronously
-        async with aiofiles.open(src, "rb") as src_file:
-            async with aiofiles.open(dst, "wb") as dst_file:
-                content = await src_file.read()
-                await dst_file.write(content)
-    elif isinstance(src, io.BytesIO):
-        async with aiofiles.open(dst, "wb") as f:
-            await f.write(src.getvalue())
-    elif isinstance(src, bytes):
-        async with aiofiles.open(dst, "wb") as f:
-            await f.write(src)
-    else:
-        raise ValueError(
-            f"src ({src}) is neither instance of Path, io.BytesIO, nor bytes"
-        )
\ No newline at end of file
+    size = 0
+    digest = hashlib.sha256()
+    async with aiofiles.open(dst, "wb") as dst_file:
+        while chunk := src.read(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+            await dst_file.write(chunk)
+
+    return size, digest.hexdigest()
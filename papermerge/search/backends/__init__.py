@@ -0,0 +1,43 @@
+"""
+Pluggable search backends
+
+Backend is selected by `papermerge__search__url`:
+
+    * not set (or "database://") - full text search in the main database:
+      PostgreSQL `tsvector` + GIN index, or SQLite FTS5
+    * any other URL - external search engine via salinic (e.g. solr://...)
+"""
+from functools import lru_cache
+
+from papermerge.core.config import get_settings
+from papermerge.core.db.engine import engine
+from papermerge.search.backends.base import DatabaseBackend, SearchBackend
+from papermerge.search.backends.external import SalinicBackend
+from papermerge.search.backends.postgres import PGBackend
+from papermerge.search.backends.sqlite import SQLiteBackend
+
+DATABASE_URL = "database://"
+
+
+@lru_cache(maxsize=1)
+def get_backend() -> SearchBackend:
+    url = get_settings().papermerge__search__url
+
+    if url and url != DATABASE_URL:
+        return SalinicBackend(url)
+
+    if engine.dialect.name == "sqlite":
+        return SQLiteBackend()
+
+    return PGBackend()
+
+
+__all__ = [
+    "get_backend",
+    "SearchBackend",
+    "DatabaseBackend",
+    "PGBackend",
+    "SQLiteBackend",
+    "SalinicBackend",
+    "DATABASE_URL",
+]
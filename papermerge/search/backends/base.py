@@ -0,0 +1,203 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Sequence
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, Select, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.db.common import node_perm_filter
+from papermerge.core.features.auth import scopes
+from papermerge.search.db.orm import SearchIndexEntry
+from papermerge.search.schema import (
+    FOLDER,
+    PAGE,
+    DocumentPage,
+    Folder,
+    PaginatedResponse,
+    SearchIndex,
+)
+
+
+class SearchBackend(ABC):
+    """Search index: add/remove `SearchIndex` items and query them"""
+
+    @abstractmethod
+    async def search(
+        self,
+        db_session: AsyncSession,
+        query: str,
+        user_id: UUID,
+        page_number: int = 1,
+        page_size: int = 10,
+        lang: str | None = None,
+    ) -> PaginatedResponse:
+        """Returns matching folders and document pages user has access to
+
+        Documents are returned once, represented by their best matching page.
+        """
+
+    @abstractmethod
+    async def add(self, db_session: AsyncSession, items: Sequence[SearchIndex]):
+        """Adds items to the index, replacing entries with the same ID"""
+
+    @abstractmethod
+    async def remove(self, db_session: AsyncSession, ids: Sequence[str]):
+        """Removes entries (page IDs / folder IDs) from the index"""
+
+    @abstractmethod
+    async def replace(
+        self,
+        db_session: AsyncSession,
+        node_ids: Sequence[UUID],
+        items: Sequence[SearchIndex],
+    ):
+        """Replaces all entries of given nodes (folders, documents) with items
+
+        Commits `db_session` once the index is updated.
+        """
+
+
+class DatabaseBackend(SearchBackend, ABC):
+    """Search index stored in `search_index` table of the main database"""
+
+    # max number of entries inserted with one statement
+    batch_size = 1000
+
+    @abstractmethod
+    async def insert(self, db_session: AsyncSession, items: Sequence[SearchIndex]):
+        """Inserts (or updates) entries of the items, does not commit"""
+
+    async def delete(self, db_session: AsyncSession, where: ColumnElement[bool]):
+        """Deletes entries matching the condition, does not commit"""
+        await db_session.execute(delete(SearchIndexEntry).where(where))
+
+    @abstractmethod
+    async def select_matches(
+        self, db_session: AsyncSession, query: str, lang: str | None
+    ) -> Select:
+        """Selects (id, node_id, rank) of matching entries
+
+        Better matches must have higher rank.
+        """
+
+    async def search(
+        self,
+        db_session: AsyncSession,
+        query: str,
+        user_id: UUID,
+        page_number: int = 1,
+        page_size: int = 10,
+        lang: str | None = None,
+    ) -> PaginatedResponse:
+        matches = await self.select_matches(db_session, query, lang=lang)
+        matches = matches.subquery("matches")
+        ranked = (
+            select(
+                matches.c.id,
+                matches.c.rank,
+                func.row_number()
+                .over(partition_by=matches.c.node_id, order_by=matches.c.rank.desc())
+                .label("pos"),
+            )
+            .join(orm.Node, orm.Node.id == matches.c.node_id)
+            .where(node_perm_filter(user_id, codename=scopes.NODE_VIEW))
+            .subquery("ranked")
+        )
+        # total is counted along with the page, so matches are
+        # ranked only once
+        best = (
+            select(
+                ranked.c.id,
+                ranked.c.rank,
+                func.count().over().label("total"),
+            )
+            .where(ranked.c.pos == 1)
+            .order_by(ranked.c.rank.desc(), ranked.c.id)
+            .limit(page_size)
+            .offset((page_number - 1) * page_size)
+            .subquery("best")
+        )
+        stmt = (
+            select(SearchIndexEntry, best.c.total)
+            .join(best, SearchIndexEntry.id == best.c.id)
+            .order_by(best.c.rank.desc(), SearchIndexEntry.id)
+        )
+        rows = (await db_session.execute(stmt)).all()
+        entries = [entry for entry, _ in rows]
+
+        if rows:
+            total = rows[0].total
+        elif page_number > 1:
+            # page past the last one
+            total = await db_session.scalar(
+                select(func.count()).select_from(
+                    select(ranked.c.id).where(ranked.c.pos == 1).subquery()
+                )
+            )
+        else:
+            total = 0
+
+        return PaginatedResponse(
+            page_size=page_size,
+            page_number=page_number,
+            num_pages=math.ceil(total / page_size),
+            items=[to_result_item(entry) for entry in entries],
+        )
+
+    async def add(self, db_session: AsyncSession, items: Sequence[SearchIndex]):
+        await self.insert(db_session, items)
+        await db_session.commit()
+
+    async def remove(self, db_session: AsyncSession, ids: Sequence[str]):
+        await self.delete(
+            db_session, SearchIndexEntry.id.in_([UUID(str(id)) for id in ids])
+        )
+        await db_session.commit()
+
+    async def replace(
+        self,
+        db_session: AsyncSession,
+        node_ids: Sequence[UUID],
+        items: Sequence[SearchIndex],
+    ):
+        # entries of e.g. pages of previous document version are not among
+        # the items; delete and insert are in one transaction
+        await self.delete(db_session, SearchIndexEntry.node_id.in_(node_ids))
+        await self.insert(db_session, items)
+        await db_session.commit()
+
+
+def entry_values(item: SearchIndex) -> dict:
+    """Column values of `search_index` entry corresponding to the item"""
+    is_folder = item.document_id is None
+    document_version_id = getattr(item, "document_version_id", None)
+
+    return dict(
+        id=UUID(item.id),
+        node_id=UUID(item.id) if is_folder else UUID(item.document_id),
+        document_version_id=UUID(document_version_id) if document_version_id else None,
+        entity_type=FOLDER if is_folder else PAGE,
+        user_id=UUID(item.user_id) if item.user_id else None,
+        lang=item.lang,
+        title=item.title,
+        page_number=None if item.page_number is None else int(item.page_number),
+        tags=list(item.tags or []),
+    )
+
+
+def to_result_item(entry: SearchIndexEntry) -> Folder | DocumentPage:
+    if entry.entity_type == FOLDER:
+        return Folder(
+            id=str(entry.id), title=entry.title, lang=entry.lang, tags=entry.tags
+        )
+
+    return DocumentPage(
+        id=str(entry.id),
+        title=entry.title,
+        lang=entry.lang,
+        tags=entry.tags,
+        page_number=entry.page_number,
+        document_id=str(entry.node_id),
+    )
@@ -0,0 +1,70 @@
+"""
+Search backend delegating to external search engine via salinic
+(`papermerge__search__url`, e.g. solr://...)
+"""
+from typing import Sequence
+from uuid import UUID
+
+from fastapi.concurrency import run_in_threadpool
+from salinic import IndexRO, IndexRW, Search, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.search.backends.base import SearchBackend
+from papermerge.search.schema import PaginatedResponse, SearchIndex
+
+
+class SalinicBackend(SearchBackend):
+    def __init__(self, url: str):
+        self.engine = create_engine(url)
+
+    async def search(
+        self,
+        db_session: AsyncSession,
+        query: str,
+        user_id: UUID,
+        page_number: int = 1,
+        page_size: int = 10,
+        lang: str | None = None,
+    ) -> PaginatedResponse:
+        index = IndexRO(self.engine, schema=SearchIndex)
+        sq = Search(SearchIndex).query(
+            query, page_number=page_number, page_size=page_size
+        )
+        # salinic clients are synchronous (blocking HTTP calls)
+        return await run_in_threadpool(index.search, sq, user_id=str(user_id))
+
+    async def add(self, db_session: AsyncSession, items: Sequence[SearchIndex]):
+        index = IndexRW(self.engine, schema=SearchIndex)
+
+        def _add():
+            for item in items:
+                index.add(item)
+
+        await run_in_threadpool(_add)
+
+    async def remove(self, db_session: AsyncSession, ids: Sequence[str]):
+        index = IndexRW(self.engine, schema=SearchIndex)
+
+        def _remove():
+            for id in ids:
+                index.remove(id=str(id))
+
+        await run_in_threadpool(_remove)
+
+    async def replace(
+        self,
+        db_session: AsyncSession,
+        node_ids: Sequence[UUID],
+        items: Sequence[SearchIndex],
+    ):
+        index = IndexRW(self.engine, schema=SearchIndex)
+
+        def _replace():
+            for node_id in node_ids:
+                # folder entry or all page entries of the document
+                index.remove(query=f"id:{node_id} OR document_id:{node_id}")
+            for item in items:
+                index.add(item)
+
+        await run_in_threadpool(_replace)
+        await db_session.commit()
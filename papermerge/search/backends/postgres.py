@@ -0,0 +1,180 @@
+"""
+PostgreSQL full text search backend
+
+Each entry of `search_index` table has a `tsv` column (covered by GIN
+index) with its title and tags (weight A) and page text (weight B). Title
+and text are stemmed with text search configuration of the page's
+language (`Page.lang`, a tesseract language code); tags are not stemmed.
+
+Query is parsed with `websearch_to_tsquery` (quoted phrases, `or`, `-word`)
+once per configuration in use, thus pages in different languages are
+matched by their own stemming rules; distinct parsed queries are OR-ed.
+"""
+import re
+from typing import Sequence
+
+from sqlalchemy import (
+    Select,
+    Text,
+    bindparam,
+    cast,
+    distinct,
+    false,
+    func,
+    literal,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSQUERY, array, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.search.backends.base import DatabaseBackend, entry_values
+from papermerge.search.db.orm import SearchIndexEntry
+from papermerge.search.schema import SearchIndex
+
+# tesseract language code -> PostgreSQL text search configuration
+LANG_CONFIGS = {
+    "ara": "arabic",
+    "dan": "danish",
+    "deu": "german",
+    "ell": "greek",
+    "eng": "english",
+    "fin": "finnish",
+    "fra": "french",
+    "hun": "hungarian",
+    "ind": "indonesian",
+    "ita": "italian",
+    "lit": "lithuanian",
+    "nld": "dutch",
+    "nor": "norwegian",
+    "por": "portuguese",
+    "ron": "romanian",
+    "rus": "russian",
+    "spa": "spanish",
+    "swe": "swedish",
+    "tur": "turkish",
+}
+# configuration of languages not listed above and of tags
+DEFAULT_CONFIG = "simple"
+
+
+def ts_config(lang: str | None) -> str:
+    return LANG_CONFIGS.get(lang, DEFAULT_CONFIG)
+
+
+def weighted(vector, weight: str):
+    return func.setweight(vector, literal_column(f"'{weight}'"))
+
+
+def tsvector():
+    """Computes `tsv` column from `ts_*` parameters (see `tsvector_params`)"""
+    config = cast(bindparam("ts_config", type_=Text), REGCONFIG)
+    simple = cast(literal(DEFAULT_CONFIG), REGCONFIG)
+
+    title = weighted(func.to_tsvector(config, bindparam("ts_title", type_=Text)), "A")
+    text = weighted(func.to_tsvector(config, bindparam("ts_text", type_=Text)), "B")
+    tags = weighted(func.to_tsvector(simple, bindparam("ts_tags", type_=Text)), "A")
+
+    return title.op("||")(text).op("||")(tags)
+
+
+def tsvector_params(item: SearchIndex) -> dict:
+    return dict(
+        ts_config=ts_config(item.lang),
+        # otherwise PostgreSQL parser would take e.g. "invoice_2024.pdf"
+        # for one single (file name) token
+        ts_title=re.sub(r"[\W_]+", " ", item.title),
+        ts_text=item.text or "",
+        ts_tags=" ".join(item.tags or []),
+    )
+
+
+def upsert_stmt():
+    table = SearchIndexEntry.__table__
+    stmt = insert(table).values(tsv=tsvector())
+
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={
+            name: stmt.excluded[name]
+            for name in (
+                "node_id",
+                "document_version_id",
+                "entity_type",
+                "user_id",
+                "lang",
+                "title",
+                "page_number",
+                "tags",
+                "tsv",
+            )
+        }
+        | {"updated_at": func.now()},
+    )
+
+
+def tsquery(query: str, lang: str | None = None) -> Select:
+    """Selects text of the query parsed for given (or all) languages
+
+    Selects NULL if query has no searchable words (e.g. only stop words).
+    """
+    if lang is None:
+        configs = sorted(set(LANG_CONFIGS.values()) | {DEFAULT_CONFIG})
+    else:
+        configs = sorted({ts_config(lang), DEFAULT_CONFIG})
+
+    parsed = (
+        func.unnest(
+            array(
+                [
+                    func.websearch_to_tsquery(cast(literal(config), REGCONFIG), query)
+                    for config in configs
+                ]
+            )
+        )
+        .table_valued("q")
+        .render_derived(name="parsed")
+    )
+    # Most configurations parse the query into the same tsquery (e.g. numbers,
+    # names); OR-ing duplicates makes matching and especially ranking of
+    # large result sets many times slower, thus only distinct ones are
+    # combined.
+    text = cast(parsed.c.q, Text)
+    combined = func.string_agg(
+        distinct(literal("(") + text + literal(")")), literal(" | ")
+    )
+
+    return select(combined).select_from(parsed).where(text != "")
+
+
+class PGBackend(DatabaseBackend):
+    async def select_matches(
+        self, db_session: AsyncSession, query: str, lang: str | None
+    ) -> Select:
+        # Query is parsed beforehand and inlined into the statement, so that
+        # planner knows how selective it is and picks GIN index for rare
+        # words and sequential scan for very common ones.
+        parsed = await db_session.scalar(tsquery(query, lang=lang))
+        stmt = select(
+            SearchIndexEntry.id,
+            SearchIndexEntry.node_id,
+        )
+        if parsed is None:
+            return stmt.add_columns(literal(0.0).label("rank")).where(false())
+
+        q = cast(literal(parsed, Text, literal_execute=True), TSQUERY)
+        return stmt.add_columns(
+            func.ts_rank_cd(SearchIndexEntry.tsv, q).label("rank")
+        ).where(SearchIndexEntry.tsv.op("@@")(q))
+
+    async def insert(self, db_session: AsyncSession, items: Sequence[SearchIndex]):
+        # One statement with bound parameters only: it is compiled once and
+        # executed for many rows (batched into multi-row INSERTs by the
+        # driver layer); tsvector is computed by the database.
+        stmt = upsert_stmt()
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            await db_session.execute(
+                stmt,
+                [entry_values(item) | tsvector_params(item) for item in batch],
+            )
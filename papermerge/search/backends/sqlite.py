@@ -0,0 +1,112 @@
+"""
+SQLite full text search backend (single node installations)
+
+Title, text and tags of each `search_index` entry are indexed in FTS5
+virtual table `search_index_fts` and ranked with bm25 (title and tags
+weigh 10 times more than text). FTS5 has no per-language stemmers;
+`porter` tokenizer stems English words only, `lang` is ignored.
+"""
+import re
+from typing import Sequence
+
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    column,
+    delete,
+    false,
+    func,
+    insert,
+    literal_column,
+    select,
+    table,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.search.backends.base import DatabaseBackend, entry_values
+from papermerge.search.db.orm import FTS_TABLE_NAME, SearchIndexEntry
+from papermerge.search.schema import SearchIndex
+
+fts = table(
+    FTS_TABLE_NAME,
+    column("id"),
+    column("title"),
+    column("text"),
+    column("tags"),
+)
+
+
+def fts5_query(query: str) -> str | None:
+    """Converts user's query into FTS5 query matching all its words
+
+    Words are quoted, thus FTS5 operators and special characters in the
+    query are not interpreted.
+    """
+    words = re.findall(r"\w+", query)
+    if len(words) == 0:
+        return None
+
+    return " ".join(f'"{word}"' for word in words)
+
+
+class SQLiteBackend(DatabaseBackend):
+    async def select_matches(
+        self, db_session: AsyncSession, query: str, lang: str | None
+    ) -> Select:
+        fts_table = literal_column(FTS_TABLE_NAME)
+        match = fts5_query(query)
+        # columns: id, title, text, tags; lower bm25 is better match
+        bm25 = func.bm25(fts_table, 0.0, 10.0, 1.0, 10.0)
+        stmt = (
+            select(
+                SearchIndexEntry.id,
+                SearchIndexEntry.node_id,
+                (-bm25).label("rank"),
+            )
+            .select_from(fts)
+            .join(SearchIndexEntry, SearchIndexEntry.id == fts.c.id)
+        )
+        if match is None:
+            return stmt.where(false())
+
+        return stmt.where(fts_table.op("MATCH")(match))
+
+    async def insert(self, db_session: AsyncSession, items: Sequence[SearchIndex]):
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            values = [entry_values(item) for item in batch]
+            stmt = sqlite_insert(SearchIndexEntry).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SearchIndexEntry.id],
+                set_={
+                    name: stmt.excluded[name]
+                    for name in values[0]
+                    if name != "id"
+                }
+                | {"updated_at": func.now()},
+            )
+            await db_session.execute(stmt)
+
+            # `search_index.id` is stored as 32 characters hex string
+            fts_ids = [value["id"].hex for value in values]
+            await db_session.execute(delete(fts).where(fts.c.id.in_(fts_ids)))
+            await db_session.execute(
+                insert(fts).values(
+                    [
+                        dict(
+                            id=fts_id,
+                            title=item.title,
+                            text=item.text or "",
+                            tags=" ".join(item.tags or []),
+                        )
+                        for fts_id, item in zip(fts_ids, batch)
+                    ]
+                )
+            )
+
+    async def delete(self, db_session: AsyncSession, where: ColumnElement[bool]):
+        # both `search_index.id` and FTS5 `id` are 32 characters hex strings
+        entry_ids = select(SearchIndexEntry.id).where(where)
+        await db_session.execute(delete(fts).where(fts.c.id.in_(entry_ids)))
+        await super().delete(db_session, where)
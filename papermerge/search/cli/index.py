@@ -1,67 +1,155 @@
-import os
+import asyncio
+import time
 import uuid
+from pathlib import Path
 from typing import Optional
 
 import typer
-from rich import print_json, print
-from salinic import IndexRW, create_engine
+from rich import print_json
+from rich.console import Console
 from typing_extensions import Annotated
 
-from papermerge.core import dbapi, schema
-from papermerge.core.db.engine import AsyncSessionLocal
-from papermerge.search.schema import FOLDER, PAGE, SearchIndex
+from papermerge.core.db.engine import AsyncSessionLocal, engine
+from papermerge.core.utils.cli import async_command
+from papermerge.search import indexer, sync
+from papermerge.search.backends import get_backend
+from papermerge.search.db import triggers
 
 app = typer.Typer(help="Index commands")
+console = Console()
 
 NodeIDsType = Annotated[Optional[list[uuid.UUID]], typer.Argument()]
+CheckpointType = Annotated[
+    Optional[Path],
+    typer.Option(help="File to record progress in; interrupted run resumes from it"),
+]
+
+# seconds between progress reports
+PROGRESS_INTERVAL = 5
 
 
 @app.command("index")
-async def index_cmd(node_ids: NodeIDsType = None, dry_run: bool = False):
-    SEARCH_URL = os.environ.get("PAPERMERGE__SEARCH__URL")
-    if not SEARCH_URL:
-        print("[red][bold]PAPERMERGE__SEARCH__URL[/bold] is missing[/red]")
-        print("Please set [bold]PAPERMERGE__SEARCH__URL[/bold] environment variable")
-        raise typer.Exit(code=1)
-
-    engine = create_engine(SEARCH_URL)
-    index = IndexRW(engine, schema=SearchIndex)
-
-    with AsyncSessionLocal() as db_session:
-        nodes = await dbapi.get_nodes(db_session, node_ids)
-        items = []  # to be added to the index
-        for node in nodes:
-            if isinstance(node, schema.Document):
-                last_ver = await dbapi.get_last_doc_ver(
-                    db_session, user_id=node.user_id, doc_id=node.id
-                )
-                pages = await dbapi.get_doc_ver_pages(db_session, last_ver.id)
-                for page in pages:
-                    item = SearchIndex(
-                        id=str(page.id),
-                        title=node.title,
-                        user_id=str(node.user_id),
-                        document_id=str(node.id),
-                        document_version_id=str(last_ver.id),
-                        page_number=page.number,
-                        text=page.text,
-                        entity_type=PAGE,
-                        tags=[tag.name for tag in node.tags],
-                    )
-                    items.append(item)
-            else:
-                item = SearchIndex(
-                    id=str(node.id),
-                    title=node.title,
-                    user_id=str(node.user_id),
-                    entity_type=FOLDER,
-                    tags=[tag.name for tag in node.tags],
+@async_command
+async def index_cmd(
+    node_ids: NodeIDsType = None,
+    dry_run: bool = False,
+    workers: int = 4,
+    chunk_size: int = 500,
+    checkpoint: CheckpointType = None,
+):
+    """Adds nodes (all of them if no IDs given) to the search index
+
+    Index is kept either in the database (default) or in external search
+    engine, if PAPERMERGE__SEARCH__URL is set.
+    """
+    if dry_run:
+        await print_items(node_ids, chunk_size=chunk_size)
+        return
+
+    last_report = time.monotonic()
+
+    def report(stats: indexer.Stats):
+        nonlocal last_report
+        if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            console.print(
+                f"{stats.nodes} nodes, {stats.pages} pages, "
+                f"{stats.docs_per_sec:.0f} docs/s"
+            )
+
+    progress = indexer.Checkpoint(checkpoint)
+    if progress.last_node_id is not None:
+        console.print(f"Resuming after node {progress.last_node_id}")
+
+    try:
+        stats = await indexer.index_nodes(
+            get_backend(),
+            node_ids=node_ids,
+            chunk_size=chunk_size,
+            workers=workers,
+            checkpoint=progress,
+            on_progress=report,
+        )
+    except BaseException:
+        if checkpoint is not None and progress.last_node_id is not None:
+            console.print(
+                f"Indexing interrupted, nodes up to {progress.last_node_id} "
+                f"are indexed; run again with --checkpoint {checkpoint} to resume"
+            )
+        raise
+
+    console.print(
+        f"Indexed {stats.nodes} nodes ({stats.documents} documents, "
+        f"{stats.pages} pages) in {stats.elapsed:.1f}s, "
+        f"{stats.docs_per_sec:.0f} docs/s"
+    )
+
+
+@app.command("sync")
+@async_command
+async def sync_cmd(
+    follow: bool = False,
+    interval: float = 2.0,
+    batch_size: int = 500,
+    reconcile: bool = False,
+):
+    """Applies changes logged since last sync to the search index
+
+    With --follow keeps running and applies new changes every `interval`
+    seconds. With --reconcile first queues nodes missing from the (database)
+    index or updated after they were indexed.
+    """
+    backend = get_backend()
+
+    async with AsyncSessionLocal() as db_session:
+        if reconcile:
+            count = await sync.reconcile(db_session)
+            console.print(f"Queued {count} missing or outdated nodes")
+
+        while True:
+            start = time.monotonic()
+            result = await sync.sync(db_session, backend, batch_size=batch_size)
+            if result.changes or not follow:
+                console.print(
+                    f"Applied {result.changes} changes of {result.nodes} nodes "
+                    f"in {time.monotonic() - start:.2f}s"
                 )
-                items.append(item)
+            if not follow:
+                break
+            await asyncio.sleep(interval)
+
+
+@app.command("triggers")
+@async_command
+async def triggers_cmd(drop: bool = False):
+    """Installs (or with --drop removes) triggers logging changes for sync
+
+    Triggers are needed only with the database search backend; run this
+    after switching PAPERMERGE__SEARCH__URL from/to an external engine.
+    """
+    async with engine.begin() as conn:
+        if drop:
+            await conn.run_sync(triggers.uninstall)
+            console.print("Search change log triggers dropped")
+            return
+
+        await conn.run_sync(triggers.install)
+
+    console.print(
+        "Search change log triggers installed; run "
+        "`paper-cli index sync --reconcile` to index changes made meanwhile"
+    )
+
 
-        if dry_run:
-            for item in items:
+async def print_items(node_ids: list[uuid.UUID] | None, chunk_size: int):
+    after = None
+    while True:
+        async with AsyncSessionLocal() as db_session:
+            ids = await indexer.get_node_ids(
+                db_session, limit=chunk_size, after=after, node_ids=node_ids
+            )
+            if len(ids) == 0:
+                return
+            for item in await indexer.get_index_items(db_session, ids):
                 print_json(data=item.model_dump())
-        else:
-            for item in items:
-                index.add(item)
+        after = ids[-1]
@@ -1,28 +1,33 @@
-import os
 import uuid
 
 import typer
-from salinic import IndexRO, Search, create_engine
 from rich import print
-from papermerge.search.schema import SearchIndex as Index
+
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.core.utils.cli import async_command
+from papermerge.search.backends import get_backend
 
 app = typer.Typer(help="Search command")
 
 
 @app.command("search")
-def search_cmd(
-    query: str, user_id: uuid.UUID, page_number: int = 1, page_size: int = 10
+@async_command
+async def search_cmd(
+    query: str,
+    user_id: uuid.UUID,
+    page_number: int = 1,
+    page_size: int = 10,
+    lang: str | None = None,
 ):
-    SEARCH_URL = os.environ.get("PAPERMERGE__SEARCH__URL")
-    if not SEARCH_URL:
-        print("[red][bold]PAPERMERGE__SEARCH__URL[/bold] is missing[/red]")
-        print("Please set [bold]PAPERMERGE__SEARCH__URL[/bold] environment variable")
-        raise typer.Exit(code=1)
-
-    engine = create_engine(SEARCH_URL)
-    index = IndexRO(engine, schema=Index)
-
-    sq = Search(Index).query(query, page_number=page_number, page_size=page_size)
+    backend = get_backend()
 
-    results = index.search(sq, user_id=str(user_id))
+    async with AsyncSessionLocal() as db_session:
+        results = await backend.search(
+            db_session,
+            query=query,
+            user_id=user_id,
+            page_number=page_number,
+            page_size=page_size,
+            lang=lang,
+        )
     print(results)
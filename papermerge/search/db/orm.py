@@ -0,0 +1,97 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import (
+    DDL,
+    JSON,
+    BigInteger,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column
+
+from papermerge.core.db.base import Base
+
+# SQLite full text index (FTS5) table, see `papermerge.search.backends.sqlite`
+FTS_TABLE_NAME = "search_index_fts"
+
+
+class SearchIndexEntry(Base):
+    """Entry of the database search index
+
+    Database counterpart of `papermerge.search.schema.SearchIndex`: one
+    entry per page of document's last version and one entry per folder.
+    Text of the page is not stored, only its `tsv` (PostgreSQL) or
+    its FTS5 entry (SQLite).
+    """
+
+    __tablename__ = "search_index"
+
+    # page ID | folder ID
+    id: Mapped[UUID] = mapped_column(primary_key=True)
+    # document ID | folder ID
+    node_id: Mapped[UUID] = mapped_column(
+        ForeignKey("nodes.id", ondelete="CASCADE")
+    )
+    document_version_id: Mapped[UUID] = mapped_column(nullable=True)
+    entity_type: Mapped[str] = mapped_column(String(8))
+    user_id: Mapped[UUID] = mapped_column(nullable=True)
+    lang: Mapped[str] = mapped_column(String(8))
+    title: Mapped[str]
+    page_number: Mapped[int] = mapped_column(nullable=True)
+    tags: Mapped[list[str]] = mapped_column(JSON, default=list)
+    # weighted title, text and tags (PostgreSQL only)
+    tsv = mapped_column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        insert_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        Index("search_index_node_id_idx", "node_id"),
+        Index("search_index_tsv_idx", "tsv", postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+    )
+
+
+class SearchChange(Base):
+    """Node whose search index entries are (possibly) out of date
+
+    Rows are inserted by database triggers (see `papermerge.search.db.triggers`)
+    in the same transaction as the change itself, and consumed by
+    `papermerge.search.sync`.
+    """
+
+    __tablename__ = "search_changes"
+
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer(), "sqlite"), primary_key=True
+    )
+    # no foreign key: deleted nodes are logged too
+    node_id: Mapped[UUID]
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
+event.listen(
+    SearchIndexEntry.__table__,
+    "after_create",
+    DDL(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE_NAME} USING fts5("
+        "id UNINDEXED, title, text, tags, "
+        "tokenize = 'porter unicode61 remove_diacritics 2')"
+    ).execute_if(dialect="sqlite"),
+)
+event.listen(
+    SearchIndexEntry.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {FTS_TABLE_NAME}").execute_if(dialect="sqlite"),
+)
+
+# registers creation of change logging triggers along with the tables
+from papermerge.search.db import triggers  # noqa: E402, F401
@@ -0,0 +1,226 @@
+"""
+Database triggers logging search relevant changes into `search_changes`
+
+A node is logged when its title, language or owner changes, when it is
+created or deleted, when tags are (un)assigned or renamed, when a version
+is added to / removed from a document, and when any page of the document
+changes (text, language, number) - no matter whether the change is made
+by this application, by the OCR worker or by hand.
+
+Triggers exist only with the database search backend, whose index the log
+is replayed into (see `papermerge.search.sync`): with an external search
+engine no write pays for logging. After switching the backend, install
+(or drop) them with `paper-cli index triggers [--drop]`.
+"""
+from sqlalchemy import DDL, Connection, event, text
+
+from papermerge.core.config import get_settings
+from papermerge.core.db.base import Base
+
+config = get_settings()
+
+PG_CREATE = [
+    """
+    CREATE OR REPLACE FUNCTION search_changes_log() RETURNS trigger AS $$
+    DECLARE
+        r RECORD;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            r := OLD;
+        ELSE
+            r := NEW;
+        END IF;
+
+        IF TG_TABLE_NAME = 'nodes' THEN
+            INSERT INTO search_changes (node_id) VALUES (r.id);
+        ELSIF TG_TABLE_NAME = 'nodes_tags' THEN
+            INSERT INTO search_changes (node_id) VALUES (r.node_id);
+        ELSIF TG_TABLE_NAME = 'tags' THEN
+            INSERT INTO search_changes (node_id)
+            SELECT node_id FROM nodes_tags WHERE tag_id = r.id;
+        ELSIF TG_TABLE_NAME = 'document_versions' THEN
+            INSERT INTO search_changes (node_id) VALUES (r.document_id);
+        ELSIF TG_TABLE_NAME = 'pages' THEN
+            INSERT INTO search_changes (node_id)
+            SELECT document_id FROM document_versions
+            WHERE id = r.document_version_id;
+        END IF;
+
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER search_changes_nodes
+    AFTER INSERT OR DELETE ON nodes
+    FOR EACH ROW EXECUTE FUNCTION search_changes_log()
+    """,
+    """
+    CREATE TRIGGER search_changes_nodes_update
+    AFTER UPDATE ON nodes
+    FOR EACH ROW
+    WHEN (
+        (OLD.title, OLD.lang, OLD.user_id)
+        IS DISTINCT FROM (NEW.title, NEW.lang, NEW.user_id)
+    )
+    EXECUTE FUNCTION search_changes_log()
+    """,
+    """
+    CREATE TRIGGER search_changes_nodes_tags
+    AFTER INSERT OR DELETE ON nodes_tags
+    FOR EACH ROW EXECUTE FUNCTION search_changes_log()
+    """,
+    """
+    CREATE TRIGGER search_changes_tags_update
+    AFTER UPDATE ON tags
+    FOR EACH ROW
+    WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION search_changes_log()
+    """,
+    """
+    CREATE TRIGGER search_changes_document_versions
+    AFTER INSERT OR DELETE ON document_versions
+    FOR EACH ROW EXECUTE FUNCTION search_changes_log()
+    """,
+    """
+    CREATE TRIGGER search_changes_pages
+    AFTER INSERT OR DELETE ON pages
+    FOR EACH ROW EXECUTE FUNCTION search_changes_log()
+    """,
+    """
+    CREATE TRIGGER search_changes_pages_update
+    AFTER UPDATE ON pages
+    FOR EACH ROW
+    WHEN (
+        (OLD.text, OLD.lang, OLD.number, OLD.document_version_id)
+        IS DISTINCT FROM (NEW.text, NEW.lang, NEW.number, NEW.document_version_id)
+    )
+    EXECUTE FUNCTION search_changes_log()
+    """,
+]
+# dropping the function drops all triggers using it
+PG_DROP = ["DROP FUNCTION IF EXISTS search_changes_log() CASCADE"]
+
+
+def _sqlite_trigger(
+    name: str, table: str, operation: str, node_id: str, when: str = ""
+) -> str:
+    """SQLite has neither procedural language nor multi-event triggers"""
+    row = "OLD" if operation == "DELETE" else "NEW"
+    node_id = node_id.format(row=row)
+    if node_id.startswith("SELECT"):
+        insert = f"INSERT INTO search_changes (node_id) {node_id};"
+    else:
+        insert = f"INSERT INTO search_changes (node_id) VALUES ({node_id});"
+    if when:
+        when = f"WHEN {when}"
+
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {operation} ON {table} "
+        f"{when} BEGIN {insert} END"
+    )
+
+
+_PAGE_DOC_ID = (
+    "SELECT document_id FROM document_versions "
+    "WHERE id = {row}.document_version_id"
+)
+# trigger name -> (table, operation, node ID expression, condition)
+SQLITE_TRIGGERS = {
+    "search_changes_nodes_insert": ("nodes", "INSERT", "{row}.id", ""),
+    "search_changes_nodes_delete": ("nodes", "DELETE", "{row}.id", ""),
+    "search_changes_nodes_update": (
+        "nodes",
+        "UPDATE",
+        "{row}.id",
+        "OLD.title IS NOT NEW.title OR OLD.lang IS NOT NEW.lang "
+        "OR OLD.user_id IS NOT NEW.user_id",
+    ),
+    "search_changes_nodes_tags_insert": (
+        "nodes_tags",
+        "INSERT",
+        "{row}.node_id",
+        "",
+    ),
+    "search_changes_nodes_tags_delete": (
+        "nodes_tags",
+        "DELETE",
+        "{row}.node_id",
+        "",
+    ),
+    "search_changes_tags_update": (
+        "tags",
+        "UPDATE",
+        "SELECT node_id FROM nodes_tags WHERE tag_id = {row}.id",
+        "OLD.name IS NOT NEW.name",
+    ),
+    "search_changes_document_versions_insert": (
+        "document_versions",
+        "INSERT",
+        "{row}.document_id",
+        "",
+    ),
+    "search_changes_document_versions_delete": (
+        "document_versions",
+        "DELETE",
+        "{row}.document_id",
+        "",
+    ),
+    "search_changes_pages_insert": ("pages", "INSERT", _PAGE_DOC_ID, ""),
+    "search_changes_pages_delete": ("pages", "DELETE", _PAGE_DOC_ID, ""),
+    "search_changes_pages_update": (
+        "pages",
+        "UPDATE",
+        _PAGE_DOC_ID,
+        "OLD.text IS NOT NEW.text OR OLD.lang IS NOT NEW.lang "
+        "OR OLD.number IS NOT NEW.number",
+    ),
+}
+SQLITE_CREATE = [
+    _sqlite_trigger(name, *args) for name, args in SQLITE_TRIGGERS.items()
+]
+SQLITE_DROP = [f"DROP TRIGGER IF EXISTS {name}" for name in SQLITE_TRIGGERS]
+
+
+def create_statements(dialect: str) -> list[str]:
+    return {"postgresql": PG_CREATE, "sqlite": SQLITE_CREATE}.get(dialect, [])
+
+
+def drop_statements(dialect: str) -> list[str]:
+    return {"postgresql": PG_DROP, "sqlite": SQLITE_DROP}.get(dialect, [])
+
+
+def is_enabled() -> bool:
+    """Whether the database search backend is selected (see `get_backend`)"""
+    url = config.papermerge__search__url
+    return not url or url == "database://"
+
+
+def install(conn: Connection):
+    """(Re)creates the triggers"""
+    dialect = conn.dialect.name
+    for statement in drop_statements(dialect) + create_statements(dialect):
+        conn.execute(text(statement))
+
+
+def uninstall(conn: Connection):
+    """Drops the triggers and discards changes logged so far"""
+    for statement in drop_statements(conn.dialect.name):
+        conn.execute(text(statement))
+    conn.execute(text("DELETE FROM search_changes"))
+
+
+def _listen():
+    # triggers reference several tables, thus are created once all tables exist
+    for dialect in ("postgresql", "sqlite"):
+        for statement in create_statements(dialect):
+            ddl = DDL(statement).execute_if(
+                dialect=dialect, callable_=lambda *args, **kwargs: is_enabled()
+            )
+            event.listen(Base.metadata, "after_create", ddl)
+        for statement in drop_statements(dialect):
+            ddl = DDL(statement).execute_if(dialect=dialect)
+            event.listen(Base.metadata, "before_drop", ddl)
+
+
+_listen()
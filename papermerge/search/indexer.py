@@ -0,0 +1,278 @@
+"""
+Bulk (re)indexing of nodes
+
+Nodes are read in chunks ordered by ID (keyset pagination, i.e. no OFFSET
+and no loading of the whole table), search index items of each chunk are
+built and written by a pool of concurrent workers, each with its own
+database session. Reading is at most `2 * workers` chunks ahead of
+writing, thus memory usage does not depend on the number of nodes.
+
+Progress is recorded in an optional checkpoint file: ID of the last node
+up to which all nodes are indexed. Interrupted run, started again with
+the same checkpoint file, continues after that node.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncContextManager, Callable, Sequence
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.search.backends import SearchBackend
+from papermerge.search.schema import FOLDER, PAGE, SearchIndex
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], AsyncContextManager[AsyncSession]]
+
+
+@dataclass
+class Stats:
+    nodes: int = 0
+    documents: int = 0
+    pages: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.documents / max(self.elapsed, 1e-9)
+
+
+class Checkpoint:
+    """Watermark of indexed nodes, optionally persisted to a file
+
+    Chunks are completed out of order; watermark advances only over
+    consecutive completed chunks, so that every node up to it is indexed.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self.last_node_id: uuid.UUID | None = None
+        self._next_seq = 0  # sequence number of next chunk to complete
+        self._completed: dict[int, uuid.UUID] = {}
+
+        if path is not None and path.exists():
+            data = json.loads(path.read_text())
+            self.last_node_id = uuid.UUID(data["last_node_id"])
+
+    def done(self, seq: int, last_node_id: uuid.UUID):
+        self._completed[seq] = last_node_id
+        advanced = False
+        while self._next_seq in self._completed:
+            self.last_node_id = self._completed.pop(self._next_seq)
+            self._next_seq += 1
+            advanced = True
+
+        if advanced:
+            self.save()
+
+    def save(self):
+        if self.path is None or self.last_node_id is None:
+            return
+
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps({"last_node_id": str(self.last_node_id)}))
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+async def get_node_ids(
+    db_session: AsyncSession,
+    limit: int,
+    after: uuid.UUID | None = None,
+    node_ids: Sequence[uuid.UUID] | None = None,
+) -> list[uuid.UUID]:
+    """Returns next `limit` node IDs (in ID order) after given one"""
+    stmt = select(orm.Node.id).order_by(orm.Node.id).limit(limit)
+    if after is not None:
+        stmt = stmt.where(orm.Node.id > after)
+    if node_ids:
+        stmt = stmt.where(orm.Node.id.in_(node_ids))
+
+    return list((await db_session.scalars(stmt)).all())
+
+
+async def get_index_items(
+    db_session: AsyncSession, node_ids: Sequence[uuid.UUID]
+) -> list[SearchIndex]:
+    """Returns search index items of given nodes
+
+    Folder is one item, document is one item per page of its last version.
+    Uses constant number of queries regardless of number of nodes.
+    """
+    # plain columns (not ORM entities): cheaper, and session's identity
+    # map is not filled with partially loaded nodes
+    nodes = (
+        await db_session.execute(
+            select(
+                orm.Node.id,
+                orm.Node.title,
+                orm.Node.ctype,
+                orm.Node.lang,
+                orm.Node.user_id,
+            ).where(orm.Node.id.in_(node_ids))
+        )
+    ).all()
+    tags: dict[uuid.UUID, list[str]] = {}
+    stmt = (
+        select(orm.NodeTagsAssociation.node_id, orm.Tag.name)
+        .join(orm.Tag, orm.Tag.id == orm.NodeTagsAssociation.tag_id)
+        .where(orm.NodeTagsAssociation.node_id.in_(node_ids))
+    )
+    for node_id, name in (await db_session.execute(stmt)).all():
+        tags.setdefault(node_id, []).append(name)
+
+    doc_ids = [node.id for node in nodes if node.ctype == "document"]
+    last_number = (
+        select(
+            orm.DocumentVersion.document_id,
+            func.max(orm.DocumentVersion.number).label("number"),
+        )
+        .where(orm.DocumentVersion.document_id.in_(doc_ids))
+        .group_by(orm.DocumentVersion.document_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            orm.DocumentVersion.document_id,
+            orm.Page.id,
+            orm.Page.document_version_id,
+            orm.Page.number,
+            orm.Page.lang,
+            orm.Page.text,
+        )
+        .join(
+            orm.DocumentVersion,
+            orm.DocumentVersion.id == orm.Page.document_version_id,
+        )
+        .join(
+            last_number,
+            and_(
+                last_number.c.document_id == orm.DocumentVersion.document_id,
+                last_number.c.number == orm.DocumentVersion.number,
+            ),
+        )
+        .order_by(orm.Page.document_version_id, orm.Page.number)
+    )
+    pages: dict[uuid.UUID, list] = {}
+    if doc_ids:
+        for page in (await db_session.execute(stmt)).all():
+            pages.setdefault(page.document_id, []).append(page)
+
+    items = []
+    for node in nodes:
+        node_tags = tags.get(node.id, [])
+        # nodes owned by a group have no user
+        user_id = str(node.user_id) if node.user_id else ""
+        if node.ctype != "document":
+            items.append(
+                SearchIndex(
+                    id=str(node.id),
+                    title=node.title,
+                    lang=node.lang,
+                    user_id=user_id,
+                    entity_type=FOLDER,
+                    tags=node_tags,
+                )
+            )
+            continue
+
+        for page in pages.get(node.id, []):
+            items.append(
+                SearchIndex(
+                    id=str(page.id),
+                    title=node.title,
+                    lang=page.lang,
+                    user_id=user_id,
+                    document_id=str(node.id),
+                    document_version_id=str(page.document_version_id),
+                    page_number=page.number,
+                    text=page.text,
+                    entity_type=PAGE,
+                    tags=node_tags,
+                )
+            )
+
+    return items
+
+
+async def index_nodes(
+    backend: SearchBackend,
+    node_ids: Sequence[uuid.UUID] | None = None,
+    chunk_size: int = 500,
+    workers: int = 4,
+    checkpoint: Checkpoint | None = None,
+    session_factory: SessionFactory = AsyncSessionLocal,
+    on_progress: Callable[[Stats], None] | None = None,
+) -> Stats:
+    """(Re)indexes nodes (all of them, or given ones)
+
+    Index entries of each node are replaced with entries of its current
+    state, e.g. pages of last document version only.
+
+    Starts after `checkpoint.last_node_id` if there is one; checkpoint is
+    cleared once all nodes are indexed.
+    """
+    checkpoint = checkpoint or Checkpoint()
+    stats = Stats()
+    # backpressure: reader waits while all workers are busy and this many
+    # chunks are waiting for them
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * workers)
+
+    async def read_chunks():
+        after, seq = checkpoint.last_node_id, 0
+        while True:
+            async with session_factory() as db_session:
+                ids = await get_node_ids(
+                    db_session, limit=chunk_size, after=after, node_ids=node_ids
+                )
+            if len(ids) == 0:
+                break
+            await queue.put((seq, ids))
+            after, seq = ids[-1], seq + 1
+
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def write_chunks():
+        while (chunk := await queue.get()) is not None:
+            seq, ids = chunk
+            async with session_factory() as db_session:
+                items = await get_index_items(db_session, ids)
+                # entries of e.g. pages of replaced document versions are
+                # not among the items; they are dropped, not left behind
+                await backend.replace(db_session, ids, items)
+
+            stats.nodes += len(ids)
+            stats.documents += len({item.document_id for item in items} - {None})
+            stats.pages += sum(1 for item in items if item.document_id)
+            checkpoint.done(seq, ids[-1])
+            if on_progress:
+                on_progress(stats)
+
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(read_chunks())
+        for _ in range(workers):
+            tg.create_task(write_chunks())
+
+    checkpoint.clear()
+    logger.debug(
+        f"Indexed {stats.nodes} nodes, {stats.pages} pages in {stats.elapsed:.1f}s"
+    )
+
+    return stats
@@ -1,26 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-from salinic import IndexRO, Search, create_engine
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from papermerge.core.features.users import schema as usr_schema
 from papermerge.core.features.auth import get_current_user
-from papermerge.core.config import get_settings
-from papermerge.search.schema import SearchIndex, PaginatedResponse
+from papermerge.core.db.engine import get_read_db
+from papermerge.search.backends import get_backend
+from papermerge.search.schema import PaginatedResponse
 
 router = APIRouter(prefix="/search", tags=["search"])
-config = get_settings()
 
 
 @router.get("/", response_model=PaginatedResponse)
-def search(
+async def search(
     q: str,
-    page_number: int = 1,
-    page_size: int = 10,
+    page_number: Annotated[int, Query(ge=1)] = 1,
+    page_size: Annotated[int, Query(ge=1, le=100)] = 10,
+    lang: str | None = None,
     user: usr_schema.User = Depends(get_current_user),
+    db_session: AsyncSession = Depends(get_read_db),
 ):
-    engine = create_engine(config.papermerge__search__url)
-    index = IndexRO(engine, schema=SearchIndex)
+    """Full text search in documents' pages and folders user has access to
 
-    sq = Search(SearchIndex).query(q, page_number=page_number, page_size=page_size)
-    results = index.search(sq, user_id=str(user.id))
+    `lang` (e.g. "deu") restricts stemming of the query to given language
+    (database search backend only).
+    """
+    backend = get_backend()
 
-    return results
+    return await backend.search(
+        db_session,
+        query=q,
+        user_id=user.id,
+        page_number=page_number,
+        page_size=page_size,
+        lang=lang,
+    )
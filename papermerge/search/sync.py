@@ -0,0 +1,179 @@
+"""
+Incremental search index updates from the change log
+
+Database triggers log every search relevant change into `search_changes`
+(see `papermerge.search.db.triggers`) in the same transaction as the change
+itself, thus no change is lost when the application crashes or Redis is
+not available. `sync` replays logged changes in batches: index entries of
+each logged node are replaced with entries built from its current state
+(or just removed, if the node no longer exists).
+
+Consumed change log rows are deleted in the same transaction which writes
+the (database) index. Rows are picked with `FOR UPDATE SKIP LOCKED`, so
+several sync processes can run at the same time. Sequence IDs are used
+only for ordering, not as a watermark: IDs are assigned at insert, but
+transactions commit in any order, thus a change with lower ID may become
+visible after higher ones were already processed.
+
+`reconcile` queues (cheaply, with one statement) nodes which are missing
+from the database index or were updated after they were indexed, e.g.
+changes made before the change log existed.
+
+The log is replayed by `SearchSync`, started by the application (with
+`papermerge__search__sync_in_app`), or by `paper-cli index sync --follow`.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import and_, delete, exists, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from papermerge.core import orm
+from papermerge.core.config import get_settings
+from papermerge.core.db.engine import AsyncSessionLocal
+from papermerge.search import indexer
+from papermerge.search.backends import SearchBackend, get_backend
+from papermerge.search.db.orm import SearchChange, SearchIndexEntry
+
+logger = logging.getLogger(__name__)
+config = get_settings()
+
+
+@dataclass
+class SyncResult:
+    changes: int = 0  # consumed change log rows
+    nodes: int = 0  # reindexed (or removed) nodes
+
+
+async def sync_batch(
+    db_session: AsyncSession, backend: SearchBackend, batch_size: int = 500
+) -> SyncResult:
+    """Replays (at most) `batch_size` oldest logged changes"""
+    stmt = (
+        select(SearchChange.id, SearchChange.node_id)
+        .order_by(SearchChange.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = (await db_session.execute(stmt)).all()
+    if len(rows) == 0:
+        await db_session.commit()
+        return SyncResult()
+
+    # e.g. upload of a document logs the document once per page
+    node_ids = list({row.node_id for row in rows})
+    items = await indexer.get_index_items(db_session, node_ids)
+    await db_session.execute(
+        delete(SearchChange).where(SearchChange.id.in_([row.id for row in rows]))
+    )
+    await backend.replace(db_session, node_ids, items)
+
+    return SyncResult(changes=len(rows), nodes=len(node_ids))
+
+
+async def sync(
+    db_session: AsyncSession, backend: SearchBackend, batch_size: int = 500
+) -> SyncResult:
+    """Replays all logged changes"""
+    result = SyncResult()
+    while True:
+        batch = await sync_batch(db_session, backend, batch_size=batch_size)
+        if batch.changes == 0:
+            break
+        result.changes += batch.changes
+        result.nodes += batch.nodes
+
+    logger.debug(f"Synced {result.changes} changes of {result.nodes} nodes")
+
+    return result
+
+
+async def reconcile(db_session: AsyncSession) -> int:
+    """Logs nodes whose entries in the database index are missing or outdated
+
+    Documents are considered only if they have pages. Returns number of
+    logged nodes.
+    """
+    indexed = exists().where(SearchIndexEntry.node_id == orm.Node.id)
+    has_pages = (
+        exists()
+        .where(orm.DocumentVersion.document_id == orm.Node.id)
+        .where(orm.Page.document_version_id == orm.DocumentVersion.id)
+    )
+    last_indexed_at = (
+        select(func.min(SearchIndexEntry.updated_at))
+        .where(SearchIndexEntry.node_id == orm.Node.id)
+        .scalar_subquery()
+    )
+    missing = and_(
+        ~indexed,
+        or_(orm.Node.ctype == "folder", has_pages),
+    )
+    outdated = orm.Node.updated_at > last_indexed_at
+
+    stmt = insert(SearchChange).from_select(
+        ["node_id"], select(orm.Node.id).where(or_(missing, outdated))
+    )
+    result = await db_session.execute(stmt)
+    await db_session.commit()
+
+    return result.rowcount
+
+
+
+class SearchSync:
+    """Replays logged changes every `interval` seconds"""
+
+    def __init__(
+        self,
+        interval: float = 2.0,
+        batch_size: int = 500,
+        backend: Callable[[], SearchBackend] = get_backend,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.interval = interval
+        self.batch_size = max(batch_size, 1)
+        self.backend = backend
+        self.session_factory = session_factory
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def sync(self) -> SyncResult:
+        async with self.session_factory() as db_session:
+            return await sync(db_session, self.backend(), batch_size=self.batch_size)
+
+    def start(self):
+        """Starts replaying in the running event loop"""
+        if self.running:
+            return
+
+        self._task = asyncio.create_task(self._run(), name="search-sync")
+
+    async def shutdown(self):
+        """Stops replaying; changes not replayed yet stay in the log"""
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Search index sync failed: {e!r}")
+            await asyncio.sleep(self.interval)
+
+
+sync_worker = SearchSync(
+    interval=config.papermerge__search__sync_interval,
+    batch_size=config.papermerge__search__sync_batch_size,
+)